@@ -9,6 +9,7 @@ import sys
 # Importer la fonction qui retourne le bon chemin selon l'environnement
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..'))
 from database import get_database_path
+from db_pool import get_connection
 
 DB_PATH = get_database_path()
 
@@ -23,7 +24,7 @@ def get_entrepreneurs_for_coach(coach_username: str):
         list: Liste des dictionnaires avec username, prenom, nom des entrepreneurs assignés à ce coach
     """
     try:
-        with sqlite3.connect(DB_PATH) as conn:
+        with get_connection() as conn:
             conn.row_factory = sqlite3.Row
             cursor = conn.cursor()
             cursor.execute("""
@@ -62,7 +63,7 @@ def get_coach_for_entrepreneur(entrepreneur_username: str):
         str: Username du coach assigné, ou None si non trouvé
     """
     try:
-        with sqlite3.connect(DB_PATH) as conn:
+        with get_connection() as conn:
             cursor = conn.cursor()
             cursor.execute("""
                 SELECT assigned_coach
@@ -90,7 +91,7 @@ def get_all_entrepreneurs():
         list: Liste de tous les usernames entrepreneurs actifs
     """
     try:
-        with sqlite3.connect(DB_PATH) as conn:
+        with get_connection() as conn:
             cursor = conn.cursor()
             cursor.execute("""
                 SELECT username
@@ -0,0 +1,221 @@
+"""
+Historique global de facturation QE (Rapprochement QBO), en ajout seul dans SQLite
+
+Avant: facturation_qe_historique/historique.json (une liste pour tous les
+entrepreneurs) était relu en entier par /api/comptable/facturation/historique
+(filtre Python puis [:limit]), par le décompte des paiements en rapprochement
+et par la liste des facturations en traitement; chaque ajout, suppression,
+retour vers Général ou remise en rapprochement réécrivait tout le fichier
+(tronqué à 500 entrées: les plus anciennes étaient perdues).
+
+Maintenant:
+- Table facturation_historique: une ligne par entrée (JSON d'origine dans
+  entry), colonnes indexées entrepreneur, soumission, type, index, statut, date
+- Ajout = INSERT; suppression = pierre tombale (deleted_at), jamais de réécriture
+- Lecture paginée par curseur (id décroissant = plus récent d'abord) avec filtres
+- live_keys(): clés (entrepreneur, soumission, type, index) sans parser les entrées
+- L'ancien historique.json est importé au démarrage si la table est vide
+"""
+
+import json
+import os
+import time
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import serialization
+from db_pool import get_connection
+
+DATE_FORMAT = "%d/%m/%Y %H:%M"
+
+# Valeur par défaut de `index` dans tombstone(): ne pas filtrer sur l'index
+ANY_INDEX = object()
+
+HistoriqueKey = Tuple[Optional[str], Optional[str], Optional[str], Optional[int]]
+
+
+def _date_ts(date_str: Optional[str]) -> float:
+    try:
+        return datetime.strptime(date_str, DATE_FORMAT).timestamp()
+    except (TypeError, ValueError):
+        return time.time()
+
+
+def _row_values(entry: Dict[str, Any]) -> tuple:
+    return (
+        entry.get("entrepreneurUsername"),
+        entry.get("numeroSoumission"),
+        entry.get("type"),
+        entry.get("index"),
+        entry.get("statut"),
+        _date_ts(entry.get("date")),
+        serialization.dumps(entry),
+    )
+
+
+def init_historique_tables(legacy_file: Optional[str] = None):
+    """Crée la table de l'historique et importe l'ancien fichier JSON si la table est vide"""
+    with get_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS facturation_historique (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                entrepreneur_username TEXT,
+                numero_soumission TEXT,
+                type TEXT,
+                paiement_index INTEGER,
+                statut TEXT,
+                date_ts REAL NOT NULL,
+                entry TEXT NOT NULL,
+                deleted_at REAL,
+                deleted_reason TEXT
+            )
+        ''')
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_facturation_historique_soumission
+            ON facturation_historique(entrepreneur_username, numero_soumission, type)
+        ''')
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_facturation_historique_statut
+            ON facturation_historique(statut, id)
+        ''')
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_facturation_historique_type
+            ON facturation_historique(type, id)
+        ''')
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_facturation_historique_date
+            ON facturation_historique(date_ts)
+        ''')
+        conn.commit()
+        has_rows = cursor.execute("SELECT 1 FROM facturation_historique LIMIT 1").fetchone()
+
+    if has_rows or not legacy_file or not os.path.exists(legacy_file):
+        return
+    try:
+        with open(legacy_file, "r", encoding="utf-8") as f:
+            historique = json.load(f)
+    except Exception as e:
+        print(f"[HISTORIQUE] Lecture {legacy_file} impossible: {e}", flush=True)
+        return
+    if not isinstance(historique, list):
+        return
+
+    # Le fichier est du plus récent au plus ancien: insertion inversée pour garder l'ordre des id
+    rows = [_row_values(entry) for entry in reversed(historique) if isinstance(entry, dict)]
+    with get_connection() as conn:
+        conn.executemany('''
+            INSERT INTO facturation_historique
+                (entrepreneur_username, numero_soumission, type, paiement_index, statut, date_ts, entry)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        ''', rows)
+        conn.commit()
+    print(f"[HISTORIQUE] {len(rows)} entrée(s) importée(s) depuis {legacy_file}", flush=True)
+
+
+def append(entry: Dict[str, Any]) -> int:
+    """Ajoute une entrée (la plus récente) et retourne son id"""
+    with get_connection() as conn:
+        cursor = conn.execute('''
+            INSERT INTO facturation_historique
+                (entrepreneur_username, numero_soumission, type, paiement_index, statut, date_ts, entry)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        ''', _row_values(entry))
+        conn.commit()
+        return cursor.lastrowid
+
+
+def query(limit: int = 100, cursor: Optional[int] = None, username: Optional[str] = None,
+          numero_soumission: Optional[str] = None, type_paiement: Optional[str] = None,
+          statut: Optional[str] = None, exclude_statut: Optional[str] = None,
+          date_from: Optional[float] = None, date_to: Optional[float] = None) -> Tuple[List[Dict[str, Any]], Optional[int]]:
+    """
+    Entrées non supprimées, de la plus récente à la plus ancienne.
+    cursor: next_cursor de la page précédente. Retourne (entrées, next_cursor ou None)
+    """
+    clauses = ["deleted_at IS NULL"]
+    params: list = []
+    for column, value in (("entrepreneur_username", username), ("numero_soumission", numero_soumission),
+                          ("type", type_paiement), ("statut", statut)):
+        if value is not None:
+            clauses.append(f"{column} = ?")
+            params.append(value)
+    if exclude_statut is not None:
+        clauses.append("(statut IS NULL OR statut != ?)")
+        params.append(exclude_statut)
+    if date_from is not None:
+        clauses.append("date_ts >= ?")
+        params.append(date_from)
+    if date_to is not None:
+        clauses.append("date_ts < ?")
+        params.append(date_to)
+    if cursor is not None:
+        clauses.append("id < ?")
+        params.append(cursor)
+
+    limit = max(1, limit)
+    with get_connection() as conn:
+        rows = conn.execute(f'''
+            SELECT id, entry FROM facturation_historique
+            WHERE {" AND ".join(clauses)}
+            ORDER BY id DESC
+            LIMIT ?
+        ''', (*params, limit + 1)).fetchall()
+
+    next_cursor = rows[limit - 1][0] if len(rows) > limit else None
+    return [serialization.loads(row[1]) for row in rows[:limit]], next_cursor
+
+
+def live_keys(statut: Optional[str] = None, exclude_statut: Optional[str] = None) -> List[HistoriqueKey]:
+    """(entrepreneurUsername, numeroSoumission, type, index) des entrées non supprimées"""
+    clauses = ["deleted_at IS NULL"]
+    params: list = []
+    if statut is not None:
+        clauses.append("statut = ?")
+        params.append(statut)
+    if exclude_statut is not None:
+        clauses.append("(statut IS NULL OR statut != ?)")
+        params.append(exclude_statut)
+    with get_connection() as conn:
+        return [tuple(row) for row in conn.execute(f'''
+            SELECT entrepreneur_username, numero_soumission, type, paiement_index
+            FROM facturation_historique WHERE {" AND ".join(clauses)}
+        ''', params).fetchall()]
+
+
+def exists(username: str, numero_soumission: str, type_paiement: str, index: Optional[int] = None) -> bool:
+    """True si une entrée non supprimée a exactement cette clé (index compris, None = sans index)"""
+    with get_connection() as conn:
+        return conn.execute('''
+            SELECT 1 FROM facturation_historique
+            WHERE deleted_at IS NULL AND entrepreneur_username = ? AND numero_soumission = ?
+              AND type = ? AND paiement_index IS ?
+            LIMIT 1
+        ''', (username, numero_soumission, type_paiement, index)).fetchone() is not None
+
+
+def tombstone(username: str, numeros: Iterable[str], type_paiement: Optional[str] = None,
+              index: Any = ANY_INDEX, reason: str = "") -> int:
+    """
+    Marque supprimées les entrées de l'entrepreneur pour ces numéros de soumission
+    (et ce type / cet index si précisés). Retourne le nombre d'entrées supprimées
+    """
+    numeros = list(numeros)
+    if not numeros:
+        return 0
+    clauses = ["deleted_at IS NULL", "entrepreneur_username = ?",
+               f"numero_soumission IN ({','.join('?' for _ in numeros)})"]
+    params: list = [username, *numeros]
+    if type_paiement is not None:
+        clauses.append("type = ?")
+        params.append(type_paiement)
+    if index is not ANY_INDEX:
+        clauses.append("paiement_index IS ?")
+        params.append(index)
+    with get_connection() as conn:
+        count = conn.execute(f'''
+            UPDATE facturation_historique SET deleted_at = ?, deleted_reason = ?
+            WHERE {" AND ".join(clauses)}
+        ''', (time.time(), reason, *params)).rowcount
+        conn.commit()
+    return count
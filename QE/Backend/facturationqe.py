@@ -20,7 +20,9 @@ def get_toronto_now():
     return datetime.now(TORONTO_TZ)
 
 # Import pour sync RPO automatique
-from QE.Backend.rpo import sync_soumissions_to_rpo
+from QE.Backend.rpo_sync import request_rpo_sync
+from json_cache import invalidate as invalidate_json_cache
+from QE.Backend import work_queue_index
 
 # Détection OS pour chemins de fichiers (même logique que main.py)
 if sys.platform == 'win32':
@@ -421,15 +423,16 @@ def update_statut_client_facturation_qe(username: str, numero_soumission: str, t
         # Sauvegarder
         with open(fichier_statuts, "w", encoding="utf-8") as f:
             json.dump(tous_statuts, f, indent=2, ensure_ascii=False)
+        invalidate_json_cache(fichier_statuts)
+        work_queue_index.refresh_source(username, "statuts_clients")
 
         print(f"[update_statut_client_facturation_qe] {username} - {numero_soumission}: {type_statut} -> {nouveau_statut}")
 
         # Sync RPO automatiquement si c'est le premier paiement
         if should_sync_rpo:
             try:
-                print(f"[RPO AUTO-SYNC] Lancement sync RPO pour {username}...")
-                sync_soumissions_to_rpo(username)
-                print(f"[RPO AUTO-SYNC] Sync RPO terminé pour {username}")
+                request_rpo_sync(username)
+                print(f"[RPO AUTO-SYNC] Sync RPO programmée pour {username}")
             except Exception as e:
                 print(f"[RPO AUTO-SYNC ERROR] Erreur sync RPO: {e}")
 
@@ -777,75 +780,10 @@ def get_facturations_a_traiter_count_direction():
     """
     Compte le nombre total de paiements à traiter pour la direction
     (même logique que coach: statut 'traitement' pour dépôt/paiement final, 'en_attente_coach' pour remboursements)
-    Parcourt tous les entrepreneurs
+    Tous les entrepreneurs, lu dans l'index des files de travail (voir work_queue_index)
     """
     try:
-        statuts_dir = Path(base_cloud) / "facturation_qe_statuts"
-        total_count = 0
-        print(f"[DEBUG] Recherche dans: {statuts_dir.absolute()}")
-
-        if not statuts_dir.exists():
-            print(f"[DEBUG] Dossier n'existe pas: {statuts_dir}")
-            return {"count": 0}
-
-        # Parcourir tous les dossiers d'entrepreneurs
-        for user_dir in statuts_dir.iterdir():
-            if user_dir.is_dir():
-                statuts_file = user_dir / "statuts_clients.json"
-                if statuts_file.exists():
-                    try:
-                        with open(statuts_file, "r", encoding="utf-8") as f:
-                            statuts = json.load(f)
-
-                        for num_soumission, data in statuts.items():
-                            # Vérifier si le client a un paiement refusé (urgent)
-                            statut_depot = data.get("statutDepot", "")
-                            statut_paiement_final = data.get("statutPaiementFinal", "")
-                            autres_paiements = data.get("autresPaiements", [])
-
-                            depot_refuse = statut_depot == "refuse"
-                            paiement_final_refuse = statut_paiement_final == "refuse"
-                            autres_refuses = any(p.get("statut") == "refuse" for p in autres_paiements) if isinstance(autres_paiements, list) else False
-                            a_paiement_refuse = depot_refuse or paiement_final_refuse or autres_refuses
-
-                            # Si le client a un paiement refusé, ne pas compter (il est dans Urgent)
-                            if a_paiement_refuse:
-                                continue
-
-                            # Compter depot en traitement (même logique que coach)
-                            if statut_depot == "traitement":
-                                total_count += 1
-                            # Compter paiement final en traitement
-                            if statut_paiement_final == "traitement":
-                                total_count += 1
-                            # Compter autres paiements en traitement
-                            if data.get("statutAutresPaiements") == "traitement":
-                                total_count += 1
-
-                    except Exception as e:
-                        print(f"[ERREUR] Lecture statuts {user_dir.name}: {e}")
-                        continue
-
-        # Compter les remboursements en attente validation coach (même logique que coach)
-        remboursements_dir = Path(base_cloud) / "remboursements"
-        if remboursements_dir.exists():
-            for user_dir in remboursements_dir.iterdir():
-                if user_dir.is_dir():
-                    remb_file = user_dir / "remboursements.json"
-                    if remb_file.exists():
-                        try:
-                            with open(remb_file, "r", encoding="utf-8") as f:
-                                content = f.read().strip()
-                                if content:
-                                    remboursements = json.loads(content)
-                                    remb_en_attente = sum(1 for r in remboursements if r.get("statut") == "en_attente_coach")
-                                    total_count += remb_en_attente
-                                    print(f"[REMB COUNT] {user_dir.name}: {remb_en_attente} remboursements en attente coach")
-                        except Exception as e:
-                            print(f"[ERREUR] Lecture remboursements {user_dir.name}: {e}")
-                            continue
-
-        return {"count": total_count}
+        return {"count": work_queue_index.count(work_queue_index.FACTURATION_QUEUES)}
 
     except Exception as e:
         print(f"[ERREUR get_facturations_a_traiter_count_direction] {e}")
@@ -0,0 +1,461 @@
+"""
+Classement matérialisé pour /api/entrepreneurs et /api/coaches
+Les métriques de chaque utilisateur (RPO annuel, semaines RPO, soumissions signées/perdues,
+avis) sont stockées dans des tables SQLite. Les écritures (sauvegarde RPO, profil, avis)
+marquent l'utilisateur comme "dirty" et seules ces lignes sont recalculées avant la requête.
+Le filtrage par période est fait en SQL sur les bornes de semaines et les dates des soumissions.
+"""
+
+import glob
+import json
+import math
+import os
+import sqlite3
+import sys
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..'))
+from database import get_database_path
+from db_pool import get_connection
+from document_store import get_base_cloud, load_user_documents
+from date_index import record_datetime
+from period_aggregation import RpoWeekColumns
+import photo_store
+from QE.Backend.rpo import load_user_rpo_data, register_rpo_save_hook
+
+DB_PATH = get_database_path()
+
+# Filet de sécurité: une ligne plus vieille que ça est recalculée même sans invalidation
+LEADERBOARD_MAX_AGE_SECONDS = int(os.getenv("LEADERBOARD_MAX_AGE_SECONDS", "3600"))
+
+ENTREPRENEUR_ROLES = ("entrepreneur", "beta")
+
+PROFILE_PHOTOS_DIR = os.path.join(os.path.dirname(__file__), '..', '..', 'static', 'profile_photos')
+
+
+def init_leaderboard_tables():
+    """Crée les tables du classement si elles n'existent pas"""
+    with get_connection() as conn:
+        cursor = conn.cursor()
+
+        # Une ligne par utilisateur: données annuelles et profil
+        # dirty = nombre d'invalidations reçues depuis le dernier recalcul
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS leaderboard_users (
+                username TEXT PRIMARY KEY,
+                display_name TEXT,
+                grade TEXT,
+                photo_url TEXT,
+                objectif REAL DEFAULT 0,
+                prod_horaire_annual REAL DEFAULT 0,
+                dollar_annual REAL DEFAULT 0,
+                contract_annual REAL DEFAULT 0,
+                estimation_annual REAL DEFAULT 0,
+                hr_pap_annual REAL DEFAULT 0,
+                etoiles_moyennes REAL DEFAULT 0,
+                nombre_avis INTEGER DEFAULT 0,
+                dirty INTEGER DEFAULT 1,
+                refreshed_at REAL
+            )
+        ''')
+
+        # Une ligne par semaine RPO avec ses bornes (ISO UTC) pour filtrer par période
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS leaderboard_weekly (
+                username TEXT NOT NULL,
+                month_index INTEGER NOT NULL,
+                week_number INTEGER NOT NULL,
+                week_start TEXT,
+                week_end TEXT,
+                dollar REAL DEFAULT 0,
+                contract INTEGER DEFAULT 0,
+                estimation INTEGER DEFAULT 0,
+                h_marketing REAL DEFAULT 0,
+                produit REAL DEFAULT 0,
+                prod_horaire REAL,
+                PRIMARY KEY (username, month_index, week_number)
+            )
+        ''')
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_leaderboard_weekly_period
+            ON leaderboard_weekly (week_end, week_start)
+        ''')
+
+        # Dates des soumissions signées / clients perdus (NULL si date illisible)
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS leaderboard_records (
+                username TEXT NOT NULL,
+                kind TEXT NOT NULL,
+                record_date TEXT
+            )
+        ''')
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_leaderboard_records
+            ON leaderboard_records (username, kind, record_date)
+        ''')
+
+        try:
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_users_assigned_coach ON users (assigned_coach)")
+        except sqlite3.OperationalError:
+            pass  # Colonne assigned_coach absente (base non migrée)
+
+        conn.commit()
+    print("[LEADERBOARD] Tables du classement initialisées")
+
+
+# ========== INVALIDATION ==========
+
+def mark_dirty(username: str):
+    """Hook d'invalidation: la ligne de l'utilisateur sera recalculée au prochain classement"""
+    if not username:
+        return
+    try:
+        with get_connection() as conn:
+            conn.execute('''
+                INSERT INTO leaderboard_users (username, dirty) VALUES (?, 1)
+                ON CONFLICT(username) DO UPDATE SET dirty = dirty + 1
+            ''', (username,))
+    except sqlite3.OperationalError as e:
+        # Tables pas encore créées (script hors application): rien à invalider
+        print(f"[LEADERBOARD] Invalidation ignorée pour {username}: {e}")
+
+
+register_rpo_save_hook(mark_dirty)
+
+
+# ========== RECALCUL D'UN UTILISATEUR ==========
+
+def _to_float(value) -> float:
+    if value in (None, '', '-'):
+        return 0.0
+    try:
+        return float(value)
+    except (ValueError, TypeError):
+        return 0.0
+
+
+def _iso_utc(dt) -> Optional[str]:
+    if dt is None:
+        return None
+    return dt.astimezone(timezone.utc).strftime('%Y-%m-%dT%H:%M:%S')
+
+
+def _iso_epoch(ts: float) -> Optional[str]:
+    """Borne de semaine des colonnes RPO (NaN si week_label illisible)"""
+    if math.isnan(ts):
+        return None
+    return _iso_utc(datetime.fromtimestamp(ts, tz=timezone.utc))
+
+
+def _load_json(path: str, default):
+    if not os.path.exists(path):
+        return default
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except Exception as e:
+        print(f"[LEADERBOARD] Erreur lecture {path}: {e}")
+        return default
+
+
+def _find_profile_photo(username: str) -> Optional[str]:
+    # Miniature de la photo courante (users.photo_hash), sinon ancienne photo la plus récente
+    photo_url = photo_store.photo_url(photo_store.get_user_photo_hash(username), photo_store.PHOTO_LIST_SIZE)
+    if photo_url:
+        return photo_url
+    matching_files = glob.glob(os.path.join(PROFILE_PHOTOS_DIR, f"{username}_*.*"))
+    if not matching_files:
+        return None
+    return f"/static/profile_photos/{os.path.basename(max(matching_files, key=os.path.getmtime))}"
+
+
+def refresh_user_metrics(username: str, role: str):
+    """Recalcule et enregistre les métriques matérialisées d'un utilisateur"""
+    with get_connection() as conn:
+        row = conn.execute("SELECT dirty FROM leaderboard_users WHERE username = ?", (username,)).fetchone()
+    dirty_seen = row[0] if row else 0
+
+    base_cloud = get_base_cloud()
+    rpo_data = load_user_rpo_data(username)
+    annual = rpo_data.get('annual', {}) or {}
+
+    # Semaines RPO (mêmes colonnes que le dashboard, voir period_aggregation)
+    weeks = RpoWeekColumns(rpo_data.get('weekly', {}) or {})
+    weekly_rows = []
+    for i in range(len(weeks)):
+        if weeks.week_number[i] < 0:
+            continue  # clé de semaine illisible
+        prod_horaire = weeks.prod_horaire[i]
+        weekly_rows.append((
+            username, int(weeks.month_index[i]), int(weeks.week_number[i]),
+            _iso_epoch(weeks.week_start[i]), _iso_epoch(weeks.week_end[i]),
+            float(weeks.dollar[i]),
+            int(weeks.contract[i]),
+            int(weeks.estimation[i]),
+            float(weeks.h_marketing[i]),
+            float(weeks.produit[i]),
+            None if math.isnan(prod_horaire) else float(prod_horaire)
+        ))
+
+    # Profil (prénom, nom, grade) et objectif
+    if role == 'coach':
+        objectif = _to_float((rpo_data.get('coach_previsions', {}) or {}).get('totalObjectif'))
+        display_name, grade = username, 'coach'
+    else:
+        objectif = _to_float(annual.get('objectif_ca'))
+        user_info = _load_json(os.path.join(base_cloud, "signatures", username, "user_info.json"), {})
+        prenom = user_info.get("prenom", "")
+        nom = user_info.get("nom", "")
+        display_name = f"{prenom} {nom}".strip() if (prenom or nom) else username
+        grade = user_info.get("grade", "")
+
+    # Avis clients
+    reviews = _load_json(os.path.join(base_cloud, "reviews", username, "reviews.json"), [])
+    nombre_avis = len(reviews) if isinstance(reviews, list) else 0
+    etoiles = round(sum(_to_float(r.get("rating")) for r in reviews) / nombre_avis, 1) if nombre_avis else 0.0
+
+    # Dates des soumissions signées et des clients perdus
+    record_rows = []
+    for kind, collection in (("signee", "soumissions_signees"), ("perdu", "clients_perdus")):
+        try:
+            records = load_user_documents(collection, username)
+        except json.JSONDecodeError as e:
+            print(f"[LEADERBOARD] JSON invalide {collection}/{username}: {e}")
+            records = []
+        for record in records:
+            record_rows.append((username, kind, _iso_utc(record_datetime(record))))
+
+    with get_connection() as conn:
+        conn.execute("DELETE FROM leaderboard_weekly WHERE username = ?", (username,))
+        conn.executemany('''
+            INSERT INTO leaderboard_weekly (username, month_index, week_number, week_start, week_end,
+                                            dollar, contract, estimation, h_marketing, produit, prod_horaire)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ''', weekly_rows)
+        conn.execute("DELETE FROM leaderboard_records WHERE username = ?", (username,))
+        conn.executemany("INSERT INTO leaderboard_records (username, kind, record_date) VALUES (?, ?, ?)", record_rows)
+        conn.execute('''
+            INSERT INTO leaderboard_users (username, dirty) VALUES (?, 0)
+            ON CONFLICT(username) DO NOTHING
+        ''', (username,))
+        # Les invalidations reçues pendant le recalcul restent comptées (dirty - dirty_seen)
+        conn.execute('''
+            UPDATE leaderboard_users SET
+                display_name = ?, grade = ?, photo_url = ?, objectif = ?, prod_horaire_annual = ?,
+                dollar_annual = ?, contract_annual = ?, estimation_annual = ?, hr_pap_annual = ?,
+                etoiles_moyennes = ?, nombre_avis = ?,
+                dirty = MAX(dirty - ?, 0), refreshed_at = ?
+            WHERE username = ?
+        ''', (
+            display_name, grade, _find_profile_photo(username), objectif, _to_float(annual.get('prod_horaire')),
+            _to_float(annual.get('dollar_reel')), _to_float(annual.get('contract_reel')),
+            _to_float(annual.get('estimation_reel')), _to_float(annual.get('hr_pap_reel_sans_week1')),
+            etoiles, nombre_avis, dirty_seen, time.time(), username
+        ))
+
+
+def refresh_stale_users(roles) -> int:
+    """Recalcule les utilisateurs actifs invalidés, jamais calculés ou trop vieux. Retourne le nombre recalculé"""
+    placeholders = ','.join('?' for _ in roles)
+    with get_connection() as conn:
+        stale = conn.execute(f'''
+            SELECT u.username, u.role
+            FROM users u LEFT JOIN leaderboard_users lu ON lu.username = u.username
+            WHERE u.is_active = 1 AND u.role IN ({placeholders})
+              AND (lu.username IS NULL OR lu.dirty > 0 OR lu.refreshed_at IS NULL OR lu.refreshed_at < ?)
+        ''', (*roles, time.time() - LEADERBOARD_MAX_AGE_SECONDS)).fetchall()
+
+    for username, role in stale:
+        try:
+            refresh_user_metrics(username, role)
+        except Exception as e:
+            print(f"[LEADERBOARD] Erreur recalcul {username}: {e}", flush=True)
+    if stale:
+        print(f"[LEADERBOARD] {len(stale)} utilisateur(s) recalculé(s)", flush=True)
+    return len(stale)
+
+
+# ========== REQUÊTES DE CLASSEMENT ==========
+
+_WEEKLY_SUMS_SQL = '''
+    SELECT username,
+           SUM(dollar) AS dollar, SUM(contract) AS contract, SUM(estimation) AS estimation,
+           SUM(h_marketing) AS h_marketing, SUM(produit) AS produit,
+           AVG(CASE WHEN month_index BETWEEN 4 AND 8 THEN prod_horaire END) AS prod_horaire_moyen
+    FROM leaderboard_weekly
+    WHERE month_index >= 0
+      AND (:start IS NULL OR (week_end >= :start AND week_start <= :end))
+    GROUP BY username
+'''
+
+_RECORD_PERIOD_SQL = "(:start IS NULL OR r.record_date BETWEEN :start AND :end)"
+
+
+def _period_params(start_date, end_date) -> Dict[str, Any]:
+    if not start_date:
+        return {"start": None, "end": None}
+    return {"start": _iso_utc(start_date), "end": _iso_utc(end_date)}
+
+
+def get_entrepreneurs_leaderboard(start_date=None, end_date=None) -> List[Dict[str, Any]]:
+    """Classement des entrepreneurs (rôles entrepreneur et beta) pour une période"""
+    refresh_stale_users(ENTREPRENEUR_ROLES)
+
+    with get_connection() as conn:
+        conn.row_factory = sqlite3.Row
+        rows = conn.execute(f'''
+            SELECT u.username, u.role, lu.*,
+                   w.dollar AS w_dollar, w.contract AS w_contract, w.estimation AS w_estimation,
+                   w.h_marketing AS w_h_marketing, w.produit AS w_produit, w.prod_horaire_moyen,
+                   (SELECT COUNT(*) FROM leaderboard_records r
+                    WHERE r.username = u.username AND r.kind = 'signee' AND {_RECORD_PERIOD_SQL}) AS signees,
+                   (SELECT COUNT(*) FROM leaderboard_records r
+                    WHERE r.username = u.username AND r.kind = 'perdu' AND {_RECORD_PERIOD_SQL}) AS perdus
+            FROM users u
+            JOIN leaderboard_users lu ON lu.username = u.username
+            LEFT JOIN ({_WEEKLY_SUMS_SQL}) w ON w.username = u.username
+            WHERE u.is_active = 1 AND u.role IN ('entrepreneur', 'beta')
+            ORDER BY u.created_at DESC
+        ''', _period_params(start_date, end_date)).fetchall()
+
+    entrepreneurs = []
+    for row in rows:
+        w_dollar = row["w_dollar"] or 0
+        w_contract = row["w_contract"] or 0
+        if start_date:
+            dollar_reel = w_dollar
+            contract_reel = w_contract
+            estimation_reel = row["w_estimation"] or 0
+            hr_pap_reel = row["w_h_marketing"] or 0
+        else:
+            dollar_reel = row["dollar_annual"] or 0
+            contract_reel = row["contract_annual"] or 0
+            estimation_reel = row["estimation_annual"] or 0
+            hr_pap_reel = row["hr_pap_annual"] or 0
+            # Fallback: si annual dollar/contract sont 0, calculer depuis weekly
+            if dollar_reel == 0 and contract_reel == 0:
+                dollar_reel = w_dollar
+                contract_reel = w_contract
+        produit_reel = row["w_produit"] or 0
+        prod_horaire_rpo = round(row["prod_horaire_moyen"]) if row["prod_horaire_moyen"] else 0
+
+        signees = row["signees"]
+        perdus = row["perdus"]
+        nb_estimations = estimation_reel if estimation_reel > 0 else (signees + perdus)
+
+        entrepreneurs.append({
+            "username": row["display_name"] or row["username"],
+            "login_username": row["username"],
+            "role": row["role"],
+            "grade": row["grade"] or "",
+            # Données RPO directes
+            "dollar_reel": dollar_reel,
+            "contract_reel": contract_reel,
+            "estimation_reel": estimation_reel,
+            "hr_pap_reel": hr_pap_reel,
+            "produit_reel": produit_reel,
+            # Alias pour compatibilité
+            "ca_actuel": dollar_reel,
+            "heures_pap": hr_pap_reel,
+            "montant_produit": produit_reel,
+            "objectif": round(row["objectif"] or 0, 2),
+            # Métriques calculées
+            "contrat_moyen": round(dollar_reel / contract_reel, 2) if contract_reel > 0 else 0,
+            "taux_vente": round((contract_reel / nb_estimations) * 100, 2) if nb_estimations > 0 else 0,
+            "taux_marketing": round(nb_estimations / hr_pap_reel, 2) if hr_pap_reel > 0 else 0,
+            "prod_horaire": prod_horaire_rpo if prod_horaire_rpo > 0 else round(row["prod_horaire_annual"] or 0, 2),
+            # Soumissions (pour compatibilité)
+            "soumissions_signees": signees,
+            "soumissions_en_attente": signees - contract_reel,  # Signés sans paiement
+            "soumissions_perdues": perdus,
+            "nb_estimations": nb_estimations,  # signés + perdus
+            # Satisfaction
+            "etoiles": row["etoiles_moyennes"] or 0,
+            "satisfactions": row["nombre_avis"] or 0,
+            "plaintes": 0,
+        })
+
+    return entrepreneurs
+
+
+def get_coaches_leaderboard(start_date=None, end_date=None) -> List[Dict[str, Any]]:
+    """Classement des coaches (données RPO agrégées + satisfaction/soumissions de l'équipe)"""
+    refresh_stale_users(ENTREPRENEUR_ROLES + ("coach",))
+
+    team_filter = "m.assigned_coach = u.username AND m.role = 'entrepreneur' AND m.is_active = 1"
+    with get_connection() as conn:
+        conn.row_factory = sqlite3.Row
+        rows = conn.execute(f'''
+            SELECT u.username, u.prenom, u.nom, lu.*,
+                   w.dollar AS w_dollar, w.contract AS w_contract, w.estimation AS w_estimation,
+                   w.h_marketing AS w_h_marketing, w.produit AS w_produit,
+                   (SELECT COUNT(*) FROM users m WHERE {team_filter}) AS nb_entrepreneurs,
+                   (SELECT COALESCE(SUM(ml.etoiles_moyennes * ml.nombre_avis), 0)
+                    FROM users m JOIN leaderboard_users ml ON ml.username = m.username
+                    WHERE {team_filter}) AS team_etoiles_total,
+                   (SELECT COALESCE(SUM(ml.nombre_avis), 0)
+                    FROM users m JOIN leaderboard_users ml ON ml.username = m.username
+                    WHERE {team_filter}) AS team_satisfactions,
+                   (SELECT COUNT(*) FROM users m JOIN leaderboard_records r ON r.username = m.username
+                    WHERE {team_filter} AND r.kind = 'signee' AND {_RECORD_PERIOD_SQL}) AS team_signees,
+                   (SELECT COUNT(*) FROM users m JOIN leaderboard_records r ON r.username = m.username
+                    WHERE {team_filter} AND r.kind = 'perdu' AND {_RECORD_PERIOD_SQL}) AS team_perdus
+            FROM users u
+            JOIN leaderboard_users lu ON lu.username = u.username
+            LEFT JOIN ({_WEEKLY_SUMS_SQL}) w ON w.username = u.username
+            WHERE u.is_active = 1 AND u.role = 'coach'
+            ORDER BY u.created_at DESC
+        ''', _period_params(start_date, end_date)).fetchall()
+
+    coaches = []
+    for row in rows:
+        if start_date:
+            dollar_reel = row["w_dollar"] or 0
+            contract_reel = row["w_contract"] or 0
+            estimation_reel = row["w_estimation"] or 0
+            hr_pap_reel = row["w_h_marketing"] or 0
+        else:
+            dollar_reel = row["dollar_annual"] or 0
+            contract_reel = row["contract_annual"] or 0
+            estimation_reel = row["estimation_annual"] or 0
+            hr_pap_reel = row["hr_pap_annual"] or 0
+        produit_reel = row["w_produit"] or 0
+        team_satisfactions = row["team_satisfactions"]
+        etoiles_moyennes = row["team_etoiles_total"] / team_satisfactions if team_satisfactions > 0 else 0
+
+        coaches.append({
+            "username": row["username"],
+            "login_username": row["username"],
+            "prenom": row["prenom"] or "",
+            "nom": row["nom"] or "",
+            "role": "coach",
+            "photo": row["photo_url"],
+            "grade": "coach",
+            "nb_entrepreneurs": row["nb_entrepreneurs"],
+            # Données RPO directes (cumulées)
+            "dollar_reel": dollar_reel,
+            "contract_reel": contract_reel,
+            "hr_pap_reel": hr_pap_reel,
+            "produit_reel": produit_reel,
+            # Soumissions cumulées (pour nb_estimations = signées + perdues)
+            "soumissions_signees": row["team_signees"],
+            "soumissions_perdues": row["team_perdus"],
+            # Alias pour compatibilité avec entrepreneur
+            "ca_actuel": dollar_reel,
+            "heures_pap": hr_pap_reel,
+            "montant_produit": produit_reel,
+            "nb_estimations": estimation_reel,  # Depuis RPO estimation_reel (agrégé)
+            "objectif": row["objectif"] or 0,
+            # Métriques calculées
+            "contrat_moyen": round(dollar_reel / contract_reel, 2) if contract_reel > 0 else 0,
+            "taux_vente": round((contract_reel / estimation_reel) * 100, 2) if estimation_reel > 0 else 0,
+            "taux_marketing": round(estimation_reel / hr_pap_reel, 2) if hr_pap_reel > 0 else 0,
+            "prod_horaire": row["prod_horaire_annual"] or 0,
+            # Satisfaction
+            "etoiles": round(etoiles_moyennes, 2),
+            "satisfactions": team_satisfactions,
+        })
+
+    return coaches
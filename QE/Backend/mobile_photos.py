@@ -0,0 +1,210 @@
+"""
+Rendez-vous photo mobile (QR code): le téléphone envoie une photo, l'ordinateur l'attend en SSE
+
+Avant: la photo était lue entièrement en mémoire, convertie en data URI base64
+(+33 %) et gardée dans un dict global de main.py jusqu'à ce que l'ordinateur
+se connecte, sans expiration. Avec plusieurs workers uvicorn, l'upload et
+l'attente SSE tombaient souvent sur des processus différents: la photo
+n'arrivait jamais.
+
+Maintenant:
+- Les octets bruts sont écrits par blocs dans un dossier spool du disque
+  persistant ({STORAGE_PATH}/mobile_photo_spool), partagé par les workers;
+  le fichier n'apparaît qu'une fois complet (tmp + os.replace)
+- Expiration après MOBILE_PHOTO_TTL_SECONDS, taille max par photo
+  (MOBILE_PHOTO_MAX_MB) et plafond total du spool (MOBILE_PHOTO_SPOOL_MAX_MB,
+  les plus anciennes photos sont évincées)
+- Réveil immédiat si l'upload arrive sur le même worker (asyncio.Event),
+  sinon détection du fichier dans le spool toutes les MOBILE_PHOTO_POLL_SECONDS
+- Le flux SSE n'envoie plus que l'URL de la photo, servie ensuite en fichier
+  (FileResponse) puis supprimée
+"""
+
+import asyncio
+import os
+import re
+import sys
+import threading
+import time
+from typing import Dict, Optional, Set, Tuple
+
+from async_io import run_blocking, UPLOAD_CHUNK_SIZE
+
+# Détection OS pour chemins de fichiers (même logique que main.py)
+if sys.platform == 'win32':
+    base_cloud = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), 'data')
+else:
+    base_cloud = os.getenv("STORAGE_PATH", "/mnt/cloud")
+
+MOBILE_PHOTO_SPOOL_DIR = os.path.join(base_cloud, "mobile_photo_spool")
+MOBILE_PHOTO_TTL_SECONDS = int(os.getenv("MOBILE_PHOTO_TTL_SECONDS", "600"))
+MOBILE_PHOTO_MAX_BYTES = int(float(os.getenv("MOBILE_PHOTO_MAX_MB", "20")) * 1024 * 1024)
+MOBILE_PHOTO_SPOOL_MAX_BYTES = int(float(os.getenv("MOBILE_PHOTO_SPOOL_MAX_MB", "200")) * 1024 * 1024)
+MOBILE_PHOTO_POLL_SECONDS = float(os.getenv("MOBILE_PHOTO_POLL_SECONDS", "1"))
+
+# Identifiant généré par le navigateur ("photo_<timestamp>_<aléatoire>"): sert de nom de fichier
+_SESSION_RE = re.compile(r"^[A-Za-z0-9_-]{1,100}$")
+
+
+class PhotoTooLarge(Exception):
+    """Photo plus grosse que MOBILE_PHOTO_MAX_MB"""
+
+
+class MobilePhotoRendezvous:
+    """Photos en attente dans le spool + ordinateurs en attente sur ce worker"""
+
+    def __init__(self, spool_dir: str = MOBILE_PHOTO_SPOOL_DIR, ttl: int = MOBILE_PHOTO_TTL_SECONDS,
+                 max_bytes: int = MOBILE_PHOTO_MAX_BYTES, spool_max_bytes: int = MOBILE_PHOTO_SPOOL_MAX_BYTES,
+                 poll_interval: float = MOBILE_PHOTO_POLL_SECONDS):
+        self.spool_dir = spool_dir
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.spool_max_bytes = spool_max_bytes
+        self.poll_interval = poll_interval
+        self._lock = threading.Lock()
+        self._waiters: Dict[str, Set[Tuple[asyncio.AbstractEventLoop, asyncio.Event]]] = {}
+
+    @staticmethod
+    def is_valid_session(session: str) -> bool:
+        return bool(session and _SESSION_RE.match(session))
+
+    def _path(self, session: str) -> str:
+        return os.path.join(self.spool_dir, f"{session}.jpg")
+
+    # ------------------------------------------------------------------
+    # Spool (fonctions bloquantes, appelées via run_blocking)
+    # ------------------------------------------------------------------
+
+    def _write_chunk(self, path: str, chunk: bytes, mode: str):
+        with open(path, mode) as f:
+            f.write(chunk)
+
+    def _publish_file(self, tmp_path: str, session: str):
+        os.replace(tmp_path, self._path(session))
+        self.evict()
+
+    def _discard(self, path: str):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+    def photo_path(self, session: str) -> Optional[str]:
+        """Chemin de la photo si elle est arrivée et n'a pas expiré"""
+        path = self._path(session)
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            return None
+        if time.time() - stat.st_mtime > self.ttl:
+            self._discard(path)
+            return None
+        return path
+
+    def remove(self, session: str):
+        self._discard(self._path(session))
+
+    def evict(self):
+        """Supprime les photos expirées (et .tmp abandonnés), puis les plus anciennes au-delà du plafond"""
+        now = time.time()
+        entries = []
+        try:
+            with os.scandir(self.spool_dir) as it:
+                for entry in it:
+                    try:
+                        stat = entry.stat()
+                    except FileNotFoundError:
+                        continue
+                    if now - stat.st_mtime > self.ttl:
+                        self._discard(entry.path)
+                    elif entry.name.endswith(".jpg"):
+                        entries.append((stat.st_mtime, stat.st_size, entry.path))
+        except FileNotFoundError:
+            return
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.spool_max_bytes:
+                break
+            self._discard(path)
+            total -= size
+            print(f"[MOBILE PHOTO] Spool plein, photo évincée: {os.path.basename(path)}", flush=True)
+
+    # ------------------------------------------------------------------
+    # Téléphone: réception de la photo
+    # ------------------------------------------------------------------
+
+    async def store(self, session: str, upload) -> int:
+        """
+        Écrit l'UploadFile dans le spool par blocs (jamais entier en mémoire) puis
+        réveille les ordinateurs en attente. Lève PhotoTooLarge au-delà de max_bytes.
+        """
+        await run_blocking(os.makedirs, self.spool_dir, exist_ok=True)
+        tmp_path = f"{self._path(session)}.{os.getpid()}.tmp"
+        size = 0
+        mode = "wb"
+        try:
+            while True:
+                chunk = await upload.read(UPLOAD_CHUNK_SIZE)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if size > self.max_bytes:
+                    raise PhotoTooLarge(f"Photo trop volumineuse (max {self.max_bytes // (1024 * 1024)} Mo)")
+                await run_blocking(self._write_chunk, tmp_path, chunk, mode)
+                mode = "ab"
+            if size == 0:
+                raise ValueError("Photo vide")
+            await run_blocking(self._publish_file, tmp_path, session)
+        except BaseException:
+            await run_blocking(self._discard, tmp_path)
+            raise
+
+        self._notify(session)
+        return size
+
+    # ------------------------------------------------------------------
+    # Ordinateur: attente de la photo
+    # ------------------------------------------------------------------
+
+    def _notify(self, session: str):
+        with self._lock:
+            waiters = list(self._waiters.get(session, ()))
+        for loop, event in waiters:
+            try:
+                loop.call_soon_threadsafe(event.set)
+            except RuntimeError:
+                # Boucle fermée: l'attente sera retirée à la fin de son générateur
+                pass
+
+    async def wait(self, session: str, timeout: float) -> Optional[str]:
+        """Attend la photo (ce worker ou un autre) jusqu'à timeout secondes. Retourne son chemin ou None"""
+        waiter = (asyncio.get_running_loop(), asyncio.Event())
+        with self._lock:
+            self._waiters.setdefault(session, set()).add(waiter)
+        deadline = time.monotonic() + timeout
+        try:
+            while True:
+                path = await run_blocking(self.photo_path, session)
+                if path:
+                    return path
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return None
+                try:
+                    # Réveil immédiat si l'upload arrive sur ce worker, sinon relecture du spool
+                    await asyncio.wait_for(waiter[1].wait(), timeout=min(self.poll_interval, remaining))
+                except asyncio.TimeoutError:
+                    pass
+                waiter[1].clear()
+        finally:
+            with self._lock:
+                waiters = self._waiters.get(session)
+                if waiters is not None:
+                    waiters.discard(waiter)
+                    if not waiters:
+                        del self._waiters[session]
+
+
+# Rendez-vous unique du processus
+rendezvous = MobilePhotoRendezvous()
@@ -0,0 +1,440 @@
+"""
+Client HTTP Monday.com (GraphQL) partagé + index local soumission -> item Monday
+
+Avant: chaque appel de monday_sync faisait un requests.post() neuf (nouvelle
+connexion TLS, aucun timeout: un Monday lent bloquait le thread indéfiniment).
+find_existing_monday_item téléchargeait jusqu'à 500 items avec toutes leurs
+column_values et les parcourait pour chaque vente, et la création d'un item
+envoyait ensuite une mutation par colonne (téléphone, adresse, courriel...).
+
+Maintenant:
+- MondayClient: une requests.Session par processus (connexions réutilisées),
+  timeouts connexion/lecture, nouvelles tentatives sur 429 (Retry-After),
+  budget de complexité épuisé / limite de débit (retry_in_seconds ou
+  "reset in N seconds") et erreurs 5xx / réseau avec délai exponentiel.
+  Une mutation non idempotente (create_item) n'est relancée que si Monday
+  l'a refusée (limite) ou si la connexion n'a jamais été établie.
+- mutate_batch(): plusieurs mutations dans une seule requête (alias m0, m1...),
+  résultat par mutation
+- Index SQLite monday_item_index: numéro de soumission / nom / jetons -> item_id,
+  lecture O(1) par clé primaire. Alimenté à la création d'un item, par le
+  webhook Monday (création, renommage, suppression, colonne $JOB) et par un
+  rafraîchissement paginé du board (id, nom, $JOB seulement) quand une
+  recherche échoue et que l'index a plus de MONDAY_INDEX_REFRESH_SECONDS
+"""
+
+import os
+import re
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from db_pool import get_connection
+
+MONDAY_API_URL = os.getenv("MONDAY_API_URL", "https://api.monday.com/v2")
+MONDAY_FILE_API_URL = os.getenv("MONDAY_FILE_API_URL", MONDAY_API_URL.rstrip("/") + "/file")
+MONDAY_API_VERSION = os.getenv("MONDAY_API_VERSION", "2024-01")
+MONDAY_CONNECT_TIMEOUT_SECONDS = float(os.getenv("MONDAY_CONNECT_TIMEOUT_SECONDS", "5"))
+MONDAY_READ_TIMEOUT_SECONDS = float(os.getenv("MONDAY_READ_TIMEOUT_SECONDS", "30"))
+MONDAY_MAX_RETRIES = int(os.getenv("MONDAY_MAX_RETRIES", "4"))
+MONDAY_RETRY_BASE_SECONDS = float(os.getenv("MONDAY_RETRY_BASE_SECONDS", "1"))
+MONDAY_RETRY_MAX_SECONDS = 60
+MONDAY_POOL_SIZE = 10
+MONDAY_BATCH_SIZE = 20
+MONDAY_PAGE_SIZE = 500
+MONDAY_INDEX_REFRESH_SECONDS = int(os.getenv("MONDAY_INDEX_REFRESH_SECONDS", "300"))
+
+# Colonne $JOB (prix) lue lors du rafraîchissement de l'index
+JOB_COLUMN_ID = "numbers4"
+
+# Codes d'erreur GraphQL pour lesquels la requête n'a pas été exécutée: on peut réessayer
+RETRYABLE_ERROR_CODES = {
+    "COMPLEXITY_BUDGET_EXHAUSTED", "ComplexityException",
+    "RATE_LIMIT_EXCEEDED", "IP_RATE_LIMIT_EXCEEDED",
+    "maxConcurrencyExceeded", "MAX_CONCURRENCY_EXCEEDED",
+}
+RETRYABLE_HTTP_STATUS = {500, 502, 503, 504}
+_RESET_IN_RE = re.compile(r"reset in (\d+) seconds?", re.IGNORECASE)
+
+
+class MondayError(Exception):
+    """Erreur HTTP ou GraphQL définitive (après les nouvelles tentatives)"""
+
+    def __init__(self, message: str, status_code: Optional[int] = None, errors: Optional[list] = None):
+        super().__init__(message)
+        self.status_code = status_code
+        self.errors = errors or []
+
+
+def _payload_errors(payload: Any) -> List[Dict[str, Any]]:
+    """Erreurs GraphQL (format 2024: errors[], ancien format: error_code/error_message)"""
+    if not isinstance(payload, dict):
+        return []
+    errors = list(payload.get("errors") or [])
+    if payload.get("error_code") or payload.get("error_message"):
+        errors.append({
+            "message": payload.get("error_message", ""),
+            "extensions": {"code": payload.get("error_code")},
+        })
+    return errors
+
+
+def _retry_in_seconds(errors: List[Dict[str, Any]]) -> Optional[float]:
+    """Délai demandé par Monday si une des erreurs est une limite (None sinon)"""
+    for error in errors:
+        extensions = error.get("extensions") or {}
+        code = extensions.get("code") or error.get("error_code")
+        message = str(error.get("message", ""))
+        if code not in RETRYABLE_ERROR_CODES and "complexity budget" not in message.lower():
+            continue
+        if extensions.get("retry_in_seconds") is not None:
+            return float(extensions["retry_in_seconds"])
+        match = _RESET_IN_RE.search(message)
+        return float(match.group(1)) if match else 0.0
+    return None
+
+
+class MondayClient:
+    """Session HTTP partagée vers l'API GraphQL Monday avec nouvelles tentatives"""
+
+    def __init__(self, url: str = MONDAY_API_URL, file_url: str = MONDAY_FILE_API_URL,
+                 timeout: Tuple[float, float] = (MONDAY_CONNECT_TIMEOUT_SECONDS, MONDAY_READ_TIMEOUT_SECONDS),
+                 max_retries: int = MONDAY_MAX_RETRIES, retry_base: float = MONDAY_RETRY_BASE_SECONDS):
+        self.url = url
+        self.file_url = file_url
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.retry_base = retry_base
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=MONDAY_POOL_SIZE)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self._stats_lock = threading.Lock()
+        self.requests = 0
+        self.retries = 0
+
+    def headers(self, api_key: str, json_body: bool = True) -> Dict[str, str]:
+        headers = {"Authorization": api_key, "API-Version": MONDAY_API_VERSION}
+        if json_body:
+            headers["Content-Type"] = "application/json"
+        return headers
+
+    def _backoff(self, attempt: int) -> float:
+        return min(self.retry_base * (2 ** attempt), MONDAY_RETRY_MAX_SECONDS)
+
+    def _retry_delay(self, response: requests.Response, payload: Any, attempt: int, idempotent: bool) -> Optional[float]:
+        """Délai avant nouvelle tentative, ou None si la réponse est définitive"""
+        if response.status_code == 429:
+            retry_after = response.headers.get("Retry-After", "")
+            if retry_after.strip().isdigit():
+                return min(float(retry_after), MONDAY_RETRY_MAX_SECONDS)
+            limit_delay = _retry_in_seconds(_payload_errors(payload))
+            return min(limit_delay, MONDAY_RETRY_MAX_SECONDS) if limit_delay else self._backoff(attempt)
+        if response.status_code in RETRYABLE_HTTP_STATUS:
+            return self._backoff(attempt) if idempotent else None
+        limit_delay = _retry_in_seconds(_payload_errors(payload))
+        if limit_delay is not None:
+            return min(max(limit_delay, self._backoff(0)), MONDAY_RETRY_MAX_SECONDS)
+        return None
+
+    def post(self, api_key: str, url: Optional[str] = None, idempotent: bool = True,
+             json_body: bool = True, **kwargs) -> Tuple[requests.Response, Any]:
+        """POST avec nouvelles tentatives. Retourne (réponse, JSON ou None)"""
+        url = url or self.url
+        headers = self.headers(api_key, json_body=json_body)
+        for attempt in range(self.max_retries + 1):
+            with self._stats_lock:
+                self.requests += 1
+            try:
+                response = self.session.post(url, headers=headers, timeout=self.timeout, **kwargs)
+            except requests.exceptions.ConnectTimeout as e:
+                error, delay = e, self._backoff(attempt)
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+                # La requête a peut-être été exécutée: pas de nouvelle tentative d'une mutation non idempotente
+                if not idempotent:
+                    raise MondayError(f"Erreur réseau Monday: {e}") from e
+                error, delay = e, self._backoff(attempt)
+            else:
+                try:
+                    payload = response.json()
+                except ValueError:
+                    payload = None
+                delay = self._retry_delay(response, payload, attempt, idempotent)
+                if delay is None:
+                    return response, payload
+                error = MondayError(f"HTTP {response.status_code}: {response.text[:300]}",
+                                    response.status_code, _payload_errors(payload))
+
+            if attempt >= self.max_retries:
+                if isinstance(error, MondayError):
+                    raise error
+                raise MondayError(f"Erreur réseau Monday: {error}") from error
+            with self._stats_lock:
+                self.retries += 1
+            print(f"[MONDAY] Nouvelle tentative dans {delay:.1f}s ({error})", flush=True)
+            time.sleep(delay)
+        raise MondayError("Nouvelles tentatives épuisées")
+
+    def execute(self, api_key: str, query: str, variables: Optional[Dict[str, Any]] = None,
+                idempotent: bool = True) -> Dict[str, Any]:
+        """Exécute une requête GraphQL et retourne data. Lève MondayError si Monday répond une erreur"""
+        body = {"query": query}
+        if variables:
+            body["variables"] = variables
+        response, payload = self.post(api_key, json=body, idempotent=idempotent)
+        if response.status_code != 200 or not isinstance(payload, dict):
+            raise MondayError(f"HTTP {response.status_code}: {response.text[:300]}", response.status_code)
+        errors = _payload_errors(payload)
+        if errors:
+            raise MondayError(f"Erreur API Monday: {errors}", response.status_code, errors)
+        return payload.get("data") or {}
+
+    def mutate_batch(self, api_key: str, mutations: Iterable[str]) -> List[Optional[str]]:
+        """
+        Envoie des champs de mutation ("change_column_value(...) { id }") par lots
+        dans une seule requête chacun. Retourne, dans l'ordre, None (succès) ou le message d'erreur.
+        """
+        mutations = list(mutations)
+        results: List[Optional[str]] = []
+        for offset in range(0, len(mutations), MONDAY_BATCH_SIZE):
+            chunk = mutations[offset:offset + MONDAY_BATCH_SIZE]
+            document = "mutation { " + " ".join(f"m{i}: {m}" for i, m in enumerate(chunk)) + " }"
+            try:
+                response, payload = self.post(api_key, json={"query": document})
+            except MondayError as e:
+                results.extend([str(e)] * len(chunk))
+                continue
+            if response.status_code != 200 or not isinstance(payload, dict):
+                results.extend([f"HTTP {response.status_code}: {response.text[:300]}"] * len(chunk))
+                continue
+
+            data = payload.get("data") or {}
+            failed: Dict[str, str] = {}
+            global_error = None
+            for error in _payload_errors(payload):
+                path = error.get("path") or []
+                if path:
+                    failed[str(path[0])] = str(error.get("message", error))
+                else:
+                    global_error = str(error.get("message", error))
+            for i in range(len(chunk)):
+                alias = f"m{i}"
+                if alias in failed:
+                    results.append(failed[alias])
+                elif data.get(alias) is None:
+                    results.append(global_error or "Aucune donnée retournée")
+                else:
+                    results.append(None)
+        return results
+
+    def upload_file(self, api_key: str, query: str, filename: str, content: bytes,
+                    content_type: str = "application/pdf") -> Dict[str, Any]:
+        """Mutation multipart (add_file_to_column). Lève MondayError en cas d'échec"""
+        response, payload = self.post(
+            api_key, url=self.file_url, json_body=False,
+            data={"query": query},
+            files={"variables[file]": (filename, content, content_type)},
+        )
+        if response.status_code != 200 or not isinstance(payload, dict):
+            raise MondayError(f"HTTP {response.status_code}: {response.text[:300]}", response.status_code)
+        errors = _payload_errors(payload)
+        if errors:
+            raise MondayError(f"Erreur API Monday: {errors}", response.status_code, errors)
+        return payload.get("data") or {}
+
+    def iter_board_items(self, api_key: str, board_id: str, column_ids: Iterable[str] = (JOB_COLUMN_ID,)):
+        """Items du board page par page (cursor), avec seulement les colonnes demandées"""
+        columns = ", ".join(f'"{c}"' for c in column_ids)
+        fields = f"cursor items {{ id name column_values(ids: [{columns}]) {{ id text }} }}"
+        data = self.execute(api_key, f"query {{ boards(ids: {board_id}) {{ items_page(limit: {MONDAY_PAGE_SIZE}) {{ {fields} }} }} }}")
+        boards = data.get("boards") or []
+        page = boards[0]["items_page"] if boards else None
+        while page:
+            yield from page.get("items") or []
+            cursor = page.get("cursor")
+            if not cursor:
+                break
+            data = self.execute(api_key, f'query {{ next_items_page(limit: {MONDAY_PAGE_SIZE}, cursor: "{cursor}") {{ {fields} }} }}')
+            page = data.get("next_items_page")
+
+    def stats(self) -> Dict[str, int]:
+        with self._stats_lock:
+            return {"requests": self.requests, "retries": self.retries}
+
+
+# Client unique du processus
+client = MondayClient()
+
+
+# ===================================
+# INDEX LOCAL SOUMISSION -> ITEM MONDAY
+# ===================================
+
+def init_monday_tables():
+    """Crée les tables de l'index Monday si elles n'existent pas"""
+    with get_connection() as conn:
+        cursor = conn.cursor()
+        # lookup_key: "num:<soumission>" (créé par Qwota), "name:<nom complet>", "tok:<mot du nom ou $JOB>"
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS monday_item_index (
+                board_id TEXT NOT NULL,
+                lookup_key TEXT NOT NULL,
+                item_id TEXT NOT NULL,
+                updated_at REAL,
+                PRIMARY KEY (board_id, lookup_key)
+            )
+        ''')
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_monday_item_index_item
+            ON monday_item_index(board_id, item_id)
+        ''')
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS monday_boards (
+                board_id TEXT PRIMARY KEY,
+                refreshed_at REAL,
+                item_count INTEGER
+            )
+        ''')
+        conn.commit()
+
+
+def _item_keys(name: Optional[str] = None, job_text: Optional[str] = None) -> List[str]:
+    keys = []
+    if name and name.strip():
+        keys.append(f"name:{name.strip().lower()}")
+        keys.extend(f"tok:{token}" for token in name.split())
+    if job_text and job_text.strip():
+        keys.extend(f"tok:{token}" for token in job_text.split())
+    return keys
+
+
+def index_record(board_id: str, item_id: str, soumission_num: Optional[str] = None,
+                 name: Optional[str] = None, job_text: Optional[str] = None):
+    """Ajoute (ou remplace) les clés d'un item dans l'index"""
+    keys = _item_keys(name, job_text)
+    if soumission_num:
+        keys.insert(0, f"num:{soumission_num}")
+    if not keys:
+        return
+    now = time.time()
+    with get_connection() as conn:
+        conn.executemany(
+            "INSERT OR REPLACE INTO monday_item_index (board_id, lookup_key, item_id, updated_at) VALUES (?, ?, ?, ?)",
+            [(str(board_id), key, str(item_id), now) for key in keys]
+        )
+        conn.commit()
+
+
+def index_remove_item(board_id: str, item_id: str, keep_num: bool = False):
+    """Retire les clés d'un item (keep_num: garde le lien soumission -> item, ex. renommage)"""
+    query = "DELETE FROM monday_item_index WHERE board_id = ? AND item_id = ?"
+    if keep_num:
+        query += " AND lookup_key NOT LIKE 'num:%'"
+    with get_connection() as conn:
+        conn.execute(query, (str(board_id), str(item_id)))
+        conn.commit()
+
+
+def index_lookup(board_id: str, soumission_num: Optional[str], prenom: Optional[str] = None,
+                 nom: Optional[str] = None) -> Optional[str]:
+    """item_id par numéro de soumission, puis numéro dans le nom / $JOB, puis nom complet"""
+    keys = []
+    if soumission_num:
+        keys += [f"num:{soumission_num}", f"tok:{soumission_num}"]
+    if prenom and nom:
+        keys.append(f"name:{prenom} {nom}".strip().lower())
+    with get_connection() as conn:
+        for key in keys:
+            row = conn.execute(
+                "SELECT item_id FROM monday_item_index WHERE board_id = ? AND lookup_key = ?",
+                (str(board_id), key)
+            ).fetchone()
+            if row:
+                return row[0]
+    return None
+
+
+def _index_age(board_id: str) -> Optional[float]:
+    with get_connection() as conn:
+        row = conn.execute("SELECT refreshed_at FROM monday_boards WHERE board_id = ?", (str(board_id),)).fetchone()
+    return time.time() - row[0] if row and row[0] else None
+
+
+def refresh_board_index(api_key: str, board_id: str) -> int:
+    """Relit tous les items du board (id, nom, $JOB) et reconstruit l'index. Retourne le nombre d'items"""
+    board_id = str(board_id)
+    rows = []
+    item_ids = set()
+    now = time.time()
+    for item in client.iter_board_items(api_key, board_id):
+        item_id = str(item["id"])
+        item_ids.add(item_id)
+        job_text = next((c.get("text") for c in item.get("column_values") or [] if c.get("id") == JOB_COLUMN_ID), None)
+        rows += [(board_id, key, item_id, now) for key in _item_keys(item.get("name"), job_text)]
+
+    with get_connection() as conn:
+        # Les liens soumission -> item créés par Qwota restent tant que l'item existe
+        num_rows = conn.execute(
+            "SELECT lookup_key, item_id FROM monday_item_index WHERE board_id = ? AND lookup_key LIKE 'num:%'",
+            (board_id,)
+        ).fetchall()
+        conn.execute("DELETE FROM monday_item_index WHERE board_id = ?", (board_id,))
+        # Ordre inverse: en cas de clé partagée, le premier item du board l'emporte (comme l'ancien parcours)
+        conn.executemany(
+            "INSERT OR REPLACE INTO monday_item_index (board_id, lookup_key, item_id, updated_at) VALUES (?, ?, ?, ?)",
+            list(reversed(rows)) + [(board_id, key, item_id, now) for key, item_id in num_rows if item_id in item_ids]
+        )
+        conn.execute(
+            "INSERT OR REPLACE INTO monday_boards (board_id, refreshed_at, item_count) VALUES (?, ?, ?)",
+            (board_id, now, len(item_ids))
+        )
+        conn.commit()
+    print(f"[MONDAY INDEX] Board {board_id}: {len(item_ids)} items indexés", flush=True)
+    return len(item_ids)
+
+
+def find_item_id(api_key: str, board_id: str, soumission_num: Optional[str], prenom: Optional[str] = None,
+                 nom: Optional[str] = None) -> Optional[str]:
+    """
+    Recherche dans l'index; si absent et que l'index a plus de MONDAY_INDEX_REFRESH_SECONDS
+    (items créés à la main dans Monday), rafraîchit le board puis recherche à nouveau
+    """
+    item_id = index_lookup(board_id, soumission_num, prenom, nom)
+    if item_id:
+        return item_id
+    age = _index_age(board_id)
+    if age is not None and age < MONDAY_INDEX_REFRESH_SECONDS:
+        return None
+    refresh_board_index(api_key, board_id)
+    return index_lookup(board_id, soumission_num, prenom, nom)
+
+
+def apply_webhook_event(event: Dict[str, Any]) -> bool:
+    """Met à jour l'index depuis un événement du webhook Monday. Retourne True si l'index a changé"""
+    board_id = event.get("boardId")
+    item_id = event.get("pulseId")
+    event_type = event.get("type")
+    if not board_id or not item_id:
+        return False
+
+    if event_type == "create_pulse":
+        index_record(board_id, item_id, name=event.get("pulseName"))
+        return True
+    if event_type == "update_name":
+        value = event.get("value") or {}
+        index_remove_item(board_id, item_id, keep_num=True)
+        index_record(board_id, item_id, name=value.get("name") if isinstance(value, dict) else str(value))
+        return True
+    if event_type in ("delete_pulse", "archive_pulse"):
+        index_remove_item(board_id, item_id)
+        return True
+    if event_type == "update_column_value" and event.get("columnId") == JOB_COLUMN_ID:
+        value = event.get("value") or {}
+        job_text = value.get("value") if isinstance(value, dict) else value
+        if job_text is not None:
+            index_record(board_id, item_id, job_text=str(job_text))
+            return True
+    return False
@@ -0,0 +1,370 @@
+"""
+Outbox persistante (SQLite) pour la synchronisation vers Monday.com
+
+Avant: la signature d'une soumission lançait un thread par vente, et
+/ventes/update-provenance, /ventes/update-type-travaux, /ventes/update-notes
+appelaient Monday dans la requête (recherche de l'item, lecture des étiquettes,
+création d'étiquette, mutation): la réponse attendait plusieurs allers-retours.
+Un échec n'était que journalisé, et la modification était perdue.
+
+Maintenant:
+- La route enregistre l'intention dans la table monday_outbox et répond tout de suite
+- Un thread répartiteur par worker livre les intentions dans l'ordre, une à la fois
+- Une intention plus récente pour la même soumission et la même colonne remplace
+  celle encore en attente (statut "superseded"): seule la dernière valeur part
+- Les modifications d'une soumission attendent sa création dans Monday
+- Échec: nouvelle tentative avec délai exponentiel jusqu'à MONDAY_OUTBOX_MAX_ATTEMPTS,
+  puis statut "failed", consultable et relancé par /api/monday/force-sync
+  (la route livre elle-même la création de l'item et retire les intentions de création)
+
+Plusieurs workers uvicorn partagent la table: une intention est réclamée dans une
+transaction BEGIN IMMEDIATE, jamais deux à la fois pour la même clé.
+"""
+
+import os
+import socket
+import threading
+import time
+import traceback
+from typing import Any, Callable, Dict, List, Optional
+
+import serialization
+from db_pool import get_connection
+from QE.Backend.monday_sync import sync_label_to_monday, sync_text_to_monday, sync_vente_to_monday
+
+MONDAY_OUTBOX_MAX_ATTEMPTS = int(os.getenv("MONDAY_OUTBOX_MAX_ATTEMPTS", "6"))
+MONDAY_OUTBOX_RETRY_BASE_SECONDS = float(os.getenv("MONDAY_OUTBOX_RETRY_BASE_SECONDS", "10"))
+MONDAY_OUTBOX_RETRY_MAX_SECONDS = 1800
+
+# Intervalle de vérification de la table quand aucune intention n'est signalée
+MONDAY_OUTBOX_POLL_SECONDS = 2.0
+
+# Une intention "running" depuis plus longtemps est considérée perdue (worker tué) et relancée
+MONDAY_OUTBOX_LEASE_SECONDS = 300
+
+# Intentions livrées / remplacées gardées (jours)
+MONDAY_OUTBOX_RETENTION_DAYS = 7
+
+KIND_CREATE_ITEM = "create_item"
+KIND_LABEL = "label"
+KIND_TEXT = "text"
+
+
+def _deliver_create_item(username: str, payload: dict) -> bool:
+    return sync_vente_to_monday(username, payload["vente"])
+
+
+def _deliver_label(username: str, payload: dict) -> bool:
+    return sync_label_to_monday(username, payload["soumission_num"], payload["column_id"],
+                                payload.get("label") or "", payload["etiquettes_key"])
+
+
+def _deliver_text(username: str, payload: dict) -> bool:
+    return sync_text_to_monday(username, payload["soumission_num"], payload["column_id"], payload.get("value") or "")
+
+
+_HANDLERS: Dict[str, Callable[[str, dict], bool]] = {
+    KIND_CREATE_ITEM: _deliver_create_item,
+    KIND_LABEL: _deliver_label,
+    KIND_TEXT: _deliver_text,
+}
+
+
+def init_monday_outbox_tables():
+    """Crée la table de l'outbox Monday si elle n'existe pas"""
+    with get_connection() as conn:
+        cursor = conn.cursor()
+        # item_key: username:soumission, dedup_key: item_key + type + colonne
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS monday_outbox (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                kind TEXT NOT NULL,
+                username TEXT NOT NULL,
+                item_key TEXT NOT NULL,
+                dedup_key TEXT NOT NULL,
+                payload TEXT NOT NULL,
+                status TEXT NOT NULL DEFAULT 'pending',
+                attempts INTEGER NOT NULL DEFAULT 0,
+                max_attempts INTEGER NOT NULL DEFAULT 6,
+                run_after REAL NOT NULL,
+                worker TEXT,
+                error TEXT,
+                created_at REAL NOT NULL,
+                started_at REAL,
+                finished_at REAL
+            )
+        ''')
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_monday_outbox_status_run_after
+            ON monday_outbox(status, run_after)
+        ''')
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_monday_outbox_dedup
+            ON monday_outbox(dedup_key, status)
+        ''')
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_monday_outbox_item
+            ON monday_outbox(item_key, status)
+        ''')
+        conn.commit()
+
+
+def enqueue(kind: str, username: str, soumission_num: str, payload: dict, column_id: str = "") -> int:
+    """
+    Enregistre une intention de synchronisation et retourne son id.
+    Les intentions en attente ou en échec de même clé (soumission, type, colonne) sont remplacées.
+    """
+    if kind not in _HANDLERS:
+        raise ValueError(f"Type d'intention Monday inconnu: {kind}")
+
+    item_key = f"{username}:{soumission_num}"
+    dedup_key = f"{item_key}:{kind}:{column_id}"
+    now = time.time()
+    with get_connection() as conn:
+        superseded = conn.execute('''
+            UPDATE monday_outbox SET status = 'superseded', finished_at = ?
+            WHERE dedup_key = ? AND status IN ('pending', 'failed')
+        ''', (now, dedup_key)).rowcount
+        cursor = conn.execute('''
+            INSERT INTO monday_outbox (kind, username, item_key, dedup_key, payload, status,
+                                       max_attempts, run_after, created_at)
+            VALUES (?, ?, ?, ?, ?, 'pending', ?, ?, ?)
+        ''', (kind, username, item_key, dedup_key, serialization.dumps(payload),
+              MONDAY_OUTBOX_MAX_ATTEMPTS, now, now))
+        conn.commit()
+        outbox_id = cursor.lastrowid
+
+    print(f"[MONDAY OUTBOX] {kind} #{soumission_num} ({username}) en file"
+          f"{f', {superseded} remplacée(s)' if superseded else ''}", flush=True)
+    dispatcher.wake()
+    return outbox_id
+
+
+def enqueue_vente_sync(username: str, vente: dict) -> int:
+    """Création de l'item Monday d'une vente acceptée"""
+    soumission_num = vente.get("num") or vente.get("id", "")
+    return enqueue(KIND_CREATE_ITEM, username, soumission_num, {"vente": vente})
+
+
+def enqueue_label_sync(username: str, soumission_num: str, column_id: str, label: str, etiquettes_key: str) -> int:
+    """Étiquette (provenance, type de travaux) d'une soumission vers sa colonne Monday"""
+    return enqueue(KIND_LABEL, username, soumission_num, {
+        "soumission_num": soumission_num, "column_id": column_id,
+        "label": label, "etiquettes_key": etiquettes_key,
+    }, column_id=column_id)
+
+
+def enqueue_text_sync(username: str, soumission_num: str, column_id: str, value: str) -> int:
+    """Texte (notes) d'une soumission vers sa colonne Monday"""
+    return enqueue(KIND_TEXT, username, soumission_num, {
+        "soumission_num": soumission_num, "column_id": column_id, "value": value,
+    }, column_id=column_id)
+
+
+def get_failures(username: str, soumission_num: Optional[str] = None) -> List[Dict[str, Any]]:
+    """Intentions en échec définitif d'un entrepreneur (d'une soumission si précisée)"""
+    query = '''
+        SELECT id, kind, item_key, dedup_key, attempts, error, created_at, finished_at
+        FROM monday_outbox WHERE status = 'failed' AND username = ?
+    '''
+    params: list = [username]
+    if soumission_num:
+        query += " AND item_key = ?"
+        params.append(f"{username}:{soumission_num}")
+    with get_connection() as conn:
+        rows = conn.execute(query + " ORDER BY id", params).fetchall()
+    return [
+        {"id": row[0], "kind": row[1], "soumission_num": row[2].split(":", 1)[1],
+         "column_id": row[3].rsplit(":", 1)[1] or None, "attempts": row[4], "error": row[5],
+         "created_at": row[6], "failed_at": row[7]}
+        for row in rows
+    ]
+
+
+def retry_failed(username: str, soumission_num: Optional[str] = None) -> int:
+    """Remet en file les intentions en échec (nouvelle série de tentatives). Retourne leur nombre"""
+    query = '''
+        UPDATE monday_outbox SET status = 'pending', attempts = 0, run_after = ?, finished_at = NULL
+        WHERE status = 'failed' AND username = ?
+    '''
+    params: list = [time.time(), username]
+    if soumission_num:
+        query += " AND item_key = ?"
+        params.append(f"{username}:{soumission_num}")
+    with get_connection() as conn:
+        count = conn.execute(query, params).rowcount
+        conn.commit()
+    if count:
+        dispatcher.wake()
+    return count
+
+
+def supersede(username: str, soumission_num: str, kind: str) -> int:
+    """
+    Retire de la file les intentions en attente ou en échec d'une soumission pour ce type
+    (livraison faite hors outbox, ex. /api/monday/force-sync). Retourne leur nombre
+    """
+    with get_connection() as conn:
+        count = conn.execute('''
+            UPDATE monday_outbox SET status = 'superseded', finished_at = ?
+            WHERE item_key = ? AND kind = ? AND status IN ('pending', 'failed')
+        ''', (time.time(), f"{username}:{soumission_num}", kind)).rowcount
+        conn.commit()
+    return count
+
+
+def retry_delay(attempts: int) -> float:
+    """Délai avant la tentative suivante: 10s, 20s, 40s, ... plafonné à MONDAY_OUTBOX_RETRY_MAX_SECONDS"""
+    return min(MONDAY_OUTBOX_RETRY_BASE_SECONDS * (2 ** max(attempts - 1, 0)), MONDAY_OUTBOX_RETRY_MAX_SECONDS)
+
+
+class MondayOutboxDispatcher:
+    """Thread qui réclame et livre les intentions dues, une à la fois"""
+
+    def __init__(self):
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}"
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._last_maintenance = 0.0
+        self.delivered = 0
+        self.failures = 0
+
+    def wake(self):
+        self._wake.set()
+
+    def _claim(self) -> Optional[dict]:
+        """
+        Réclame l'intention due la plus ancienne dont la clé n'est pas déjà en cours
+        et dont la soumission n'a pas de création Monday plus ancienne encore à livrer
+        """
+        now = time.time()
+        with get_connection() as conn:
+            conn.isolation_level = None
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = conn.execute('''
+                    SELECT o.id, o.kind, o.username, o.payload, o.attempts, o.max_attempts
+                    FROM monday_outbox o
+                    WHERE o.status = 'pending' AND o.run_after <= ?
+                      AND NOT EXISTS (
+                          SELECT 1 FROM monday_outbox r
+                          WHERE r.dedup_key = o.dedup_key AND r.status = 'running'
+                      )
+                      AND NOT EXISTS (
+                          SELECT 1 FROM monday_outbox c
+                          WHERE c.item_key = o.item_key AND c.kind = ? AND c.id < o.id
+                            AND c.status IN ('pending', 'running')
+                      )
+                    ORDER BY o.run_after, o.id
+                    LIMIT 1
+                ''', (now, KIND_CREATE_ITEM)).fetchone()
+                if row:
+                    conn.execute('''
+                        UPDATE monday_outbox SET status = 'running', attempts = attempts + 1,
+                                                 worker = ?, started_at = ?
+                        WHERE id = ?
+                    ''', (self.worker_id, now, row[0]))
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+
+        if not row:
+            return None
+        return {"id": row[0], "kind": row[1], "username": row[2], "payload": serialization.loads(row[3]),
+                "attempts": row[4] + 1, "max_attempts": row[5]}
+
+    def _deliver(self, entry: dict):
+        error = None
+        try:
+            if not _HANDLERS[entry["kind"]](entry["username"], entry["payload"]):
+                error = "Synchronisation Monday.com échouée"
+        except Exception as e:
+            error = "".join(traceback.format_exception_only(type(e), e)).strip()
+        self._finish(entry, error)
+
+    def _finish(self, entry: dict, error: Optional[str]):
+        now = time.time()
+        label = f"{entry['kind']} #{entry['id']} ({entry['username']})"
+        with get_connection() as conn:
+            if error is None:
+                conn.execute('''
+                    UPDATE monday_outbox SET status = 'done', error = NULL, finished_at = ?
+                    WHERE id = ?
+                ''', (now, entry["id"]))
+                self.delivered += 1
+                print(f"[MONDAY OUTBOX] {label} livrée", flush=True)
+            elif entry["attempts"] >= entry["max_attempts"]:
+                conn.execute('''
+                    UPDATE monday_outbox SET status = 'failed', error = ?, finished_at = ?
+                    WHERE id = ?
+                ''', (error, now, entry["id"]))
+                self.failures += 1
+                print(f"[MONDAY OUTBOX] {label} en échec définitif: {error}", flush=True)
+            else:
+                delay = retry_delay(entry["attempts"])
+                conn.execute('''
+                    UPDATE monday_outbox SET status = 'pending', error = ?, run_after = ?
+                    WHERE id = ?
+                ''', (error, now + delay, entry["id"]))
+                print(f"[MONDAY OUTBOX] {label} échouée (tentative {entry['attempts']}/{entry['max_attempts']}), "
+                      f"nouvel essai dans {delay:.0f}s: {error}", flush=True)
+            conn.commit()
+
+    def _maintenance(self):
+        """Relance les intentions perdues et purge les anciennes intentions livrées ou remplacées"""
+        now = time.time()
+        with get_connection() as conn:
+            cursor = conn.execute('''
+                UPDATE monday_outbox SET status = 'pending', run_after = ?
+                WHERE status = 'running' AND started_at < ?
+            ''', (now, now - MONDAY_OUTBOX_LEASE_SECONDS))
+            if cursor.rowcount:
+                print(f"[MONDAY OUTBOX] {cursor.rowcount} intention(s) perdue(s) remise(s) en file", flush=True)
+            conn.execute('''
+                DELETE FROM monday_outbox WHERE status IN ('done', 'superseded') AND finished_at < ?
+            ''', (now - MONDAY_OUTBOX_RETENTION_DAYS * 86400,))
+            conn.commit()
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                if time.time() - self._last_maintenance > 60:
+                    self._last_maintenance = time.time()
+                    self._maintenance()
+
+                entry = self._claim()
+                if entry is not None:
+                    self._deliver(entry)
+                    continue
+            except Exception as e:
+                print(f"[MONDAY OUTBOX] Erreur répartiteur: {e}", flush=True)
+
+            self._wake.wait(MONDAY_OUTBOX_POLL_SECONDS)
+            self._wake.clear()
+
+    def start(self):
+        """Démarre le répartiteur (appelé au startup de l'application)"""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="monday-outbox", daemon=True)
+        self._thread.start()
+        print("[MONDAY OUTBOX] Répartiteur démarré", flush=True)
+
+    def stop(self):
+        """Arrête le répartiteur après la livraison en cours (les autres restent en file)"""
+        self._stop.set()
+        self._wake.set()
+        if self._thread:
+            self._thread.join(timeout=30)
+
+    def stats(self) -> Dict[str, Any]:
+        with get_connection() as conn:
+            rows = conn.execute("SELECT status, COUNT(*) FROM monday_outbox GROUP BY status").fetchall()
+        return {"delivered": self.delivered, "failures": self.failures, "by_status": dict(rows)}
+
+
+# Répartiteur unique du processus
+dispatcher = MondayOutboxDispatcher()
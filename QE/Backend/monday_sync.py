@@ -1,10 +1,12 @@
 """
 Module de synchronisation avec Monday.com
 Gère la création automatique d'items dans Monday.com quand une vente est acceptée
+
+Les appels HTTP passent par le client partagé (QE/Backend/monday_client.py):
+session réutilisée, timeouts, nouvelles tentatives sur limites Monday, mutations
+regroupées et index local soumission -> item_id.
 """
 
-import requests
-import sqlite3
 from typing import Optional, Dict, Set
 import os
 import sys
@@ -12,6 +14,9 @@ import json
 from datetime import datetime
 import urllib.parse
 
+from db_pool import get_connection
+from QE.Backend.monday_client import MONDAY_API_URL, MondayError, client, find_item_id, index_record
+
 # Configuration des chemins selon l'environnement
 if sys.platform == 'win32':
     # Windows - développement local
@@ -90,15 +95,7 @@ def add_label_to_monday_column(api_key: str, board_id: str, column_id: str, labe
         Optional[int]: Index de la nouvelle étiquette créée, None si échec
     """
     try:
-        # Utiliser l'API GraphQL pour récupérer les settings actuels
-        url = "https://api.monday.com/v2"
-        headers = {
-            "Authorization": api_key,
-            "Content-Type": "application/json",
-            "API-Version": "2024-01"
-        }
-
-        # 1. Récupérer les settings actuels
+        # 1. Récupérer les settings actuels (API GraphQL)
         query = f"""
         query {{
           boards(ids: {board_id}) {{
@@ -110,17 +107,17 @@ def add_label_to_monday_column(api_key: str, board_id: str, column_id: str, labe
         }}
         """
 
-        response = requests.post(url, headers=headers, json={"query": query})
-        if response.status_code != 200:
-            print(f"[MONDAY ERROR] Erreur récupération settings: {response.status_code}")
+        try:
+            data = client.execute(api_key, query)
+        except MondayError as e:
+            print(f"[MONDAY ERROR] Erreur récupération settings: {e}")
             return None
 
-        data = response.json()
-        if "data" not in data or not data["data"]["boards"]:
+        if not data.get("boards"):
             print(f"[MONDAY ERROR] Board non trouvé")
             return None
 
-        columns = data["data"]["boards"][0]["columns"]
+        columns = data["boards"][0]["columns"]
         if not columns:
             print(f"[MONDAY ERROR] Colonne non trouvée")
             return None
@@ -156,13 +153,13 @@ def add_label_to_monday_column(api_key: str, board_id: str, column_id: str, labe
         settings["labels_ids_style"] = labels_ids_style
 
         # Essayer avec l'API REST Monday
-        rest_url = f"https://api.monday.com/v2/boards/{board_id}/columns/{column_id}.json"
+        rest_url = f"{MONDAY_API_URL.rstrip('/')}/boards/{board_id}/columns/{column_id}.json"
 
         payload = {
             "settings_str": json.dumps(settings)
         }
 
-        rest_response = requests.put(rest_url, headers=headers, json=payload)
+        rest_response = client.session.put(rest_url, headers=client.headers(api_key), json=payload, timeout=client.timeout)
 
         if rest_response.status_code == 200:
             print(f"[MONDAY] ✓ Étiquette '{label_name}' créée avec succès via REST API (index {new_index})")
@@ -196,12 +193,6 @@ def get_monday_column_labels(api_key: str, board_id: str, column_id: str) -> Dic
         Dict[str, int]: Mapping nom d'étiquette -> index Monday
     """
     try:
-        url = "https://api.monday.com/v2"
-        headers = {
-            "Authorization": api_key,
-            "Content-Type": "application/json"
-        }
-
         query = f"""
         query {{
           boards(ids: {board_id}) {{
@@ -213,26 +204,23 @@ def get_monday_column_labels(api_key: str, board_id: str, column_id: str) -> Dic
         }}
         """
 
-        response = requests.post(url, headers=headers, json={"query": query})
-
-        if response.status_code == 200:
-            data = response.json()
-            if "data" in data and data["data"]["boards"]:
-                columns = data["data"]["boards"][0]["columns"]
-                if columns:
-                    settings = json.loads(columns[0]["settings_str"])
-                    labels = settings.get("labels", {})
+        data = client.execute(api_key, query)
+        if data.get("boards"):
+            columns = data["boards"][0]["columns"]
+            if columns:
+                settings = json.loads(columns[0]["settings_str"])
+                labels = settings.get("labels", {})
 
-                    # Créer le mapping nom -> index
-                    label_map = {}
-                    for idx, label_name in labels.items():
-                        # Normaliser le nom pour comparaison (minuscules, sans accents)
-                        label_normalized = label_name.strip().lower()
-                        label_map[label_normalized] = int(idx)
-                        # Aussi garder le nom original
-                        label_map[label_name.strip()] = int(idx)
+                # Créer le mapping nom -> index
+                label_map = {}
+                for idx, label_name in labels.items():
+                    # Normaliser le nom pour comparaison (minuscules, sans accents)
+                    label_normalized = label_name.strip().lower()
+                    label_map[label_normalized] = int(idx)
+                    # Aussi garder le nom original
+                    label_map[label_name.strip()] = int(idx)
 
-                    return label_map
+                return label_map
 
         return {}
     except Exception as e:
@@ -251,7 +239,7 @@ def get_monday_credentials(username: str) -> tuple[Optional[str], Optional[str]]
         tuple: (api_key, board_id) ou (None, None) si non configuré
     """
     try:
-        with sqlite3.connect(DB_PATH) as conn:
+        with get_connection() as conn:
             cursor = conn.cursor()
             cursor.execute("""
                 SELECT monday_api_key, monday_board_id
@@ -363,10 +351,30 @@ def is_banned_from_monday(username: str, item_id: str) -> bool:
     return str(item_id) in banned_ids
 
 
+def _graphql_string(value) -> str:
+    """Littéral de chaîne GraphQL (guillemets, antislashs, retours à la ligne échappés)"""
+    return json.dumps(str(value))
+
+
+def _column_mutation(board_id: str, item_id: str, column_id: str, value: str) -> str:
+    """Champ de mutation change_column_value (value: JSON de la colonne)"""
+    return (f'change_column_value(board_id: {board_id}, item_id: {item_id}, '
+            f'column_id: "{column_id}", value: {_graphql_string(value)}) {{ id }}')
+
+
+def _simple_column_mutation(board_id: str, item_id: str, column_id: str, value: str) -> str:
+    """Champ de mutation change_simple_column_value (value: texte brut)"""
+    return (f'change_simple_column_value(board_id: {board_id}, item_id: {item_id}, '
+            f'column_id: "{column_id}", value: {_graphql_string(value)}) {{ id }}')
+
+
 def find_existing_monday_item(api_key: str, board_id: str, soumission_num: str, prenom: str = None, nom: str = None) -> Optional[str]:
     """
     Recherche un item existant dans Monday.com par numéro de soumission
 
+    Lecture dans l'index local (numéro de soumission, numéro dans le nom ou la
+    colonne $JOB, nom complet); le board n'est relu que si l'index est périmé.
+
     Args:
         api_key: Clé API Monday.com
         board_id: ID du board Monday.com
@@ -376,78 +384,12 @@ def find_existing_monday_item(api_key: str, board_id: str, soumission_num: str,
         Optional[str]: ID de l'item si trouvé, None sinon
     """
     try:
-        url = "https://api.monday.com/v2"
-        headers = {
-            "Authorization": api_key,
-            "Content-Type": "application/json"
-        }
-
-        # Query pour rechercher tous les items du board
-        query = f"""
-        query {{
-          boards(ids: {board_id}) {{
-            items_page(limit: 500) {{
-              items {{
-                id
-                name
-                column_values {{
-                  id
-                  text
-                  value
-                }}
-              }}
-            }}
-          }}
-        }}
-        """
-
-        response = requests.post(url, headers=headers, json={"query": query})
-
-        if response.status_code == 200:
-            data = response.json()
-            if "data" in data and data["data"]["boards"]:
-                items = data["data"]["boards"][0]["items_page"]["items"]
-
-                # Construire le nom complet pour la recherche par nom
-                nom_complet_recherche = None
-                if prenom and nom:
-                    nom_complet_recherche = f"{prenom} {nom}".strip().lower()
-                    print(f"[MONDAY DEBUG] Recherche par nom: '{nom_complet_recherche}'")
-
-                print(f"[MONDAY DEBUG] {len(items)} items à examiner")
-
-                # Chercher un item qui correspond
-                for item in items:
-                    item_name = item.get("name", "")
-                    item_name_lower = item_name.lower()
-                    print(f"[MONDAY DEBUG] Examen item: '{item_name}'")
-
-                    # Méthode 1: Vérifier si le numéro de soumission est dans le nom (nouveau format)
-                    if soumission_num and soumission_num in item_name:
-                        print(f"[MONDAY] Item existant trouvé par numéro dans nom: {item_name} (ID: {item['id']})")
-                        return item["id"]
-
-                    # Méthode 2: Vérifier si le nom complet correspond exactement (ancien format)
-                    if nom_complet_recherche and nom_complet_recherche in item_name_lower:
-                        print(f"[MONDAY] Item existant trouvé par nom complet: {item_name} (ID: {item['id']})")
-                        return item["id"]
-
-                    # Méthode 3: Vérifier dans la colonne $JOB (au cas où le numéro y serait)
-                    for col_value in item.get("column_values", []):
-                        if col_value.get("id") == "numbers4":  # Colonne $JOB
-                            job_num = col_value.get("text", "")
-                            if job_num and soumission_num in job_num:
-                                print(f"[MONDAY] Item existant trouvé par $JOB: {item_name} (ID: {item['id']}, Job: {job_num})")
-                                return item["id"]
-
-                print(f"[MONDAY] Aucun item existant trouvé avec le numéro {soumission_num}")
-                return None
-            else:
-                print(f"[MONDAY] Aucun item trouvé dans le board")
-                return None
+        item_id = find_item_id(api_key, board_id, soumission_num, prenom, nom)
+        if item_id:
+            print(f"[MONDAY] Item existant trouvé pour #{soumission_num} (ID: {item_id})")
         else:
-            print(f"[MONDAY WARN] Erreur recherche items: HTTP {response.status_code}")
-            return None
+            print(f"[MONDAY] Aucun item existant trouvé avec le numéro {soumission_num}")
+        return item_id
 
     except Exception as e:
         print(f"[MONDAY WARN] Erreur lors de la recherche: {e}")
@@ -499,13 +441,6 @@ def create_monday_item(api_key: str, board_id: str, item_data: Dict, username: s
         print(f"[MONDAY] Création item pour: {nom_complet}")
         print(f"[MONDAY] Prix: {prix}, Tel: {telephone}, Courriel: {courriel}")
 
-        # URL de l'API Monday.com
-        url = "https://api.monday.com/v2"
-        headers = {
-            "Authorization": api_key,
-            "Content-Type": "application/json"
-        }
-
         # Préparer les valeurs des colonnes
         column_values = {}
 
@@ -535,11 +470,7 @@ def create_monday_item(api_key: str, board_id: str, item_data: Dict, username: s
                 print(f"[MONDAY WARN] Impossible de parser le dépôt: {depot} - {e}")
 
         # Pour Monday.com, les colonnes phone, location et email nécessitent un format JSON spécifique
-        # On va les envoyer séparément avec change_column_value après la création
-
-        # Convertir column_values en JSON string pour GraphQL
-        import json
-        column_values_json = json.dumps(column_values).replace('"', '\\"')
+        # On les envoie après la création, regroupées dans une seule requête
 
         # Nom de l'item = seulement prénom + nom (pas de numéro visible)
         item_name = nom_complet
@@ -549,8 +480,8 @@ def create_monday_item(api_key: str, board_id: str, item_data: Dict, username: s
         mutation {{
           create_item (
             board_id: {board_id},
-            item_name: "{item_name}",
-            column_values: "{column_values_json}"
+            item_name: {_graphql_string(item_name)},
+            column_values: {_graphql_string(json.dumps(column_values))}
           ) {{
             id
             name
@@ -560,146 +491,104 @@ def create_monday_item(api_key: str, board_id: str, item_data: Dict, username: s
 
         print(f"[MONDAY] Envoi requête à Monday.com...")
 
-        # Envoyer la requête
-        response = requests.post(
-            url,
-            headers=headers,
-            json={"query": query}
-        )
-
-        if response.status_code == 200:
-            data = response.json()
-
-            if "errors" in data:
-                print(f"[MONDAY ERROR] Erreur API Monday.com:")
-                print(json.dumps(data["errors"], indent=2))
-                return False
-            elif "data" in data and data["data"]["create_item"]:
-                item_id = data["data"]["create_item"]["id"]
-                item_name = data["data"]["create_item"]["name"]
-                print(f"[MONDAY SUCCESS] Item cree dans Monday.com!")
-                print(f"[MONDAY] ID: {item_id}, Nom: {item_name}")
-
-                # Maintenant mettre à jour les colonnes phone, location et email
-                # Ces colonnes nécessitent un format spécial avec change_column_value
-                if telephone:
-                    # Enlever les tirets et ajouter 1 au début si nécessaire
-                    tel_clean = str(telephone).strip().replace('-', '').replace(' ', '').replace('(', '').replace(')', '')
-                    if not tel_clean.startswith('1') and len(tel_clean) == 10:
-                        tel_clean = '1' + tel_clean
-
-                    tel_value_json = json.dumps({"phone": tel_clean, "countryShortName": "CA"})
-                    tel_escaped = tel_value_json.replace('"', '\\"')
-                    query_tel = f'mutation {{ change_column_value(board_id: {board_id}, item_id: {item_id}, column_id: "phone", value: "{tel_escaped}") {{ id }} }}'
-
-                    resp_tel = requests.post(url, headers=headers, json={"query": query_tel})
-                    if resp_tel.status_code == 200 and "errors" not in resp_tel.json():
-                        print(f"[MONDAY] Telephone mis a jour")
-                    else:
-                        print(f"[MONDAY WARN] Erreur mise a jour telephone: {resp_tel.text}")
-
-                if adresse:
-                    # Format simple: "lat lng address" - on utilise 0 0 comme coordonnées
-                    # Monday.com affichera le texte de l'adresse
-                    addr_value = f"0 0 {str(adresse).strip()}"
-                    query_addr = f'mutation {{ change_simple_column_value(board_id: {board_id}, item_id: {item_id}, column_id: "location", value: "{addr_value}") {{ id }} }}'
-
-                    resp_addr = requests.post(url, headers=headers, json={"query": query_addr})
-                    if resp_addr.status_code == 200 and "errors" not in resp_addr.json():
-                        print(f"[MONDAY] Adresse mise a jour")
-                    else:
-                        print(f"[MONDAY WARN] Erreur mise a jour adresse: {resp_addr.text}")
-
-                if courriel:
-                    email_value_json = json.dumps({"email": str(courriel).strip(), "text": str(courriel).strip()})
-                    email_escaped = email_value_json.replace('"', '\\"')
-                    query_email = f'mutation {{ change_column_value(board_id: {board_id}, item_id: {item_id}, column_id: "email", value: "{email_escaped}") {{ id }} }}'
-
-                    resp_email = requests.post(url, headers=headers, json={"query": query_email})
-                    if resp_email.status_code == 200 and "errors" not in resp_email.json():
-                        print(f"[MONDAY] Email mis a jour")
-                    else:
-                        print(f"[MONDAY WARN] Erreur mise a jour email: {resp_email.text}")
-
-                # Mettre la colonne Provenance à "PàP" (index 0)
-                provenance_value = json.dumps({"index": 0})
-                provenance_escaped = provenance_value.replace('"', '\\"')
-                query_provenance = f'mutation {{ change_column_value(board_id: {board_id}, item_id: {item_id}, column_id: "dup__of_couleurs_mkm0awjt", value: "{provenance_escaped}") {{ id }} }}'
-                resp_prov = requests.post(url, headers=headers, json={"query": query_provenance})
-                if resp_prov.status_code == 200 and "errors" not in resp_prov.json():
-                    print(f"[MONDAY] Provenance mise a jour (PaP)")
-                else:
-                    print(f"[MONDAY WARN] Erreur mise a jour Provenance: {resp_prov.text}")
-
-                # Ajouter les notes dans la colonne "Infos sup" (ID: "text")
-                notes = item_data.get('notes', '')
-                if notes:
-                    # Échapper les caractères spéciaux pour GraphQL
-                    notes_escaped = notes.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
-                    query_notes = f'mutation {{ change_simple_column_value(board_id: {board_id}, item_id: {item_id}, column_id: "text", value: "{notes_escaped}") {{ id }} }}'
-                    resp_notes = requests.post(url, headers=headers, json={"query": query_notes})
-                    if resp_notes.status_code == 200 and "errors" not in resp_notes.json():
-                        print(f"[MONDAY] Notes ajoutées")
-                    else:
-                        print(f"[MONDAY WARN] Erreur ajout notes: {resp_notes.text}")
-
-                # Ajouter le PDF de la soumission signée dans la colonne Contrats
-                pdf_url = item_data.get('pdfUrl') or item_data.get('pdf_url')
-                if pdf_url:
-                    # Convertir l'URL en chemin de fichier local (localhost ou production)
-                    # Toutes les URLs internes contiennent /cloud/ dans le chemin
-                    if '/cloud/' in pdf_url:
-                        # Extraire le chemin du fichier depuis l'URL
-                        pdf_path = pdf_url.split('/cloud/')[-1]
-                        pdf_full_path = os.path.join(base_cloud, pdf_path.replace('/', os.sep))
-                        print(f"[MONDAY] Chemin PDF: {pdf_full_path}")
-
-                        if os.path.exists(pdf_full_path):
-                            try:
-                                # Lire le fichier PDF
-                                with open(pdf_full_path, 'rb') as pdf_file:
-                                    # GraphQL mutation pour ajouter le fichier
-                                    query_file = f'mutation($file: File!) {{ add_file_to_column(file: $file, item_id: {item_id}, column_id: "dup__of_gqp") {{ id }} }}'
-
-                                    # Monday.com file upload via https://api.monday.com/v2/file
-                                    file_response = requests.post(
-                                        'https://api.monday.com/v2/file',
-                                        headers={"Authorization": api_key},
-                                        data={'query': query_file},
-                                        files={'variables[file]': (os.path.basename(pdf_full_path), pdf_file, 'application/pdf')}
-                                    )
-
-                                    if file_response.status_code == 200:
-                                        resp_data = file_response.json()
-                                        if "errors" not in resp_data:
-                                            print(f"[MONDAY] PDF contrat ajoute")
-                                        else:
-                                            print(f"[MONDAY WARN] Erreur ajout PDF: {json.dumps(resp_data['errors'])}")
-                                    else:
-                                        print(f"[MONDAY WARN] Erreur HTTP ajout PDF: {file_response.status_code} - {file_response.text}")
-                            except Exception as e:
-                                print(f"[MONDAY WARN] Erreur lecture PDF: {e}")
-                        else:
-                            print(f"[MONDAY WARN] PDF introuvable: {pdf_full_path}")
-                    else:
-                        # URL publique externe - essayer de l'ajouter directement
-                        print(f"[MONDAY INFO] URL PDF externe (non supportée): {pdf_url}")
-                else:
-                    print(f"[MONDAY INFO] Aucun PDF dans les donnees de vente")
+        # Pas de nouvelle tentative après un timeout: l'item a peut-être été créé
+        try:
+            data = client.execute(api_key, query, idempotent=False)
+        except MondayError as e:
+            print(f"[MONDAY ERROR] {e}")
+            return False
 
-                # BANNIR cet ID pour ne JAMAIS le renvoyer à Monday
-                add_to_monday_ban(username, soumission_num)
-                print(f"[MONDAY BAN] ✓ ID {soumission_num} ajouté à la liste des bannis - Ne sera plus jamais envoyé")
+        if not data.get("create_item"):
+            print(f"[MONDAY ERROR] Reponse inattendue de Monday.com:")
+            print(json.dumps(data, indent=2))
+            return False
 
-                return True
+        item_id = data["create_item"]["id"]
+        item_name = data["create_item"]["name"]
+        print(f"[MONDAY SUCCESS] Item cree dans Monday.com!")
+        print(f"[MONDAY] ID: {item_id}, Nom: {item_name}")
+        index_record(board_id, item_id, soumission_num=str(soumission_num), name=item_name,
+                     job_text=column_values.get("numbers4"))
+
+        # Maintenant mettre à jour les colonnes phone, location, email, provenance et notes
+        # (une seule requête, une mutation aliasée par colonne)
+        mutations = []
+        labels = []
+        if telephone:
+            # Enlever les tirets et ajouter 1 au début si nécessaire
+            tel_clean = str(telephone).strip().replace('-', '').replace(' ', '').replace('(', '').replace(')', '')
+            if not tel_clean.startswith('1') and len(tel_clean) == 10:
+                tel_clean = '1' + tel_clean
+            tel_value_json = json.dumps({"phone": tel_clean, "countryShortName": "CA"})
+            mutations.append(_column_mutation(board_id, item_id, "phone", tel_value_json))
+            labels.append("Telephone")
+
+        if adresse:
+            # Format simple: "lat lng address" - on utilise 0 0 comme coordonnées
+            # Monday.com affichera le texte de l'adresse
+            addr_value = f"0 0 {str(adresse).strip()}"
+            mutations.append(_simple_column_mutation(board_id, item_id, "location", addr_value))
+            labels.append("Adresse")
+
+        if courriel:
+            email_value_json = json.dumps({"email": str(courriel).strip(), "text": str(courriel).strip()})
+            mutations.append(_column_mutation(board_id, item_id, "email", email_value_json))
+            labels.append("Email")
+
+        # Mettre la colonne Provenance à "PàP" (index 0)
+        mutations.append(_column_mutation(board_id, item_id, "dup__of_couleurs_mkm0awjt", json.dumps({"index": 0})))
+        labels.append("Provenance (PaP)")
+
+        # Ajouter les notes dans la colonne "Infos sup" (ID: "text")
+        notes = item_data.get('notes', '')
+        if notes:
+            mutations.append(_simple_column_mutation(board_id, item_id, "text", notes))
+            labels.append("Notes")
+
+        for label, error in zip(labels, client.mutate_batch(api_key, mutations)):
+            if error is None:
+                print(f"[MONDAY] {label} mis a jour")
+            else:
+                print(f"[MONDAY WARN] Erreur mise a jour {label}: {error}")
+
+        # Ajouter le PDF de la soumission signée dans la colonne Contrats
+        pdf_url = item_data.get('pdfUrl') or item_data.get('pdf_url')
+        if pdf_url:
+            # Convertir l'URL en chemin de fichier local (localhost ou production)
+            # Toutes les URLs internes contiennent /cloud/ dans le chemin
+            if '/cloud/' in pdf_url:
+                # Extraire le chemin du fichier depuis l'URL
+                pdf_path = pdf_url.split('/cloud/')[-1]
+                pdf_full_path = os.path.join(base_cloud, pdf_path.replace('/', os.sep))
+                print(f"[MONDAY] Chemin PDF: {pdf_full_path}")
+
+                if os.path.exists(pdf_full_path):
+                    try:
+                        # Lu en mémoire: le contenu peut être renvoyé en cas de nouvelle tentative
+                        with open(pdf_full_path, 'rb') as pdf_file:
+                            pdf_content = pdf_file.read()
+
+                        # GraphQL mutation pour ajouter le fichier (endpoint /v2/file)
+                        query_file = f'mutation($file: File!) {{ add_file_to_column(file: $file, item_id: {item_id}, column_id: "dup__of_gqp") {{ id }} }}'
+                        client.upload_file(api_key, query_file, os.path.basename(pdf_full_path), pdf_content)
+                        print(f"[MONDAY] PDF contrat ajoute")
+                    except MondayError as e:
+                        print(f"[MONDAY WARN] Erreur ajout PDF: {e}")
+                    except Exception as e:
+                        print(f"[MONDAY WARN] Erreur lecture PDF: {e}")
+                else:
+                    print(f"[MONDAY WARN] PDF introuvable: {pdf_full_path}")
             else:
-                print(f"[MONDAY ERROR] Reponse inattendue de Monday.com:")
-                print(json.dumps(data, indent=2))
-                return False
+                # URL publique externe - essayer de l'ajouter directement
+                print(f"[MONDAY INFO] URL PDF externe (non supportée): {pdf_url}")
         else:
-            print(f"[MONDAY ERROR] HTTP {response.status_code}")
-            print(response.text)
-            return False
+            print(f"[MONDAY INFO] Aucun PDF dans les donnees de vente")
+
+        # BANNIR cet ID pour ne JAMAIS le renvoyer à Monday
+        add_to_monday_ban(username, soumission_num)
+        print(f"[MONDAY BAN] ✓ ID {soumission_num} ajouté à la liste des bannis - Ne sera plus jamais envoyé")
+
+        return True
 
     except Exception as e:
         print(f"[MONDAY ERROR] Exception lors de la création: {e}")
@@ -722,36 +611,8 @@ def update_monday_column(api_key: str, board_id: str, item_id: str, column_id: s
     Returns:
         bool: True si succès, False sinon
     """
-    try:
-        url = "https://api.monday.com/v2"
-        headers = {
-            "Authorization": api_key,
-            "Content-Type": "application/json"
-        }
-
-        # Pour les colonnes dropdown (provenance, type), la valeur doit être {"index": X}
-        import json
-        value_escaped = value.replace('"', '\\"')
-
-        query = f'mutation {{ change_column_value(board_id: {board_id}, item_id: {item_id}, column_id: "{column_id}", value: "{value_escaped}") {{ id }} }}'
-
-        response = requests.post(url, headers=headers, json={"query": query})
-
-        if response.status_code == 200:
-            resp_data = response.json()
-            if "errors" not in resp_data:
-                print(f"[MONDAY] Colonne {column_id} mise à jour avec succès")
-                return True
-            else:
-                print(f"[MONDAY ERROR] Erreur mise à jour colonne: {resp_data['errors']}")
-                return False
-        else:
-            print(f"[MONDAY ERROR] HTTP {response.status_code} - {response.text}")
-            return False
-
-    except Exception as e:
-        print(f"[MONDAY ERROR] Exception mise à jour colonne: {e}")
-        return False
+    # Pour les colonnes dropdown (provenance, type), la valeur doit être {"index": X}
+    return update_monday_columns(api_key, board_id, item_id, {column_id: value})
 
 
 def update_monday_text_column(api_key: str, board_id: str, item_id: str, column_id: str, value: str) -> bool:
@@ -768,35 +629,46 @@ def update_monday_text_column(api_key: str, board_id: str, item_id: str, column_
     Returns:
         bool: True si succès, False sinon
     """
-    try:
-        url = "https://api.monday.com/v2"
-        headers = {
-            "Authorization": api_key,
-            "Content-Type": "application/json"
-        }
+    # Pour les colonnes texte, la valeur doit être une simple chaîne
+    return update_monday_columns(api_key, board_id, item_id, text_values={column_id: value})
 
-        # Pour les colonnes texte, la valeur doit être une simple chaîne
-        import json
-        value_escaped = value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
 
-        query = f'mutation {{ change_simple_column_value(board_id: {board_id}, item_id: {item_id}, column_id: "{column_id}", value: "{value_escaped}") {{ id }} }}'
+def update_monday_columns(api_key: str, board_id: str, item_id: str, values: Optional[Dict[str, str]] = None,
+                          text_values: Optional[Dict[str, str]] = None) -> bool:
+    """
+    Met à jour plusieurs colonnes d'un item en une seule requête
 
-        response = requests.post(url, headers=headers, json={"query": query})
+    Args:
+        api_key: Clé API Monday.com
+        board_id: ID du board Monday.com
+        item_id: ID de l'item à mettre à jour
+        values: column_id -> valeur JSON (change_column_value)
+        text_values: column_id -> texte brut (change_simple_column_value)
 
-        if response.status_code == 200:
-            resp_data = response.json()
-            if "errors" not in resp_data:
-                print(f"[MONDAY] Colonne texte {column_id} mise à jour avec succès")
-                return True
+    Returns:
+        bool: True si toutes les colonnes ont été mises à jour, False sinon
+    """
+    try:
+        mutations = []
+        column_ids = []
+        for column_id, value in (values or {}).items():
+            mutations.append(_column_mutation(board_id, item_id, column_id, value))
+            column_ids.append(column_id)
+        for column_id, value in (text_values or {}).items():
+            mutations.append(_simple_column_mutation(board_id, item_id, column_id, value))
+            column_ids.append(column_id)
+
+        success = True
+        for column_id, error in zip(column_ids, client.mutate_batch(api_key, mutations)):
+            if error is None:
+                print(f"[MONDAY] Colonne {column_id} mise à jour avec succès")
             else:
-                print(f"[MONDAY ERROR] Erreur mise à jour colonne texte: {resp_data['errors']}")
-                return False
-        else:
-            print(f"[MONDAY ERROR] HTTP {response.status_code} - {response.text}")
-            return False
+                print(f"[MONDAY ERROR] Erreur mise à jour colonne {column_id}: {error}")
+                success = False
+        return success
 
     except Exception as e:
-        print(f"[MONDAY ERROR] Exception mise à jour colonne texte: {e}")
+        print(f"[MONDAY ERROR] Exception mise à jour colonnes: {e}")
         return False
 
 
@@ -875,3 +747,116 @@ def sync_vente_to_monday(username: str, vente_data: Dict) -> bool:
         print(f"[MONDAY] Echec de la synchronisation vers Monday.com")
 
     return success
+
+
+def get_etiquette_color(username: str, etiquettes_key: str, label: str, default: str = "#3b82f6") -> str:
+    """Couleur de l'étiquette dans Qwota (ventes_etiquettes/<username>/etiquettes.json)"""
+    try:
+        fichier_etiquettes = os.path.join(f"{base_cloud}/ventes_etiquettes", username, "etiquettes.json")
+        if os.path.exists(fichier_etiquettes):
+            with open(fichier_etiquettes, "r", encoding="utf-8") as f:
+                etiquettes = json.load(f)
+            for etiquette in etiquettes.get(etiquettes_key, []):
+                if isinstance(etiquette, dict) and etiquette.get("label") == label:
+                    return etiquette.get("color", default)
+    except Exception as e:
+        print(f"[MONDAY] Impossible de récupérer la couleur: {e}")
+    return default
+
+
+def resolve_monday_label_index(api_key: str, board_id: str, username: str, column_id: str, label: str,
+                               etiquettes_key: str) -> Optional[int]:
+    """
+    Index Monday d'une étiquette Qwota: nom exact, nom en minuscules, sinon
+    création de l'étiquette dans Monday, sinon correspondance partielle
+
+    Returns:
+        Optional[int]: Index de l'étiquette, None si introuvable
+    """
+    label_map = get_monday_column_labels(api_key, board_id, column_id)
+
+    # Essayer avec le nom exact, puis avec le nom normalisé (minuscules)
+    if label in label_map:
+        return label_map[label]
+    if label.lower() in label_map:
+        return label_map[label.lower()]
+
+    # Si l'étiquette n'existe pas dans Monday, essayer de la créer
+    print(f"[MONDAY] Étiquette '{label}' non trouvée dans Monday")
+    print(f"[MONDAY] Tentative de création de l'étiquette '{label}'...")
+    monday_index = add_label_to_monday_column(
+        api_key, board_id, column_id, label, get_etiquette_color(username, etiquettes_key, label)
+    )
+    if monday_index is not None:
+        return monday_index
+
+    # Si la création échoue, essayer une correspondance partielle
+    print(f"[MONDAY] Recherche de correspondance partielle...")
+    label_lower = label.lower()
+    for label_name, idx in label_map.items():
+        if label_name and label_lower in label_name.lower() or label_name.lower() in label_lower:
+            print(f"[MONDAY] Correspondance partielle trouvée: '{label}' -> '{label_name}' (index {idx})")
+            return idx
+
+    print(f"[MONDAY WARN] ⚠️ Étiquette '{label}' absente dans Monday.com")
+    print(f"[MONDAY WARN] 💡 Ajoutez manuellement l'étiquette dans la colonne {column_id} de votre board Monday")
+    print(f"[MONDAY WARN] Labels disponibles: {', '.join([k for k in label_map.keys() if k and k[0].isupper()])}")
+    return None
+
+
+def sync_label_to_monday(username: str, soumission_num: str, column_id: str, label: str,
+                         etiquettes_key: str) -> bool:
+    """
+    Synchronise une étiquette (provenance, type de travaux) vers l'item Monday de la soumission
+
+    Args:
+        username: Username de l'entrepreneur
+        soumission_num: Numéro de soumission
+        column_id: ID de la colonne Monday (dup__of_couleurs_mkm0awjt, status_1)
+        label: Nom de l'étiquette Qwota ("" pour effacer)
+        etiquettes_key: Clé des étiquettes dans etiquettes.json (couleur à la création)
+
+    Returns:
+        bool: True si synchronisé (ou pas de config Monday.com), False sinon
+    """
+    api_key, board_id = get_monday_credentials(username)
+    if not api_key or not board_id:
+        return True
+
+    monday_item_id = find_monday_item_by_soumission(username, soumission_num)
+    if not monday_item_id:
+        print(f"[MONDAY] Item non trouvé dans Monday pour {soumission_num}")
+        return False
+
+    if not label or not label.strip():
+        # Vide - effacer la valeur
+        return update_monday_column(api_key, board_id, monday_item_id, column_id, json.dumps({"index": None}))
+
+    monday_index = resolve_monday_label_index(api_key, board_id, username, column_id, label, etiquettes_key)
+    if monday_index is None:
+        return False
+
+    success = update_monday_column(api_key, board_id, monday_item_id, column_id, json.dumps({"index": monday_index}))
+    if success:
+        print(f"[MONDAY] Étiquette synchronisée ({column_id}): {label} -> index {monday_index}")
+    return success
+
+
+def sync_text_to_monday(username: str, soumission_num: str, column_id: str, value: str) -> bool:
+    """
+    Synchronise une colonne texte (ex: notes -> "Infos sup") vers l'item Monday de la soumission
+
+    Returns:
+        bool: True si synchronisé (ou pas de config Monday.com), False sinon
+    """
+    api_key, board_id = get_monday_credentials(username)
+    if not api_key or not board_id:
+        print(f"[MONDAY] Pas de configuration Monday pour {username}")
+        return True
+
+    monday_item_id = find_monday_item_by_soumission(username, soumission_num)
+    if not monday_item_id:
+        print(f"[MONDAY] Item non trouvé dans Monday pour {soumission_num}")
+        return False
+
+    return update_monday_text_column(api_key, board_id, monday_item_id, column_id, value or "")
@@ -0,0 +1,221 @@
+"""
+Présence en ligne des utilisateurs (heartbeats) tenue en mémoire
+
+Avant: chaque heartbeat de chaque onglet faisait un SELECT sur users, un
+INSERT OR REPLACE dans online_users et un commit; /api/users/online relisait
+la table toutes les 3 secondes.
+
+Maintenant:
+- Les heartbeats mettent à jour un registre en mémoire (aucun accès DB,
+  sauf le premier heartbeat d'un utilisateur pour lire prenom/nom/role)
+- Un thread écrit les changements dans online_users par lot toutes les
+  PRESENCE_FLUSH_SECONDS (persistance aux redéploiements, autres workers)
+  et expire les utilisateurs sans heartbeat depuis PRESENCE_TTL_SECONDS
+- /api/users/online est servi depuis la mémoire
+- Les pages abonnées reçoivent la liste par SSE à chaque changement
+"""
+
+import asyncio
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from db_pool import get_connection
+
+PRESENCE_TTL_SECONDS = int(os.getenv("PRESENCE_TTL_SECONDS", "30"))
+PRESENCE_FLUSH_SECONDS = float(os.getenv("PRESENCE_FLUSH_SECONDS", "5"))
+
+
+class PresenceRegistry:
+    """Registre des utilisateurs en ligne de ce worker + ceux vus par les autres (via SQLite)"""
+
+    def __init__(self, ttl: int = PRESENCE_TTL_SECONDS, flush_interval: float = PRESENCE_FLUSH_SECONDS):
+        self.ttl = ttl
+        self.flush_interval = flush_interval
+        self._lock = threading.Lock()
+        self._local: Dict[str, Dict[str, Any]] = {}    # heartbeats reçus par ce worker
+        self._remote: Dict[str, Dict[str, Any]] = {}   # lus dans online_users (autres workers)
+        self._dirty = set()                            # à écrire au prochain flush
+        self._removed = set()                          # à supprimer au prochain flush
+        self._version = 0
+        self._subscribers = set()                      # (loop, asyncio.Event)
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    # ------------------------------------------------------------------
+    # Heartbeats
+    # ------------------------------------------------------------------
+
+    def heartbeat(self, username: str) -> bool:
+        """
+        Met à jour last_seen en mémoire. Retourne False si l'utilisateur n'est
+        pas encore connu: l'appelant doit alors appeler register() (accès DB).
+        """
+        with self._lock:
+            entry = self._local.get(username)
+            if entry is None:
+                return False
+            entry["last_seen"] = time.time()
+            self._dirty.add(username)
+            return True
+
+    def register(self, username: str) -> bool:
+        """Premier heartbeat: lit prenom/nom/role dans users. Fonction bloquante"""
+        with get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT prenom, nom, role FROM users WHERE username = ?", (username,))
+            row = cursor.fetchone()
+
+        if not row:
+            return False
+
+        with self._lock:
+            self._local[username] = {
+                "username": username,
+                "prenom": row[0] or "",
+                "nom": row[1] or "",
+                "role": row[2] or "entrepreneur",
+                "last_seen": time.time()
+            }
+            self._dirty.add(username)
+            self._removed.discard(username)
+            changed = self._remote.pop(username, None) is None
+        if changed:
+            self._publish()
+        return True
+
+    def disconnect(self, username: str):
+        """Déconnexion explicite (fermeture de l'onglet)"""
+        with self._lock:
+            removed = self._local.pop(username, None) or self._remote.pop(username, None)
+            self._dirty.discard(username)
+            self._removed.add(username)
+        if removed:
+            self._publish()
+
+    def get_online_users(self) -> List[Dict[str, Any]]:
+        """Utilisateurs avec un heartbeat de moins de ttl secondes"""
+        cutoff = time.time() - self.ttl
+        with self._lock:
+            users = {**self._remote, **self._local}
+            return [
+                {"username": u["username"], "prenom": u["prenom"], "nom": u["nom"], "role": u["role"]}
+                for u in users.values() if u["last_seen"] >= cutoff
+            ]
+
+    # ------------------------------------------------------------------
+    # Écriture par lot dans SQLite
+    # ------------------------------------------------------------------
+
+    def flush(self):
+        """Écrit les heartbeats en attente, expire les inactifs et relit les autres workers"""
+        now = time.time()
+        cutoff = now - self.ttl
+
+        with self._lock:
+            expired = [u for u, entry in self._local.items() if entry["last_seen"] < cutoff]
+            for username in expired:
+                del self._local[username]
+                self._dirty.discard(username)
+            rows = [
+                (u, self._local[u]["last_seen"], self._local[u]["prenom"], self._local[u]["nom"], self._local[u]["role"])
+                for u in self._dirty if u in self._local
+            ]
+            removed = list(self._removed)
+            self._dirty.clear()
+            self._removed.clear()
+
+        with get_connection() as conn:
+            cursor = conn.cursor()
+            if rows:
+                cursor.executemany("""
+                    INSERT OR REPLACE INTO online_users (username, last_seen, prenom, nom, role)
+                    VALUES (?, ?, ?, ?, ?)
+                """, rows)
+            if removed:
+                cursor.executemany("DELETE FROM online_users WHERE username = ?", [(u,) for u in removed])
+            cursor.execute("DELETE FROM online_users WHERE last_seen < ?", (cutoff,))
+            cursor.execute("""
+                SELECT username, last_seen, prenom, nom, role
+                FROM online_users
+                WHERE last_seen >= ?
+            """, (cutoff,))
+            persisted = cursor.fetchall()
+
+        with self._lock:
+            old_remote = set(self._remote)
+            self._remote = {
+                row[0]: {"username": row[0], "last_seen": row[1], "prenom": row[2] or "",
+                         "nom": row[3] or "", "role": row[4] or "entrepreneur"}
+                for row in persisted if row[0] not in self._local and row[0] not in self._removed
+            }
+            changed = bool(expired) or old_remote != set(self._remote)
+
+        if changed:
+            self._publish()
+
+    def _run(self):
+        while not self._stop.wait(self.flush_interval):
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"[PRESENCE] Erreur flush: {e}", flush=True)
+
+    def start(self):
+        """Démarre le thread d'écriture (appelé au startup de l'application)"""
+        if self._thread and self._thread.is_alive():
+            return
+        try:
+            # Reprendre les utilisateurs encore en ligne avant un redéploiement
+            self.flush()
+        except Exception as e:
+            print(f"[PRESENCE] Erreur chargement initial: {e}", flush=True)
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="presence-flush", daemon=True)
+        self._thread.start()
+        print(f"[PRESENCE] Registre démarré (TTL {self.ttl}s, flush {self.flush_interval}s)", flush=True)
+
+    def stop(self):
+        """Arrête le thread et écrit les derniers heartbeats"""
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=self.flush_interval + 1)
+        try:
+            self.flush()
+        except Exception as e:
+            print(f"[PRESENCE] Erreur flush final: {e}", flush=True)
+
+    # ------------------------------------------------------------------
+    # Abonnements (SSE)
+    # ------------------------------------------------------------------
+
+    @property
+    def version(self) -> int:
+        return self._version
+
+    def _publish(self):
+        with self._lock:
+            self._version += 1
+            subscribers = list(self._subscribers)
+        for loop, event in subscribers:
+            try:
+                loop.call_soon_threadsafe(event.set)
+            except RuntimeError:
+                # Boucle fermée: l'abonné sera retiré à la fin de son générateur
+                pass
+
+    def subscribe(self) -> tuple:
+        """Abonnement depuis une coroutine: retourne (loop, event) à passer à unsubscribe()"""
+        subscriber = (asyncio.get_running_loop(), asyncio.Event())
+        with self._lock:
+            self._subscribers.add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber: tuple):
+        with self._lock:
+            self._subscribers.discard(subscriber)
+
+
+# Registre unique du processus
+registry = PresenceRegistry()
@@ -3,6 +3,7 @@ Backend routes pour RPO (Résultats, Prévisions, Objectifs)
 Gère les données annuelles, mensuelles et hebdomadaires par utilisateur
 """
 
+import copy
 import json
 import os
 import logging
@@ -13,6 +14,11 @@ from datetime import datetime
 from typing import Dict, Any, Optional
 from zoneinfo import ZoneInfo
 
+import json_cache
+import serialization
+from db_pool import get_connection
+from season_calendar import season_calendar
+
 logger = logging.getLogger(__name__)
 
 # Locks pour éviter les synchronisations simultanées
@@ -25,6 +31,24 @@ _locks_lock = threading.Lock()  # Lock pour accéder au dict des locks
 _user_file_locks = {}  # Dict[username, Lock]
 _user_file_locks_lock = threading.Lock()  # Lock pour accéder au dict des locks
 
+# Hooks appelés après chaque sauvegarde RPO réussie (ex: invalidation du classement)
+_rpo_save_hooks = []
+
+
+def register_rpo_save_hook(hook):
+    """Enregistre une fonction hook(username) appelée après chaque save_user_rpo_data réussi"""
+    if hook not in _rpo_save_hooks:
+        _rpo_save_hooks.append(hook)
+
+
+def _notify_rpo_saved(username: str):
+    for hook in _rpo_save_hooks:
+        try:
+            hook(username)
+        except Exception as e:
+            print(f"[WARN] [SAVE RPO] Hook {getattr(hook, '__name__', hook)} en erreur pour {username}: {e}", flush=True)
+
+
 def get_user_file_lock(username: str) -> threading.Lock:
     """Retourne un lock spécifique pour le fichier RPO d'un utilisateur"""
     with _user_file_locks_lock:
@@ -154,10 +178,7 @@ os.makedirs(RPO_DATA_DIR, exist_ok=True)
 def get_user_role(username: str) -> str:
     """Récupère le rôle d'un utilisateur depuis la base de données"""
     try:
-        import sqlite3
-        from database import get_database_path
-        DB_PATH = get_database_path()
-        with sqlite3.connect(DB_PATH) as conn:
+        with get_connection() as conn:
             cursor = conn.cursor()
             cursor.execute("SELECT role FROM users WHERE username=?", (username,))
             row = cursor.fetchone()
@@ -250,8 +271,10 @@ def load_user_rpo_data(username: str) -> Dict[str, Any]:
         }
 
     try:
-        with open(filepath, 'r', encoding='utf-8') as f:
-            return json.load(f)
+        data = json_cache.load_json_cached(filepath)
+        if data is not None:
+            return data
+        raise json.JSONDecodeError("Fichier RPO vide", "", 0)
     except json.JSONDecodeError as e:
         # ALERTE: Fichier JSON corrompu - probablement une race condition
         print(f"[CRITICAL] [LOAD RPO] Fichier JSON corrompu pour {username}: {e}", flush=True)
@@ -260,9 +283,9 @@ def load_user_rpo_data(username: str) -> Dict[str, Any]:
         temp_filepath = filepath + '.tmp'
         if os.path.exists(temp_filepath):
             try:
-                with open(temp_filepath, 'r', encoding='utf-8') as f:
-                    print(f"[RECOVERY] [LOAD RPO] Recuperation depuis fichier temporaire pour {username}", flush=True)
-                    return json.load(f)
+                recovered = serialization.read_json_file(temp_filepath)
+                print(f"[RECOVERY] [LOAD RPO] Recuperation depuis fichier temporaire pour {username}", flush=True)
+                return recovered
             except:
                 pass
     except Exception as e:
@@ -346,8 +369,7 @@ def save_user_rpo_data(username: str, data: Dict[str, Any]) -> bool:
         data['last_updated'] = get_toronto_now().isoformat()
 
         # Écriture atomique: écrire dans un fichier temporaire puis renommer
-        with open(temp_filepath, 'w', encoding='utf-8') as f:
-            json.dump(data, f, indent=2, ensure_ascii=False)
+        serialization.write_json_file(temp_filepath, data)
 
         # Renommer atomiquement (remplace le fichier existant)
         # Sur Windows avec OneDrive, os.replace peut échouer temporairement
@@ -363,16 +385,17 @@ def save_user_rpo_data(username: str, data: Dict[str, Any]) -> bool:
                 else:
                     # Fallback: écrire directement si os.replace échoue
                     print(f"[WARN] [SAVE RPO] os.replace failed, using fallback write", flush=True)
-                    with open(filepath, 'w', encoding='utf-8') as f:
-                        json.dump(data, f, indent=2, ensure_ascii=False)
+                    serialization.write_json_file(filepath, data)
                     if os.path.exists(temp_filepath):
                         try:
                             os.remove(temp_filepath)
                         except:
                             pass
 
+        json_cache.invalidate(filepath)
         print(f"[DEBUG] [SAVE RPO] File written successfully!", flush=True)
         print(f"[DEBUG] [SAVE RPO] File exists after save? {os.path.exists(filepath)}", flush=True)
+        _notify_rpo_saved(username)
         return True
     except Exception as e:
         print(f"[ERROR] [SAVE RPO] Failed to save RPO for {username}: {e}", flush=True)
@@ -448,6 +471,9 @@ def update_weekly_data(username: str, month_index: int, week_number: int, weekly
 
         week_key = str(week_number)
 
+        # Copie de la semaine avant modification pour calculer le delta coach/direction
+        old_week = dict(rpo_data['weekly'][month_key].get(week_key) or {})
+
         # MERGE au lieu d'écraser
         if week_key in rpo_data['weekly'][month_key]:
             print(f"[BACKEND-SAVE] Merge avec donnees existantes pour semaine {week_number}", flush=True)
@@ -458,19 +484,20 @@ def update_weekly_data(username: str, month_index: int, week_number: int, weekly
             print(f"[BACKEND-SAVE] Creation nouvelle semaine {week_number}", flush=True)
             rpo_data['weekly'][month_key][week_key] = weekly_data
 
+        new_week = dict(rpo_data['weekly'][month_key][week_key])
         result = save_user_rpo_data(username, rpo_data)
 
     # Ces opérations secondaires sont HORS du lock pour ne pas bloquer
     if result:
         print(f"[BACKEND-SAVE] Donnees sauvegardees avec succes", flush=True)
 
-        # Synchroniser le RPO du coach si cet entrepreneur est assigné à un coach
+        # Appliquer seulement le delta de cette semaine aux RPO coach et direction
         try:
-            from QE.Backend.coach_access import get_coach_for_entrepreneur
-            coach_username = get_coach_for_entrepreneur(username)
-            if coach_username:
-                print(f"[BACKEND-SAVE] Synchronisation RPO du coach {coach_username}...", flush=True)
-                sync_coach_rpo(coach_username)
+            apply_weekly_deltas_to_rollups(
+                username,
+                {month_key: {week_key: old_week}},
+                {month_key: {week_key: new_week}}
+            )
         except Exception as coach_sync_error:
             print(f"[WARN] [BACKEND-SAVE] Erreur synchronisation RPO coach: {coach_sync_error}", flush=True)
 
@@ -521,92 +548,27 @@ def get_all_weekly_data_for_month(username: str, month_index: int) -> Dict[str,
     return rpo_data.get('weekly', {}).get(month_key, {})
 
 
-def get_week_number_from_date(date_str: str) -> tuple:
+def get_week_number_from_date(date_str: str, year: Optional[int] = None) -> tuple:
     """
     Retourne (month_index, week_number) basé sur la date (en heure de Toronto)
-    month_index: -2 (octobre 2025), 0-8 (janvier-septembre 2026)
+    month_index: -2 (décembre de l'année précédente), 0-11 (janvier-décembre de la saison)
     week_number: 1-5 (semaine dans le mois, basée sur les lundis)
 
-    Pour Octobre 2025:
-    - Semaine 1: 6-12 oct (lundi-dimanche)
-    - Semaine 2: 13-19 oct
-    - Semaine 3: 20-26 oct
-    - Semaine 4: 27 oct - 2 nov
-
-    Pour 2026: Les semaines commencent le lundi
+    Une semaine appartient au mois de son lundi; les jours de janvier avant le
+    premier lundi appartiennent à la dernière semaine de décembre.
+    Table précalculée: voir season_calendar (saison config.RPO_SEASON_YEAR par défaut).
     """
-    from datetime import timedelta
-
     try:
         # Parse la date avec le fuseau horaire de Toronto
-        date = parse_date_toronto(date_str)
-
-        # Déterminer month_index selon l'année et le mois
-        if date.year == 2025 and date.month == 12:
-            month_index = -2  # Décembre 2025 (premier mois du cycle fiscal)
-
-            # Pour décembre 2025: trouver le premier lundi et calculer les semaines
-            first_day = datetime(date.year, date.month, 1, tzinfo=TORONTO_TZ)
-            if first_day.weekday() == 0:  # Si le 1er est déjà un lundi
-                first_monday = first_day
-            else:
-                days_until_monday = (7 - first_day.weekday()) % 7
-                if days_until_monday == 0:
-                    days_until_monday = 7
-                first_monday = first_day + timedelta(days=days_until_monday)
-
-            # Compter les lundis depuis le début du mois jusqu'à cette date
-            if date < first_monday:
-                week_number = 1  # Avant le premier lundi = semaine 1
-            else:
-                days_since_first_monday = (date - first_monday).days
-                week_number = (days_since_first_monday // 7) + 1
-
-        elif date.year == 2026 and 1 <= date.month <= 12:  # Janvier-Décembre 2026
-            # NOUVELLE LOGIQUE: Une semaine appartient au mois où elle COMMENCE (lundi)
-            # Trouver le lundi de la semaine qui contient cette date
-            days_since_monday = date.weekday()  # 0=Monday, 6=Sunday
-            monday_of_week = date - timedelta(days=days_since_monday)
-
-            # CAS SPÉCIAL: Janvier 1-4 2026 (avant le 5 janvier qui est un lundi)
-            if date.month == 1 and date.day < 5:
-                print(f"[DEBUG] Date {date_str} est avant le 5 janvier -> Décembre semaine 5")
-                return (-2, 5)  # Décembre 2025, semaine 5
-
-            # Le mois auquel appartient cette semaine est le mois du LUNDI
-            week_belongs_to_month = monday_of_week.month
-            week_belongs_to_year = monday_of_week.year
-
-            # Si le lundi est dans un autre mois, rediriger vers ce mois
-            if week_belongs_to_month != date.month or week_belongs_to_year != date.year:
-                # Cette date appartient à la semaine d'un autre mois
-                # Appeler récursivement avec la date du lundi
-                print(f"[DEBUG] Date {date_str} appartient à la semaine du {monday_of_week.strftime('%Y-%m-%d')}")
-                return get_week_number_from_date(monday_of_week.strftime('%Y-%m-%d'))
-
-            # Trouver le premier lundi du mois du lundi de la semaine
-            first_day = datetime(week_belongs_to_year, week_belongs_to_month, 1, tzinfo=TORONTO_TZ)
-            if first_day.weekday() == 0:  # Si le 1er est déjà un lundi
-                first_monday = first_day
-            else:
-                days_until_monday = 7 - first_day.weekday()
-                first_monday = first_day + timedelta(days=days_until_monday)
-
-            month_index = week_belongs_to_month - 1  # 0-11 pour janvier-décembre 2026
-
-            # Compter les lundis depuis le début du mois jusqu'au lundi de cette semaine
-            days_since_first_monday = (monday_of_week - first_monday).days
-            week_number = (days_since_first_monday // 7) + 1
-
-        else:
-            # Default: dates hors période fiscale (décembre 2025 - décembre 2026)
-            month_index = 0  # Default janvier 2026
-            week_number = 1
-
-        return (month_index, week_number)
+        week = season_calendar(year).week_of(parse_date_toronto(date_str))
     except Exception as e:
         print(f"Erreur parsing date {date_str}: {e}")
-        return (0, 1)  # Default janvier 2026 semaine 1
+        return (0, 1)  # Default janvier semaine 1
+
+    if week is None:
+        # Default: dates hors saison (décembre précédent - décembre)
+        return (0, 1)
+    return (week.month_index, week.week_number)
 
 
 def sync_direction_rpo() -> bool:
@@ -615,15 +577,11 @@ def sync_direction_rpo() -> bool:
     Agrège: h_marketing, estimation, contract, dollar, produit
     Utilise un lock pour éviter les synchronisations simultanées
     """
-    # Acquérir le lock pour direction
-    with _direction_sync_lock:
+    # Acquérir le lock pour direction (et le fichier RPO direction pour les autres workers)
+    with _direction_sync_lock, rpo_file_lock('direction'):
         try:
-            import sqlite3
-            from database import get_database_path
-
             # Récupérer tous les coaches actifs
-            DB_PATH = get_database_path()
-            with sqlite3.connect(DB_PATH) as conn:
+            with get_connection() as conn:
                 cursor = conn.cursor()
                 cursor.execute("SELECT username FROM users WHERE role='coach' AND is_active=1")
                 coaches = [row[0] for row in cursor.fetchall()]
@@ -871,20 +829,28 @@ def sync_direction_rpo() -> bool:
             return False
 
 
-def sync_coach_rpo(coach_username: str) -> bool:
+def _get_coach_sync_lock(coach_username: str) -> threading.Lock:
+    """Obtient ou crée le lock de synchronisation d'un coach"""
+    with _locks_lock:
+        if coach_username not in _coach_sync_locks:
+            _coach_sync_locks[coach_username] = threading.Lock()
+        return _coach_sync_locks[coach_username]
+
+
+def sync_coach_rpo(coach_username: str, sync_direction: bool = True) -> bool:
     """
     Synchronise le RPO d'un coach en agrégeant les données de tous ses entrepreneurs
     Agrège: h_marketing, estimation, contract, dollar, produit
     Utilise un lock par coach pour éviter les synchronisations simultanées
+
+    Reconstruction complète: les modifications courantes passent par
+    apply_weekly_deltas_to_rollups(). sync_direction=False permet de
+    reconstruire plusieurs coaches avant une seule synchronisation direction.
     """
-    # Obtenir ou créer le lock pour ce coach
-    with _locks_lock:
-        if coach_username not in _coach_sync_locks:
-            _coach_sync_locks[coach_username] = threading.Lock()
-        coach_lock = _coach_sync_locks[coach_username]
+    coach_lock = _get_coach_sync_lock(coach_username)
 
-    # Acquérir le lock pour ce coach
-    with coach_lock:
+    # Acquérir le lock pour ce coach (et le fichier RPO du coach pour les autres workers)
+    with coach_lock, rpo_file_lock(coach_username):
         try:
             from QE.Backend.coach_access import get_entrepreneurs_for_coach
 
@@ -1174,7 +1140,8 @@ def sync_coach_rpo(coach_username: str) -> bool:
 
             # Synchroniser le RPO direction après avoir mis à jour le coach
             try:
-                sync_direction_rpo()
+                if sync_direction:
+                    sync_direction_rpo()
             except Exception as direction_sync_error:
                 print(f"[WARN] [COACH RPO] Erreur synchronisation RPO direction: {direction_sync_error}", flush=True)
 
@@ -1187,11 +1154,190 @@ def sync_coach_rpo(coach_username: str) -> bool:
             return False
 
 
-def sync_soumissions_to_rpo(username: str) -> bool:
+# ========================================
+# AGRÉGATION INCRÉMENTALE COACH / DIRECTION
+# ========================================
+
+# Champs sommés dans les RPO coach (réels + objectifs) et direction (réels seulement)
+_ROLLUP_FIELDS = ['h_marketing', 'estimation', 'contract', 'dollar', 'produit']
+_ROLLUP_VISE_FIELDS = ['h_marketing_vise', 'estimation_vise', 'contract_vise', 'dollar_vise']
+
+# Correspondance champ weekly -> total annuel
+_ROLLUP_ANNUAL_FIELDS = {
+    'estimation': 'estimation_reel',
+    'contract': 'contract_reel',
+    'dollar': 'dollar_reel',
+    'produit': 'produit_reel',
+}
+
+
+def _rollup_value(value) -> float:
+    """Valeur numérique d'un champ agrégé ("-", vide ou non numérique = 0)"""
+    if value in ('-', '', None):
+        return 0.0
+    try:
+        return float(value)
+    except (ValueError, TypeError):
+        return 0.0
+
+
+def compute_weekly_deltas(old_weekly: Dict[str, Any], new_weekly: Dict[str, Any]) -> Dict[tuple, tuple]:
+    """
+    Compare deux versions des données weekly d'un entrepreneur
+    Retourne {(month_key, week_key): ({champ: delta}, week_label)} pour les semaines modifiées
+    Les mois négatifs (-2, -1) sont ignorés comme dans sync_coach_rpo()
+    """
+    deltas = {}
+    for month_key in set(old_weekly) | set(new_weekly):
+        if month_key in ['-2', '-1']:
+            continue
+
+        old_weeks = old_weekly.get(month_key) or {}
+        new_weeks = new_weekly.get(month_key) or {}
+        for week_key in set(old_weeks) | set(new_weeks):
+            old_week = old_weeks.get(week_key) or {}
+            new_week = new_weeks.get(week_key) or {}
+            if old_week == new_week:
+                continue
+
+            week_delta = {}
+            for field in _ROLLUP_FIELDS + _ROLLUP_VISE_FIELDS:
+                diff = _rollup_value(new_week.get(field)) - _rollup_value(old_week.get(field))
+                if diff:
+                    week_delta[field] = diff
+
+            if week_delta:
+                deltas[(month_key, week_key)] = (week_delta, new_week.get('week_label'))
+
+    return deltas
+
+
+def _apply_rollup_deltas(rollup_rpo: Dict[str, Any], deltas: Dict[tuple, tuple], fields: list,
+                         marker_field: str, mktg_hr_field: str, copy_week_label: bool) -> bool:
+    """
+    Applique les deltas aux semaines et aux totaux annuels d'un RPO agrégé (coach ou direction)
+    Retourne False si le RPO n'a jamais été reconstruit (marker_field absent de annual):
+    un delta sur une base vide serait faux, l'appelant doit faire une reconstruction complète.
+    """
+    annual = rollup_rpo.get('annual')
+    if not annual or marker_field not in annual:
+        return False
+
+    weekly = rollup_rpo.setdefault('weekly', {})
+    for (month_key, week_key), (week_delta, week_label) in deltas.items():
+        week_data = weekly.setdefault(month_key, {}).setdefault(week_key, {})
+
+        for field in fields:
+            if field in week_delta:
+                week_data[field] = _rollup_value(week_data.get(field)) + week_delta[field]
+
+        if copy_week_label and week_label and 'week_label' not in week_data:
+            week_data['week_label'] = week_label
+
+        # Les totaux annuels ne comptent que Janvier-Décembre 2026, semaines 1 à 5
+        if not (month_key.isdigit() and int(month_key) < 12 and week_key in ['1', '2', '3', '4', '5']):
+            continue
+
+        for field, annual_field in _ROLLUP_ANNUAL_FIELDS.items():
+            if field in week_delta:
+                annual[annual_field] = _rollup_value(annual.get(annual_field)) + week_delta[field]
+
+        if 'h_marketing' in week_delta:
+            annual['hr_pap_reel'] = _rollup_value(annual.get('hr_pap_reel')) + week_delta['h_marketing']
+            # Exclure semaine 1 du mois 0 (formation)
+            if not (month_key == '0' and week_key == '1'):
+                annual['hr_pap_reel_sans_week1'] = _rollup_value(annual.get('hr_pap_reel_sans_week1')) + week_delta['h_marketing']
+
+    # Recalculer les taux à partir des totaux mis à jour
+    total_estimation = _rollup_value(annual.get('estimation_reel'))
+    total_contract = _rollup_value(annual.get('contract_reel'))
+    total_hr = _rollup_value(annual.get(mktg_hr_field))
+    annual['mktg_reel'] = round(total_estimation / total_hr, 2) if total_hr > 0 else 0
+    annual['vente_reel'] = round((total_contract / total_estimation) * 100, 2) if total_estimation > 0 else 0
+    annual['moyen_reel'] = round(_rollup_value(annual.get('dollar_reel')) / total_contract, 2) if total_contract > 0 else 0
+    return True
+
+
+def _is_active_coach(username: str) -> bool:
+    """Vérifie si l'utilisateur est un coach actif (donc inclus dans le RPO direction)"""
+    with get_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT 1 FROM users WHERE username = ? AND role='coach' AND is_active=1", (username,))
+        return cursor.fetchone() is not None
+
+
+def apply_weekly_deltas_to_rollups(username: str, old_weekly: Dict[str, Any], new_weekly: Dict[str, Any]) -> bool:
+    """
+    Propage la modification des semaines d'un entrepreneur aux RPO coach et direction
+    Seules les semaines modifiées sont touchées (old -> new), sans relire toute l'équipe.
+    Si le RPO coach ou direction n'a jamais été reconstruit, bascule sur la
+    synchronisation complète. reconcile_rollups() corrige périodiquement les dérives.
+    """
+    deltas = compute_weekly_deltas(old_weekly, new_weekly)
+    if not deltas:
+        return True
+
+    from QE.Backend.coach_access import get_coach_for_entrepreneur
+    coach_username = get_coach_for_entrepreneur(username)
+    if not coach_username:
+        return True
+
+    # 1. RPO coach (réels + objectifs)
+    with _get_coach_sync_lock(coach_username), rpo_file_lock(coach_username):
+        coach_rpo = load_user_rpo_data(coach_username)
+        applied = _apply_rollup_deltas(
+            coach_rpo, deltas, _ROLLUP_FIELDS + _ROLLUP_VISE_FIELDS,
+            marker_field='nb_entrepreneurs', mktg_hr_field='hr_pap_reel', copy_week_label=True
+        )
+        if applied:
+            save_user_rpo_data(coach_username, coach_rpo)
+
+    if not applied:
+        print(f"[COACH RPO] RPO de {coach_username} jamais agrégé, synchronisation complète", flush=True)
+        return sync_coach_rpo(coach_username)
+
+    print(f"[COACH RPO] Delta de {username} appliqué à {coach_username} ({len(deltas)} semaine(s))", flush=True)
+
+    if not _is_active_coach(coach_username):
+        return True
+
+    # 2. RPO direction (réels seulement)
+    with _direction_sync_lock, rpo_file_lock('direction'):
+        direction_rpo = load_user_rpo_data('direction')
+        applied = _apply_rollup_deltas(
+            direction_rpo, deltas, _ROLLUP_FIELDS,
+            marker_field='nb_coaches', mktg_hr_field='hr_pap_reel_sans_week1', copy_week_label=False
+        )
+        if applied:
+            save_user_rpo_data('direction', direction_rpo)
+
+    if not applied:
+        print(f"[DIRECTION RPO] RPO direction jamais agrégé, synchronisation complète", flush=True)
+        return sync_direction_rpo()
+
+    return True
+
+
+def reconcile_rollups() -> Dict[str, Any]:
+    """
+    Reconstruction complète de tous les RPO coach puis du RPO direction
+    Corrige les dérives des deltas (arrondis flottants, écritures sans delta,
+    changements d'équipe). Appelée périodiquement par le scheduler et par
+    /api/rpo/sync-all-coaches. Les coaches sont reconstruits en parallèle
+    (pool de processus, voir rpo_org_sync).
+    """
+    from QE.Backend.rpo_org_sync import run_org_sync
+    return run_org_sync(recompute_entrepreneurs=False)
+
+
+def sync_soumissions_to_rpo(username: str, propagate: bool = True) -> bool:
     """
     Synchronise les soumissions complètes et signées vers les données hebdomadaires RPO
     - Soumissions complètes -> Estimation réel
     - Soumissions signées -> Contrat réel + $ réel
+
+    propagate=False n'applique pas les deltas aux RPO coach/direction
+    (synchronisation globale: ils sont reconstruits ensuite, voir rpo_org_sync)
     """
     import json
     import os
@@ -1208,6 +1354,7 @@ def sync_soumissions_to_rpo(username: str) -> bool:
         _lock_held = True
 
         rpo_data = load_user_rpo_data(username)
+        old_weekly = copy.deepcopy(rpo_data.get('weekly', {}))
 
         # Réinitialiser les données hebdomadaires estimation/contract/dollar
         # Octobre 2025 (index -2) + 12 mois de 2026 (index 0-11)
@@ -1686,13 +1833,10 @@ def sync_soumissions_to_rpo(username: str) -> bool:
         except Exception as badge_error:
             print(f"[WARN] [RPO SYNC] Erreur verification badges automatiques: {badge_error}", flush=True)
 
-        # Synchroniser le RPO du coach si cet entrepreneur est assigné à un coach
+        # Appliquer aux RPO coach et direction seulement les semaines modifiées
         try:
-            from QE.Backend.coach_access import get_coach_for_entrepreneur
-            coach_username = get_coach_for_entrepreneur(username)
-            if coach_username:
-                print(f"[RPO SYNC] Synchronisation RPO du coach {coach_username}...", flush=True)
-                sync_coach_rpo(coach_username)
+            if propagate:
+                apply_weekly_deltas_to_rollups(username, old_weekly, rpo_data.get('weekly', {}))
         except Exception as coach_sync_error:
             print(f"[WARN] [RPO SYNC] Erreur synchronisation RPO coach: {coach_sync_error}", flush=True)
 
@@ -0,0 +1,197 @@
+"""
+Synchronisation RPO de toute l'organisation, répartie sur un pool de processus
+
+Avant: /api/rpo/sync-all-coaches, la réconciliation périodique et
+scripts/sync_all_rpo.py traitaient les entrepreneurs puis les coaches un par
+un dans un seul thread (parsing JSON de gros fichiers, CPU-bound), et chaque
+recalcul d'entrepreneur propageait en plus ses deltas au coach et à la
+direction, qui étaient de toute façon reconstruits juste après.
+
+Maintenant, run_org_sync():
+1. (optionnel) recalcule chaque entrepreneur actif dans un pool de processus
+   (sync_soumissions_to_rpo sans propagation des deltas)
+2. reconstruit chaque coach dans le même pool (sync_coach_rpo sans direction)
+3. reconstruit une seule fois le RPO direction à partir des coaches
+
+Chaque tâche prend le rpo_file_lock (fcntl) de l'utilisateur qu'elle écrit,
+donc les processus du pool, les workers uvicorn et les recalculs programmés
+(rpo_sync) restent sérialisés par fichier. Les phases sont séquentielles: un
+coach n'est relu qu'une fois tous ses entrepreneurs écrits.
+
+Progression et durées: get_org_sync_status() (GET /api/rpo/sync-all-coaches/status).
+"""
+
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Any, Callable, Dict, List, Optional
+
+from db_pool import get_connection
+
+# 0 = un processus par cœur
+RPO_SYNC_PROCESSES = int(os.getenv("RPO_SYNC_PROCESSES", "0")) or (os.cpu_count() or 1)
+
+_run_lock = threading.Lock()
+_status_lock = threading.Lock()
+_status: Dict[str, Any] = {"running": False, "phase": None, "done": 0, "total": 0, "failed": [], "last_result": None}
+
+
+# ------------------------------------------------------------------
+# Tâches exécutées dans les processus du pool (fonctions de module: picklables)
+# ------------------------------------------------------------------
+
+def _register_save_hooks():
+    """
+    Initialiseur du pool (et de l'exécution en ligne): un processus spawn n'importe pas
+    main.py, donc aucun hook de save_user_rpo_data n'y est enregistré. Sans celui-ci,
+    le classement ne verrait pas les RPO réécrits par les tâches
+    """
+    from QE.Backend.leaderboard import mark_dirty
+    from QE.Backend.rpo import register_rpo_save_hook
+    register_rpo_save_hook(mark_dirty)
+
+
+def _recompute_entrepreneur(username: str) -> Dict[str, Any]:
+    from QE.Backend.rpo import sync_soumissions_to_rpo
+    start = time.perf_counter()
+    ok = sync_soumissions_to_rpo(username, propagate=False)
+    return {"username": username, "ok": bool(ok), "seconds": time.perf_counter() - start}
+
+
+def _rebuild_coach(username: str) -> Dict[str, Any]:
+    from QE.Backend.rpo import sync_coach_rpo
+    start = time.perf_counter()
+    ok = sync_coach_rpo(username, sync_direction=False)
+    return {"username": username, "ok": bool(ok), "seconds": time.perf_counter() - start}
+
+
+# ------------------------------------------------------------------
+# Orchestration
+# ------------------------------------------------------------------
+
+def _list_users(query: str) -> List[str]:
+    with get_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(query)
+        return [row[0] for row in cursor.fetchall()]
+
+
+def _set_status(**fields):
+    with _status_lock:
+        _status.update(fields)
+
+
+def _run_phase(phase: str, task: Callable[[str], Dict[str, Any]], usernames: List[str],
+               pool: Optional[ProcessPoolExecutor]) -> Dict[str, Any]:
+    """Exécute task pour chaque utilisateur (pool ou en ligne). Retourne succès, échecs et durées"""
+    _set_status(phase=phase, done=0, total=len(usernames), failed=[])
+    start = time.perf_counter()
+    succeeded, failed, task_seconds = 0, [], 0.0
+
+    def record(username: str, result: Optional[Dict[str, Any]], error: Optional[BaseException]):
+        nonlocal succeeded, task_seconds
+        if result is not None:
+            task_seconds += result["seconds"]
+        if error is not None or not result["ok"]:
+            failed.append(username)
+            if error is not None:
+                print(f"[RPO ORG SYNC] Erreur {phase} {username}: {error}", flush=True)
+        else:
+            succeeded += 1
+        with _status_lock:
+            _status["done"] += 1
+            _status["failed"] = list(failed)
+
+    if pool is None:
+        for username in usernames:
+            try:
+                record(username, task(username), None)
+            except Exception as e:
+                record(username, None, e)
+    else:
+        futures = {pool.submit(task, username): username for username in usernames}
+        for future in as_completed(futures):
+            try:
+                record(futures[future], future.result(), None)
+            except Exception as e:
+                record(futures[future], None, e)
+
+    wall = time.perf_counter() - start
+    print(f"[RPO ORG SYNC] {phase}: {succeeded}/{len(usernames)} en {wall:.2f}s "
+          f"(somme des tâches {task_seconds:.2f}s)", flush=True)
+    return {"total": len(usernames), "succeeded": succeeded, "failed": failed,
+            "seconds": round(wall, 3), "task_seconds": round(task_seconds, 3)}
+
+
+def run_org_sync(recompute_entrepreneurs: bool = False, processes: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Entrepreneurs (si recompute_entrepreneurs) -> coaches -> direction.
+    Une seule exécution à la fois par processus: un appel concurrent retourne
+    {"status": "already_running", ...} avec la progression en cours.
+    """
+    if not _run_lock.acquire(blocking=False):
+        return {"status": "already_running", **get_org_sync_status()}
+
+    from QE.Backend.rpo import sync_direction_rpo
+
+    _register_save_hooks()
+    started = time.perf_counter()
+    try:
+        entrepreneurs = _list_users(
+            "SELECT username FROM users WHERE role='entrepreneur' AND is_active=1"
+        ) if recompute_entrepreneurs else []
+        coaches = _list_users("SELECT username FROM users WHERE role='coach'")
+        _set_status(running=True, started_at=time.time())
+
+        processes = min(processes or RPO_SYNC_PROCESSES, max(len(entrepreneurs), len(coaches), 1))
+        print(f"[RPO ORG SYNC] {len(entrepreneurs)} entrepreneurs, {len(coaches)} coaches, "
+              f"{processes} processus", flush=True)
+
+        pool = None
+        if processes > 1:
+            # spawn: pas de fork d'un processus uvicorn qui a déjà des threads (et des locks)
+            pool = ProcessPoolExecutor(max_workers=processes, mp_context=multiprocessing.get_context("spawn"),
+                                       initializer=_register_save_hooks)
+        try:
+            phases = {}
+            if recompute_entrepreneurs:
+                phases["entrepreneurs"] = _run_phase("entrepreneurs", _recompute_entrepreneur, entrepreneurs, pool)
+            phases["coaches"] = _run_phase("coaches", _rebuild_coach, coaches, pool)
+        finally:
+            if pool is not None:
+                pool.shutdown(wait=True)
+
+        _set_status(phase="direction", done=0, total=1, failed=[])
+        direction_start = time.perf_counter()
+        direction_ok = sync_direction_rpo()
+        phases["direction"] = {"ok": direction_ok, "seconds": round(time.perf_counter() - direction_start, 3)}
+
+        coach_phase = phases["coaches"]
+        result = {
+            "status": "success",
+            "total_coaches": coach_phase["total"],
+            "synchronized": coach_phase["succeeded"],
+            "failed_coaches": coach_phase["failed"],
+            "direction": direction_ok,
+            "processes": processes,
+            "phases": phases,
+            "seconds": round(time.perf_counter() - started, 3),
+        }
+        if recompute_entrepreneurs:
+            result["failed_entrepreneurs"] = phases["entrepreneurs"]["failed"]
+
+        print(f"[RPO ORG SYNC] Terminé en {result['seconds']}s: {coach_phase['succeeded']}/{coach_phase['total']} "
+              f"coaches, direction={'OK' if direction_ok else 'ERREUR'}", flush=True)
+        _set_status(last_result=result)
+        return result
+    finally:
+        _set_status(running=False, phase=None)
+        _run_lock.release()
+
+
+def get_org_sync_status() -> Dict[str, Any]:
+    """Progression de la synchronisation en cours (dans ce worker) et résultat de la dernière"""
+    with _status_lock:
+        return {**_status, "failed": list(_status["failed"])}
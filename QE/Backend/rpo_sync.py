@@ -0,0 +1,164 @@
+"""
+Recalcul RPO (sync_soumissions_to_rpo) regroupé et différé
+
+Avant: chaque endpoint de modification (signature, perdu, suppression, fin de
+production, paiement...) appelait sync_soumissions_to_rpo() directement, dans
+la requête: sous le lock RPO de l'utilisateur, toutes les semaines étaient
+remises à zéro puis recalculées en relisant soumissions_completes,
+soumissions_signees, ventes_*, facturation... Une rafale de N modifications
+faisait N recalculs complets.
+
+Maintenant:
+- request(username) marque l'utilisateur à recalculer; les demandes reçues
+  pendant RPO_SYNC_DEBOUNCE_SECONDS sont regroupées (un seul recalcul), sans
+  dépasser RPO_SYNC_MAX_DELAY_SECONDS depuis la première demande
+- Un thread du worker exécute les recalculs, un utilisateur à la fois; une
+  demande reçue pendant le recalcul de cet utilisateur en relance un après
+- force(username) recalcule tout de suite dans l'appelant (force-sync, ordre
+  imposé avec sync_ventes_produit_to_rpo) et absorbe la demande en attente
+- Sans thread démarré (scripts, tests), request() recalcule immédiatement
+- À l'arrêt, les recalculs en attente sont exécutés
+"""
+
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, Optional, Set, Tuple
+
+RPO_SYNC_DEBOUNCE_SECONDS = float(os.getenv("RPO_SYNC_DEBOUNCE_SECONDS", "2"))
+RPO_SYNC_MAX_DELAY_SECONDS = float(os.getenv("RPO_SYNC_MAX_DELAY_SECONDS", "10"))
+
+
+def _default_sync(username: str) -> bool:
+    from QE.Backend.rpo import sync_soumissions_to_rpo
+    return sync_soumissions_to_rpo(username)
+
+
+class RpoSyncScheduler:
+    """Utilisateurs à recalculer (regroupés par fenêtre de debounce) + thread d'exécution"""
+
+    def __init__(self, sync: Callable[[str], bool] = _default_sync,
+                 debounce: float = RPO_SYNC_DEBOUNCE_SECONDS, max_delay: float = RPO_SYNC_MAX_DELAY_SECONDS):
+        self.sync = sync
+        self.debounce = debounce
+        self.max_delay = max(max_delay, debounce)
+        self._cond = threading.Condition()
+        self._pending: Dict[str, Tuple[float, float]] = {}  # username -> (première demande, échéance)
+        self._running: Set[str] = set()
+        self._stop = False
+        self._thread: Optional[threading.Thread] = None
+        self.requests = 0
+        self.runs = 0
+        self.failures = 0
+
+    # ------------------------------------------------------------------
+    # Demandes
+    # ------------------------------------------------------------------
+
+    def request(self, username: str):
+        """Programme un recalcul (regroupé avec les autres demandes de la fenêtre)"""
+        if not username:
+            return
+        with self._cond:
+            self.requests += 1
+            started = self._thread is not None and self._thread.is_alive() and not self._stop
+            if started:
+                now = time.monotonic()
+                first = self._pending[username][0] if username in self._pending else now
+                self._pending[username] = (first, min(now + self.debounce, first + self.max_delay))
+                self._cond.notify_all()
+                return
+        self.force(username)
+
+    def force(self, username: str) -> bool:
+        """Recalcule maintenant dans le thread appelant (attend le recalcul en cours de cet utilisateur)"""
+        with self._cond:
+            self._pending.pop(username, None)
+            while username in self._running:
+                self._cond.wait()
+            self._running.add(username)
+        return self._execute(username)
+
+    def _execute(self, username: str) -> bool:
+        """Appelé avec username dans _running; le retire à la fin"""
+        ok = False
+        try:
+            ok = bool(self.sync(username))
+        except Exception as e:
+            print(f"[RPO SYNC] Erreur recalcul {username}: {e}", flush=True)
+        finally:
+            with self._cond:
+                self._running.discard(username)
+                self.runs += 1
+                if not ok:
+                    self.failures += 1
+                self._cond.notify_all()
+        return ok
+
+    # ------------------------------------------------------------------
+    # Thread d'exécution
+    # ------------------------------------------------------------------
+
+    def _next_due(self) -> Optional[str]:
+        """Utilisateur dont l'échéance est passée (appelé sous _cond); attend sinon"""
+        while not self._stop:
+            now = time.monotonic()
+            ready = [(due, u) for u, (_, due) in self._pending.items() if due <= now and u not in self._running]
+            if ready:
+                username = min(ready)[1]
+                del self._pending[username]
+                self._running.add(username)
+                return username
+            waiting = [due for u, (_, due) in self._pending.items() if u not in self._running]
+            self._cond.wait(max(min(waiting) - now, 0.01) if waiting else None)
+        return None
+
+    def _run(self):
+        while True:
+            with self._cond:
+                username = self._next_due()
+            if username is None:
+                return
+            self._execute(username)
+
+    def start(self):
+        """Démarre le thread de recalcul (appelé au startup de l'application)"""
+        with self._cond:
+            if self._thread and self._thread.is_alive():
+                return
+            self._stop = False
+            self._thread = threading.Thread(target=self._run, name="rpo-sync", daemon=True)
+            self._thread.start()
+        print(f"[RPO SYNC] Planificateur démarré (debounce {self.debounce}s, max {self.max_delay}s)", flush=True)
+
+    def stop(self):
+        """Arrête le thread puis exécute les recalculs encore en attente"""
+        with self._cond:
+            self._stop = True
+            self._cond.notify_all()
+            thread = self._thread
+        if thread:
+            thread.join()
+        with self._cond:
+            pending = sorted(self._pending, key=lambda u: self._pending[u][1])
+        for username in pending:
+            self.force(username)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            return {
+                "pending": len(self._pending),
+                "running": len(self._running),
+                "requests": self.requests,
+                "runs": self.runs,
+                "failures": self.failures,
+            }
+
+
+# Planificateur unique du processus
+scheduler = RpoSyncScheduler()
+
+
+def request_rpo_sync(username: str):
+    """Programme le recalcul RPO de l'utilisateur (entrepreneur -> coach -> direction)"""
+    scheduler.request(username)
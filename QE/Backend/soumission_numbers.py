@@ -0,0 +1,181 @@
+"""
+Attribution des numéros de soumission uniques (format AA-XXXX)
+
+Avant: /api/soumission/generer-numero tirait des suffixes au hasard et les
+comparait à une liste reconstruite depuis tout soumissions/numeros_utilises.json
+(100 essais max: de plus en plus lent, puis en échec quand l'espace de 10 000
+numéros se remplit). /api/soumission/reserver-numero relisait le fichier, le
+parcourait puis le réécrivait en entier, sans verrou: deux workers pouvaient
+réserver le même numéro, ou perdre la réservation de l'autre.
+
+Maintenant:
+- Table soumission_numeros dans qwota.db, numero en clé primaire: la
+  réservation est un INSERT OR IGNORE, atomique entre workers
+- Par préfixe, une bitmap des numéros pris et la liste des numéros libres
+  (position de chaque numéro dans la liste): tirage au hasard, réservation et
+  vérification en O(1). Les réservations des autres workers sont rattrapées
+  par rowid (seulement les nouvelles lignes)
+- Préfixe = deux derniers chiffres de l'année de saison (config.RPO_SEASON_YEAR):
+  changer d'année ouvre un nouvel espace de 10 000 numéros
+- L'ancien fichier numeros_utilises.json est importé au démarrage (idempotent)
+"""
+
+import json
+import os
+import random
+import re
+import threading
+from datetime import datetime
+from typing import Dict, Optional, Tuple
+
+import config
+from db_pool import get_connection
+
+SLOTS_PER_PREFIX = 10000
+
+_NUMERO_RE = re.compile(r"^(\d{2})-(\d{4})$")
+
+
+def current_prefix() -> str:
+    """Préfixe de l'année de saison (2026 -> "26")"""
+    return f"{config.RPO_SEASON_YEAR % 100:02d}"
+
+
+def parse_numero(numero: str) -> Optional[Tuple[str, int]]:
+    """("26", 42) pour "26-0042", None si le numéro n'est pas au format AA-XXXX"""
+    match = _NUMERO_RE.match(numero or "")
+    return (match.group(1), int(match.group(2))) if match else None
+
+
+class _PrefixSlots:
+    """Numéros pris (bitmap) et libres (liste + positions) d'un préfixe"""
+
+    def __init__(self):
+        self.taken = bytearray(SLOTS_PER_PREFIX)
+        self.free = list(range(SLOTS_PER_PREFIX))
+        self.position = list(range(SLOTS_PER_PREFIX))
+
+    def mark_taken(self, slot: int):
+        if self.taken[slot]:
+            return
+        self.taken[slot] = 1
+        # Retrait en O(1): le dernier numéro libre prend la place de celui-ci
+        index = self.position[slot]
+        last = self.free.pop()
+        if last != slot:
+            self.free[index] = last
+            self.position[last] = index
+
+    def random_free(self) -> Optional[int]:
+        return random.choice(self.free) if self.free else None
+
+
+class SoumissionNumberAllocator:
+    """Génère, réserve et vérifie les numéros de soumission (un allocateur par processus)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._prefixes: Dict[str, _PrefixSlots] = {}
+        self._last_rowid = 0
+
+    def _refresh(self, conn):
+        """Rattrape les numéros réservés depuis le dernier passage (ce worker ou un autre). Sous _lock"""
+        rows = conn.execute(
+            "SELECT rowid, prefixe, slot FROM soumission_numeros WHERE rowid > ? ORDER BY rowid",
+            (self._last_rowid,)
+        ).fetchall()
+        for rowid, prefixe, slot in rows:
+            if prefixe is not None and slot is not None:
+                self._slots(prefixe).mark_taken(slot)
+            self._last_rowid = rowid
+
+    def _slots(self, prefixe: str) -> _PrefixSlots:
+        slots = self._prefixes.get(prefixe)
+        if slots is None:
+            slots = self._prefixes[prefixe] = _PrefixSlots()
+        return slots
+
+    def generate(self, prefixe: Optional[str] = None) -> Optional[str]:
+        """Numéro libre au hasard (non réservé), None si le préfixe est plein"""
+        prefixe = prefixe or current_prefix()
+        with self._lock, get_connection() as conn:
+            self._refresh(conn)
+            slot = self._slots(prefixe).random_free()
+        return None if slot is None else f"{prefixe}-{slot:04d}"
+
+    def reserve(self, numero: str, username: str) -> bool:
+        """Réserve le numéro. False s'il est déjà pris (par n'importe quel worker)"""
+        parsed = parse_numero(numero)
+        with self._lock, get_connection() as conn:
+            inserted = conn.execute('''
+                INSERT OR IGNORE INTO soumission_numeros (numero, prefixe, slot, username, date)
+                VALUES (?, ?, ?, ?, ?)
+            ''', (numero, parsed[0] if parsed else None, parsed[1] if parsed else None,
+                  username, datetime.now().isoformat())).rowcount
+            conn.commit()
+            self._refresh(conn)
+        return bool(inserted)
+
+    def is_available(self, numero: str) -> bool:
+        """True si le numéro n'est pas réservé"""
+        parsed = parse_numero(numero)
+        with self._lock, get_connection() as conn:
+            self._refresh(conn)
+            if parsed:
+                return not self._slots(parsed[0]).taken[parsed[1]]
+            # Ancien format (hors AA-XXXX): recherche par clé primaire
+            return conn.execute("SELECT 1 FROM soumission_numeros WHERE numero = ?", (numero,)).fetchone() is None
+
+    def stats(self, prefixe: Optional[str] = None) -> Dict[str, int]:
+        prefixe = prefixe or current_prefix()
+        with self._lock, get_connection() as conn:
+            self._refresh(conn)
+            free = len(self._slots(prefixe).free)
+        return {"prefixe": prefixe, "reserves": SLOTS_PER_PREFIX - free, "libres": free}
+
+
+# Allocateur unique du processus
+allocator = SoumissionNumberAllocator()
+
+
+def init_soumission_numeros_tables(legacy_file: Optional[str] = None):
+    """Crée la table des numéros et importe l'ancien fichier JSON s'il existe"""
+    with get_connection() as conn:
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS soumission_numeros (
+                numero TEXT PRIMARY KEY,
+                prefixe TEXT,
+                slot INTEGER,
+                username TEXT,
+                date TEXT
+            )
+        ''')
+        conn.commit()
+
+    if not legacy_file or not os.path.exists(legacy_file):
+        return
+    try:
+        with open(legacy_file, "r", encoding="utf-8") as f:
+            numeros = json.load(f)
+    except Exception as e:
+        print(f"[SOUMISSION NUMEROS] Lecture {legacy_file} impossible: {e}", flush=True)
+        return
+
+    rows = []
+    for entry in numeros:
+        numero = entry.get("numero") if isinstance(entry, dict) else None
+        if not numero:
+            continue
+        parsed = parse_numero(numero)
+        rows.append((numero, parsed[0] if parsed else None, parsed[1] if parsed else None,
+                     entry.get("username"), entry.get("date")))
+    with get_connection() as conn:
+        before = conn.total_changes
+        conn.executemany('''
+            INSERT OR IGNORE INTO soumission_numeros (numero, prefixe, slot, username, date)
+            VALUES (?, ?, ?, ?, ?)
+        ''', rows)
+        imported = conn.total_changes - before
+        conn.commit()
+    if imported:
+        print(f"[SOUMISSION NUMEROS] {imported} numéro(s) importé(s) depuis {legacy_file}", flush=True)
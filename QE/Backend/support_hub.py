@@ -0,0 +1,178 @@
+"""
+Diffusion en direct du chat de support (pub/sub en mémoire + SSE)
+
+Avant: chaque onglet ouvert relisait /api/support/messages/{username} toutes
+les 3 secondes et la page admin /api/support/all-conversations toutes les
+2 secondes, soit une requête SQLite par onglet et par intervalle, même quand
+rien n'avait changé.
+
+Maintenant:
+- Les routes qui modifient messages_support (envoi, pièce jointe, lecture,
+  suppression, résolution) appellent publish(username)
+- Les flux SSE /api/support/stream/{username} et /api/support/admin/stream
+  attendent un asyncio.Event (même principe que /api/wait-mobile-photo) et ne
+  relisent SQLite qu'après une notification
+- Un thread relit une signature de la table (COUNT, MAX(id), SUM(read_by_admin))
+  toutes les SUPPORT_HUB_POLL_SECONDS, seulement s'il y a des abonnés: un
+  changement fait par un autre worker réveille tous les flux de ce worker
+- Les pages gardent leur polling si EventSource est indisponible ou coupé
+"""
+
+import asyncio
+import json
+import os
+import threading
+from typing import AsyncIterator, Awaitable, Callable, Dict, Optional, Set, Tuple
+
+from async_io import run_blocking
+from db_pool import get_connection
+
+SUPPORT_HUB_POLL_SECONDS = float(os.getenv("SUPPORT_HUB_POLL_SECONDS", "2"))
+SUPPORT_STREAM_KEEPALIVE_SECONDS = float(os.getenv("SUPPORT_STREAM_KEEPALIVE_SECONDS", "15"))
+
+ADMIN_TOPIC = "admin"
+
+
+def user_topic(username: str) -> str:
+    return f"user:{username}"
+
+
+class SupportHub:
+    """Abonnés SSE par sujet ("user:{username}" pour un entrepreneur, "admin" pour le support)"""
+
+    def __init__(self, poll_interval: float = SUPPORT_HUB_POLL_SECONDS):
+        self.poll_interval = poll_interval
+        self._lock = threading.Lock()
+        self._subscribers: Dict[str, Set[Tuple[asyncio.AbstractEventLoop, asyncio.Event]]] = {}
+        self._signature: Optional[tuple] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    # ------------------------------------------------------------------
+    # Publication
+    # ------------------------------------------------------------------
+
+    def publish(self, username: Optional[str] = None):
+        """
+        Réveille la conversation de username et la page admin.
+        Sans username: réveille tous les abonnés (changement venant d'un autre worker).
+        """
+        with self._lock:
+            if username is None:
+                subscribers = [s for subs in self._subscribers.values() for s in subs]
+            else:
+                subscribers = list(self._subscribers.get(user_topic(username), ()))
+                subscribers += list(self._subscribers.get(ADMIN_TOPIC, ()))
+        for loop, event in subscribers:
+            try:
+                loop.call_soon_threadsafe(event.set)
+            except RuntimeError:
+                # Boucle fermée: l'abonné sera retiré à la fin de son générateur
+                pass
+
+    # ------------------------------------------------------------------
+    # Abonnements (SSE)
+    # ------------------------------------------------------------------
+
+    def subscribe(self, topic: str) -> tuple:
+        """Abonnement depuis une coroutine: retourne (topic, loop, event) à passer à unsubscribe()"""
+        loop, event = asyncio.get_running_loop(), asyncio.Event()
+        with self._lock:
+            self._subscribers.setdefault(topic, set()).add((loop, event))
+        return topic, loop, event
+
+    def unsubscribe(self, subscription: tuple):
+        topic, loop, event = subscription
+        with self._lock:
+            subs = self._subscribers.get(topic)
+            if subs is not None:
+                subs.discard((loop, event))
+                if not subs:
+                    del self._subscribers[topic]
+
+    async def event_stream(self, topic: str, load_state: Callable[[], dict],
+                           is_disconnected: Callable[[], Awaitable[bool]]) -> AsyncIterator[str]:
+        """
+        Événements SSE: l'état à la connexion puis après chaque publication, seulement
+        s'il a changé. load_state est une fonction bloquante (SQLite, exécutée dans le pool d'I/O).
+        """
+        subscription = self.subscribe(topic)
+        _, _, changed = subscription
+        last_payload = None
+        changed.set()
+        try:
+            while True:
+                if await is_disconnected():
+                    break
+
+                if changed.is_set():
+                    changed.clear()
+                    payload = json.dumps(await run_blocking(load_state))
+                    if payload != last_payload:
+                        last_payload = payload
+                        yield f"data: {payload}\n\n"
+
+                try:
+                    await asyncio.wait_for(changed.wait(), timeout=SUPPORT_STREAM_KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    # Commentaire SSE: garde la connexion ouverte derrière les proxies (sans relire SQLite)
+                    yield ": keepalive\n\n"
+        finally:
+            self.unsubscribe(subscription)
+
+    def subscriber_count(self) -> int:
+        with self._lock:
+            return sum(len(subs) for subs in self._subscribers.values())
+
+    # ------------------------------------------------------------------
+    # Changements faits par les autres workers
+    # ------------------------------------------------------------------
+
+    def _read_signature(self) -> tuple:
+        with get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("""
+                SELECT COUNT(*), COALESCE(MAX(id), 0), COALESCE(SUM(read_by_admin), 0)
+                FROM messages_support
+            """)
+            messages = cursor.fetchone()
+            cursor.execute("SELECT COALESCE(MAX(id), 0) FROM resolved_conversations")
+            resolved = cursor.fetchone()
+        return tuple(messages) + tuple(resolved)
+
+    def check_for_changes(self):
+        """Une requête par worker (et non par onglet): réveille tout le monde si la table a changé"""
+        signature = self._read_signature()
+        changed = self._signature is not None and signature != self._signature
+        self._signature = signature
+        if changed:
+            self.publish()
+
+    def _run(self):
+        while not self._stop.wait(self.poll_interval):
+            if not self.subscriber_count():
+                # Personne n'écoute: la signature sera relue au prochain abonné
+                self._signature = None
+                continue
+            try:
+                self.check_for_changes()
+            except Exception as e:
+                print(f"[SUPPORT] Erreur vérification des changements: {e}", flush=True)
+
+    def start(self):
+        """Démarre le thread de surveillance (appelé au startup de l'application)"""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="support-hub", daemon=True)
+        self._thread.start()
+        print(f"[SUPPORT] Diffusion du chat démarrée (vérification inter-workers {self.poll_interval}s)", flush=True)
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=self.poll_interval + 1)
+
+
+# Hub unique du processus
+hub = SupportHub()
@@ -0,0 +1,417 @@
+"""
+Index central des files de travail coach / comptable / direction (badges et listes)
+
+Avant: chaque compteur (/api/coach/{coach}/facturation-en-traitement/count,
+/api/comptable/facturation-en-attente/count, employes-en-attente,
+inactivations-en-attente, reactivations-en-attente, ...) parcourait tous les
+dossiers d'entrepreneurs et parsait statuts_clients.json, remboursements.json
+et les fichiers d'employés pour produire un seul entier. Les shells admin
+interrogent ces compteurs en continu.
+
+Maintenant:
+- Table work_queue_items: une ligne par élément en attente, clé
+  (queue, entrepreneur, item), avec l'entrée d'origine (payload) pour les listes
+- Table work_queue_sources: signature (mtime_ns, taille) de chaque fichier
+  source indexé. Ré-indexer un fichier = supprimer ses éléments et insérer les
+  nouveaux dans une seule transaction
+- Les fonctions d'écriture (save_employes, save_inactivations, statuts de
+  facturation, remboursements...) appellent refresh_source() juste après
+  l'écriture: le badge est à jour immédiatement
+- Filet de sécurité pour les écritures non raccordées: avant une lecture, les
+  signatures des fichiers sont comparées (stat seulement, au plus une fois par
+  WORK_QUEUE_SCAN_SECONDS) et seuls les fichiers modifiés sont relus
+- Comptes et listes = requêtes SQL indexées. Le parcours complet des fichiers
+  reste disponible: scan_entrepreneur() + scripts/rebuild_work_queues.py
+  (reconstruction / vérification)
+"""
+
+import os
+import sys
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import serialization
+from db_pool import get_connection
+from json_cache import load_json_cached
+
+# Détection OS pour chemins de fichiers (même logique que main.py)
+if sys.platform == 'win32':
+    base_cloud = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), 'data')
+else:
+    base_cloud = os.getenv("STORAGE_PATH", "/mnt/cloud")
+
+WORK_QUEUE_SCAN_SECONDS = float(os.getenv("WORK_QUEUE_SCAN_SECONDS", "5"))
+
+# Files de travail
+FACTURATION_TRAITEMENT = "facturation_traitement"            # dépôt / paiement final / autres paiements "traitement"
+REMBOURSEMENT_ATTENTE_COACH = "remboursement_attente_coach"  # remboursements "en_attente_coach"
+ACTIVATION_COACH = "activation_coach"
+ACTIVATION_COMPTABLE = "activation_comptable"
+MODIFICATION_COACH = "modification_coach"
+MODIFICATION_COMPTABLE = "modification_comptable"
+REFUSE_COACH = "refuse_coach"
+INACTIVATION_COACH = "inactivation_coach"
+INACTIVATION_COMPTABLE = "inactivation_comptable"
+REACTIVATION_COACH = "reactivation_coach"                    # demandes dans reactivations.json
+REACTIVATION_COMPTABLE = "reactivation_comptable"
+REACTIVATION_COACH_EMPLOYE = "reactivation_coach_employe"    # statut porté par inactifs.json / termines.json
+REACTIVATION_COMPTABLE_EMPLOYE = "reactivation_comptable_employe"
+
+FACTURATION_QUEUES = (FACTURATION_TRAITEMENT, REMBOURSEMENT_ATTENTE_COACH)
+
+# Fichiers sources: nom -> (dossier sous base_cloud, fichier dans le dossier de l'entrepreneur)
+SOURCES: Dict[str, Tuple[str, str]] = {
+    "statuts_clients": ("facturation_qe_statuts", "statuts_clients.json"),
+    "remboursements": ("remboursements", "remboursements.json"),
+    "employes_nouveaux": ("employes", "nouveaux.json"),
+    "employes_actifs": ("employes", "actifs.json"),
+    "employes_inactifs": ("employes", "inactifs.json"),
+    "employes_termines": ("employes", "termines.json"),
+    "inactivations": ("employes", "inactivations.json"),
+    "reactivations": ("employes", "reactivations.json"),
+}
+
+# Sources de type liste: statut de l'entrée -> file de travail
+_STATUT_QUEUES: Dict[str, Dict[str, str]] = {
+    "remboursements": {
+        "en_attente_coach": REMBOURSEMENT_ATTENTE_COACH,
+    },
+    "employes_nouveaux": {
+        "En attente de validation": ACTIVATION_COACH,
+        "En attente comptable": ACTIVATION_COMPTABLE,
+        "Refusé par coach": REFUSE_COACH,
+    },
+    "employes_actifs": {
+        "Modification en attente de validation": MODIFICATION_COACH,
+        "Modification en attente comptable": MODIFICATION_COMPTABLE,
+        "Refusé par coach": REFUSE_COACH,
+    },
+    "employes_inactifs": {
+        "Réactivation en attente de validation": REACTIVATION_COACH_EMPLOYE,
+        "Réactivation en attente comptable": REACTIVATION_COMPTABLE_EMPLOYE,
+    },
+    "employes_termines": {
+        "Réactivation en attente de validation": REACTIVATION_COACH_EMPLOYE,
+        "Réactivation en attente comptable": REACTIVATION_COMPTABLE_EMPLOYE,
+    },
+    "inactivations": {
+        "Inactivation en attente de validation": INACTIVATION_COACH,
+        "Inactivation en attente comptable": INACTIVATION_COMPTABLE,
+    },
+    "reactivations": {
+        "Réactivation en attente de validation": REACTIVATION_COACH,
+        "Réactivation en attente comptable": REACTIVATION_COMPTABLE,
+    },
+}
+
+# (queue, item, ref, position, payload)
+QueueItem = Tuple[str, str, str, int, Any]
+
+
+def source_path(username: str, source: str) -> str:
+    folder, filename = SOURCES[source]
+    return os.path.join(base_cloud, folder, username, filename)
+
+
+def _signature(path: str) -> Optional[Tuple[int, int]]:
+    try:
+        st = os.stat(path)
+    except (FileNotFoundError, NotADirectoryError):
+        return None
+    return (st.st_mtime_ns, st.st_size)
+
+
+def _statuts_items(statuts: Any) -> List[QueueItem]:
+    """Paiements "traitement" des clients sans paiement refusé (les refusés sont dans Urgent)"""
+    if not isinstance(statuts, dict):
+        return []
+    items = []
+    for position, (num_soumission, data) in enumerate(statuts.items()):
+        if not isinstance(data, dict):
+            continue
+        statut_depot = data.get("statutDepot")
+        statut_paiement_final = data.get("statutPaiementFinal")
+        autres_paiements = data.get("autresPaiements", [])
+        autres_refuses = any(isinstance(p, dict) and p.get("statut") == "refuse" for p in autres_paiements) \
+            if isinstance(autres_paiements, list) else False
+        if statut_depot == "refuse" or statut_paiement_final == "refuse" or autres_refuses:
+            continue
+
+        for type_paiement, statut in (("depot", statut_depot),
+                                      ("paiement_final", statut_paiement_final),
+                                      ("autres_paiements", data.get("statutAutresPaiements"))):
+            if statut == "traitement":
+                items.append((FACTURATION_TRAITEMENT, f"{num_soumission}/{type_paiement}",
+                              num_soumission, position, data))
+    return items
+
+
+def _list_items(source: str, records: Any) -> List[QueueItem]:
+    """Entrées d'un fichier liste dont le statut correspond à une file de travail"""
+    if not isinstance(records, list):
+        return []
+    statut_queues = _STATUT_QUEUES[source]
+    prefix = source.rsplit("_", 1)[-1]
+    items = []
+    seen = set()
+    for position, record in enumerate(records):
+        if not isinstance(record, dict):
+            continue
+        queue = statut_queues.get(record.get("statut"))
+        if queue is None:
+            continue
+        ref = record.get("id")
+        item = f"{prefix}/{ref}" if ref is not None else f"{prefix}/#{position}"
+        if (queue, item) in seen:
+            item = f"{item}#{position}"
+        seen.add((queue, item))
+        items.append((queue, item, str(ref) if ref is not None else item, position, record))
+    return items
+
+
+def scan_source(username: str, source: str) -> List[QueueItem]:
+    """Parcours complet d'un fichier source (lecture + filtre, sans l'index)"""
+    try:
+        data = load_json_cached(source_path(username, source), default=None, readonly=True)
+    except Exception as e:
+        print(f"[WORK QUEUE] Lecture {source} de {username} impossible: {e}", flush=True)
+        return []
+    if source == "statuts_clients":
+        return _statuts_items(data)
+    return _list_items(source, data)
+
+
+def scan_entrepreneur(username: str) -> Dict[str, int]:
+    """Comptes par file d'un entrepreneur, calculés en relisant ses fichiers (vérification)"""
+    counts: Dict[str, int] = {}
+    for source in SOURCES:
+        for queue, *_ in scan_source(username, source):
+            counts[queue] = counts.get(queue, 0) + 1
+    return counts
+
+
+def init_work_queue_tables():
+    """Crée les tables de l'index des files de travail"""
+    with get_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS work_queue_items (
+                queue TEXT NOT NULL,
+                entrepreneur TEXT NOT NULL,
+                item TEXT NOT NULL,
+                source TEXT NOT NULL,
+                ref TEXT,
+                position INTEGER NOT NULL,
+                payload TEXT NOT NULL,
+                updated_at REAL NOT NULL,
+                PRIMARY KEY (queue, entrepreneur, item)
+            )
+        ''')
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_work_queue_items_source
+            ON work_queue_items(entrepreneur, source)
+        ''')
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS work_queue_sources (
+                entrepreneur TEXT NOT NULL,
+                source TEXT NOT NULL,
+                mtime_ns INTEGER NOT NULL,
+                size INTEGER NOT NULL,
+                indexed_at REAL NOT NULL,
+                PRIMARY KEY (entrepreneur, source)
+            )
+        ''')
+        conn.commit()
+
+
+def refresh_source(username: str, source: str) -> int:
+    """
+    Ré-indexe un fichier source d'un entrepreneur (à appeler après chaque écriture).
+    Retourne le nombre d'éléments en attente de ce fichier
+    """
+    path = source_path(username, source)
+    # Signature prise avant la lecture: si le fichier change entre les deux, la
+    # prochaine vérification verra une signature différente et relira le fichier
+    signature = _signature(path)
+    items = scan_source(username, source) if signature else []
+    now = time.time()
+    with get_connection() as conn:
+        conn.execute("DELETE FROM work_queue_items WHERE entrepreneur = ? AND source = ?", (username, source))
+        conn.executemany('''
+            INSERT OR REPLACE INTO work_queue_items
+                (queue, entrepreneur, item, source, ref, position, payload, updated_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        ''', [(queue, username, item, source, ref, position, serialization.dumps(payload), now)
+              for queue, item, ref, position, payload in items])
+        if signature:
+            conn.execute('''
+                INSERT OR REPLACE INTO work_queue_sources (entrepreneur, source, mtime_ns, size, indexed_at)
+                VALUES (?, ?, ?, ?, ?)
+            ''', (username, source, signature[0], signature[1], now))
+        else:
+            conn.execute("DELETE FROM work_queue_sources WHERE entrepreneur = ? AND source = ?", (username, source))
+        conn.commit()
+    return len(items)
+
+
+def refresh_entrepreneur(username: str, sources: Iterable[str] = SOURCES):
+    """Ré-indexe les fichiers sources d'un entrepreneur (toutes les sources par défaut)"""
+    for source in sources:
+        refresh_source(username, source)
+
+
+class _Freshness:
+    """Vérification des signatures des fichiers sources, au plus une fois par intervalle et par processus"""
+
+    def __init__(self, interval: float = WORK_QUEUE_SCAN_SECONDS):
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._last_check = 0.0
+        self.reindexed = 0
+
+    def ensure(self, force: bool = False) -> int:
+        """Relit les fichiers modifiés, ajoutés ou supprimés depuis leur indexation. Retourne leur nombre"""
+        if not force and time.monotonic() - self._last_check < self.interval:
+            return 0
+        with self._lock:
+            if not force and time.monotonic() - self._last_check < self.interval:
+                return 0
+            changed = sync_sources()
+            self._last_check = time.monotonic()
+            self.reindexed += changed
+            return changed
+
+
+def sync_sources() -> int:
+    """Compare la signature de chaque fichier source à celle indexée et ré-indexe ceux qui diffèrent"""
+    with get_connection() as conn:
+        indexed = {(row[0], row[1]): (row[2], row[3]) for row in conn.execute(
+            "SELECT entrepreneur, source, mtime_ns, size FROM work_queue_sources"
+        ).fetchall()}
+
+    stale = []
+    seen = set()
+    listings: Dict[str, List[str]] = {}
+    for source, (folder, filename) in SOURCES.items():
+        if folder not in listings:
+            folder_path = os.path.join(base_cloud, folder)
+            listings[folder] = os.listdir(folder_path) if os.path.isdir(folder_path) else []
+        for username in listings[folder]:
+            signature = _signature(os.path.join(base_cloud, folder, username, filename))
+            key = (username, source)
+            if signature is None and key not in indexed:
+                continue
+            seen.add(key)
+            if indexed.get(key) != signature:
+                stale.append(key)
+    # Dossiers d'entrepreneurs supprimés
+    stale.extend(key for key in indexed if key not in seen)
+
+    for username, source in stale:
+        refresh_source(username, source)
+    return len(stale)
+
+
+# Vérification unique du processus
+_freshness = _Freshness()
+
+
+def _where(queues: Iterable[str], entrepreneurs: Optional[Iterable[str]]) -> Tuple[str, list]:
+    queues = list(queues)
+    clauses = [f"queue IN ({','.join('?' for _ in queues)})"]
+    params: list = list(queues)
+    if entrepreneurs is not None:
+        entrepreneurs = list(entrepreneurs)
+        clauses.append(f"entrepreneur IN ({','.join('?' for _ in entrepreneurs)})")
+        params.extend(entrepreneurs)
+    return " AND ".join(clauses), params
+
+
+def count_by_queue(queues: Iterable[str], entrepreneurs: Optional[Iterable[str]] = None) -> Dict[str, int]:
+    """Nombre d'éléments par file (entrepreneurs: None = tous)"""
+    queues = list(queues)
+    _freshness.ensure()
+    where, params = _where(queues, entrepreneurs)
+    with get_connection() as conn:
+        counts = dict(conn.execute(
+            f"SELECT queue, COUNT(*) FROM work_queue_items WHERE {where} GROUP BY queue", params
+        ).fetchall())
+    return {queue: counts.get(queue, 0) for queue in queues}
+
+
+def count(queues: Iterable[str], entrepreneurs: Optional[Iterable[str]] = None) -> int:
+    return sum(count_by_queue(queues, entrepreneurs).values())
+
+
+def count_by_entrepreneur(queues: Iterable[str], entrepreneurs: Optional[Iterable[str]] = None) -> Dict[str, int]:
+    """Nombre d'éléments par entrepreneur (ceux qui n'ont rien en attente sont absents)"""
+    _freshness.ensure()
+    where, params = _where(queues, entrepreneurs)
+    with get_connection() as conn:
+        return dict(conn.execute(
+            f"SELECT entrepreneur, COUNT(*) FROM work_queue_items WHERE {where} GROUP BY entrepreneur", params
+        ).fetchall())
+
+
+def count_distinct_refs(queues: Iterable[str], entrepreneurs: Optional[Iterable[str]] = None) -> int:
+    """Nombre de références (id) distinctes par entrepreneur, une demande présente dans plusieurs fichiers compte une fois"""
+    _freshness.ensure()
+    where, params = _where(queues, entrepreneurs)
+    with get_connection() as conn:
+        return conn.execute(
+            f"SELECT COUNT(*) FROM (SELECT DISTINCT entrepreneur, ref FROM work_queue_items WHERE {where})", params
+        ).fetchone()[0]
+
+
+def list_items(queues: Iterable[str], entrepreneurs: Optional[Iterable[str]] = None) -> List[Dict[str, Any]]:
+    """Éléments en attente (entrée d'origine dans "payload"), par entrepreneur puis dans l'ordre du fichier"""
+    _freshness.ensure()
+    where, params = _where(queues, entrepreneurs)
+    with get_connection() as conn:
+        rows = conn.execute(f'''
+            SELECT queue, entrepreneur, item, source, payload FROM work_queue_items
+            WHERE {where}
+            ORDER BY entrepreneur, source, position, item
+        ''', params).fetchall()
+    return [{"queue": queue, "entrepreneur": entrepreneur, "item": item, "source": source,
+             "payload": serialization.loads(payload)}
+            for queue, entrepreneur, item, source, payload in rows]
+
+
+def rebuild() -> int:
+    """Vide l'index et ré-indexe tous les fichiers sources. Retourne le nombre de fichiers indexés"""
+    with get_connection() as conn:
+        conn.execute("DELETE FROM work_queue_items")
+        conn.execute("DELETE FROM work_queue_sources")
+        conn.commit()
+    return _freshness.ensure(force=True)
+
+
+def verify() -> List[Dict[str, Any]]:
+    """
+    Compare l'index au parcours complet des fichiers, par entrepreneur et par file.
+    Retourne les écarts [{entrepreneur, queue, index, scan}] (liste vide = index cohérent)
+    """
+    usernames = set()
+    for folder in {folder for folder, _ in SOURCES.values()}:
+        folder_path = os.path.join(base_cloud, folder)
+        if os.path.isdir(folder_path):
+            usernames.update(name for name in os.listdir(folder_path)
+                             if os.path.isdir(os.path.join(folder_path, name)))
+    with get_connection() as conn:
+        indexed: Dict[Tuple[str, str], int] = {(row[0], row[1]): row[2] for row in conn.execute(
+            "SELECT entrepreneur, queue, COUNT(*) FROM work_queue_items GROUP BY entrepreneur, queue"
+        ).fetchall()}
+        usernames.update(row[0] for row in conn.execute("SELECT DISTINCT entrepreneur FROM work_queue_items"))
+
+    differences = []
+    for username in sorted(usernames):
+        scanned = scan_entrepreneur(username)
+        queues = set(scanned) | {queue for entrepreneur, queue in indexed if entrepreneur == username}
+        for queue in sorted(queues):
+            index_count = indexed.get((username, queue), 0)
+            if index_count != scanned.get(queue, 0):
+                differences.append({"entrepreneur": username, "queue": queue,
+                                    "index": index_count, "scan": scanned.get(queue, 0)})
+    return differences
@@ -643,6 +643,29 @@ function showNotification(message, type = 'info') {
   }, 3000);
 }
 
+/**
+ * Attend la fin d'une tâche de la file (envoi Gmail, ...) via /api/jobs/{jobId}
+ * Retourne la tâche ('done' ou 'failed'), ou { status: 'pending' } si elle est encore
+ * en cours après timeoutMs (Google a échoué, la file retente automatiquement)
+ */
+async function attendreTache(jobId, { timeoutMs = 40000, intervalMs = 1000 } = {}) {
+  const limite = Date.now() + timeoutMs;
+  let job = { id: jobId, status: 'pending' };
+  while (Date.now() < limite) {
+    try {
+      const res = await fetch(`/api/jobs/${encodeURIComponent(jobId)}`);
+      if (res.ok) {
+        job = await res.json();
+        if (job.status === 'done' || job.status === 'failed') return job;
+      }
+    } catch (e) {
+      warn('[JOBS] Suivi de la tâche impossible:', e);
+    }
+    await new Promise(resolve => setTimeout(resolve, intervalMs));
+  }
+  return { ...job, status: 'pending' };
+}
+
 // Initialisation UNIQUE - éviter les doublons
 if (document.readyState === 'loading') {
   document.addEventListener('DOMContentLoaded', initCommonSystem);
@@ -653,6 +676,7 @@ if (document.readyState === 'loading') {
 
 // Export des fonctions et variables pour usage externe
 window.showNotification = showNotification;
+window.attendreTache = attendreTache;
 // Variables déjà sur window, pas besoin de les réassigner
 window.username = username;
 
@@ -8,6 +8,7 @@ from reportlab.lib.pagesizes import letter
 from io import BytesIO
 from PyPDF2 import PdfReader, PdfWriter
 from reportlab.lib.utils import simpleSplit, ImageReader
+from QE.PDF.template_cache import render_with_template, TemplateError
 
 # Détection OS pour chemins de fichiers (même logique que main.py)
 if sys.platform == 'win32':
@@ -578,6 +579,12 @@ def generate_pdf(data: dict, language: str = 'fr') -> BytesIO:
     c.save()
     overlay.seek(0)
 
+    # Template en cache: page 1 + calque, page 2 du template (anglais) copiée telle quelle
+    try:
+        return render_with_template(os.path.basename(template_path), (True,), [overlay], include_rest=True)
+    except TemplateError as e:
+        print(f"[PDF] Cache template indisponible ({e}), fusion PyPDF2")
+
     background = PdfReader(template_path)
     overlay_pdf = PdfReader(overlay)
 
@@ -7,6 +7,7 @@ from reportlab.lib import colors
 from io import BytesIO
 from PyPDF2 import PdfReader, PdfWriter
 from reportlab.lib.utils import simpleSplit
+from QE.PDF.template_cache import render_with_template, TemplateError
 
 def generate_calcul_pdf(data: dict, language: str = 'fr') -> BytesIO:
     """
@@ -920,6 +921,15 @@ def generate_calcul_pdf(data: dict, language: str = 'fr') -> BytesIO:
     
     # === FUSIONNER LES DEUX PAGES ===
     print(f"DEBUG INT: === DÉBUT FUSION DES PAGES ===")
+
+    # Template en cache: calque sur la page 1, et sur la page 2 en français
+    # (anglais: page 2 du template copiée sans calque)
+    try:
+        if language != 'en':
+            return render_with_template(os.path.basename(template_path), (True, True), [overlay, overlay2])
+        return render_with_template(os.path.basename(template_path), (True,), [overlay], include_rest=True)
+    except TemplateError as e:
+        print(f"DEBUG INT: Cache template indisponible ({e}), fusion PyPDF2")
     
     try:
         background = PdfReader(template_path)
@@ -3,6 +3,7 @@ from reportlab.lib.pagesizes import letter
 from reportlab.lib.utils import simpleSplit, ImageReader
 from io import BytesIO
 from PyPDF2 import PdfReader, PdfWriter
+from QE.PDF.template_cache import render_with_template, TemplateError
 from datetime import datetime
 import os
 import sys
@@ -64,9 +65,6 @@ def generate_facture_pdf(nom: str, prenom: str, adresse: str, prix: str, depot:
     if not os.path.exists(template_path):
         raise FileNotFoundError(f"Template non trouvé : {template_path}")
 
-    reader = PdfReader(template_path)
-    writer = PdfWriter()
-
     try:
         montant = float(prix.replace("$", "").replace(",", ".").replace(" ", ""))
     except:
@@ -483,6 +481,14 @@ def generate_facture_pdf(nom: str, prenom: str, adresse: str, prix: str, depot:
     c.save()
     packet.seek(0)
 
+    # Template en cache: page 1 + calque
+    try:
+        return render_with_template(os.path.basename(template_path), (True,), [packet])
+    except TemplateError as e:
+        print(f"[PDF] Cache template indisponible ({e}), fusion PyPDF2")
+
+    reader = PdfReader(template_path)
+    writer = PdfWriter()
     overlay = PdfReader(packet)
     page = reader.pages[0]
     page.merge_page(overlay.pages[0])
@@ -0,0 +1,43 @@
+"""
+Tâches de rendu PDF exécutées dans le pool de processus de job_queue
+
+Chaque fonction reçoit le payload JSON de la tâche, génère le PDF et l'écrit
+aux chemins demandés. Ce module n'importe que les générateurs PDF (pas main.py)
+pour que les processus enfants démarrent vite.
+"""
+
+import os
+from typing import List
+
+from QE.PDF.generate_pdf import generate_pdf
+from QE.PDF.generate_pdf_facture import generate_facture_pdf
+from QE.PDF.generate_pdf_calcul import generate_calcul_pdf
+
+
+def _write_pdf(content: bytes, paths: List[str]):
+    for path in paths:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Fichier temporaire puis remplacement: le lien public ne sert jamais un PDF à moitié écrit
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(content)
+        os.replace(tmp_path, path)
+
+
+def render_soumission_pdf(payload: dict) -> dict:
+    """payload: {"data": dict soumission, "language": str, "paths": [str]}"""
+    content = generate_pdf(payload["data"], language=payload.get("language", "fr")).getvalue()
+    _write_pdf(content, payload["paths"])
+    return {"size": len(content), "paths": payload["paths"]}
+
+
+def render_facture_pdf(payload: dict) -> dict:
+    """payload: {"args": dict des arguments de generate_facture_pdf, "paths": [str]}"""
+    content = generate_facture_pdf(**payload["args"]).getvalue()
+    _write_pdf(content, payload["paths"])
+    return {"size": len(content), "paths": payload["paths"]}
+
+
+def render_calcul_pdf_bytes(data: dict, language: str = "fr") -> bytes:
+    """PDF du calculateur renvoyé à la route (téléchargement direct)"""
+    return generate_calcul_pdf(data, language=language).getvalue()
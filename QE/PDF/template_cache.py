@@ -0,0 +1,274 @@
+"""
+Cache des templates PDF (soumission, facture, calculateur) par langue
+
+Avant: chaque PDF relisait le template (600 Ko - 1 Mo) avec PyPDF2, clonait
+tous ses objets dans un PdfWriter, analysait son flux de contenu pour la
+fusion (merge_page) puis réécrivait le tout: ~90 ms par soumission.
+
+Maintenant le template est préparé une seule fois (par fichier, invalidé si
+le fichier change): les pages avec calque reçoivent un appel à un XObject
+/QwotaOverlayN réservé, et le PDF de base est gardé en mémoire (octets).
+
+Pour chaque PDF, seul le calque ReportLab (quelques Ko) est lu: il est ajouté
+à la suite de la base comme Form XObject par mise à jour incrémentale PDF
+(nouveaux objets + nouvelle table xref avec /Prev). Le template n'est plus
+ni relu, ni analysé, ni réécrit.
+
+En cas de problème avec un template (structure inattendue), TemplateError est
+levée et les générateurs retombent sur l'ancienne fusion PyPDF2.
+"""
+
+import os
+import re
+import threading
+import zlib
+from io import BytesIO
+from typing import Dict, List, Sequence, Tuple
+
+from PyPDF2 import PdfReader, PdfWriter
+from PyPDF2.generic import (
+    ArrayObject,
+    DecodedStreamObject,
+    DictionaryObject,
+    IndirectObject,
+    NameObject,
+    NumberObject,
+    StreamObject,
+)
+
+PDF_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "pdf")
+
+# Premières pages du template: True si la page reçoit un calque, False si copiée telle quelle
+PageSpec = Tuple[bool, ...]
+
+_STARTXREF_RE = re.compile(rb"startxref\s+(\d+)\s+%%EOF\s*$")
+
+
+class TemplateError(Exception):
+    """Template impossible à préparer (l'appelant utilise la fusion PyPDF2 classique)"""
+
+
+def _content_stream(data: bytes) -> DecodedStreamObject:
+    stream = DecodedStreamObject()
+    stream.set_data(data)
+    return stream
+
+
+class PreparedTemplate:
+    """Template prêt à recevoir des calques sans être relu"""
+
+    def __init__(self, path: str, pages: PageSpec, include_rest: bool = False):
+        self.path = path
+        self.pages = pages
+        self.include_rest = include_rest
+        self.base, self.overlay_ids, self.trailer_refs, self.size, self.startxref = self._build()
+
+    def _build(self):
+        reader = PdfReader(self.path)
+        if len(self.pages) > len(reader.pages):
+            raise TemplateError(f"{os.path.basename(self.path)}: {len(reader.pages)} page(s) seulement")
+
+        # Pages demandées, puis (include_rest) les pages suivantes sans calque
+        count = len(reader.pages) if self.include_rest else len(self.pages)
+        writer = PdfWriter()
+        for index in range(count):
+            writer.add_page(reader.pages[index])
+
+        overlay_refs = []
+        for index, has_overlay in enumerate(self.pages):
+            if not has_overlay:
+                continue
+            page = writer.pages[index]
+            name = NameObject(f"/QwotaOverlay{len(overlay_refs)}")
+
+            # Objet réservé: remplacé par le calque dans chaque PDF généré
+            placeholder = writer._add_object(_content_stream(b""))
+            overlay_refs.append(placeholder)
+
+            # Contenu d'origine isolé (q ... Q) puis calque par-dessus, comme merge_page()
+            contents = page.get("/Contents")
+            original = []
+            if isinstance(contents, ArrayObject):
+                original = list(contents)
+            elif contents is not None:
+                original = [contents if isinstance(contents, IndirectObject) else writer._add_object(contents)]
+            page[NameObject("/Contents")] = ArrayObject(
+                [writer._add_object(_content_stream(b"q\n"))]
+                + original
+                + [writer._add_object(_content_stream(f"\nQ\nq {name} Do Q\n".encode("latin-1")))]
+            )
+
+            # Ressources copiées (un dictionnaire /XObject peut être partagé entre pages)
+            resources = DictionaryObject()
+            for key, value in (page.get("/Resources") or DictionaryObject()).get_object().items():
+                resources[NameObject(key)] = value
+            xobjects = DictionaryObject()
+            for key, value in (resources.get("/XObject") or DictionaryObject()).get_object().items():
+                xobjects[NameObject(key)] = value
+            xobjects[name] = placeholder
+            resources[NameObject("/XObject")] = xobjects
+            page[NameObject("/Resources")] = resources
+
+        output = BytesIO()
+        writer.write(output)
+        base = output.getvalue()
+        if not base.endswith(b"\n"):
+            base += b"\n"
+
+        match = _STARTXREF_RE.search(base[-64:])
+        if not match:
+            raise TemplateError("startxref introuvable dans le template préparé")
+
+        # Vérifier la numérotation des objets réservés dans le fichier écrit
+        check = PdfReader(BytesIO(base))
+        overlay_ids = []
+        for ref in overlay_refs:
+            if not isinstance(check.get_object(ref.idnum), StreamObject):
+                raise TemplateError("Objet réservé au calque introuvable")
+            overlay_ids.append(ref.idnum)
+
+        trailer_refs = {}
+        for key in ("/Root", "/Info"):
+            value = check.trailer.raw_get(key) if key in check.trailer else None
+            if isinstance(value, IndirectObject):
+                trailer_refs[key] = value.idnum
+        if "/Root" not in trailer_refs:
+            raise TemplateError("/Root introuvable dans le template préparé")
+
+        return base, overlay_ids, trailer_refs, int(check.trailer["/Size"]), int(match.group(1))
+
+    def render(self, overlays: Sequence[bytes]) -> bytes:
+        """Ajoute les calques (PDF ReportLab d'une page, dans l'ordre des pages à calque)"""
+        if len(overlays) != len(self.overlay_ids):
+            raise ValueError(f"{len(self.overlay_ids)} calque(s) attendu(s), {len(overlays)} reçu(s)")
+
+        out = bytearray(self.base)
+        offsets: Dict[int, int] = {}
+        next_id = [self.size]
+
+        def new_id() -> int:
+            next_id[0] += 1
+            return next_id[0] - 1
+
+        for overlay_id, overlay in zip(self.overlay_ids, overlays):
+            _append_overlay(out, offsets, overlay_id, overlay, new_id)
+
+        # Table xref de la mise à jour: une sous-section par objet
+        xref_offset = len(out)
+        xref = [b"xref\n"]
+        for idnum in sorted(offsets):
+            xref.append(f"{idnum} 1\n{offsets[idnum]:010d} 00000 n\r\n".encode("ascii"))
+        out += b"".join(xref)
+
+        trailer = f"trailer\n<< /Size {next_id[0]} /Root {self.trailer_refs['/Root']} 0 R"
+        if "/Info" in self.trailer_refs:
+            trailer += f" /Info {self.trailer_refs['/Info']} 0 R"
+        trailer += f" /Prev {self.startxref} >>\nstartxref\n{xref_offset}\n%%EOF\n"
+        out += trailer.encode("ascii")
+        return bytes(out)
+
+
+def _append_overlay(out: bytearray, offsets: Dict[int, int], overlay_id: int, overlay: bytes, new_id):
+    """Écrit la page 1 du calque comme Form XObject (numéro overlay_id) et ses ressources"""
+    reader = PdfReader(BytesIO(overlay))
+    page = reader.pages[0]
+
+    contents = page.get("/Contents")
+    if contents is None:
+        data = b""
+    elif isinstance(contents.get_object(), ArrayObject):
+        data = b"\n".join(part.get_object().get_data() for part in contents.get_object())
+    else:
+        data = contents.get_object().get_data()
+
+    remapped: Dict[int, int] = {}
+    pending: List[Tuple[int, object]] = []
+
+    def remap(obj):
+        if isinstance(obj, IndirectObject):
+            if obj.idnum not in remapped:
+                remapped[obj.idnum] = new_id()
+                pending.append((remapped[obj.idnum], obj.get_object()))
+            return IndirectObject(remapped[obj.idnum], 0, None)
+        if isinstance(obj, StreamObject):
+            copy = StreamObject()
+            copy._data = obj._data
+            for key, value in obj.items():
+                if key != "/Length":
+                    copy[NameObject(key)] = remap(value)
+            return copy
+        if isinstance(obj, DictionaryObject):
+            copy = DictionaryObject()
+            for key, value in obj.items():
+                copy[NameObject(key)] = remap(value)
+            return copy
+        if isinstance(obj, ArrayObject):
+            return ArrayObject(remap(value) for value in obj)
+        return obj
+
+    form = StreamObject()
+    form._data = zlib.compress(data)
+    form[NameObject("/Type")] = NameObject("/XObject")
+    form[NameObject("/Subtype")] = NameObject("/Form")
+    form[NameObject("/FormType")] = NumberObject(1)
+    form[NameObject("/Filter")] = NameObject("/FlateDecode")
+    form[NameObject("/BBox")] = ArrayObject(NumberObject(int(v)) if float(v).is_integer() else v
+                                            for v in page.mediabox)
+    form[NameObject("/Resources")] = remap(page.get("/Resources") or DictionaryObject())
+
+    _write_object(out, offsets, overlay_id, form)
+    while pending:
+        idnum, obj = pending.pop()
+        _write_object(out, offsets, idnum, remap(obj))
+
+
+def _write_object(out: bytearray, offsets: Dict[int, int], idnum: int, obj):
+    offsets[idnum] = len(out)
+    stream = BytesIO()
+    obj.write_to_stream(stream, None)
+    out += f"{idnum} 0 obj\n".encode("ascii") + stream.getvalue() + b"\nendobj\n"
+
+
+_cache: Dict[Tuple[str, PageSpec, bool], Tuple[tuple, PreparedTemplate]] = {}
+_lock = threading.Lock()
+
+
+def get_template(filename: str, pages: PageSpec, include_rest: bool = False) -> PreparedTemplate:
+    """Template préparé (reconstruit si le fichier a changé)"""
+    path = os.path.join(PDF_DIR, filename)
+    try:
+        stat = os.stat(path)
+    except OSError as e:
+        raise TemplateError(f"Template introuvable: {path}") from e
+    signature = (stat.st_mtime_ns, stat.st_size)
+    key = (path, pages, include_rest)
+
+    with _lock:
+        cached = _cache.get(key)
+        if cached and cached[0] == signature:
+            return cached[1]
+
+    # Préparation hors verrou (une seule fois par template et par processus)
+    try:
+        template = PreparedTemplate(path, pages, include_rest)
+    except TemplateError:
+        raise
+    except Exception as e:
+        raise TemplateError(f"{filename}: {type(e).__name__}: {e}") from e
+
+    with _lock:
+        _cache[key] = (signature, template)
+    print(f"[PDF] Template préparé et mis en cache: {filename} ({len(template.base) // 1024} Ko)", flush=True)
+    return template
+
+
+def render_with_template(filename: str, pages: PageSpec, overlays: Sequence[BytesIO],
+                         include_rest: bool = False) -> BytesIO:
+    """PDF final: template en cache + calques. Lève TemplateError si le template est inutilisable"""
+    template = get_template(filename, pages, include_rest)
+    return BytesIO(template.render([overlay.getvalue() for overlay in overlays]))
+
+
+def clear_template_cache():
+    with _lock:
+        _cache.clear()
@@ -0,0 +1,89 @@
+"""
+Façade d'I/O non bloquantes pour les routes async
+
+Dans une route `async def`, un open()/json.load()/sqlite3.connect() bloque la
+boucle d'événements: sur le disque persistant de Render, une écriture lente
+gèle toutes les autres requêtes du worker. Ces helpers exécutent le travail
+bloquant dans un pool de threads borné (IO_MAX_WORKERS) et rendent la main à
+la boucle pendant l'attente.
+
+Usage dans une route async:
+    data = await load_json_async(path, default=[])
+    await save_json_async(path, data)
+    size = await save_upload_file(image, image_path)
+    row = await run_blocking(fonction_sqlite, username)
+
+Vérification: python scripts/check_blocking_async.py
+"""
+
+import asyncio
+import functools
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable
+
+import utils
+
+IO_MAX_WORKERS = int(os.getenv("IO_MAX_WORKERS", "16"))
+
+# Taille des blocs lus depuis un UploadFile
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+
+_executor = ThreadPoolExecutor(max_workers=IO_MAX_WORKERS, thread_name_prefix="qwota-io")
+
+
+async def run_blocking(func: Callable, *args, **kwargs) -> Any:
+    """Exécute une fonction bloquante (fichier, SQLite) dans le pool d'I/O"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_executor, functools.partial(func, *args, **kwargs))
+
+
+async def load_json_async(file_path, default: Any = None) -> Any:
+    """Version async de utils.load_json_file"""
+    return await run_blocking(utils.load_json_file, file_path, default)
+
+
+async def save_json_async(file_path, data: Any, create_dirs: bool = True) -> bool:
+    """Version async de utils.save_json_file"""
+    return await run_blocking(utils.save_json_file, file_path, data, create_dirs)
+
+
+async def makedirs_async(path: str):
+    await run_blocking(os.makedirs, path, exist_ok=True)
+
+
+def _write_bytes(file_path: str, content: bytes, mode: str = "wb"):
+    with open(file_path, mode) as f:
+        f.write(content)
+
+
+async def save_bytes_async(file_path: str, content: bytes) -> int:
+    """Écrit un contenu binaire (image, PDF) sans bloquer la boucle. Retourne la taille"""
+    await run_blocking(_write_bytes, file_path, content)
+    return len(content)
+
+
+async def save_upload_file(upload, file_path: str) -> int:
+    """
+    Enregistre un UploadFile FastAPI par blocs (pas de fichier entier en mémoire)
+    Retourne le nombre d'octets écrits
+    """
+    size = 0
+    mode = "wb"
+    while True:
+        chunk = await upload.read(UPLOAD_CHUNK_SIZE)
+        if not chunk:
+            break
+        await run_blocking(_write_bytes, file_path, chunk, mode)
+        size += len(chunk)
+        mode = "ab"
+
+    # Fichier vide: créer quand même le fichier, comme l'ancien open(..., "wb")
+    if size == 0:
+        await run_blocking(_write_bytes, file_path, b"")
+    return size
+
+
+def shutdown_io_pool():
+    """Arrête le pool (appelé à l'arrêt de l'application)"""
+    _executor.shutdown(wait=False)
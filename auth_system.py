@@ -7,6 +7,9 @@ Base de données SQLite ultra propre
 
 import sqlite3
 import secrets
+import threading
+import time
+from collections import OrderedDict
 from datetime import datetime, timedelta
 from typing import Optional, Dict, List
 from pathlib import Path
@@ -541,6 +544,10 @@ class JWTManager:
         self.secret_key = config.JWT_SECRET_KEY
         self.algorithm = config.JWT_ALGORITHM
         self.access_token_expire_minutes = config.JWT_ACCESS_TOKEN_EXPIRE_MINUTES
+        # Jetons déjà vérifiés: token -> (exp epoch, TokenData), LRU borné
+        self._verified: "OrderedDict[str, tuple]" = OrderedDict()
+        self._verified_lock = threading.Lock()
+        self._verified_max_entries = config.JWT_VERIFY_CACHE_MAX_ENTRIES
 
     def create_access_token(
         self,
@@ -576,7 +583,26 @@ class JWTManager:
         return encoded_jwt
 
     def verify_token(self, token: str) -> TokenData:
-        """Vérifie et décode un token JWT"""
+        """Vérifie et décode un token JWT (résultat mémorisé par token jusqu'à son expiration)"""
+        now = time.time()
+        with self._verified_lock:
+            cached = self._verified.get(token)
+            if cached is not None:
+                if cached[0] > now:
+                    self._verified.move_to_end(token)
+                    return cached[1]
+                del self._verified[token]
+
+        token_data, exp = self._decode_token(token)
+        if exp is not None and exp > now:
+            with self._verified_lock:
+                self._verified[token] = (exp, token_data)
+                while len(self._verified) > self._verified_max_entries:
+                    self._verified.popitem(last=False)
+        return token_data
+
+    def _decode_token(self, token: str) -> tuple:
+        """Vérifie la signature et l'expiration. Retourne (TokenData, exp epoch)"""
         try:
             payload = jwt.decode(
                 token,
@@ -601,7 +627,7 @@ class JWTManager:
                 role=role,
                 user_id=user_id,
                 exp=datetime.fromtimestamp(exp)
-            )
+            ), exp
 
         except jwt.ExpiredSignatureError:
             raise HTTPException(
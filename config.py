@@ -49,6 +49,21 @@ MAX_UPLOAD_FILES = int(os.getenv('MAX_UPLOAD_FILES', '10'))
 RATE_LIMIT_PER_MINUTE = int(os.getenv('RATE_LIMIT_PER_MINUTE', '60'))
 LOGIN_RATE_LIMIT_PER_MINUTE = int(os.getenv('LOGIN_RATE_LIMIT_PER_MINUTE', '5'))
 
+# Cache des fichiers JSON parsés (budget mémoire par processus)
+JSON_CACHE_MAX_MB = int(os.getenv('JSON_CACHE_MAX_MB', '64'))
+
+# Index par date des listes (ventes, soumissions): nombre de fichiers indexés gardés par processus
+DATE_INDEX_MAX_ENTRIES = int(os.getenv('DATE_INDEX_MAX_ENTRIES', '512'))
+
+# Saison RPO: décembre de l'année précédente (mois -2) puis janvier-décembre de cette année (mois 0-11)
+RPO_SEASON_YEAR = int(os.getenv('RPO_SEASON_YEAR', '2026'))
+
+# Middleware des pages protégées: durée de vie des identités en cache (utilisateur + onboarding + guide)
+IDENTITY_CACHE_TTL_SECONDS = int(os.getenv('IDENTITY_CACHE_TTL_SECONDS', '30'))
+
+# Jetons JWT déjà vérifiés gardés en mémoire jusqu'à leur expiration (nombre max par processus)
+JWT_VERIFY_CACHE_MAX_ENTRIES = int(os.getenv('JWT_VERIFY_CACHE_MAX_ENTRIES', '10000'))
+
 # Session & Cookies
 COOKIE_MAX_AGE_DAYS = int(os.getenv('COOKIE_MAX_AGE_DAYS', '7'))
 COOKIE_MAX_AGE_SECONDS = int(timedelta(days=COOKIE_MAX_AGE_DAYS).total_seconds())
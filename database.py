@@ -11,6 +11,7 @@ from typing import Optional, Dict, List
 import bcrypt
 
 import config
+from db_pool import get_connection
 
 
 #  Configuration du chemin de la base de données
@@ -50,7 +51,7 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
 #  Initialisation de la base de données
 def init_database():
     """Crée les tables si elles n'existent pas"""
-    with sqlite3.connect(DB_PATH) as conn:
+    with get_connection() as conn:
         cursor = conn.cursor()
 
         # Table des utilisateurs
@@ -100,6 +101,12 @@ def init_database():
         except sqlite3.OperationalError:
             pass
 
+        # Photo courante adressée par contenu (photo_store.py)
+        try:
+            cursor.execute("ALTER TABLE users ADD COLUMN photo_hash TEXT")
+        except sqlite3.OperationalError:
+            pass
+
         try:
             cursor.execute("ALTER TABLE users ADD COLUMN coach_id INTEGER")
         except sqlite3.OperationalError:
@@ -170,7 +177,7 @@ def init_database():
 def init_support_user():
     """Crée les utilisateurs support et direction s'ils n'existent pas"""
     try:
-        with sqlite3.connect(DB_PATH) as conn:
+        with get_connection() as conn:
             cursor = conn.cursor()
 
             # Vérifier si l'utilisateur support existe
@@ -216,7 +223,7 @@ def init_support_user():
 def create_user(username: str, password: str, role: str, department: Optional[str] = None, email: Optional[str] = None, monday_api_key: Optional[str] = None, monday_board_id: Optional[str] = None) -> bool:
     """Crée un nouvel utilisateur"""
     try:
-        with sqlite3.connect(DB_PATH) as conn:
+        with get_connection() as conn:
             cursor = conn.cursor()
 
             hashed_pw = hash_password(password)
@@ -247,7 +254,7 @@ def create_user(username: str, password: str, role: str, department: Optional[st
 def get_user(username: str) -> Optional[Dict]:
     """Récupère les informations d'un utilisateur"""
     try:
-        with sqlite3.connect(DB_PATH) as conn:
+        with get_connection() as conn:
             conn.row_factory = sqlite3.Row
             cursor = conn.cursor()
 
@@ -290,7 +297,7 @@ def authenticate_user(username: str, password: str) -> Optional[Dict]:
 def update_last_login(username: str):
     """Met à jour la date de dernière connexion"""
     try:
-        with sqlite3.connect(DB_PATH) as conn:
+        with get_connection() as conn:
             cursor = conn.cursor()
 
             last_login = datetime.now().isoformat()
@@ -307,7 +314,7 @@ def update_last_login(username: str):
 def list_all_users(include_inactive: bool = False) -> List[Dict]:
     """Liste tous les utilisateurs (actifs par défaut, ou tous si include_inactive=True)"""
     try:
-        with sqlite3.connect(DB_PATH) as conn:
+        with get_connection() as conn:
             conn.row_factory = sqlite3.Row
             cursor = conn.cursor()
 
@@ -341,7 +348,7 @@ def list_all_users(include_inactive: bool = False) -> List[Dict]:
 def update_user_password(username: str, new_password: str) -> bool:
     """Met à jour le mot de passe d'un utilisateur"""
     try:
-        with sqlite3.connect(DB_PATH) as conn:
+        with get_connection() as conn:
             cursor = conn.cursor()
 
             hashed_pw = hash_password(new_password)
@@ -362,7 +369,7 @@ def update_user_password(username: str, new_password: str) -> bool:
 def delete_user(username: str) -> bool:
     """Désactive un utilisateur (soft delete)"""
     try:
-        with sqlite3.connect(DB_PATH) as conn:
+        with get_connection() as conn:
             cursor = conn.cursor()
 
             cursor.execute('''
@@ -382,7 +389,7 @@ def delete_user(username: str) -> bool:
 def change_user_role(username: str, new_role: str) -> bool:
     """Change le rôle d'un utilisateur"""
     try:
-        with sqlite3.connect(DB_PATH) as conn:
+        with get_connection() as conn:
             cursor = conn.cursor()
 
             cursor.execute('''
@@ -406,7 +413,7 @@ def update_user(user_id: int, username: str = None, email: str = None,
                 monday_board_id: str = None) -> bool:
     """Met à jour les informations d'un utilisateur"""
     try:
-        with sqlite3.connect(DB_PATH) as conn:
+        with get_connection() as conn:
             cursor = conn.cursor()
 
             # Construire la requête dynamiquement en fonction des champs fournis
@@ -486,7 +493,7 @@ def update_user(user_id: int, username: str = None, email: str = None,
 def toggle_user_active(user_id: int, is_active: bool) -> bool:
     """Active ou désactive un utilisateur"""
     try:
-        with sqlite3.connect(DB_PATH) as conn:
+        with get_connection() as conn:
             cursor = conn.cursor()
 
             cursor.execute('''
@@ -512,7 +519,7 @@ def delete_user_completely(user_id: int) -> bool:
 
     try:
         # 1. Récupérer les infos de l'utilisateur
-        with sqlite3.connect(DB_PATH) as conn:
+        with get_connection() as conn:
             cursor = conn.cursor()
             cursor.execute('SELECT username FROM users WHERE id = ?', (user_id,))
             result = cursor.fetchone()
@@ -591,7 +598,7 @@ def migrate_users_from_dict(users_dict: dict):
 
         # Créer l'utilisateur avec le hash déjà existant
         try:
-            with sqlite3.connect(DB_PATH) as conn:
+            with get_connection() as conn:
                 cursor = conn.cursor()
 
                 created_at = datetime.now().isoformat()
@@ -618,7 +625,7 @@ def migrate_users_from_dict(users_dict: dict):
 def get_user_stats() -> Dict:
     """Retourne des statistiques sur les utilisateurs"""
     try:
-        with sqlite3.connect(DB_PATH) as conn:
+        with get_connection() as conn:
             cursor = conn.cursor()
 
             # Total utilisateurs
@@ -649,7 +656,7 @@ def get_user_stats() -> Dict:
 def get_guide_progress(username: str) -> Optional[Dict]:
     """Récupère la progression du guide pour un utilisateur"""
     try:
-        with sqlite3.connect(DB_PATH) as conn:
+        with get_connection() as conn:
             cursor = conn.cursor()
 
             cursor.execute('''
@@ -681,7 +688,7 @@ def get_guide_progress(username: str) -> Optional[Dict]:
 def init_guide_progress(username: str) -> bool:
     """Initialise la progression du guide pour un nouvel utilisateur"""
     try:
-        with sqlite3.connect(DB_PATH) as conn:
+        with get_connection() as conn:
             cursor = conn.cursor()
 
             cursor.execute('''
@@ -719,7 +726,7 @@ def update_video_progress(username: str, video_number: int) -> bool:
 
         column = video_columns[video_number]
 
-        with sqlite3.connect(DB_PATH) as conn:
+        with get_connection() as conn:
             cursor = conn.cursor()
 
             # Initialiser si n'existe pas
@@ -747,7 +754,7 @@ def update_video_progress(username: str, video_number: int) -> bool:
 def complete_guide(username: str) -> bool:
     """Marque le guide comme complété"""
     try:
-        with sqlite3.connect(DB_PATH) as conn:
+        with get_connection() as conn:
             cursor = conn.cursor()
 
             completed_at = datetime.now().isoformat()
@@ -771,7 +778,7 @@ def complete_guide(username: str) -> bool:
 def mark_onboarding_completed(username: str) -> bool:
     """Marque l'onboarding comme complété pour un utilisateur"""
     try:
-        with sqlite3.connect(DB_PATH) as conn:
+        with get_connection() as conn:
             cursor = conn.cursor()
 
             cursor.execute('''
@@ -792,7 +799,7 @@ def mark_onboarding_completed(username: str) -> bool:
 def mark_videos_completed(username: str) -> bool:
     """Marque les vidéos comme complétées pour un utilisateur"""
     try:
-        with sqlite3.connect(DB_PATH) as conn:
+        with get_connection() as conn:
             cursor = conn.cursor()
 
             cursor.execute('''
@@ -813,7 +820,7 @@ def mark_videos_completed(username: str) -> bool:
 def check_user_access(username: str) -> Dict[str, bool]:
     """Vérifie si l'utilisateur a complété onboarding et vidéos"""
     try:
-        with sqlite3.connect(DB_PATH) as conn:
+        with get_connection() as conn:
             cursor = conn.cursor()
 
             cursor.execute('''
@@ -850,7 +857,7 @@ def check_user_access(username: str) -> Dict[str, bool]:
 def send_support_message(username: str, message: str, is_admin: int = 0, attachment_path: str = None, attachment_type: str = None) -> bool:
     """Envoie un message de support"""
     try:
-        with sqlite3.connect(DB_PATH) as conn:
+        with get_connection() as conn:
             cursor = conn.cursor()
 
             created_at = datetime.now().isoformat()
@@ -873,7 +880,7 @@ def send_support_message(username: str, message: str, is_admin: int = 0, attachm
 def get_user_messages(username: str) -> List[Dict]:
     """Récupère tous les messages d'un utilisateur (conversation avec le support)"""
     try:
-        with sqlite3.connect(DB_PATH) as conn:
+        with get_connection() as conn:
             cursor = conn.cursor()
 
             cursor.execute('''
@@ -908,7 +915,7 @@ def get_user_messages(username: str) -> List[Dict]:
 def get_all_support_conversations() -> List[Dict]:
     """Récupère toutes les conversations de support avec le dernier message de chaque utilisateur"""
     try:
-        with sqlite3.connect(DB_PATH) as conn:
+        with get_connection() as conn:
             cursor = conn.cursor()
 
             # Récupérer le dernier message de chaque utilisateur
@@ -950,7 +957,7 @@ def get_all_support_conversations() -> List[Dict]:
 def mark_messages_as_read(username: str) -> bool:
     """Marque tous les messages d'un utilisateur comme lus par l'admin"""
     try:
-        with sqlite3.connect(DB_PATH) as conn:
+        with get_connection() as conn:
             cursor = conn.cursor()
 
             cursor.execute('''
@@ -972,7 +979,7 @@ def mark_messages_as_read(username: str) -> bool:
 def delete_conversation(username: str) -> bool:
     """Supprime toute la conversation d'un utilisateur"""
     try:
-        with sqlite3.connect(DB_PATH) as conn:
+        with get_connection() as conn:
             cursor = conn.cursor()
 
             cursor.execute('''
@@ -993,7 +1000,7 @@ def delete_conversation(username: str) -> bool:
 def mark_conversation_resolved(username: str, resolved_by: str = "support") -> bool:
     """Marque une conversation comme résolue et l'archive"""
     try:
-        with sqlite3.connect(DB_PATH) as conn:
+        with get_connection() as conn:
             cursor = conn.cursor()
 
             # Compter les messages avant suppression
@@ -1022,7 +1029,7 @@ def mark_conversation_resolved(username: str, resolved_by: str = "support") -> b
 def get_resolved_today_count() -> int:
     """Compte les conversations résolues aujourd'hui"""
     try:
-        with sqlite3.connect(DB_PATH) as conn:
+        with get_connection() as conn:
             cursor = conn.cursor()
 
             today = datetime.now().date().isoformat()
@@ -1043,7 +1050,7 @@ def get_resolved_today_count() -> int:
 def get_unread_messages_count(username: str = None) -> int:
     """Compte les messages non lus (si username fourni, pour cet utilisateur seulement)"""
     try:
-        with sqlite3.connect(DB_PATH) as conn:
+        with get_connection() as conn:
             cursor = conn.cursor()
 
             if username:
@@ -0,0 +1,214 @@
+"""
+Index par date des listes de ventes / soumissions (filtrage par période en O(log n))
+
+Le dashboard, graph-data, la liste des coaches et le résumé des soumissions
+filtraient chaque liste par période en appelant parse_date_flexible() sur
+chaque enregistrement à chaque requête (jusqu'à trois strptime/fromisoformat
+par ligne, pour chaque utilisateur de l'équipe).
+
+Maintenant:
+- À l'écriture, normalize_record_date() ajoute le champ canonique date_ts
+  (epoch UTC en secondes) et date_ts_from (la valeur de "date" convertie).
+  Un handler qui modifie "date" sans renormaliser est détecté (date_ts_from
+  différent) et la date est reparsée: date_ts n'est jamais utilisé périmé.
+- DateIndex trie une fois les enregistrements par date_ts; between() découpe
+  la période avec bisect.
+- load_date_index(path) garde l'index tant que json_cache retourne le même
+  objet (même version du fichier); user_date_index() passe par le mode de
+  la collection (document_store).
+- scripts/backfill_record_dates.py normalise les fichiers existants.
+
+Les listes retournées sont partagées avec json_cache: ne PAS les modifier.
+"""
+
+import json
+import threading
+from bisect import bisect_left, bisect_right
+from collections import OrderedDict
+from datetime import datetime, timezone
+from functools import lru_cache
+from typing import Any, Callable, Dict, List, Optional
+
+import config
+from json_cache import load_json_cached
+from utils import parse_date_flexible
+
+DATE_FIELD = "date"
+DATE_TS_FIELD = "date_ts"
+DATE_TS_SOURCE_FIELD = "date_ts_from"
+
+
+@lru_cache(maxsize=8192)
+def _parse_timestamp(date_str: str) -> Optional[float]:
+    date_obj = parse_date_flexible(date_str)
+    if date_obj is None:
+        return None
+    ts = date_obj.timestamp()
+    return int(ts) if ts.is_integer() else ts
+
+
+def to_timestamp(value) -> Optional[float]:
+    """datetime (naïf = UTC, comme parse_date_flexible) ou date texte -> epoch UTC"""
+    if value is None:
+        return None
+    if isinstance(value, datetime):
+        if value.tzinfo is None:
+            value = value.replace(tzinfo=timezone.utc)
+        return value.timestamp()
+    if isinstance(value, str):
+        return _parse_timestamp(value) if value else None
+    return None
+
+
+def record_timestamp(record: Dict[str, Any]) -> Optional[float]:
+    """Epoch UTC de record["date"]: date_ts s'il est à jour, sinon parsing (mis en cache par valeur)"""
+    date_value = record.get(DATE_FIELD)
+    if DATE_TS_FIELD in record and record.get(DATE_TS_SOURCE_FIELD) == date_value:
+        return record[DATE_TS_FIELD]
+    return to_timestamp(date_value) if isinstance(date_value, str) else None
+
+
+def record_datetime(record: Dict[str, Any]) -> Optional[datetime]:
+    """record["date"] en datetime UTC, ou None si la date est absente ou illisible"""
+    ts = record_timestamp(record)
+    return datetime.fromtimestamp(ts, tz=timezone.utc) if ts is not None else None
+
+
+def normalize_record_date(record: Dict[str, Any]) -> Dict[str, Any]:
+    """Ajoute (ou met à jour) date_ts / date_ts_from. Retourne le même dict"""
+    date_value = record.get(DATE_FIELD)
+    if not isinstance(date_value, str) or not date_value:
+        record.pop(DATE_TS_FIELD, None)
+        record.pop(DATE_TS_SOURCE_FIELD, None)
+        return record
+    if record.get(DATE_TS_SOURCE_FIELD) != date_value or DATE_TS_FIELD not in record:
+        record[DATE_TS_FIELD] = _parse_timestamp(date_value)
+        record[DATE_TS_SOURCE_FIELD] = date_value
+    return record
+
+
+def normalize_records(records: List[Any]) -> int:
+    """Normalise une liste en place. Retourne le nombre d'enregistrements modifiés"""
+    changed = 0
+    for record in records:
+        if not isinstance(record, dict):
+            continue
+        before = (record.get(DATE_TS_FIELD), record.get(DATE_TS_SOURCE_FIELD), DATE_TS_FIELD in record)
+        normalize_record_date(record)
+        if before != (record.get(DATE_TS_FIELD), record.get(DATE_TS_SOURCE_FIELD), DATE_TS_FIELD in record):
+            changed += 1
+    return changed
+
+
+class DateIndex:
+    """Enregistrements triés par date (tableau d'epochs pour bisect) + enregistrements sans date"""
+
+    __slots__ = ("timestamps", "dated", "undated", "size")
+
+    def __init__(self, records: Optional[List[Any]]):
+        records = records if isinstance(records, list) else []
+        pairs = []
+        undated = []
+        for record in records:
+            if not isinstance(record, dict):
+                continue
+            ts = record_timestamp(record)
+            if ts is None:
+                undated.append(record)
+            else:
+                pairs.append((ts, len(pairs), record))
+        pairs.sort(key=lambda p: (p[0], p[1]))
+        self.timestamps = [p[0] for p in pairs]
+        self.dated = [p[2] for p in pairs]
+        self.undated = undated
+        self.size = len(records)
+
+    def between(self, start=None, end=None, include_undated: bool = False) -> List[Dict[str, Any]]:
+        """
+        Enregistrements avec start <= date <= end (bornes datetime ou None = ouverte),
+        triés par date. include_undated ajoute ceux dont la date est absente ou illisible.
+        """
+        lo = 0 if start is None else bisect_left(self.timestamps, to_timestamp(start))
+        hi = len(self.timestamps) if end is None else bisect_right(self.timestamps, to_timestamp(end))
+        selected = self.dated[lo:hi] if lo < hi else []
+        return selected + self.undated if include_undated else selected
+
+    def count_between(self, start=None, end=None, include_undated: bool = False) -> int:
+        lo = 0 if start is None else bisect_left(self.timestamps, to_timestamp(start))
+        hi = len(self.timestamps) if end is None else bisect_right(self.timestamps, to_timestamp(end))
+        return max(hi - lo, 0) + (len(self.undated) if include_undated else 0)
+
+
+class IdentityCache:
+    """
+    Structure dérivée (index, colonnes) par chemin, valide tant que la source
+    est le même objet (json_cache retourne le même objet pour une même version du fichier)
+    """
+
+    def __init__(self, max_entries: int, builder: Callable[[Any], Any]):
+        self.max_entries = max_entries
+        self.builder = builder
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.builds = 0
+
+    def get(self, key: str, source) -> Any:
+        with self._lock:
+            entry = self._entries.get(key)
+            # La référence gardée sur source empêche la réutilisation de son id()
+            if entry is not None and entry[0] is source:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+
+        built = self.builder(source)
+        with self._lock:
+            self.builds += 1
+            self._entries[key] = (source, built)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return built
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"entries": len(self._entries), "hits": self.hits, "builds": self.builds}
+
+
+_cache = IdentityCache(config.DATE_INDEX_MAX_ENTRIES, DateIndex)
+
+
+def load_date_index(path: str) -> Optional[DateIndex]:
+    """Index du fichier JSON (liste), ou None s'il n'existe pas. Lève json.JSONDecodeError si invalide"""
+    records = load_json_cached(path, readonly=True)
+    if records is None:
+        return None
+    return _cache.get(path, records)
+
+
+def user_date_index(collection: str, username: str) -> DateIndex:
+    """Index d'une collection du DocumentStore pour un utilisateur (même lecture que load_user_documents)"""
+    # Import local: document_store importe ce module pour normaliser à l'écriture
+    from document_store import MODE_JSON, get_collection_mode, get_legacy_path, load_user_documents
+
+    if get_collection_mode(collection) == MODE_JSON:
+        try:
+            return load_date_index(get_legacy_path(collection, username)) or DateIndex([])
+        except json.JSONDecodeError as e:
+            print(f"[DATE INDEX] JSON invalide {collection}/{username}: {e}", flush=True)
+            return DateIndex([])
+    # mirror / store: lecture SQLite à chaque appel, l'index n'évite que le parsing des dates
+    return DateIndex(load_user_documents(collection, username))
+
+
+def get_date_index_stats() -> Dict[str, Any]:
+    return _cache.stats()
+
+
+def clear_date_index_cache():
+    _cache.clear()
@@ -0,0 +1,152 @@
+"""
+Pool de connexions SQLite pour qwota.db
+
+Avant: chaque fonction ouvrait sqlite3.connect(DB_PATH) (journal rollback par
+défaut, pas de busy_timeout): heartbeats, messages support et attribution d'XP
+se bloquaient mutuellement ("database is locked").
+
+Maintenant:
+- Connexions réutilisées par thread (pas de partage entre threads)
+- journal_mode=WAL: les lectures ne bloquent plus les écritures
+- synchronous=NORMAL (sûr en WAL, beaucoup moins de fsync)
+- busy_timeout: une écriture concurrente attend au lieu d'échouer
+- Cache de requêtes préparées de sqlite3 (cached_statements) conservé d'un appel à l'autre
+
+Les deux usages existants restent valides:
+    with get_connection() as conn:      # commit/rollback puis retour au pool
+        ...
+    conn = get_connection()
+    ...
+    conn.close()                        # retour au pool (rollback si transaction ouverte)
+"""
+
+import os
+import sqlite3
+import sys
+import threading
+
+# Attente maximale d'un verrou d'écriture (millisecondes)
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "10000"))
+
+# Connexions inactives gardées par thread et par base
+MAX_IDLE_PER_THREAD = 4
+
+# Requêtes préparées gardées par connexion
+CACHED_STATEMENTS = 256
+
+
+def get_database_path():
+    """Retourne le chemin de qwota.db selon l'environnement (même logique que database.py)"""
+    if sys.platform == 'win32':
+        data_dir = os.path.join(os.path.dirname(__file__), 'data')
+    else:
+        data_dir = os.getenv("STORAGE_PATH", '/mnt/cloud')
+
+    os.makedirs(data_dir, exist_ok=True)
+    return os.path.join(data_dir, 'qwota.db')
+
+
+class PooledConnection(sqlite3.Connection):
+    """Connexion dont close() et la sortie du bloc with la rendent au pool"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.pool_key = None
+        self.owner_thread = threading.get_ident()
+        self.checked_out = False
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        # Commit si succès, rollback si exception (comportement sqlite3 standard)
+        try:
+            return super().__exit__(exc_type, exc_value, traceback)
+        finally:
+            self.close()
+
+    def close(self):
+        _release(self)
+
+    def close_for_real(self):
+        sqlite3.Connection.close(self)
+
+
+_local = threading.local()
+_stats_lock = threading.Lock()
+_stats = {"created": 0, "reused": 0}
+
+
+def _idle_connections(db_path: str) -> list:
+    pools = getattr(_local, "pools", None)
+    if pools is None:
+        pools = _local.pools = {}
+    return pools.setdefault(db_path, [])
+
+
+def _create_connection(db_path: str) -> PooledConnection:
+    conn = sqlite3.connect(
+        db_path,
+        timeout=SQLITE_BUSY_TIMEOUT_MS / 1000,
+        factory=PooledConnection,
+        cached_statements=CACHED_STATEMENTS,
+    )
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute(f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}")
+    conn.pool_key = db_path
+    with _stats_lock:
+        _stats["created"] += 1
+    return conn
+
+
+_default_db_path = None
+
+
+def get_connection(db_path: str = None) -> PooledConnection:
+    """Emprunte une connexion du pool du thread courant (ou en crée une)"""
+    global _default_db_path
+    if db_path is None:
+        if _default_db_path is None:
+            _default_db_path = get_database_path()
+        db_path = _default_db_path
+    idle = _idle_connections(db_path)
+    if idle:
+        conn = idle.pop()
+        with _stats_lock:
+            _stats["reused"] += 1
+    else:
+        conn = _create_connection(db_path)
+    conn.checked_out = True
+    return conn
+
+
+def _release(conn: PooledConnection):
+    if not conn.checked_out:
+        return
+    conn.checked_out = False
+
+    # Une connexion ne peut pas être utilisée par un autre thread que son créateur
+    if conn.owner_thread != threading.get_ident():
+        return
+
+    try:
+        # Même effet qu'un close() sans commit: les changements non validés sont annulés
+        if conn.in_transaction:
+            conn.rollback()
+        # Réinitialiser ce que l'appelant a pu modifier
+        conn.row_factory = None
+        conn.text_factory = str
+        conn.isolation_level = ""
+    except sqlite3.Error:
+        conn.close_for_real()
+        return
+
+    idle = _idle_connections(conn.pool_key)
+    if len(idle) < MAX_IDLE_PER_THREAD:
+        idle.append(conn)
+    else:
+        conn.close_for_real()
+
+
+def get_pool_stats() -> dict:
+    """Nombre de connexions créées / réutilisées depuis le démarrage"""
+    with _stats_lock:
+        return dict(_stats)
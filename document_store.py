@@ -0,0 +1,464 @@
+"""
+[DOCS] DOCUMENT STORE - Stockage des listes JSON par utilisateur dans SQLite
+Remplace progressivement les fichiers base_cloud/<collection>/<user>/<fichier>.json
+(ventes, soumissions signées, clients perdus, ...) par une table indexée.
+
+Chaque collection a un mode (variable d'environnement DOCUMENT_STORE_COLLECTIONS):
+    - json   : comportement historique, lecture/écriture du fichier JSON (défaut)
+    - mirror : lecture depuis SQLite, écriture dans SQLite ET dans le fichier JSON
+               (les handlers pas encore migrés continuent de voir les données)
+    - store  : SQLite uniquement
+
+Exemple: DOCUMENT_STORE_COLLECTIONS="clients_perdus:mirror,ventes_acceptees:mirror"
+
+Les handlers passent par load_user_documents() / save_user_documents() (shim de
+compatibilité) et migrent ainsi une collection à la fois.
+"""
+
+import json
+import os
+import re
+import sqlite3
+import sys
+import threading
+import uuid
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from database import get_database_path
+from date_index import normalize_records
+
+
+# Fichier JSON historique de chaque collection: base_cloud/<collection>/<user>/<fichier>
+COLLECTIONS = {
+    "ventes_attente": "ventes.json",
+    "ventes_acceptees": "ventes.json",
+    "ventes_produit": "ventes.json",
+    "soumissions_completes": "soumissions.json",
+    "soumissions_signees": "soumissions.json",
+    "clients_perdus": "clients.json",
+    "travaux_a_completer": "travaux.json",
+    "travaux_completes": "travaux.json",
+    "prospects": "prospects.json",
+}
+
+# Champs utilisés (dans l'ordre) comme identifiant d'un document
+ID_FIELDS = ("id", "num", "numero_soumission", "numeroSoumission")
+
+MODE_JSON = "json"
+MODE_MIRROR = "mirror"
+MODE_STORE = "store"
+
+_FIELD_RE = re.compile(r'^[A-Za-z0-9_]+(\.[A-Za-z0-9_]+)*$')
+
+
+def get_base_cloud() -> str:
+    """Retourne le dossier racine des données (même logique que main.py)"""
+    if sys.platform == 'win32':
+        return os.path.join(os.path.dirname(__file__), 'data')
+    return os.getenv("STORAGE_PATH", "/mnt/cloud")
+
+
+def get_documents_db_path() -> str:
+    """La base des documents vit à côté de qwota.db pour ne pas bloquer la table users"""
+    return os.path.join(os.path.dirname(get_database_path()), 'documents.db')
+
+
+def _parse_modes(raw: str) -> Dict[str, str]:
+    modes = {}
+    for item in raw.split(','):
+        item = item.strip()
+        if not item:
+            continue
+        collection, _, mode = item.partition(':')
+        mode = (mode or MODE_MIRROR).strip().lower()
+        if collection in COLLECTIONS and mode in (MODE_JSON, MODE_MIRROR, MODE_STORE):
+            modes[collection] = mode
+        else:
+            print(f"[DOCS] Configuration ignorée: {item}")
+    return modes
+
+
+COLLECTION_MODES = _parse_modes(os.getenv("DOCUMENT_STORE_COLLECTIONS", ""))
+
+
+def get_collection_mode(collection: str) -> str:
+    """Retourne le mode actif pour une collection (json par défaut)"""
+    return COLLECTION_MODES.get(collection, MODE_JSON)
+
+
+def get_legacy_path(collection: str, username: str) -> str:
+    """Chemin du fichier JSON historique d'une collection pour un utilisateur"""
+    return os.path.join(get_base_cloud(), collection, username, COLLECTIONS[collection])
+
+
+def document_id(doc: Dict[str, Any]) -> Optional[str]:
+    """Retourne l'identifiant naturel d'un document (id, num, ...) ou None"""
+    for field in ID_FIELDS:
+        value = doc.get(field)
+        if value not in (None, ""):
+            return str(value)
+    return None
+
+
+def _read_legacy_file(path: str) -> List[Dict[str, Any]]:
+    if not os.path.exists(path):
+        return []
+    with open(path, 'r', encoding='utf-8') as f:
+        content = f.read().strip()
+    if not content:
+        return []
+    data = json.loads(content)
+    return data if isinstance(data, list) else []
+
+
+def _write_legacy_file(path: str, docs: List[Dict[str, Any]]):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    temp_path = path + '.tmp'
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        json.dump(docs, f, ensure_ascii=False, indent=2)
+    os.replace(temp_path, path)
+
+
+class DocumentStore:
+    """
+    Stockage de documents JSON par (collection, utilisateur) dans SQLite.
+    L'ordre d'insertion est conservé (colonne position) pour rester compatible
+    avec les listes JSON existantes.
+    """
+
+    def __init__(self, db_path: Optional[str] = None):
+        self.db_path = db_path or get_documents_db_path()
+        self._local = threading.local()
+        self._init_lock = threading.Lock()
+        self._initialized = False
+
+    # ----------------------------------------
+    # Connexion et schéma
+    # ----------------------------------------
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            os.makedirs(os.path.dirname(self.db_path) or '.', exist_ok=True)
+            conn = sqlite3.connect(self.db_path, timeout=30)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        if not self._initialized:
+            self._init_schema(conn)
+        return conn
+
+    def _init_schema(self, conn: sqlite3.Connection):
+        with self._init_lock:
+            if self._initialized:
+                return
+            conn.executescript('''
+                CREATE TABLE IF NOT EXISTS documents (
+                    collection TEXT NOT NULL,
+                    username TEXT NOT NULL,
+                    doc_id TEXT NOT NULL,
+                    position INTEGER NOT NULL,
+                    data TEXT NOT NULL,
+                    updated_at TEXT NOT NULL,
+                    PRIMARY KEY (collection, username, doc_id)
+                );
+                CREATE INDEX IF NOT EXISTS idx_documents_position
+                    ON documents (collection, username, position);
+
+                -- Empreinte du fichier JSON importé (pour détecter les écritures legacy)
+                CREATE TABLE IF NOT EXISTS document_sources (
+                    collection TEXT NOT NULL,
+                    username TEXT NOT NULL,
+                    source_mtime_ns INTEGER,
+                    source_size INTEGER,
+                    imported_at TEXT NOT NULL,
+                    PRIMARY KEY (collection, username)
+                );
+            ''')
+            conn.commit()
+            self._initialized = True
+
+    # ----------------------------------------
+    # Lecture
+    # ----------------------------------------
+
+    def get(self, collection: str, username: str, doc_id: str) -> Optional[Dict[str, Any]]:
+        """Retourne un document par son identifiant, ou None"""
+        row = self._connect().execute(
+            "SELECT data FROM documents WHERE collection=? AND username=? AND doc_id=?",
+            (collection, username, str(doc_id))
+        ).fetchone()
+        return json.loads(row["data"]) if row else None
+
+    def get_all(self, collection: str, username: str) -> List[Dict[str, Any]]:
+        """Retourne tous les documents d'un utilisateur dans l'ordre d'insertion"""
+        rows = self._connect().execute(
+            "SELECT data FROM documents WHERE collection=? AND username=? ORDER BY position",
+            (collection, username)
+        ).fetchall()
+        return [json.loads(row["data"]) for row in rows]
+
+    def query(self, collection: str, username: Optional[str] = None,
+              where: Optional[Dict[str, Any]] = None,
+              order_by: Optional[str] = None, descending: bool = False,
+              limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        Recherche des documents avec des filtres d'égalité sur les champs JSON
+
+        Args:
+            collection: Nom de la collection
+            username: Limiter à un utilisateur (None = tous les utilisateurs)
+            where: {champ: valeur} (champ imbriqué avec des points: "client.nom")
+            order_by: Champ JSON de tri (défaut: ordre d'insertion)
+            descending: Tri décroissant
+            limit: Nombre maximum de documents
+
+        Returns:
+            Liste des documents trouvés
+        """
+        sql = "SELECT data FROM documents WHERE collection=?"
+        params: List[Any] = [collection]
+        if username is not None:
+            sql += " AND username=?"
+            params.append(username)
+        for field, value in (where or {}).items():
+            sql += f" AND json_extract(data, ?) {'IS' if value is None else '='} ?"
+            params.extend([self._json_path(field), value])
+        if order_by:
+            sql += f" ORDER BY json_extract(data, ?) {'DESC' if descending else 'ASC'}"
+            params.append(self._json_path(order_by))
+        else:
+            sql += f" ORDER BY username, position {'DESC' if descending else 'ASC'}"
+        if limit:
+            sql += " LIMIT ?"
+            params.append(int(limit))
+        rows = self._connect().execute(sql, params).fetchall()
+        return [json.loads(row["data"]) for row in rows]
+
+    def count(self, collection: str, username: str) -> int:
+        """Nombre de documents d'un utilisateur"""
+        row = self._connect().execute(
+            "SELECT COUNT(*) FROM documents WHERE collection=? AND username=?",
+            (collection, username)
+        ).fetchone()
+        return row[0]
+
+    # ----------------------------------------
+    # Écriture
+    # ----------------------------------------
+
+    def put(self, collection: str, username: str, doc: Dict[str, Any],
+            doc_id: Optional[str] = None) -> str:
+        """
+        Insère ou remplace un document (même identifiant = remplacement en place)
+
+        Returns:
+            Identifiant du document
+        """
+        doc_id = str(doc_id or document_id(doc) or uuid.uuid4())
+        conn = self._connect()
+        with conn:
+            existing = conn.execute(
+                "SELECT position FROM documents WHERE collection=? AND username=? AND doc_id=?",
+                (collection, username, doc_id)
+            ).fetchone()
+            if existing:
+                position = existing["position"]
+            else:
+                row = conn.execute(
+                    "SELECT COALESCE(MAX(position), -1) + 1 FROM documents WHERE collection=? AND username=?",
+                    (collection, username)
+                ).fetchone()
+                position = row[0]
+            conn.execute(
+                "INSERT OR REPLACE INTO documents (collection, username, doc_id, position, data, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (collection, username, doc_id, position,
+                 json.dumps(doc, ensure_ascii=False), datetime.now().isoformat())
+            )
+        return doc_id
+
+    def patch(self, collection: str, username: str, doc_id: str,
+              changes: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """
+        Met à jour certains champs d'un document sans réécrire les autres
+        (en mode mirror, passer par save_user_documents pour garder le JSON à jour)
+
+        Returns:
+            Le document modifié, ou None si introuvable
+        """
+        conn = self._connect()
+        with conn:
+            row = conn.execute(
+                "SELECT data FROM documents WHERE collection=? AND username=? AND doc_id=?",
+                (collection, username, str(doc_id))
+            ).fetchone()
+            if not row:
+                return None
+            doc = json.loads(row["data"])
+            doc.update(changes)
+            conn.execute(
+                "UPDATE documents SET data=?, updated_at=? WHERE collection=? AND username=? AND doc_id=?",
+                (json.dumps(doc, ensure_ascii=False), datetime.now().isoformat(),
+                 collection, username, str(doc_id))
+            )
+        return doc
+
+    def delete(self, collection: str, username: str, doc_id: str) -> bool:
+        """Supprime un document. Retourne True si un document a été supprimé"""
+        conn = self._connect()
+        with conn:
+            cursor = conn.execute(
+                "DELETE FROM documents WHERE collection=? AND username=? AND doc_id=?",
+                (collection, username, str(doc_id))
+            )
+        return cursor.rowcount > 0
+
+    def replace_all(self, collection: str, username: str, docs: List[Dict[str, Any]],
+                    source_stat: Optional[os.stat_result] = None):
+        """
+        Remplace toute la liste d'un utilisateur (équivalent de l'écriture du fichier JSON)
+        Les documents sans identifiant reçoivent un identifiant positionnel.
+        """
+        now = datetime.now().isoformat()
+        rows = []
+        seen = set()
+        for position, doc in enumerate(docs):
+            doc_id = document_id(doc)
+            if doc_id is None or doc_id in seen:
+                doc_id = f"#{position}"
+            seen.add(doc_id)
+            rows.append((collection, username, doc_id, position,
+                         json.dumps(doc, ensure_ascii=False), now))
+
+        conn = self._connect()
+        with conn:
+            conn.execute("DELETE FROM documents WHERE collection=? AND username=?",
+                         (collection, username))
+            conn.executemany(
+                "INSERT INTO documents (collection, username, doc_id, position, data, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)", rows
+            )
+            self._record_source(conn, collection, username, source_stat, now)
+
+    def usernames(self, collection: str) -> List[str]:
+        """Liste des utilisateurs ayant des documents dans une collection"""
+        rows = self._connect().execute(
+            "SELECT DISTINCT username FROM documents WHERE collection=? ORDER BY username",
+            (collection,)
+        ).fetchall()
+        return [row[0] for row in rows]
+
+    # ----------------------------------------
+    # Suivi du fichier JSON source
+    # ----------------------------------------
+
+    def _record_source(self, conn, collection, username, source_stat, now):
+        conn.execute(
+            "INSERT OR REPLACE INTO document_sources (collection, username, source_mtime_ns, source_size, imported_at) "
+            "VALUES (?, ?, ?, ?, ?)",
+            (collection, username,
+             source_stat.st_mtime_ns if source_stat else None,
+             source_stat.st_size if source_stat else None, now)
+        )
+
+    def source_is_current(self, collection: str, username: str,
+                          source_stat: Optional[os.stat_result]) -> bool:
+        """True si le fichier JSON n'a pas changé depuis le dernier import/écriture"""
+        row = self._connect().execute(
+            "SELECT source_mtime_ns, source_size FROM document_sources WHERE collection=? AND username=?",
+            (collection, username)
+        ).fetchone()
+        if row is None:
+            return False
+        if source_stat is None:
+            return row["source_mtime_ns"] is None
+        return (row["source_mtime_ns"] == source_stat.st_mtime_ns
+                and row["source_size"] == source_stat.st_size)
+
+    def import_legacy_file(self, collection: str, username: str) -> int:
+        """Importe (ou réimporte) le fichier JSON historique. Retourne le nombre de documents"""
+        path = get_legacy_path(collection, username)
+        try:
+            source_stat = os.stat(path)
+        except FileNotFoundError:
+            source_stat = None
+        docs = _read_legacy_file(path)
+        self.replace_all(collection, username, docs, source_stat=source_stat)
+        return len(docs)
+
+    @staticmethod
+    def _json_path(field: str) -> str:
+        if not _FIELD_RE.match(field):
+            raise ValueError(f"Nom de champ invalide: {field}")
+        return "$." + field
+
+
+_store: Optional[DocumentStore] = None
+_store_lock = threading.Lock()
+
+
+def get_document_store() -> DocumentStore:
+    """Retourne l'instance partagée du DocumentStore"""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = DocumentStore()
+    return _store
+
+
+# ===================================
+# SHIM DE COMPATIBILITÉ POUR LES HANDLERS
+# ===================================
+
+def load_user_documents(collection: str, username: str) -> List[Dict[str, Any]]:
+    """
+    Charge la liste d'une collection pour un utilisateur selon le mode de la collection.
+    En mode mirror, si le fichier JSON a été réécrit par un handler pas encore migré,
+    il est réimporté avant la lecture. En mode json, lève json.JSONDecodeError si le fichier est invalide.
+    """
+    mode = get_collection_mode(collection)
+    path = get_legacy_path(collection, username)
+
+    if mode == MODE_JSON:
+        # JSON invalide: l'erreur remonte (500), sinon un handler qui ajoute puis
+        # sauvegarde réécrirait le fichier avec ce seul enregistrement
+        return _read_legacy_file(path)
+
+    store = get_document_store()
+    if mode == MODE_MIRROR:
+        try:
+            source_stat = os.stat(path)
+        except FileNotFoundError:
+            source_stat = None
+        if not store.source_is_current(collection, username, source_stat):
+            try:
+                store.import_legacy_file(collection, username)
+            except json.JSONDecodeError as e:
+                print(f"[DOCS] JSON invalide {path}, lecture depuis SQLite: {e}")
+    return store.get_all(collection, username)
+
+
+def save_user_documents(collection: str, username: str, docs: List[Dict[str, Any]]) -> bool:
+    """
+    Sauvegarde la liste complète d'une collection pour un utilisateur.
+    En mode mirror, le fichier JSON est aussi réécrit pour les handlers pas encore migrés.
+    Les documents reçoivent date_ts / date_ts_from (voir date_index.normalize_record_date).
+    """
+    mode = get_collection_mode(collection)
+    path = get_legacy_path(collection, username)
+    # Champ canonique date_ts pour le filtrage par période (date_index)
+    normalize_records(docs)
+    try:
+        if mode in (MODE_JSON, MODE_MIRROR):
+            _write_legacy_file(path, docs)
+        if mode in (MODE_MIRROR, MODE_STORE):
+            source_stat = os.stat(path) if mode == MODE_MIRROR else None
+            get_document_store().replace_all(collection, username, docs, source_stat=source_stat)
+        return True
+    except Exception as e:
+        print(f"[DOCS] Erreur sauvegarde {collection}/{username}: {e}")
+        return False
@@ -9,6 +9,8 @@ from typing import Dict, List, Optional, Tuple
 import os
 import sys
 
+from db_pool import get_connection
+
 # Base directory du projet
 BASE_DIR = os.path.dirname(__file__)
 
@@ -144,7 +146,7 @@ LEVELS_CONFIG = {
 
 def init_gamification_tables():
     """Initialise les tables de gamification dans la base de données"""
-    conn = sqlite3.connect(DB_PATH)
+    conn = get_connection()
     cursor = conn.cursor()
 
     # Table pour la progression des utilisateurs
@@ -205,7 +207,7 @@ def init_gamification_tables():
 
     # Migration: ajouter la colonne count si elle n'existe pas
     try:
-        conn = sqlite3.connect(DB_PATH)
+        conn = get_connection()
         cursor = conn.cursor()
 
         # Vérifier si la colonne count existe
@@ -333,7 +335,7 @@ def get_badge_icon_path(badge_id: str) -> str:
 
 def get_user_progress(username: str) -> Dict:
     """Récupère la progression d'un utilisateur"""
-    conn = sqlite3.connect(DB_PATH)
+    conn = get_connection()
     cursor = conn.cursor()
 
     cursor.execute("""
@@ -389,7 +391,7 @@ def get_user_progress(username: str) -> Dict:
 
 def create_user_progress(username: str) -> Dict:
     """Crée une nouvelle progression pour un utilisateur"""
-    conn = sqlite3.connect(DB_PATH)
+    conn = get_connection()
     cursor = conn.cursor()
 
     try:
@@ -425,7 +427,7 @@ def award_xp(username: str, xp_amount: int, action_type: str, action_description
     Attribue des XP à un utilisateur pour une action
     Retourne: {old_level, new_level, xp_earned, total_xp, level_up}
     """
-    conn = sqlite3.connect(DB_PATH)
+    conn = get_connection()
     cursor = conn.cursor()
 
     # Récupérer l'XP actuel
@@ -478,7 +480,7 @@ def award_xp(username: str, xp_amount: int, action_type: str, action_description
 
 def get_xp_history(username: str, limit: int = 50) -> List[Dict]:
     """Récupère l'historique des XP d'un utilisateur"""
-    conn = sqlite3.connect(DB_PATH)
+    conn = get_connection()
     cursor = conn.cursor()
 
     cursor.execute("""
@@ -2075,7 +2077,7 @@ def unlock_badge(username: str, badge_id: str, reason: str = "") -> Dict:
     Débloque un badge pour un utilisateur ou incrémente son compteur
     Retourne: {success, badge_info, xp_awarded, count}
     """
-    conn = sqlite3.connect(DB_PATH)
+    conn = get_connection()
     cursor = conn.cursor()
 
     # Vérifier si le badge existe
@@ -2237,7 +2239,7 @@ def remove_badge(username: str, badge_id: str) -> Dict:
     Décrémente le compteur d'un badge ou le supprime si count = 1
     Retourne: {success, badge_info, count, removed}
     """
-    conn = sqlite3.connect(DB_PATH)
+    conn = get_connection()
     cursor = conn.cursor()
 
     # Vérifier si le badge existe
@@ -2367,7 +2369,7 @@ def remove_badge(username: str, badge_id: str) -> Dict:
 
 def get_user_badges(username: str) -> List[Dict]:
     """Récupère tous les badges d'un utilisateur avec XP recalculé et compteur"""
-    conn = sqlite3.connect(DB_PATH)
+    conn = get_connection()
     cursor = conn.cursor()
 
     cursor.execute("""
@@ -2412,7 +2414,7 @@ def get_user_badges(username: str) -> List[Dict]:
 
 def has_badge(username: str, badge_id: str) -> bool:
     """Vérifie si un utilisateur possède un badge"""
-    conn = sqlite3.connect(DB_PATH)
+    conn = get_connection()
     cursor = conn.cursor()
 
     cursor.execute("""
@@ -2431,7 +2433,7 @@ def recalculate_all_user_xp() -> Dict:
     Recalcule l'XP de tous les utilisateurs basé sur leurs badges actifs uniquement
     Fonction de migration pour corriger les données existantes
     """
-    conn = sqlite3.connect(DB_PATH)
+    conn = get_connection()
     cursor = conn.cursor()
 
     # Récupérer tous les utilisateurs
@@ -2586,7 +2588,7 @@ def get_badge_stats(username: str) -> Dict:
 
 def get_leaderboard(limit: int = 100) -> List[Dict]:
     """Récupère le classement des utilisateurs"""
-    conn = sqlite3.connect(DB_PATH)
+    conn = get_connection()
     cursor = conn.cursor()
 
     cursor.execute("""
@@ -2710,7 +2712,7 @@ def check_and_reward_completed_quests(username: str):
         from QE.Backend.rpo import load_user_rpo_data, get_week_number_from_date
         from datetime import timedelta
 
-        conn = sqlite3.connect(DB_PATH)
+        conn = get_connection()
         cursor = conn.cursor()
 
         today = datetime.now()
@@ -2921,7 +2923,7 @@ def check_and_award_automatic_badges(username: str) -> Dict:
 
                 if expected_count > 0:
                     # Vérifier le count actuel en DB
-                    conn = sqlite3.connect(DB_PATH)
+                    conn = get_connection()
                     cursor = conn.cursor()
                     cursor.execute("""
                         SELECT count FROM user_badges
@@ -2957,7 +2959,7 @@ def check_and_award_automatic_badges(username: str) -> Dict:
                 threshold = trigger.get('count', 0)
                 if active_employees_count >= threshold:
                     # Vérifier si le badge existe déjà
-                    conn = sqlite3.connect(DB_PATH)
+                    conn = get_connection()
                     cursor = conn.cursor()
                     cursor.execute("""
                         SELECT count FROM user_badges
@@ -3104,7 +3106,7 @@ def check_and_award_automatic_badges(username: str) -> Dict:
             badge_config = BADGES_CONFIG.get(badge_id, {})
 
             # Obtenir le count actuel du badge
-            conn = sqlite3.connect(DB_PATH)
+            conn = get_connection()
             cursor = conn.cursor()
             cursor.execute("""
                 SELECT count FROM user_badges
@@ -3218,7 +3220,7 @@ def check_and_award_automatic_badges(username: str) -> Dict:
 
                 if current_streak >= required_weeks:
                     # Vérifier si badge déjà attribué
-                    conn = sqlite3.connect(DB_PATH)
+                    conn = get_connection()
                     cursor = conn.cursor()
                     cursor.execute("""
                         SELECT count FROM user_badges
@@ -3293,7 +3295,7 @@ def check_and_award_automatic_badges(username: str) -> Dict:
 
         # Attribuer les badges RPO rempli
         if rpo_filled_count > 0:
-            conn = sqlite3.connect(DB_PATH)
+            conn = get_connection()
             cursor = conn.cursor()
             cursor.execute("SELECT count FROM user_badges WHERE username = ? AND badge_id = ?", (username, 'rpo_rempli'))
             result = cursor.fetchone()
@@ -3313,7 +3315,7 @@ def check_and_award_automatic_badges(username: str) -> Dict:
 
         # Attribuer les anti-badges RPO pas rempli
         if rpo_not_filled_count > 0:
-            conn = sqlite3.connect(DB_PATH)
+            conn = get_connection()
             cursor = conn.cursor()
             cursor.execute("SELECT count FROM user_badges WHERE username = ? AND badge_id = ?", (username, 'oublie_quelque_chose'))
             result = cursor.fetchone()
@@ -3373,7 +3375,7 @@ def check_and_award_automatic_badges(username: str) -> Dict:
 
         # Attribuer les anti-badges PAP insuffisant
         if pap_insufficient_count > 0:
-            conn = sqlite3.connect(DB_PATH)
+            conn = get_connection()
             cursor = conn.cursor()
             cursor.execute("SELECT count FROM user_badges WHERE username = ? AND badge_id = ?", (username, 'perdu_bottes'))
             result = cursor.fetchone()
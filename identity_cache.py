@@ -0,0 +1,126 @@
+"""
+Cache d'identité (par processus) du middleware des pages protégées
+
+Avant: le middleware block_sensitive_files, exécuté pour chaque page HTML
+protégée, ouvrait une connexion SQLite (get_user), relisait et parsait
+signatures/<user>/user_info.json pour vérifier l'onboarding, puis
+interrogeait guide_progress.
+
+Maintenant:
+- Identité = ligne users + onboarding complété + guide complété, gardée
+  IDENTITY_CACHE_TTL_SECONDS en mémoire: aucune lecture disque sur le chemin
+  chaud; en cas d'absence, la lecture complète passe par le pool d'I/O
+- Seules les identités qui passent toutes les vérifications sont gardées: un
+  utilisateur qui vient de terminer son onboarding ou son guide (peut-être
+  sur un autre worker) n'est jamais redirigé à cause d'un état périmé
+- invalidate(username) est appelé par les endpoints de profil, d'onboarding,
+  de guide et de gestion des utilisateurs; les autres workers voient le
+  changement au plus tard après le TTL
+"""
+
+import json
+import os
+import sys
+import threading
+import time
+from typing import Any, Dict, Optional
+
+import config
+from database import get_guide_progress, get_user
+
+# Détection OS pour chemins de fichiers (même logique que main.py)
+if sys.platform == 'win32':
+    base_cloud = os.path.join(os.path.dirname(__file__), 'data')
+else:
+    base_cloud = os.getenv("STORAGE_PATH", "/mnt/cloud")
+
+
+class Identity:
+    """Ce que le middleware vérifie pour un utilisateur"""
+    __slots__ = ("user", "onboarding_ok", "guide_completed")
+
+    def __init__(self, user: Dict[str, Any], onboarding_ok: bool, guide_completed: bool):
+        self.user = user
+        self.onboarding_ok = onboarding_ok
+        self.guide_completed = guide_completed
+
+    @property
+    def complete(self) -> bool:
+        return self.onboarding_ok and self.guide_completed
+
+
+def _onboarding_ok(username: str) -> bool:
+    """Onboarding complété avec prénom et nom renseignés (signatures/<user>/user_info.json)"""
+    info_file = f"{base_cloud}/signatures/{username}/user_info.json"
+    if not os.path.exists(info_file):
+        return False
+    try:
+        with open(info_file, "r", encoding="utf-8") as f:
+            user_details = json.load(f)
+        has_prenom = user_details.get("prenom", "").strip() != ""
+        has_nom = user_details.get("nom", "").strip() != ""
+        onboarding_completed = user_details.get("onboarding_completed", False)
+        return bool(onboarding_completed and has_prenom and has_nom)
+    except Exception as e:
+        print(f"Erreur lecture onboarding pour {username}: {e}")
+        return False
+
+
+def load_identity(username: str) -> Optional[Identity]:
+    """Lecture complète (SQLite + user_info.json), None si l'utilisateur n'existe pas ou est inactif"""
+    user = get_user(username)
+    if not user:
+        return None
+    guide_progress = get_guide_progress(username)
+    guide_completed = guide_progress is not None and guide_progress.get("completed", False)
+    return Identity(user, _onboarding_ok(username), guide_completed)
+
+
+class IdentityCache:
+    """Identités complètes récemment vérifiées, expirées après ttl secondes"""
+
+    def __init__(self, ttl: float = config.IDENTITY_CACHE_TTL_SECONDS):
+        self.ttl = ttl
+        self._entries: Dict[str, tuple] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def cached(self, username: str) -> Optional[Identity]:
+        """Identité en mémoire si encore valide, sans aucune lecture (None sinon)"""
+        with self._lock:
+            entry = self._entries.get(username)
+            if entry is not None and entry[0] > time.monotonic():
+                self.hits += 1
+                return entry[1]
+            return None
+
+    def get(self, username: str) -> Optional[Identity]:
+        """Identité en mémoire, sinon lecture complète (bloquante: SQLite + fichier)"""
+        identity = self.cached(username)
+        if identity is not None:
+            return identity
+
+        with self._lock:
+            self.misses += 1
+        identity = load_identity(username)
+        if identity is not None and identity.complete:
+            with self._lock:
+                self._entries[username] = (time.monotonic() + self.ttl, identity)
+        return identity
+
+    def invalidate(self, username: Optional[str] = None):
+        """Oublie un utilisateur (ou tous si username est None)"""
+        with self._lock:
+            if username is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(username, None)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"entries": len(self._entries), "ttl": self.ttl, "hits": self.hits, "misses": self.misses}
+
+
+# Cache unique du processus
+identity_cache = IdentityCache()
@@ -0,0 +1,380 @@
+"""
+File de tâches persistante (SQLite) pour la génération de PDF et l'envoi de courriels
+
+Avant: /creer-pdf, /creer-facture, ... faisaient le rendu ReportLab + fusion
+PyPDF2 dans la requête, et les envois Gmail bloquaient la requête pendant
+l'appel à Google. Un rendu lent gelait le worker uvicorn.
+
+Maintenant:
+- Rendu dont le résultat est lu tout de suite (lien PDF affiché, signé, envoyé):
+  la route attend run_in_process(), le worker reste libre pendant le rendu
+- Envois Gmail: enqueue() et réponse immédiate avec un job_id; le frontend suit
+  /api/jobs/{job_id} (attendreTache, common.js) avant d'annoncer "envoyé"
+- Les tâches sont stockées dans la table jobs de qwota.db (survivent à un redémarrage)
+- Un thread répartiteur réclame les tâches et les exécute:
+    * "process": pool de processus séparés (rendu PDF, CPU)
+    * "thread":  pool de threads (appels réseau: Gmail)
+- Échec: nouvelle tentative avec délai exponentiel (JOB_RETRY_BASE_SECONDS * 2^n)
+  jusqu'à JOB_MAX_ATTEMPTS, puis statut "failed"
+- Suivi: GET /api/jobs/{job_id} (polling) ou /api/jobs/{job_id}/stream (SSE)
+
+Plusieurs workers uvicorn peuvent partager la table: une tâche est réclamée
+dans une transaction BEGIN IMMEDIATE, donc par un seul worker.
+"""
+
+import asyncio
+import functools
+import multiprocessing
+import os
+import socket
+import threading
+import time
+import traceback
+import uuid
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Dict, Optional
+
+import serialization
+from db_pool import get_connection
+
+JOB_PROCESS_WORKERS = int(os.getenv("JOB_PROCESS_WORKERS", "2"))
+JOB_THREAD_WORKERS = int(os.getenv("JOB_THREAD_WORKERS", "4"))
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "5"))
+JOB_RETRY_BASE_SECONDS = float(os.getenv("JOB_RETRY_BASE_SECONDS", "2"))
+JOB_RETRY_MAX_SECONDS = 300
+
+# Intervalle de vérification de la table quand aucune tâche n'est signalée
+JOB_POLL_SECONDS = 1.0
+
+# Une tâche "running" depuis plus longtemps est considérée perdue (worker tué) et relancée
+JOB_LEASE_SECONDS = 600
+
+# Tâches terminées gardées pour le suivi (jours)
+JOB_RETENTION_DAYS = 7
+
+STATUS_PENDING = "pending"
+STATUS_RUNNING = "running"
+STATUS_DONE = "done"
+STATUS_FAILED = "failed"
+
+_handlers: Dict[str, tuple] = {}   # kind -> (fonction, "process" | "thread")
+
+
+def init_job_tables():
+    """Crée la table des tâches si elle n'existe pas"""
+    with get_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS jobs (
+                id TEXT PRIMARY KEY,
+                kind TEXT NOT NULL,
+                payload TEXT NOT NULL,
+                username TEXT,
+                status TEXT NOT NULL DEFAULT 'pending',
+                attempts INTEGER NOT NULL DEFAULT 0,
+                max_attempts INTEGER NOT NULL DEFAULT 5,
+                run_after REAL NOT NULL,
+                worker TEXT,
+                result TEXT,
+                error TEXT,
+                created_at REAL NOT NULL,
+                started_at REAL,
+                finished_at REAL
+            )
+        ''')
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_jobs_status_run_after
+            ON jobs(status, run_after)
+        ''')
+        conn.commit()
+
+
+def register_handler(kind: str, func: Callable, executor: str = "process"):
+    """
+    Associe un type de tâche à sa fonction: func(payload: dict) -> dict (résultat JSON)
+    En mode "process", func doit être une fonction de module (importable par le processus enfant)
+    """
+    if executor not in ("process", "thread"):
+        raise ValueError(f"Exécuteur inconnu: {executor}")
+    _handlers[kind] = (func, executor)
+
+
+def enqueue(kind: str, payload: dict, username: str = None, max_attempts: int = None,
+            delay: float = 0) -> str:
+    """Ajoute une tâche à la file et retourne son id"""
+    if kind not in _handlers:
+        raise ValueError(f"Aucun handler pour les tâches '{kind}'")
+
+    job_id = uuid.uuid4().hex
+    now = time.time()
+    with get_connection() as conn:
+        conn.execute('''
+            INSERT INTO jobs (id, kind, payload, username, status, max_attempts, run_after, created_at)
+            VALUES (?, ?, ?, ?, 'pending', ?, ?, ?)
+        ''', (job_id, kind, serialization.dumps(payload), username,
+              max_attempts or JOB_MAX_ATTEMPTS, now + delay, now))
+        conn.commit()
+
+    print(f"[JOBS] Tâche {kind} {job_id} ajoutée à la file", flush=True)
+    _runner.wake()
+    return job_id
+
+
+def get_job(job_id: str) -> Optional[Dict[str, Any]]:
+    """Statut d'une tâche (sans son payload)"""
+    with get_connection() as conn:
+        row = conn.execute('''
+            SELECT id, kind, username, status, attempts, max_attempts, run_after,
+                   result, error, created_at, started_at, finished_at
+            FROM jobs WHERE id = ?
+        ''', (job_id,)).fetchone()
+
+    if not row:
+        return None
+    return {
+        "id": row[0],
+        "kind": row[1],
+        "username": row[2],
+        "status": row[3],
+        "attempts": row[4],
+        "max_attempts": row[5],
+        "next_attempt_at": row[6] if row[3] == STATUS_PENDING else None,
+        "result": serialization.loads(row[7]) if row[7] else None,
+        "error": row[8],
+        "created_at": row[9],
+        "started_at": row[10],
+        "finished_at": row[11],
+    }
+
+
+def retry_delay(attempts: int) -> float:
+    """Délai avant la tentative suivante: 2s, 4s, 8s, ... plafonné à JOB_RETRY_MAX_SECONDS"""
+    return min(JOB_RETRY_BASE_SECONDS * (2 ** max(attempts - 1, 0)), JOB_RETRY_MAX_SECONDS)
+
+
+async def run_in_process(func: Callable, *args, **kwargs) -> Any:
+    """
+    Exécute une fonction CPU dans le pool de processus et attend son résultat
+    (pour les routes qui doivent renvoyer le PDF dans la réponse)
+    """
+    loop = asyncio.get_running_loop()
+    call = functools.partial(func, *args, **kwargs)
+    pool = _runner.process_pool()
+    try:
+        return await loop.run_in_executor(pool, call)
+    except BrokenProcessPool:
+        # Processus enfant tué (mémoire, segfault): nouveau pool et une seule nouvelle tentative
+        _runner._discard_broken_process_pool(pool)
+        return await loop.run_in_executor(_runner.process_pool(), call)
+
+
+class JobRunner:
+    """Répartiteur: réclame les tâches dues et les confie aux pools"""
+
+    def __init__(self):
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}"
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._process_pool: Optional[ProcessPoolExecutor] = None
+        self._thread_pool: Optional[ThreadPoolExecutor] = None
+        self._pool_lock = threading.Lock()
+        self._inflight = 0
+        self._inflight_lock = threading.Lock()
+        self._last_maintenance = 0.0
+
+    def process_pool(self) -> ProcessPoolExecutor:
+        with self._pool_lock:
+            if self._process_pool is None:
+                # spawn: pas de fork d'un processus uvicorn qui a déjà des threads
+                self._process_pool = ProcessPoolExecutor(
+                    max_workers=JOB_PROCESS_WORKERS,
+                    mp_context=multiprocessing.get_context("spawn")
+                )
+            return self._process_pool
+
+    def _discard_broken_process_pool(self, pool):
+        """Un processus enfant tué (mémoire, segfault) rend le pool inutilisable: on le recrée"""
+        with self._pool_lock:
+            if self._process_pool is pool:
+                self._process_pool = None
+        pool.shutdown(wait=False)
+        print("[JOBS] Pool de processus cassé, il sera recréé", flush=True)
+
+    def thread_pool(self) -> ThreadPoolExecutor:
+        with self._pool_lock:
+            if self._thread_pool is None:
+                self._thread_pool = ThreadPoolExecutor(
+                    max_workers=JOB_THREAD_WORKERS, thread_name_prefix="qwota-job"
+                )
+            return self._thread_pool
+
+    @property
+    def capacity(self) -> int:
+        return JOB_PROCESS_WORKERS + JOB_THREAD_WORKERS
+
+    def wake(self):
+        self._wake.set()
+
+    # ------------------------------------------------------------------
+
+    def _claim(self, limit: int) -> list:
+        """Réclame jusqu'à `limit` tâches dues (un seul worker obtient chaque tâche)"""
+        now = time.time()
+        kinds = list(_handlers)
+        if not kinds or limit <= 0:
+            return []
+
+        placeholders = ",".join("?" for _ in kinds)
+        with get_connection() as conn:
+            conn.isolation_level = None
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                rows = conn.execute(f'''
+                    SELECT id, kind, payload, attempts, max_attempts FROM jobs
+                    WHERE status = 'pending' AND run_after <= ? AND kind IN ({placeholders})
+                    ORDER BY run_after
+                    LIMIT ?
+                ''', (now, *kinds, limit)).fetchall()
+                conn.executemany('''
+                    UPDATE jobs SET status = 'running', attempts = attempts + 1,
+                                    worker = ?, started_at = ?
+                    WHERE id = ?
+                ''', [(self.worker_id, now, row[0]) for row in rows])
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+
+        return [
+            {"id": row[0], "kind": row[1], "payload": serialization.loads(row[2]),
+             "attempts": row[3] + 1, "max_attempts": row[4]}
+            for row in rows
+        ]
+
+    def _submit(self, job: dict):
+        func, executor = _handlers[job["kind"]]
+        pool = self.process_pool() if executor == "process" else self.thread_pool()
+        with self._inflight_lock:
+            self._inflight += 1
+        try:
+            future = pool.submit(func, job["payload"])
+        except Exception as e:
+            # Pool arrêté ou cassé (processus enfant tué): la tâche sera retentée
+            if isinstance(e, BrokenProcessPool):
+                self._discard_broken_process_pool(pool)
+            self._finish(job, error=f"{type(e).__name__}: {e}")
+            return
+        future.add_done_callback(lambda f: self._on_done(job, pool, f))
+
+    def _on_done(self, job: dict, pool, future):
+        try:
+            result = future.result()
+        except Exception as e:
+            if isinstance(e, BrokenProcessPool):
+                self._discard_broken_process_pool(pool)
+            detail = "".join(traceback.format_exception_only(type(e), e)).strip()
+            self._finish(job, error=detail)
+        else:
+            self._finish(job, result=result)
+
+    def _finish(self, job: dict, result: Any = None, error: str = None):
+        with self._inflight_lock:
+            self._inflight -= 1
+        now = time.time()
+
+        try:
+            with get_connection() as conn:
+                if error is None:
+                    conn.execute('''
+                        UPDATE jobs SET status = 'done', result = ?, error = NULL, finished_at = ?
+                        WHERE id = ?
+                    ''', (serialization.dumps(result) if result is not None else None, now, job["id"]))
+                    print(f"[JOBS] Tâche {job['kind']} {job['id']} terminée", flush=True)
+                elif job["attempts"] >= job["max_attempts"]:
+                    conn.execute('''
+                        UPDATE jobs SET status = 'failed', error = ?, finished_at = ?
+                        WHERE id = ?
+                    ''', (error, now, job["id"]))
+                    print(f"[JOBS] Tâche {job['kind']} {job['id']} en échec définitif: {error}", flush=True)
+                else:
+                    delay = retry_delay(job["attempts"])
+                    conn.execute('''
+                        UPDATE jobs SET status = 'pending', error = ?, run_after = ?
+                        WHERE id = ?
+                    ''', (error, now + delay, job["id"]))
+                    print(f"[JOBS] Tâche {job['kind']} {job['id']} échouée "
+                          f"(tentative {job['attempts']}/{job['max_attempts']}), "
+                          f"nouvel essai dans {delay:.0f}s: {error}", flush=True)
+                conn.commit()
+        except Exception as e:
+            print(f"[JOBS] Erreur mise à jour tâche {job['id']}: {e}", flush=True)
+
+        self.wake()
+
+    def _maintenance(self):
+        """Relance les tâches perdues et purge les anciennes tâches terminées"""
+        now = time.time()
+        with get_connection() as conn:
+            cursor = conn.execute('''
+                UPDATE jobs SET status = 'pending', run_after = ?
+                WHERE status = 'running' AND started_at < ?
+            ''', (now, now - JOB_LEASE_SECONDS))
+            if cursor.rowcount:
+                print(f"[JOBS] {cursor.rowcount} tâche(s) perdue(s) remise(s) en file", flush=True)
+            conn.execute('''
+                DELETE FROM jobs WHERE status IN ('done', 'failed') AND finished_at < ?
+            ''', (now - JOB_RETENTION_DAYS * 86400,))
+            conn.commit()
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                if time.time() - self._last_maintenance > 60:
+                    self._last_maintenance = time.time()
+                    self._maintenance()
+
+                with self._inflight_lock:
+                    free = self.capacity - self._inflight
+                for job in self._claim(free):
+                    self._submit(job)
+            except Exception as e:
+                print(f"[JOBS] Erreur répartiteur: {e}", flush=True)
+
+            self._wake.wait(JOB_POLL_SECONDS)
+            self._wake.clear()
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="job-dispatcher", daemon=True)
+        self._thread.start()
+        print(f"[JOBS] Répartiteur démarré ({JOB_PROCESS_WORKERS} processus, "
+              f"{JOB_THREAD_WORKERS} threads)", flush=True)
+
+    def stop(self):
+        """Arrête le répartiteur; les tâches en cours restent 'running' et seront relancées"""
+        self._stop.set()
+        self._wake.set()
+        if self._thread:
+            self._thread.join(timeout=5)
+        with self._pool_lock:
+            for pool in (self._process_pool, self._thread_pool):
+                if pool is not None:
+                    pool.shutdown(wait=False, cancel_futures=True)
+            self._process_pool = None
+            self._thread_pool = None
+
+
+_runner = JobRunner()
+
+
+def start_job_workers():
+    """Démarre le répartiteur (appelé au startup de l'application)"""
+    _runner.start()
+
+
+def stop_job_workers():
+    _runner.stop()
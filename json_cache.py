@@ -0,0 +1,166 @@
+"""
+Cache partagé (par processus) des fichiers JSON déjà parsés
+
+Les routes lourdes (dashboard équipe coach, tous les employés, compteurs de
+facturation) relisent les mêmes fichiers JSON plusieurs fois par requête et
+d'une requête à l'autre. Ce cache garde le résultat parsé par chemin:
+
+- Validation à chaque lecture par (st_mtime_ns, st_size, st_ino): une écriture
+  faite par un autre worker ou un remplacement atomique (os.replace) est vue.
+- Copie à l'écriture: chaque appel reçoit sa propre copie (restaurée depuis un
+  instantané pickle, plus rapide que json.loads) et peut la modifier librement.
+  readonly=True retourne l'objet partagé, sans copie: l'appelant ne doit PAS le modifier.
+- Budget mémoire LRU en octets (taille des instantanés), JSON_CACHE_MAX_MB.
+- invalidate(path) est appelé par les fonctions d'écriture (utils.save_json_file,
+  save_user_rpo_data, ...) pour ne pas dépendre de la résolution du mtime.
+"""
+
+import os
+import pickle
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Union
+
+import config
+import serialization
+
+
+class _Entry:
+    __slots__ = ("signature", "blob", "shared")
+
+    def __init__(self, signature: tuple, blob: bytes, shared: Any):
+        self.signature = signature
+        self.blob = blob
+        self.shared = shared
+
+
+class JsonCache:
+    """Cache LRU des fichiers JSON parsés, borné en octets"""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self.evictions = 0
+
+    @staticmethod
+    def _key(file_path: Union[str, Path]) -> str:
+        return os.path.abspath(os.fspath(file_path))
+
+    @staticmethod
+    def _signature(st: os.stat_result) -> tuple:
+        return (st.st_mtime_ns, st.st_size, st.st_ino)
+
+    def load(self, file_path: Union[str, Path], default: Any = None, readonly: bool = False) -> Any:
+        """
+        Retourne le contenu parsé du fichier, ou default si le fichier
+        n'existe pas ou est vide. Lève json.JSONDecodeError si le JSON est invalide.
+        """
+        key = self._key(file_path)
+
+        try:
+            st = os.stat(key)
+        except FileNotFoundError:
+            self.invalidate(key)
+            return default
+
+        signature = self._signature(st)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.signature == signature:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry.shared if readonly else pickle.loads(entry.blob)
+            self.misses += 1
+
+        try:
+            with open(key, "rb") as f:
+                # Signature du contenu réellement lu (le fichier a pu être remplacé depuis le stat)
+                signature = self._signature(os.fstat(f.fileno()))
+                content = f.read()
+        except FileNotFoundError:
+            self.invalidate(key)
+            return default
+
+        if not content.strip():
+            self.invalidate(key)
+            return default
+
+        data = serialization.loads(content)
+        blob = pickle.dumps(data, protocol=pickle.HIGHEST_PROTOCOL)
+        self._store(key, _Entry(signature, blob, data))
+        return data if readonly else pickle.loads(blob)
+
+    def _store(self, key: str, entry: _Entry):
+        size = len(entry.blob)
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= len(old.blob)
+
+            # Un fichier plus gros que le quart du budget n'est pas gardé
+            if size > self.max_bytes // 4:
+                return
+
+            self._entries[key] = entry
+            self._bytes += size
+            while self._bytes > self.max_bytes and self._entries:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= len(evicted.blob)
+                self.evictions += 1
+
+    def invalidate(self, file_path: Union[str, Path]):
+        """Retire un fichier du cache (à appeler après chaque écriture)"""
+        key = self._key(file_path)
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is not None:
+                self._bytes -= len(entry.blob)
+                self.invalidations += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / total, 4) if total else 0,
+                "invalidations": self.invalidations,
+                "evictions": self.evictions,
+            }
+
+
+# Instance unique du processus
+_cache = JsonCache(config.JSON_CACHE_MAX_MB * 1024 * 1024)
+
+
+def load_json_cached(file_path: Union[str, Path], default: Any = None, readonly: bool = False) -> Any:
+    """Lecture via le cache partagé (voir JsonCache.load)"""
+    return _cache.load(file_path, default, readonly)
+
+
+def invalidate(file_path: Union[str, Path]):
+    """Invalide l'entrée d'un fichier qui vient d'être écrit"""
+    _cache.invalidate(file_path)
+
+
+def clear_cache():
+    _cache.clear()
+
+
+def get_cache_stats() -> Dict[str, Any]:
+    """Compteurs hits/misses/évictions pour le monitoring"""
+    return _cache.stats()
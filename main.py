@@ -6,6 +6,7 @@ from fastapi import FastAPI, HTTPException, Request, Query, Body, UploadFile, Fi
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 from fastapi.responses import StreamingResponse, RedirectResponse, HTMLResponse, FileResponse, JSONResponse, Response
+from starlette.background import BackgroundTask
 from starlette.status import HTTP_308_PERMANENT_REDIRECT
 from pydantic import BaseModel, EmailStr
 from typing import Optional, List
@@ -25,12 +26,21 @@ from database import (
     get_unread_messages_count, delete_conversation, mark_conversation_resolved,
     get_resolved_today_count, toggle_user_active, delete_user_completely, DB_PATH
 )
+from db_pool import get_connection
+from document_store import load_user_documents, save_user_documents
+import serialization
+from static_assets import asset_store
+from async_io import run_blocking, load_json_async, save_json_async, makedirs_async, save_upload_file, shutdown_io_pool
+from json_cache import load_json_cached, invalidate as invalidate_json_cache, get_cache_stats as get_json_cache_stats
+from identity_cache import identity_cache
+import photo_store
+from date_index import normalize_record_date, load_date_index
+from period_aggregation import load_record_columns, user_record_columns, RpoWeekColumns
 
 # Configuration sécurisée
 import config
 import time
 import glob
-import threading
 
 # Scheduler pour backup automatique
 from apscheduler.schedulers.background import BackgroundScheduler
@@ -39,16 +49,17 @@ from apscheduler.triggers.cron import CronTrigger
 # Backend QE imports
 from QE.Backend.auth import hash_password, verify_password
 from QE.Backend.coach_access import get_entrepreneurs_for_coach
-from QE.Backend.monday_sync import sync_vente_to_monday, update_monday_column, find_monday_item_by_soumission, get_monday_credentials, update_monday_text_column
+from QE.Backend.monday_sync import sync_vente_to_monday, get_monday_credentials
+from QE.Backend import monday_client, monday_outbox
+from QE.Backend.soumission_numbers import allocator as soumission_number_allocator, init_soumission_numeros_tables
+from QE.Backend import facturation_historique
+from QE.Backend import work_queue_index
 
 # Définition locale pour éviter problème de cache avec la fonction importée
 def get_all_entrepreneurs():
     """Retourne tous les entrepreneurs actifs qui ont un coach assigné (sans doublons)"""
     try:
-        import sqlite3
-        from database import get_database_path
-        DB_PATH = get_database_path()
-        with sqlite3.connect(DB_PATH) as conn:
+        with get_connection() as conn:
             cursor = conn.cursor()
             # Ne prendre QUE les entrepreneurs avec un coach assigné
             cursor.execute("""
@@ -82,7 +93,12 @@ from QE.PDF.generate_pdf import generate_pdf
 from QE.PDF.generate_gqp_pdf import generate_gqp_pdf
 from QE.PDF.generate_gqp_html import generate_gqp_html
 from QE.PDF.generate_pdf_facture import generate_facture_pdf
-from QE.PDF.generate_pdf_calcul import generate_calcul_pdf
+from QE.PDF.pdf_jobs import render_soumission_pdf, render_facture_pdf, render_calcul_pdf_bytes
+import job_queue
+from job_queue import enqueue as enqueue_job, get_job, run_in_process
+# Les routes attendent le rendu PDF (run_in_process); handlers gardés pour les tâches déjà en file
+job_queue.register_handler("pdf.soumission", render_soumission_pdf)
+job_queue.register_handler("pdf.facture", render_facture_pdf)
 import uuid
 
 import base64
@@ -105,6 +121,11 @@ from PyPDF2 import PdfReader, PdfWriter
 
 # Gamification system
 import gamification
+from QE.Backend import leaderboard
+from QE.Backend.presence import registry as presence_registry
+from QE.Backend.rpo_sync import scheduler as rpo_sync_scheduler
+from QE.Backend.support_hub import hub as support_hub, user_topic, ADMIN_TOPIC
+from QE.Backend.mobile_photos import rendezvous as mobile_photo_rendezvous, PhotoTooLarge
 from reportlab.pdfgen import canvas as rl_canvas
 from reportlab.lib.pagesizes import letter
 from reportlab.lib.utils import ImageReader
@@ -175,15 +196,25 @@ os.makedirs(f"{base_cloud}/ventes_produit", exist_ok=True)
 
 from pathlib import Path
 BASE_DIR = Path(__file__).resolve().parent
-app = FastAPI()
+
+
+class FastJSONResponse(JSONResponse):
+    """Réponse JSON par défaut: sérialisée par orjson (fallback json standard)"""
+
+    def render(self, content) -> bytes:
+        return serialization.dumps_bytes(content)
+
+
+app = FastAPI(default_response_class=FastJSONResponse)
 
 @app.get("/healthz")
 def health_check():
     return {"status": "ok"}
 
-# Variables globales pour les sessions photo mobile
-mobile_photo_sessions = {}
-mobile_photo_waiters = {}
+@app.get("/healthz/json-cache")
+def json_cache_stats():
+    """Compteurs du cache JSON de ce worker (hits, misses, évictions, mémoire)"""
+    return get_json_cache_stats()
 
 # Note: Les utilisateurs en ligne sont maintenant persistés dans la table 'online_users' en SQLite
 # pour survivre aux redéploiements et fonctionner en production sur Render
@@ -367,10 +398,67 @@ async def startup_event():
 
     print(f"[STARTUP] {len(required_dirs)} dossiers créés/vérifiés")  # 28 dossiers
 
+    # Assets CSS/JS avec empreinte et précompressés (reconstruits si les sources ont changé)
+    await run_blocking(asset_store.load)
+
     print("[STARTUP] Initialisation du système de gamification...")
     gamification.init_gamification_tables()
     print("[STARTUP] Système de gamification initialisé")
 
+    leaderboard.init_leaderboard_tables()
+
+    # Index local soumission -> item Monday (évite de relire tout le board)
+    monday_client.init_monday_tables()
+
+    # Numéros de soumission (table SQLite, import de l'ancienne liste JSON)
+    init_soumission_numeros_tables(NUMEROS_SOUMISSION_FILE)
+
+    # Historique de facturation QE (ajout seul, import de l'ancien historique.json)
+    facturation_historique.init_historique_tables(
+        os.path.join(base_cloud, "facturation_qe_historique", "historique.json")
+    )
+
+    # Index des files de travail coach / comptable (compteurs et listes)
+    work_queue_index.init_work_queue_tables()
+
+    # Synchronisations Monday.com (création d'items, étiquettes, notes) livrées en arrière-plan
+    monday_outbox.init_monday_outbox_tables()
+    monday_outbox.dispatcher.start()
+
+    # Registre de présence en ligne (heartbeats en mémoire, écrits par lot)
+    presence_registry.start()
+
+    # Recalculs RPO regroupés (sync_soumissions_to_rpo) exécutés en arrière-plan
+    rpo_sync_scheduler.start()
+
+    # Diffusion du chat de support (SSE), changements des autres workers compris
+    support_hub.start()
+
+    # Photos mobiles expirées ou abandonnées dans le spool partagé
+    await run_blocking(mobile_photo_rendezvous.evict)
+
+    # File de tâches PDF / courriels (processus séparés, nouvelles tentatives)
+    job_queue.init_job_tables()
+    job_queue.start_job_workers()
+
+    # Reconstruction complète périodique des RPO coach/direction (corrige la dérive des deltas)
+    try:
+        from QE.Backend.rpo import reconcile_rollups
+        rpo_scheduler = BackgroundScheduler(timezone="America/Montreal")
+        rpo_scheduler.add_job(
+            reconcile_rollups,
+            "interval",
+            minutes=int(os.getenv("RPO_RECONCILE_INTERVAL_MINUTES", "60")),
+            id="rpo_reconcile",
+            replace_existing=True,
+            max_instances=1,
+            coalesce=True
+        )
+        rpo_scheduler.start()
+        print("[STARTUP] Réconciliation RPO coach/direction programmée")
+    except Exception as e:
+        print(f"[STARTUP] Erreur configuration réconciliation RPO: {e}")
+
     # Initialiser le scheduler pour le backup automatique (seulement en production)
     if os.path.exists("/mnt/cloud"):
         print("[STARTUP] Configuration du backup automatique Google Drive...")
@@ -398,6 +486,17 @@ async def startup_event():
             print(f"[STARTUP] Erreur configuration backup: {e}")
 
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Écrit les derniers heartbeats, termine les recalculs RPO en attente et libère les pools (I/O, tâches) à l'arrêt du worker"""
+    presence_registry.stop()
+    support_hub.stop()
+    rpo_sync_scheduler.stop()
+    monday_outbox.dispatcher.stop()
+    job_queue.stop_job_workers()
+    shutdown_io_pool()
+
+
 @app.post("/api/admin/backup-gdrive")
 async def trigger_gdrive_backup(request: Request, part: int = 0):
     """Déclenche manuellement un backup vers Google Drive (admin uniquement)
@@ -467,271 +566,258 @@ async def stop_maintenance():
 
 
 @app.get("/onboarding", include_in_schema=False)
-def onboarding_file():
-    return FileResponse(os.path.join(BASE_DIR, "QE", "Frontend", "Common", "onboarding.html"))
+def onboarding_file(request: Request):
+    return asset_store.html_response(request, os.path.join(BASE_DIR, "QE", "Frontend", "Common", "onboarding.html"))
 
 @app.get("/guide", include_in_schema=False)
-def guide_file():
-    return FileResponse(os.path.join(BASE_DIR, "QE", "Frontend", "Common", "guide.html"))
+def guide_file(request: Request):
+    return asset_store.html_response(request, os.path.join(BASE_DIR, "QE", "Frontend", "Common", "guide.html"))
 
 @app.get("/guide-content", include_in_schema=False)
-def guide_content_file():
-    return FileResponse(os.path.join(BASE_DIR, "QE", "Frontend", "Common", "guide-content.html"))
+def guide_content_file(request: Request):
+    return asset_store.html_response(request, os.path.join(BASE_DIR, "QE", "Frontend", "Common", "guide-content.html"))
 
 @app.get("/entrepreneur-selector.css", include_in_schema=False)
-def entrepreneur_selector_css():
+def entrepreneur_selector_css(request: Request):
     """CSS partagé pour le sélecteur entrepreneur (Coach/Direction)"""
-    return FileResponse(
-        os.path.join(BASE_DIR, "QE", "Frontend", "Common", "entrepreneur-selector.css"),
-        media_type="text/css"
-    )
+    return asset_store.legacy_response(request, "Common/entrepreneur-selector.css")
 
 @app.get("/entrepreneur-selector.js", include_in_schema=False)
-def entrepreneur_selector_js():
+def entrepreneur_selector_js(request: Request):
     """JavaScript partagé pour le sélecteur entrepreneur (Coach/Direction)"""
-    return FileResponse(
-        os.path.join(BASE_DIR, "QE", "Frontend", "Common", "entrepreneur-selector.js"),
-        media_type="application/javascript"
-    )
+    return asset_store.legacy_response(request, "Common/entrepreneur-selector.js")
 
 @app.get("/dashboard", include_in_schema=False)
-def dashboard_file():
-    return FileResponse(os.path.join(BASE_DIR, "QE", "Frontend", "Entrepreneurs", "General", "Dashboard", "dashboard_user.html"))
+def dashboard_file(request: Request):
+    return asset_store.html_response(request, os.path.join(BASE_DIR, "QE", "Frontend", "Entrepreneurs", "General", "Dashboard", "dashboard_user.html"))
 
 @app.get("/apppc", include_in_schema=False)
-def apppc_file():
+def apppc_file(request: Request):
     """Application SPA avec menu et header centralises"""
-    response = FileResponse(os.path.join(BASE_DIR, "QE", "Frontend", "Common", "apppc.html"))
-    # Forcer le navigateur a ne pas mettre en cache pour toujours avoir la derniere version
-    response.headers["Cache-Control"] = "no-cache, no-store, must-revalidate, max-age=0"
-    response.headers["Pragma"] = "no-cache"
-    response.headers["Expires"] = "0"
-    return response
+    # Revalidée à chaque chargement (ETag/304): toujours la dernière version, sans tout retélécharger
+    return asset_store.html_response(request, os.path.join(BASE_DIR, "QE", "Frontend", "Common", "apppc.html"))
 
 @app.get("/support-admin", include_in_schema=False)
-def support_admin_file():
+def support_admin_file(request: Request):
     """Page d'administration du support - Accès restreint au rôle support"""
-    return FileResponse(os.path.join(BASE_DIR, "QE", "Frontend", "Common", "support-admin.html"))
+    return asset_store.html_response(request, os.path.join(BASE_DIR, "QE", "Frontend", "Common", "support-admin.html"))
 
 @app.get("/users-online", include_in_schema=False)
-def users_online_file():
+def users_online_file(request: Request):
     """Page affichant les utilisateurs en ligne en temps réel"""
-    return FileResponse(os.path.join(BASE_DIR, "QE", "Frontend", "Admin", "users_online.html"))
+    return asset_store.html_response(request, os.path.join(BASE_DIR, "QE", "Frontend", "Admin", "users_online.html"))
 
 @app.get("/apppcdirection", include_in_schema=False)
-def apppcdirection_file():
+def apppcdirection_file(request: Request):
     """Application SPA pour utilisateurs avec role direction (administration)"""
-    response = FileResponse(os.path.join(BASE_DIR, "QE", "Frontend", "Admin", "apppcdirection.html"))
-    # Forcer le navigateur a ne pas mettre en cache pour toujours avoir la derniere version
-    response.headers["Cache-Control"] = "no-cache, no-store, must-revalidate, max-age=0"
-    response.headers["Pragma"] = "no-cache"
-    response.headers["Expires"] = "0"
-    return response
+    # Revalidée à chaque chargement (ETag/304): toujours la dernière version, sans tout retélécharger
+    return asset_store.html_response(request, os.path.join(BASE_DIR, "QE", "Frontend", "Admin", "apppcdirection.html"))
 
 @app.get("/apppccoach", include_in_schema=False)
-def apppccoach_file():
+def apppccoach_file(request: Request):
     """Application SPA pour utilisateurs avec role coach"""
-    response = FileResponse(os.path.join(BASE_DIR, "QE", "Frontend", "Admin", "apppccoach.html"))
-    # Forcer le navigateur a ne pas mettre en cache pour toujours avoir la derniere version
-    response.headers["Cache-Control"] = "no-cache, no-store, must-revalidate, max-age=0"
-    response.headers["Pragma"] = "no-cache"
-    response.headers["Expires"] = "0"
-    return response
+    # Revalidée à chaque chargement (ETag/304): toujours la dernière version, sans tout retélécharger
+    return asset_store.html_response(request, os.path.join(BASE_DIR, "QE", "Frontend", "Admin", "apppccoach.html"))
 
 @app.get("/coach_travaux", include_in_schema=False)
-def coach_travaux_file():
+def coach_travaux_file(request: Request):
     """Page de gestion des ventes pour les coachs"""
-    return FileResponse(os.path.join(BASE_DIR, "QE", "Frontend", "Admin", "coach_travaux.html"))
+    return asset_store.html_response(request, os.path.join(BASE_DIR, "QE", "Frontend", "Admin", "coach_travaux.html"))
 
 @app.get("/coach_gestionemployes", include_in_schema=False)
-def coach_gestionemployes_file():
+def coach_gestionemployes_file(request: Request):
     """Page de gestion des employés pour les coachs"""
-    return FileResponse(os.path.join(BASE_DIR, "QE", "Frontend", "Admin", "coach_gestionemployes.html"))
+    return asset_store.html_response(request, os.path.join(BASE_DIR, "QE", "Frontend", "Admin", "coach_gestionemployes.html"))
 
 @app.get("/coach_facturationqe", include_in_schema=False)
-def coach_facturationqe_file():
+def coach_facturationqe_file(request: Request):
     """Page de facturation QE pour les coachs"""
-    return FileResponse(os.path.join(BASE_DIR, "QE", "Frontend", "Admin", "coach_facturationqe.html"))
+    return asset_store.html_response(request, os.path.join(BASE_DIR, "QE", "Frontend", "Admin", "coach_facturationqe.html"))
 
 @app.get("/coach_avis", include_in_schema=False)
-def coach_avis_file():
+def coach_avis_file(request: Request):
     """Page de gestion des avis clients pour les coachs"""
-    return FileResponse(os.path.join(BASE_DIR, "QE", "Frontend", "Admin", "coach_avis.html"))
+    return asset_store.html_response(request, os.path.join(BASE_DIR, "QE", "Frontend", "Admin", "coach_avis.html"))
 
 @app.get("/coach_parametres", include_in_schema=False)
-def coach_parametres_file():
+def coach_parametres_file(request: Request):
     """Page de paramètres pour les coachs"""
-    return FileResponse(os.path.join(BASE_DIR, "QE", "Frontend", "Admin", "coach_parametres.html"))
+    return asset_store.html_response(request, os.path.join(BASE_DIR, "QE", "Frontend", "Admin", "coach_parametres.html"))
 
 @app.get("/coach_dashboard", include_in_schema=False)
-def coach_dashboard_file():
+def coach_dashboard_file(request: Request):
     """Page dashboard pour les coachs"""
-    return FileResponse(os.path.join(BASE_DIR, "QE", "Frontend", "Coach", "coach_dashboard.html"))
+    return asset_store.html_response(request, os.path.join(BASE_DIR, "QE", "Frontend", "Coach", "coach_dashboard.html"))
 
 @app.get("/coach_central", include_in_schema=False)
-def coach_central_file():
+def coach_central_file(request: Request):
     """Page centrale de communication pour les coachs (La Centrale)"""
-    return FileResponse(os.path.join(BASE_DIR, "QE", "Frontend", "Admin", "coach_centrale.html"))
+    return asset_store.html_response(request, os.path.join(BASE_DIR, "QE", "Frontend", "Admin", "coach_centrale.html"))
 
 @app.get("/coach_centralevue", include_in_schema=False)
-def coach_centralevue_file():
+def coach_centralevue_file(request: Request):
     """Centrale du coach (vue principale)"""
-    return FileResponse(os.path.join(BASE_DIR, "QE", "Frontend", "Admin", "coach_centralevue.html"))
+    return asset_store.html_response(request, os.path.join(BASE_DIR, "QE", "Frontend", "Admin", "coach_centralevue.html"))
 
 @app.get("/coach_validation_employes", include_in_schema=False)
-def coach_validation_employes_file():
+def coach_validation_employes_file(request: Request):
     """Page de validation des employés pour le coach"""
-    return FileResponse(os.path.join(BASE_DIR, "QE", "Frontend", "Admin", "coach_validation_employes.html"))
+    return asset_store.html_response(request, os.path.join(BASE_DIR, "QE", "Frontend", "Admin", "coach_validation_employes.html"))
 
 @app.get("/direction_facturation", include_in_schema=False)
-def direction_facturation_file():
+def direction_facturation_file(request: Request):
     """Page de facturation pour la direction"""
-    return FileResponse(os.path.join(BASE_DIR, "QE", "Frontend", "Admin", "direction_facturation.html"))
+    return asset_store.html_response(request, os.path.join(BASE_DIR, "QE", "Frontend", "Admin", "direction_facturation.html"))
 
 @app.get("/suivicoach", include_in_schema=False)
-def suivi_coach_file():
+def suivi_coach_file(request: Request):
     """Page de suivi des coachs pour la direction"""
-    return FileResponse(os.path.join(BASE_DIR, "QE", "Frontend", "Admin", "suivicoach.html"))
+    return asset_store.html_response(request, os.path.join(BASE_DIR, "QE", "Frontend", "Admin", "suivicoach.html"))
 
 @app.get("/coach_inactivation_employes", include_in_schema=False)
-def coach_inactivation_employes_file():
+def coach_inactivation_employes_file(request: Request):
     """Page des demandes d'inactivation pour le coach"""
-    return FileResponse(os.path.join(BASE_DIR, "QE", "Frontend", "Admin", "coach_inactivation_employes.html"))
+    return asset_store.html_response(request, os.path.join(BASE_DIR, "QE", "Frontend", "Admin", "coach_inactivation_employes.html"))
 
 @app.get("/coach_mon_equipe", include_in_schema=False)
-def coach_mon_equipe_file():
+def coach_mon_equipe_file(request: Request):
     """Page Mon équipe pour les coachs"""
-    return FileResponse(os.path.join(BASE_DIR, "QE", "Frontend", "Coach", "mon_equipe_coach.html"))
+    return asset_store.html_response(request, os.path.join(BASE_DIR, "QE", "Frontend", "Coach", "mon_equipe_coach.html"))
 
 @app.get("/coach_rpo", include_in_schema=False)
-def coach_rpo_file():
+def coach_rpo_file(request: Request):
     """Page RPO pour les coachs"""
-    return FileResponse(os.path.join(BASE_DIR, "QE", "Frontend", "Coach", "coach_rpo.html"))
+    return asset_store.html_response(request, os.path.join(BASE_DIR, "QE", "Frontend", "Coach", "coach_rpo.html"))
 
 @app.get("/coach_plaintes", include_in_schema=False)
-def coach_plaintes_file():
+def coach_plaintes_file(request: Request):
     """Page Gestion de Plaintes pour les coachs"""
-    return FileResponse(os.path.join(BASE_DIR, "QE", "Frontend", "Coach", "coach_plaintes.html"))
+    return asset_store.html_response(request, os.path.join(BASE_DIR, "QE", "Frontend", "Coach", "coach_plaintes.html"))
 
 @app.get("/direction_rpo", include_in_schema=False)
-def direction_rpo_file():
+def direction_rpo_file(request: Request):
     """Page RPO pour la direction"""
-    return FileResponse(os.path.join(BASE_DIR, "QE", "Frontend", "Admin", "direction_rpo.html"))
+    return asset_store.html_response(request, os.path.join(BASE_DIR, "QE", "Frontend", "Admin", "direction_rpo.html"))
 
 @app.get("/entrepreneur_centralevue", include_in_schema=False)
-def entrepreneur_centralevue_file():
+def entrepreneur_centralevue_file(request: Request):
     """Centrale des entrepreneurs (vue principale)"""
-    return FileResponse(os.path.join(BASE_DIR, "QE", "Frontend", "Admin", "entrepreneur_centralevue.html"))
+    return asset_store.html_response(request, os.path.join(BASE_DIR, "QE", "Frontend", "Admin", "entrepreneur_centralevue.html"))
 
 @app.get("/parametreadmin", include_in_schema=False)
-def parametreadmin_file():
+def parametreadmin_file(request: Request):
     """Page de parametres pour administrateurs (role direction)"""
-    return FileResponse(os.path.join(BASE_DIR, "QE", "Frontend", "Admin", "admin_users.html"))
+    return asset_store.html_response(request, os.path.join(BASE_DIR, "QE", "Frontend", "Admin", "admin_users.html"))
 
 @app.get("/parametredirection", include_in_schema=False)
-def parametredirection_file():
+def parametredirection_file(request: Request):
     """Page de parametres personnels pour direction"""
-    return FileResponse(os.path.join(BASE_DIR, "QE", "Frontend", "Admin", "parametredirection.html"))
+    return asset_store.html_response(request, os.path.join(BASE_DIR, "QE", "Frontend", "Admin", "parametredirection.html"))
 
 @app.get("/calcul", include_in_schema=False)
-def calcul_file():
-    return FileResponse(os.path.join(BASE_DIR, "QE", "Frontend", "Entrepreneurs", "Outils", "Calcul", "calcul.html"))
+def calcul_file(request: Request):
+    return asset_store.html_response(request, os.path.join(BASE_DIR, "QE", "Frontend", "Entrepreneurs", "Outils", "Calcul", "calcul.html"))
 
 @app.get("/outilsmobile", include_in_schema=False)
-def outilsmobile_file():
-    return FileResponse(os.path.join(BASE_DIR, "QE", "Frontend", "Entrepreneurs", "Mobile", "outils-mobile.html"))
+def outilsmobile_file(request: Request):
+    return asset_store.html_response(request, os.path.join(BASE_DIR, "QE", "Frontend", "Entrepreneurs", "Mobile", "outils-mobile.html"))
 
 @app.get("/gestionsmobile", include_in_schema=False)
-def gestionsmobile_file():
-    return FileResponse(os.path.join(BASE_DIR, "QE", "Frontend", "Entrepreneurs", "Mobile", "gestions-mobile.html"))
+def gestionsmobile_file(request: Request):
+    return asset_store.html_response(request, os.path.join(BASE_DIR, "QE", "Frontend", "Entrepreneurs", "Mobile", "gestions-mobile.html"))
 
 @app.get("/app", include_in_schema=False)
-def app_shell():
-    return FileResponse(os.path.join(BASE_DIR, "QE", "Frontend", "Common", "apppc.html"))
+def app_shell(request: Request):
+    return asset_store.html_response(request, os.path.join(BASE_DIR, "QE", "Frontend", "Common", "apppc.html"))
 
 @app.get("/base.css", include_in_schema=False)
-def base_css_file():
-    return FileResponse(os.path.join(BASE_DIR, "QE", "Frontend", "Common", "base.css"))
+def base_css_file(request: Request):
+    return asset_store.legacy_response(request, "Common/base.css")
 
 @app.get("/dashboard_user.css", include_in_schema=False)
-def dashboard_user_css_file():
-    return FileResponse(os.path.join(BASE_DIR, "QE", "Frontend", "Entrepreneurs", "General", "Dashboard", "dashboard_user.css"))
+def dashboard_user_css_file(request: Request):
+    return asset_store.legacy_response(request, "Entrepreneurs/General/Dashboard/dashboard_user.css")
 
 @app.get("/connect_agenda.css", include_in_schema=False)
-def connect_agenda_css_file():
-    return FileResponse(os.path.join(BASE_DIR, "QE", "Frontend", "Entrepreneurs", "General", "Parametres", "connect_agenda.css"))
+def connect_agenda_css_file(request: Request):
+    return asset_store.legacy_response(request, "Entrepreneurs/General/Parametres/connect_agenda.css")
 
 @app.get("/rpo.css", include_in_schema=False)
-def rpo_css_file():
-    return FileResponse(os.path.join(BASE_DIR, "QE", "Frontend", "Entrepreneurs", "General", "RPO", "rpo.css"))
+def rpo_css_file(request: Request):
+    return asset_store.legacy_response(request, "Entrepreneurs/General/RPO/rpo.css")
 
 @app.get("/Centralevue.css", include_in_schema=False)
-def centralevue_css_file():
-    return FileResponse(os.path.join(BASE_DIR, "QE", "Frontend", "Entrepreneurs", "General", "La Centrale", "Centralevue.css"))
+def centralevue_css_file(request: Request):
+    return asset_store.legacy_response(request, "Entrepreneurs/General/La Centrale/Centralevue.css")
 
 @app.get("/Centralevue.js", include_in_schema=False)
-def centralevue_js_file():
-    return FileResponse(os.path.join(BASE_DIR, "QE", "Frontend", "Entrepreneurs", "General", "La Centrale", "Centralevue.js"), media_type="application/javascript")
+def centralevue_js_file(request: Request):
+    return asset_store.legacy_response(request, "Entrepreneurs/General/La Centrale/Centralevue.js")
 
 @app.get("/gamification.css", include_in_schema=False)
-def gamification_css_file():
-    return FileResponse(os.path.join(BASE_DIR, "QE", "Frontend", "Entrepreneurs", "General", "Niveaux & trophees", "gamification.css"))
+def gamification_css_file(request: Request):
+    return asset_store.legacy_response(request, "Entrepreneurs/General/Niveaux & trophees/gamification.css")
 
 @app.get("/calcul.css", include_in_schema=False)
-def calcul_css_file():
-    return FileResponse(os.path.join(BASE_DIR, "QE", "Frontend", "Entrepreneurs", "Outils", "Calcul", "calcul.css"))
+def calcul_css_file(request: Request):
+    return asset_store.legacy_response(request, "Entrepreneurs/Outils/Calcul/calcul.css")
 
 @app.get("/facture.css", include_in_schema=False)
-def facture_css_file():
-    return FileResponse(os.path.join(BASE_DIR, "QE", "Frontend", "Entrepreneurs", "Outils", "Facturation Client", "facture.css"))
+def facture_css_file(request: Request):
+    return asset_store.legacy_response(request, "Entrepreneurs/Outils/Facturation Client/facture.css")
 
 @app.get("/gqp.css", include_in_schema=False)
-def gqp_css_file():
-    return FileResponse(os.path.join(BASE_DIR, "QE", "Frontend", "Entrepreneurs", "Outils", "GQP", "gqp.css"))
+def gqp_css_file(request: Request):
+    return asset_store.legacy_response(request, "Entrepreneurs/Outils/GQP/gqp.css")
 
 @app.get("/soumission.css", include_in_schema=False)
-def soumission_css_file():
-    return FileResponse(os.path.join(BASE_DIR, "QE", "Frontend", "Entrepreneurs", "Outils", "Soumission", "soumission.css"))
+def soumission_css_file(request: Request):
+    return asset_store.legacy_response(request, "Entrepreneurs/Outils/Soumission/soumission.css")
 
 @app.get("/avis.css", include_in_schema=False)
-def avis_css_file():
-    return FileResponse(os.path.join(BASE_DIR, "QE", "Frontend", "Entrepreneurs", "Gestions", "Avis", "avis.css"))
+def avis_css_file(request: Request):
+    return asset_store.legacy_response(request, "Entrepreneurs/Gestions/Avis/avis.css")
 
 @app.get("/gestionemployes.css", include_in_schema=False)
-def gestionemployes_css_file():
-    return FileResponse(os.path.join(BASE_DIR, "QE", "Frontend", "Entrepreneurs", "Gestions", "Employes", "gestionemployes.css"))
+def gestionemployes_css_file(request: Request):
+    return asset_store.legacy_response(request, "Entrepreneurs/Gestions/Employes/gestionemployes.css")
 
 @app.get("/FacturationQE.css", include_in_schema=False)
-def facturation_qe_css_file():
-    return FileResponse(os.path.join(BASE_DIR, "QE", "Frontend", "Entrepreneurs", "Gestions", "Facturation QE", "FacturationQE.css"))
+def facturation_qe_css_file(request: Request):
+    return asset_store.legacy_response(request, "Entrepreneurs/Gestions/Facturation QE/FacturationQE.css")
 
 @app.get("/Ventes.css", include_in_schema=False)
-def ventes_css_file():
-    return FileResponse(os.path.join(BASE_DIR, "QE", "Frontend", "Entrepreneurs", "Gestions", "Ventes", "Ventes.css"))
+def ventes_css_file(request: Request):
+    return asset_store.legacy_response(request, "Entrepreneurs/Gestions/Ventes/Ventes.css")
 
 @app.get("/centraleadmin.css", include_in_schema=False)
-def centraleadmin_css():
-    return FileResponse(os.path.join(BASE_DIR, "QE", "Frontend", "Admin", "centraleadmin.css"), media_type="text/css")
+def centraleadmin_css(request: Request):
+    return asset_store.legacy_response(request, "Admin/centraleadmin.css")
 
 @app.get("/centraleadmin.js", include_in_schema=False)
-def centraleadmin_js():
-    return FileResponse(os.path.join(BASE_DIR, "QE", "Frontend", "Admin", "centraleadmin.js"), media_type="application/javascript")
+def centraleadmin_js(request: Request):
+    return asset_store.legacy_response(request, "Admin/centraleadmin.js")
 
 @app.get("/centraleadmin_monday.css", include_in_schema=False)
-def centraleadmin_monday_css():
-    return FileResponse(os.path.join(BASE_DIR, "QE", "Frontend", "Admin", "centraleadmin_monday.css"), media_type="text/css")
+def centraleadmin_monday_css(request: Request):
+    return asset_store.legacy_response(request, "Admin/centraleadmin_monday.css")
 
 @app.get("/centraleadmin_monday.js", include_in_schema=False)
-def centraleadmin_monday_js():
-    return FileResponse(os.path.join(BASE_DIR, "QE", "Frontend", "Admin", "centraleadmin_monday.js"), media_type="application/javascript")
+def centraleadmin_monday_js(request: Request):
+    return asset_store.legacy_response(request, "Admin/centraleadmin_monday.js")
 
 @app.get("/centraleadmin_monday_fichiers.js", include_in_schema=False)
-def centraleadmin_monday_fichiers_js():
-    return FileResponse(os.path.join(BASE_DIR, "QE", "Frontend", "Admin", "centraleadmin_monday_fichiers.js"), media_type="application/javascript")
+def centraleadmin_monday_fichiers_js(request: Request):
+    return asset_store.legacy_response(request, "Admin/centraleadmin_monday_fichiers.js")
 
 @app.get("/admin_users.css", include_in_schema=False)
-def admin_users_css():
-    return FileResponse(os.path.join(BASE_DIR, "QE", "Frontend", "Admin", "admin_users.css"), media_type="text/css")
+def admin_users_css(request: Request):
+    return asset_store.legacy_response(request, "Admin/admin_users.css")
+
+@app.get("/assets/{filename}", include_in_schema=False)
+def frontend_asset(filename: str, request: Request):
+    """CSS/JS avec empreinte (build/assets): cache immutable, br/gzip, ETag (voir static_assets.py)"""
+    return asset_store.asset_response(request, filename)
 
 @app.get("/api/version")
 def get_version():
@@ -745,12 +831,12 @@ def get_version():
         return JSONResponse(content={"version": "1.0.0", "lastUpdate": datetime.now(timezone.utc).isoformat()})
 
 @app.get("/soumissions", include_in_schema=False)
-def soumissions_file():
-    return FileResponse(os.path.join(BASE_DIR, "QE", "Frontend", "Entrepreneurs", "Outils", "Soumission", "soumission.html"))
+def soumissions_file(request: Request):
+    return asset_store.html_response(request, os.path.join(BASE_DIR, "QE", "Frontend", "Entrepreneurs", "Outils", "Soumission", "soumission.html"))
 
 @app.get("/avis", include_in_schema=False)
-def avis_file():
-    return FileResponse(os.path.join(BASE_DIR, "QE", "Frontend", "Entrepreneurs", "Gestions", "Avis", "avis.html"))
+def avis_file(request: Request):
+    return asset_store.html_response(request, os.path.join(BASE_DIR, "QE", "Frontend", "Entrepreneurs", "Gestions", "Avis", "avis.html"))
 
 @app.get("/api/reviews/{username}")
 def get_reviews(username: str):
@@ -775,147 +861,143 @@ def get_reviews(username: str):
     return {"reviews": reviews}
 
 @app.get("/signer-soumission", include_in_schema=False)
-def signer_soumission_file():
-    return FileResponse(os.path.join(BASE_DIR, "QE", "Frontend", "Common", "Signer-soumission.html"))
+def signer_soumission_file(request: Request):
+    return asset_store.html_response(request, os.path.join(BASE_DIR, "QE", "Frontend", "Common", "Signer-soumission.html"))
 
 @app.get("/connection", include_in_schema=False)
-def connection_file():
-    return FileResponse(os.path.join(BASE_DIR, "QE", "Frontend", "Entrepreneurs", "General", "Parametres", "connect_agenda.html"))
+def connection_file(request: Request):
+    return asset_store.html_response(request, os.path.join(BASE_DIR, "QE", "Frontend", "Entrepreneurs", "General", "Parametres", "connect_agenda.html"))
 
 @app.get("/politique", include_in_schema=False)
-def politique_file():
-    return FileResponse(os.path.join(BASE_DIR, "QE", "Frontend", "politique.html"))
+def politique_file(request: Request):
+    return asset_store.html_response(request, os.path.join(BASE_DIR, "QE", "Frontend", "politique.html"))
 
 @app.get("/conditions", include_in_schema=False)
-def conditions_file():
-    return FileResponse(os.path.join(BASE_DIR, "QE", "Frontend", "conditions.html"))
+def conditions_file(request: Request):
+    return asset_store.html_response(request, os.path.join(BASE_DIR, "QE", "Frontend", "conditions.html"))
 
 @app.get("/support", include_in_schema=False)
-def support_file():
-    return FileResponse(os.path.join(BASE_DIR, "QE", "Frontend", "support.html"))
+def support_file(request: Request):
+    return asset_store.html_response(request, os.path.join(BASE_DIR, "QE", "Frontend", "support.html"))
 
 @app.get("/test-functions", include_in_schema=False)
-def test_functions_file():
-    return FileResponse(os.path.join(BASE_DIR, "QE", "Frontend", "test_functions.html"))
+def test_functions_file(request: Request):
+    return asset_store.html_response(request, os.path.join(BASE_DIR, "QE", "Frontend", "test_functions.html"))
 
 @app.get("/politiquepublic", include_in_schema=False)
-def politique_public_file():
-    return FileResponse(os.path.join(BASE_DIR, "Qwota", "Frontend", "politiquepublic.html"))
+def politique_public_file(request: Request):
+    return asset_store.html_response(request, os.path.join(BASE_DIR, "Qwota", "Frontend", "politiquepublic.html"))
 
 @app.get("/conditionspublic", include_in_schema=False)
-def conditions_public_file():
-    return FileResponse(os.path.join(BASE_DIR, "Qwota", "Frontend", "conditionspublic.html"))
+def conditions_public_file(request: Request):
+    return asset_store.html_response(request, os.path.join(BASE_DIR, "Qwota", "Frontend", "conditionspublic.html"))
 
 @app.get("/gqp", include_in_schema=False)
-def gqp_file():
-    return FileResponse(os.path.join(BASE_DIR, "QE", "Frontend", "Entrepreneurs", "Outils", "GQP", "gqp.html"))
+def gqp_file(request: Request):
+    return asset_store.html_response(request, os.path.join(BASE_DIR, "QE", "Frontend", "Entrepreneurs", "Outils", "GQP", "gqp.html"))
 
 @app.get("/rpo", include_in_schema=False)
-def rpo_file():
-    return FileResponse(os.path.join(BASE_DIR, "QE", "Frontend", "Entrepreneurs", "General", "RPO", "rpo.html"))
+def rpo_file(request: Request):
+    return asset_store.html_response(request, os.path.join(BASE_DIR, "QE", "Frontend", "Entrepreneurs", "General", "RPO", "rpo.html"))
 
 @app.get("/gestionemployes", include_in_schema=False)
-def gestion_employes_file():
-    return FileResponse(os.path.join(BASE_DIR, "QE", "Frontend", "Entrepreneurs", "Gestions", "Employes", "gestionemployes.html"))
+def gestion_employes_file(request: Request):
+    return asset_store.html_response(request, os.path.join(BASE_DIR, "QE", "Frontend", "Entrepreneurs", "Gestions", "Employes", "gestionemployes.html"))
 
 @app.get("/travaux", include_in_schema=False)
-def travaux_file():
-    return FileResponse(os.path.join(BASE_DIR, "QE", "Frontend", "Entrepreneurs", "Gestions", "Ventes", "Ventes.html"))
+def travaux_file(request: Request):
+    return asset_store.html_response(request, os.path.join(BASE_DIR, "QE", "Frontend", "Entrepreneurs", "Gestions", "Ventes", "Ventes.html"))
 
 @app.get("/login")
-def read_index():
-    return FileResponse(os.path.join(BASE_DIR, "QE", "Frontend", "Common", "login.html"))
+def read_index(request: Request):
+    return asset_store.html_response(request, os.path.join(BASE_DIR, "QE", "Frontend", "Common", "login.html"))
 
 @app.get("/mobile-blocked")
-def mobile_blocked():
-    return FileResponse(os.path.join(BASE_DIR, "QE", "Frontend", "mobile-blocked.html"))
+def mobile_blocked(request: Request):
+    return asset_store.html_response(request, os.path.join(BASE_DIR, "QE", "Frontend", "mobile-blocked.html"))
 
 @app.get("/contact")
-def read_index():
-    return FileResponse(os.path.join(BASE_DIR, "Qwota", "Frontend", "contact.html"))
+def read_index(request: Request):
+    return asset_store.html_response(request, os.path.join(BASE_DIR, "Qwota", "Frontend", "contact.html"))
 
 @app.get("/avisclient", include_in_schema=False)
-def avisclient_file():
-    return FileResponse(os.path.join(BASE_DIR, "QE", "Frontend", "Common", "reviews.html"))
+def avisclient_file(request: Request):
+    return asset_store.html_response(request, os.path.join(BASE_DIR, "QE", "Frontend", "Common", "reviews.html"))
 
 @app.get("/plainte", include_in_schema=False)
-def plainte_file():
-    return FileResponse(os.path.join(BASE_DIR, "QE", "Frontend", "Common", "plainte.html"))
+def plainte_file(request: Request):
+    return asset_store.html_response(request, os.path.join(BASE_DIR, "QE", "Frontend", "Common", "plainte.html"))
 
 
 @app.get("/facture")
-def facture_index():
-    return FileResponse(os.path.join(BASE_DIR, "QE", "Frontend", "Entrepreneurs", "Outils", "Facturation Client", "facture.html"))
+def facture_index(request: Request):
+    return asset_store.html_response(request, os.path.join(BASE_DIR, "QE", "Frontend", "Entrepreneurs", "Outils", "Facturation Client", "facture.html"))
 
 @app.get("/facturationqe")
-def facturationqe_file():
-    return FileResponse(os.path.join(BASE_DIR, "QE", "Frontend", "Entrepreneurs", "Gestions", "Facturation QE", "Facturation QE.html"))
+def facturationqe_file(request: Request):
+    return asset_store.html_response(request, os.path.join(BASE_DIR, "QE", "Frontend", "Entrepreneurs", "Gestions", "Facturation QE", "Facturation QE.html"))
 
 @app.get("/newfacturationqe")
-def newfacturationqe_file():
-    return FileResponse(os.path.join(BASE_DIR, "QE", "Frontend", "Entrepreneurs", "Gestions", "Facturation QE", "Facturation QE.html"))
+def newfacturationqe_file(request: Request):
+    return asset_store.html_response(request, os.path.join(BASE_DIR, "QE", "Frontend", "Entrepreneurs", "Gestions", "Facturation QE", "Facturation QE.html"))
 
 @app.get("/centrale")
-def centrale_index():
-    return FileResponse(os.path.join(BASE_DIR, "QE", "Frontend", "Entrepreneurs", "Gestions", "Ventes", "Ventes.html"))
+def centrale_index(request: Request):
+    return asset_store.html_response(request, os.path.join(BASE_DIR, "QE", "Frontend", "Entrepreneurs", "Gestions", "Ventes", "Ventes.html"))
 
 @app.get("/ventes")
-def ventes_index():
-    return FileResponse(os.path.join(BASE_DIR, "QE", "Frontend", "Entrepreneurs", "Gestions", "Ventes", "Ventes.html"))
+def ventes_index(request: Request):
+    return asset_store.html_response(request, os.path.join(BASE_DIR, "QE", "Frontend", "Entrepreneurs", "Gestions", "Ventes", "Ventes.html"))
 
 @app.get("/centralevue")
-def centralevue_index():
-    return FileResponse(os.path.join(BASE_DIR, "QE", "Frontend", "Entrepreneurs", "Gestions", "Centrale", "centralevue.html"))
+def centralevue_index(request: Request):
+    return asset_store.html_response(request, os.path.join(BASE_DIR, "QE", "Frontend", "Entrepreneurs", "Gestions", "Centrale", "centralevue.html"))
 
 @app.get("/gamification")
-def gamification_page():
-    response = FileResponse(os.path.join(BASE_DIR, "QE", "Frontend", "Entrepreneurs", "General", "Niveaux & trophees", "gamification.html"))
-    # Forcer le navigateur a ne pas mettre en cache pour toujours avoir la derniere version
-    response.headers["Cache-Control"] = "no-cache, no-store, must-revalidate, max-age=0"
-    response.headers["Pragma"] = "no-cache"
-    response.headers["Expires"] = "0"
-    return response
+def gamification_page(request: Request):
+    # Revalidée à chaque chargement (ETag/304): toujours la dernière version, sans tout retélécharger
+    return asset_store.html_response(request, os.path.join(BASE_DIR, "QE", "Frontend", "Entrepreneurs", "General", "Niveaux & trophees", "gamification.html"))
 
 @app.get("/badge_assignment")
-def badge_assignment_page():
+def badge_assignment_page(request: Request):
     """Page d'assignation de badges pour la direction """
-    return FileResponse(os.path.join(BASE_DIR, "QE", "Frontend", "Admin", "badge_assignment.html"))
+    return asset_store.html_response(request, os.path.join(BASE_DIR, "QE", "Frontend", "Admin", "badge_assignment.html"))
 
 @app.get("/centraleadmin")
-def centrale_admin_page():
+def centrale_admin_page(request: Request):
     """Page de la centrale admin pour la direction"""
-    return FileResponse(os.path.join(BASE_DIR, "QE", "Frontend", "Admin", "centraleadmin.html"))
+    return asset_store.html_response(request, os.path.join(BASE_DIR, "QE", "Frontend", "Admin", "centraleadmin.html"))
 
 @app.get("/centraleadmin_monday")
-def centrale_admin_monday_page():
+def centrale_admin_monday_page(request: Request):
     """Page de la centrale admin Monday.com pour la direction"""
-    return FileResponse(os.path.join(BASE_DIR, "QE", "Frontend", "Admin", "centraleadmin_monday.html"))
+    return asset_store.html_response(request, os.path.join(BASE_DIR, "QE", "Frontend", "Admin", "centraleadmin_monday.html"))
 
 @app.get("/connect-agenda")
-def connect_agenda_page():
+def connect_agenda_page(request: Request):
     """Page de connexion Google Calendar et Gmail"""
-    return FileResponse(os.path.join(BASE_DIR, "QE", "Frontend", "Entrepreneurs", "General", "Parametres", "connect_agenda.html"))
+    return asset_store.html_response(request, os.path.join(BASE_DIR, "QE", "Frontend", "Entrepreneurs", "General", "Parametres", "connect_agenda.html"))
 
 @app.get("/")
-def read_index():
-    return FileResponse(os.path.join(BASE_DIR, "Qwota", "Frontend", "index.html"))
+def read_index(request: Request):
+    return asset_store.html_response(request, os.path.join(BASE_DIR, "Qwota", "Frontend", "index.html"))
 
 @app.get("/apppc")
-def read_apppc():
+def read_apppc(request: Request):
     """Page principale pour les entrepreneurs (responsive mobile et PC)"""
-    return FileResponse(os.path.join(BASE_DIR, "QE", "Frontend", "Common", "apppc.html"))
+    return asset_store.html_response(request, os.path.join(BASE_DIR, "QE", "Frontend", "Common", "apppc.html"))
 
 @app.get("/favicon", include_in_schema=False)
 def favicon():
     return FileResponse(os.path.join(BASE_DIR, "QE", "Frontend", "Common", "favicon.ico"))
 
 @app.get("/common.js", include_in_schema=False)
-def common_js():
-    return FileResponse(os.path.join(BASE_DIR, "QE", "Frontend", "Common", "common.js"), media_type="application/javascript")
+def common_js(request: Request):
+    return asset_store.legacy_response(request, "Common/common.js")
 
 @app.get("/frontend/common.js", include_in_schema=False)
-def frontend_common_js():
-    return FileResponse(os.path.join(BASE_DIR, "QE", "Frontend", "Common", "common.js"), media_type="application/javascript")
+def frontend_common_js(request: Request):
+    return asset_store.legacy_response(request, "Common/common.js")
 
 @app.get("/robots.txt", include_in_schema=False)
 def robots():
@@ -943,20 +1025,20 @@ def download_windows_app():
 
 
 @app.get("/dashboardcoach", include_in_schema=False)
-def dashboardcoach_file():
-    return FileResponse(os.path.join(BASE_DIR, "QE", "Frontend", "Coach", "Parametrecoach.html"))
+def dashboardcoach_file(request: Request):
+    return asset_store.html_response(request, os.path.join(BASE_DIR, "QE", "Frontend", "Coach", "Parametrecoach.html"))
 
 @app.get("/parametrecoach", include_in_schema=False)
-def parametrecoach_file():
-    return FileResponse(os.path.join(BASE_DIR, "QE", "Frontend", "Coach", "Parametrecoach.html"))
+def parametrecoach_file(request: Request):
+    return asset_store.html_response(request, os.path.join(BASE_DIR, "QE", "Frontend", "Coach", "Parametrecoach.html"))
 
 @app.get("/gestionventescoach", include_in_schema=False)
-def gestionventescoach_file():
-    return FileResponse(os.path.join(BASE_DIR, "QE", "Frontend", "Coach", "Parametrecoach.html"))
+def gestionventescoach_file(request: Request):
+    return asset_store.html_response(request, os.path.join(BASE_DIR, "QE", "Frontend", "Coach", "Parametrecoach.html"))
 
 @app.get("/template", include_in_schema=False)
-def template_file():
-    return FileResponse(os.path.join(BASE_DIR, "QE", "Frontend", "template.html"))
+def template_file(request: Request):
+    return asset_store.html_response(request, os.path.join(BASE_DIR, "QE", "Frontend", "template.html"))
 
 
 # 🔐 Middleware CORS sécurisé
@@ -1191,7 +1273,7 @@ async def get_user_profile(username: str):
     print(f"[PROFILE DEBUG] START - username={username}, DB_PATH={DB_PATH}", flush=True)
     try:
         print(f"[PROFILE DEBUG] Opening DB connection...", flush=True)
-        with sqlite3.connect(DB_PATH) as conn:
+        with get_connection() as conn:
             cursor = conn.cursor()
             print(f"[PROFILE DEBUG] Executing SQL query for username={username}...", flush=True)
             cursor.execute("""
@@ -1230,7 +1312,7 @@ def get_user_info(username: str):
     print(f"[USER INFO DEBUG] START - username={username}, DB_PATH={DB_PATH}", flush=True)
     try:
         print(f"[USER INFO DEBUG] Opening DB connection...", flush=True)
-        with sqlite3.connect(DB_PATH) as conn:
+        with get_connection() as conn:
             cursor = conn.cursor()
             print(f"[USER INFO DEBUG] Executing SQL query for username={username}...", flush=True)
             cursor.execute("""
@@ -1273,6 +1355,12 @@ def get_user_info_alias(username: str):
 def get_user_profile_photo(username: str):
     """Récupère l'URL de la photo de profil la plus récente pour un utilisateur"""
     try:
+        # Photo courante enregistrée à l'upload (users.photo_hash): aucun parcours du dossier
+        digest = photo_store.get_user_photo_hash(username)
+        if digest:
+            return {"photo_url": photo_store.photo_url(digest), "thumbnails": photo_store.photo_urls(digest)}
+
+        # Anciennes photos (avant photo_store), encore sur disque
         photos_dir = os.path.join(BASE_DIR, "static", "profile_photos")
         if not os.path.exists(photos_dir):
             return {"photo_url": None}
@@ -1344,216 +1432,9 @@ def get_entrepreneurs_list_api(
 
     try:
         print(f"[DEBUG] [CLASSEMENT] Chargement des entrepreneurs avec période: {period}, start: {start_date}, end: {end_date}", flush=True)
-        entrepreneurs = []
-
-        # Récupérer tous les utilisateurs de la base de données
-        all_users = list_all_users()
-
-        for user_data in all_users:
-            username = user_data.get("username", "")
-            role = user_data.get("role", "")
-            if role in ["entrepreneur", "beta"]:
-                try:
-                    # Calculer les stats dashboard pour cet entrepreneur avec filtrage par période
-                    stats = calculate_dashboard_stats(username, start_date, end_date)
-
-                    # Charger le prénom, nom et grade depuis user_info.json
-                    prenom = ""
-                    nom = ""
-                    grade = ""
-                    info_file = os.path.join(base_cloud, "signatures", username, "user_info.json")
-                    try:
-                        if os.path.exists(info_file):
-                            with open(info_file, 'r', encoding='utf-8') as f:
-                                user_info = json.load(f)
-                                prenom = user_info.get("prenom", "")
-                                nom = user_info.get("nom", "")
-                                grade = user_info.get("grade", "")
-                    except Exception as e:
-                        print(f"[WARNING] Erreur lecture user_info pour {username}: {e}", flush=True)
-
-                    # Créer le nom complet: "Prénom Nom" ou username si pas d'info
-                    nom_complet = f"{prenom} {nom}".strip() if (prenom or nom) else username
-
-                    print(f"[CLASSEMENT] {username} -> {nom_complet} - Stats OK", flush=True)
-
-                    # ========================================
-                    # DONNÉES RPO - Source unique de vérité
-                    # ========================================
-                    # Toutes les données viennent du JSON RPO:
-                    # - annual: totaux de l'année (quand period=all)
-                    # - weekly: données par semaine (quand period spécifique)
-                    # Les métriques sont calculées automatiquement
-
-                    dollar_reel = 0
-                    contract_reel = 0
-                    estimation_reel = 0
-                    hr_pap_reel = 0
-                    produit_reel = 0
-                    prod_horaire_rpo = 0
-
-                    rpo_file = os.path.join(base_cloud, "rpo", f"{username}_rpo.json")
-                    if os.path.exists(rpo_file):
-                        try:
-                            with open(rpo_file, 'r', encoding='utf-8') as f:
-                                rpo_data = json.load(f)
-
-                                # Données weekly pour filtrage par période ou fallback
-                                weekly_data = rpo_data.get("weekly", {})
-
-                                # Si période spécifique: calculer depuis weekly filtrées
-                                # Si period=all: utiliser annual directement
-                                if start_date:
-                                    # Filtrer weekly par période
-                                    weekly_data = filter_rpo_weekly_by_period(weekly_data, start_date, end_date)
-
-                                    # Agréger depuis weekly filtrées
-                                    for month_key, weeks in weekly_data.items():
-                                        try:
-                                            if int(month_key) < 0:
-                                                continue
-                                        except:
-                                            continue
-
-                                        for week_key, week_data in weeks.items():
-                                            # Dollar et contract
-                                            d = week_data.get("dollar", 0)
-                                            if d and d != "-":
-                                                dollar_reel += float(d)
-                                            c = week_data.get("contract", 0)
-                                            if c and c != "-":
-                                                contract_reel += int(c)
-                                            # Estimation
-                                            e = week_data.get("estimation", 0)
-                                            if e and e != "-":
-                                                estimation_reel += int(e)
-                                            # Heures PAP
-                                            h = week_data.get("h_marketing", "-")
-                                            if h and h != "-":
-                                                try:
-                                                    hr_pap_reel += float(h)
-                                                except:
-                                                    pass
-                                            # Produit
-                                            p = week_data.get("produit", 0)
-                                            if p and p != "-":
-                                                produit_reel += float(p)
-                                else:
-                                    # Utiliser annual (totaux de l'année)
-                                    annual = rpo_data.get("annual", {})
-                                    dollar_reel = annual.get("dollar_reel", 0) or 0
-                                    contract_reel = annual.get("contract_reel", 0) or 0
-                                    estimation_reel = annual.get("estimation_reel", 0) or 0
-                                    # Utiliser hr_pap_reel_sans_week1 (week 1 ne compte pas)
-                                    hr_pap_reel = annual.get("hr_pap_reel_sans_week1", 0) or 0
-
-                                    # Produit depuis weekly (pas dans annual)
-                                    for month_key, weeks in weekly_data.items():
-                                        try:
-                                            if int(month_key) < 0:
-                                                continue
-                                        except:
-                                            continue
-                                        for week_key, week_data in weeks.items():
-                                            p = week_data.get("produit", 0)
-                                            if p and p != "-":
-                                                produit_reel += float(p)
-
-                                    # Fallback: si annual dollar/contract sont 0, calculer depuis weekly
-                                    # Note: hr_pap_reel et estimation_reel viennent déjà de annual, ne pas les recalculer
-                                    if dollar_reel == 0 and contract_reel == 0:
-                                        for m_key, weeks in weekly_data.items():
-                                            try:
-                                                if int(m_key) < 0:
-                                                    continue
-                                            except:
-                                                continue
-                                            for w_key, w_data in weeks.items():
-                                                d = w_data.get("dollar", 0)
-                                                if d and d != "-":
-                                                    dollar_reel += float(d)
-                                                c = w_data.get("contract", 0)
-                                                if c and c != "-":
-                                                    contract_reel += int(c)
-
-                                # Prod horaire: moyenne des valeurs saisies (mai-septembre)
-                                total_prod_horaire = 0
-                                nombre_semaines_prod_horaire = 0
-                                for month_key, weeks in weekly_data.items():
-                                    try:
-                                        month_index = int(month_key)
-                                        if 4 <= month_index <= 8:  # Mai à septembre
-                                            for week_key, week_data in weeks.items():
-                                                prod_h = week_data.get("prod_horaire")
-                                                if prod_h is not None and prod_h != 0 and prod_h != "-":
-                                                    try:
-                                                        total_prod_horaire += float(prod_h)
-                                                        nombre_semaines_prod_horaire += 1
-                                                    except:
-                                                        pass
-                                    except:
-                                        pass
 
-                                if nombre_semaines_prod_horaire > 0:
-                                    prod_horaire_rpo = round(total_prod_horaire / nombre_semaines_prod_horaire)
-
-                        except Exception as e:
-                            print(f"[WARNING] Erreur lecture RPO pour {username}: {e}", flush=True)
-
-                    # ========================================
-                    # MÉTRIQUES CALCULÉES AUTOMATIQUEMENT
-                    # ========================================
-                    # nb_estimations = estimation_reel du RPO annual (source unique de vérité)
-                    # Fallback: signees + perdues si RPO non disponible
-                    nb_estimations = estimation_reel if estimation_reel > 0 else (stats["status_soumissions"]["signees"] + stats["status_soumissions"]["perdus"])
-
-                    # Contrat moyen = dollar_reel / contract_reel
-                    contrat_moyen = round(dollar_reel / contract_reel, 2) if contract_reel > 0 else 0
-
-                    # Taux de vente = contract_reel / nb_estimations * 100
-                    # Formule: Signés avec paiement / (Signés + Perdus)
-                    taux_vente = round((contract_reel / nb_estimations) * 100, 2) if nb_estimations > 0 else 0
-
-                    # Taux marketing = nb_estimations / hr_pap_reel (estimations par heure)
-                    taux_marketing = round(nb_estimations / hr_pap_reel, 2) if hr_pap_reel > 0 else 0
-
-                    entrepreneur_data = {
-                        "username": nom_complet,
-                        "login_username": username,
-                        "role": role,
-                        "grade": grade,
-                        # Données RPO directes
-                        "dollar_reel": dollar_reel,
-                        "contract_reel": contract_reel,
-                        "estimation_reel": estimation_reel,
-                        "hr_pap_reel": hr_pap_reel,
-                        "produit_reel": produit_reel,
-                        # Alias pour compatibilité
-                        "ca_actuel": dollar_reel,
-                        "heures_pap": hr_pap_reel,
-                        "montant_produit": produit_reel,
-                        "objectif": stats["chiffre_affaires"]["objectif"],
-                        # Métriques calculées
-                        "contrat_moyen": contrat_moyen,
-                        "taux_vente": taux_vente,
-                        "taux_marketing": taux_marketing,
-                        "prod_horaire": prod_horaire_rpo if prod_horaire_rpo > 0 else stats["metriques"]["prod_horaire"],
-                        # Soumissions (pour compatibilité)
-                        "soumissions_signees": stats["status_soumissions"]["signees"],
-                        "soumissions_en_attente": stats["status_soumissions"]["signees"] - contract_reel,  # Signés sans paiement
-                        "soumissions_perdues": stats["status_soumissions"]["perdus"],
-                        "nb_estimations": nb_estimations,  # signés + perdus
-                        # Satisfaction
-                        "etoiles": stats["satisfaction"]["etoiles_moyennes"],
-                        "satisfactions": stats["satisfaction"]["nombre_avis"],
-                        "plaintes": stats["satisfaction"]["plaintes_actuel"],
-                    }
-
-                    print(f"   [DATA] Donnees ajoutees pour: {nom_complet}", flush=True)
-                    entrepreneurs.append(entrepreneur_data)
-                except Exception as e:
-                    print(f"[ERROR] Erreur traitement entrepreneur {username}: {str(e)[:100]}", flush=True)
-                    continue
+        # Classement matérialisé: seules les lignes invalidées sont recalculées
+        entrepreneurs = leaderboard.get_entrepreneurs_leaderboard(start_date, end_date)
 
         print(f"[OK] [CLASSEMENT] Total entrepreneurs: {len(entrepreneurs)}", flush=True)
         return entrepreneurs
@@ -1607,196 +1488,9 @@ def get_coaches_list_api(
 
     try:
         print(f"[DEBUG] [COACHES] Chargement des coaches avec période: {period}", flush=True)
-        coaches_list = []
 
-        # Récupérer tous les utilisateurs de la base de données
-        all_users = list_all_users()
-
-        for user_data in all_users:
-            username = user_data.get("username", "")
-            role = user_data.get("role", "")
-            if role == "coach":
-                try:
-                    # ========================================
-                    # DONNÉES RPO DU COACH - Source unique
-                    # ========================================
-                    # Le JSON du coach contient déjà les données agrégées
-                    # de tous ses entrepreneurs (via sync_coach_rpo)
-
-                    dollar_reel = 0
-                    contract_reel = 0
-                    estimation_reel = 0
-                    hr_pap_reel = 0
-                    produit_reel = 0
-
-                    rpo_file = os.path.join(base_cloud, "rpo", f"{username}_rpo.json")
-                    if os.path.exists(rpo_file):
-                        with open(rpo_file, 'r', encoding='utf-8') as f:
-                            rpo_data = json.load(f)
-
-                        annual = rpo_data.get("annual", {})
-                        weekly_data = rpo_data.get("weekly", {})
-
-                        if start_date:
-                            # Filtrer weekly par période
-                            filtered_weekly = filter_rpo_weekly_by_period(weekly_data, start_date, end_date)
-
-                            # Agréger depuis weekly filtrées
-                            for month_key, weeks in filtered_weekly.items():
-                                try:
-                                    if int(month_key) < 0:
-                                        continue
-                                except:
-                                    continue
-
-                                for week_key, week_data in weeks.items():
-                                    d = week_data.get("dollar", 0)
-                                    if d and d != "-":
-                                        dollar_reel += float(d)
-                                    c = week_data.get("contract", 0)
-                                    if c and c != "-":
-                                        contract_reel += int(c)
-                                    e = week_data.get("estimation", 0)
-                                    if e and e != "-":
-                                        estimation_reel += int(e)
-                                    h = week_data.get("h_marketing", "-")
-                                    if h and h != "-":
-                                        try:
-                                            hr_pap_reel += float(h)
-                                        except:
-                                            pass
-                                    p = week_data.get("produit", 0)
-                                    if p and p != "-":
-                                        produit_reel += float(p)
-                        else:
-                            # Utiliser annual pour les totaux (hr_pap_reel_sans_week1 exclut semaine 1)
-                            dollar_reel = annual.get("dollar_reel", 0) or 0
-                            contract_reel = annual.get("contract_reel", 0) or 0
-                            estimation_reel = annual.get("estimation_reel", 0) or 0
-                            hr_pap_reel = annual.get("hr_pap_reel_sans_week1", 0) or 0
-
-                            # Produit depuis weekly (pas dans annual)
-                            for month_key, weeks in weekly_data.items():
-                                try:
-                                    if int(month_key) < 0:
-                                        continue
-                                except:
-                                    continue
-                                for week_key, week_data in weeks.items():
-                                    p = week_data.get("produit", 0)
-                                    if p and p != "-":
-                                        produit_reel += float(p)
-
-                    # prod_horaire vient directement du JSON RPO (pas calculé ici)
-                    prod_horaire = 0
-                    if 'annual' in rpo_data:
-                        prod_horaire = rpo_data['annual'].get('prod_horaire', 0)
-
-                    # Récupérer nb entrepreneurs
-                    team_members = get_entrepreneurs_for_coach(username)
-                    nb_entrepreneurs = len(team_members) if team_members else 0
-
-                    # Récupérer objectif depuis coach_previsions
-                    team_objectif = 0
-                    if 'coach_previsions' in rpo_data:
-                        team_objectif = rpo_data['coach_previsions'].get('totalObjectif', 0)
-
-                    # Agréger stats depuis entrepreneurs (satisfaction + soumissions)
-                    team_etoiles_total = 0
-                    team_satisfactions_total = 0
-                    team_soumissions_signees = 0
-                    team_soumissions_perdues = 0
-                    if team_members:
-                        for member in team_members:
-                            try:
-                                member_stats = calculate_dashboard_stats(member['username'], start_date, end_date)
-                                # Satisfaction
-                                team_etoiles_total += member_stats["satisfaction"]["etoiles_moyennes"] * member_stats["satisfaction"]["nombre_avis"]
-                                team_satisfactions_total += member_stats["satisfaction"]["nombre_avis"]
-                                # Soumissions (pour nb_estimations = signées + perdues)
-                                team_soumissions_signees += member_stats["status_soumissions"]["signees"]
-                                team_soumissions_perdues += member_stats["status_soumissions"]["perdus"]
-                            except:
-                                pass
-                    etoiles_moyennes = team_etoiles_total / team_satisfactions_total if team_satisfactions_total > 0 else 0
-                    # nb_estimations = signées + perdues (comme pour entrepreneur)
-                    nb_estimations_cumule = team_soumissions_signees + team_soumissions_perdues
-
-                    # ========================================
-                    # MÉTRIQUES CALCULÉES AUTOMATIQUEMENT
-                    # ========================================
-                    # Contrat moyen = dollar_reel / contract_reel
-                    contrat_moyen = round(dollar_reel / contract_reel, 2) if contract_reel > 0 else 0
-
-                    # Taux de vente = contract_reel / estimation_reel * 100
-                    # Formule: Signés avec paiement / Nb estimations (depuis RPO)
-                    taux_vente = round((contract_reel / estimation_reel) * 100, 2) if estimation_reel > 0 else 0
-
-                    # Taux marketing = estimation_reel / hr_pap_reel (estimations par heure)
-                    taux_marketing = round(estimation_reel / hr_pap_reel, 2) if hr_pap_reel > 0 else 0
-
-                    # Photo de profil
-                    photo_profil = None
-                    import glob
-                    photos_dir = os.path.join(BASE_DIR, "static", "profile_photos")
-                    pattern = os.path.join(photos_dir, f"{username}_*.*")
-                    matching_files = glob.glob(pattern)
-                    if matching_files:
-                        photo_file = max(matching_files, key=os.path.getmtime)
-                        photo_filename = os.path.basename(photo_file)
-                        photo_profil = f"/static/profile_photos/{photo_filename}"
-
-                    # Prenom et nom
-                    prenom = ""
-                    nom = ""
-                    with sqlite3.connect(DB_PATH) as conn:
-                        cursor = conn.cursor()
-                        cursor.execute("SELECT prenom, nom FROM users WHERE username = ?", (username,))
-                        coach_info = cursor.fetchone()
-                        if coach_info:
-                            prenom = coach_info[0] or ""
-                            nom = coach_info[1] or ""
-
-                    # Structure de réponse (format identique à entrepreneur)
-                    coach_data = {
-                        "username": username,
-                        "login_username": username,
-                        "prenom": prenom,
-                        "nom": nom,
-                        "role": "coach",
-                        "photo": photo_profil,
-                        "grade": "coach",
-                        "nb_entrepreneurs": nb_entrepreneurs,
-                        # Données RPO directes (cumulées)
-                        "dollar_reel": dollar_reel,
-                        "contract_reel": contract_reel,
-                        "hr_pap_reel": hr_pap_reel,
-                        "produit_reel": produit_reel,
-                        # Soumissions cumulées (pour nb_estimations = signées + perdues)
-                        "soumissions_signees": team_soumissions_signees,
-                        "soumissions_perdues": team_soumissions_perdues,
-                        # Alias pour compatibilité avec entrepreneur
-                        "ca_actuel": dollar_reel,
-                        "heures_pap": hr_pap_reel,
-                        "montant_produit": produit_reel,
-                        "nb_estimations": estimation_reel,  # Depuis RPO estimation_reel (agrégé)
-                        "objectif": team_objectif,
-                        # Métriques calculées
-                        "contrat_moyen": contrat_moyen,
-                        "taux_vente": taux_vente,
-                        "taux_marketing": taux_marketing,
-                        "prod_horaire": prod_horaire,
-                        # Satisfaction
-                        "etoiles": round(etoiles_moyennes, 2),
-                        "satisfactions": team_satisfactions_total,
-                    }
-
-                    print(f"   [DATA] Coach {username}: dollar={dollar_reel}, contract={contract_reel}, estimation={estimation_reel}, hr_pap={hr_pap_reel}", flush=True)
-                    coaches_list.append(coach_data)
-
-                except Exception as e:
-                    print(f"[ERROR] Erreur traitement coach {username}: {str(e)[:100]}", flush=True)
-                    continue
+        # Le RPO du coach contient déjà les données agrégées de ses entrepreneurs (via sync_coach_rpo)
+        coaches_list = leaderboard.get_coaches_leaderboard(start_date, end_date)
 
         print(f"[OK] [COACHES] Total coaches: {len(coaches_list)}", flush=True)
         return coaches_list
@@ -1905,90 +1599,22 @@ def calculate_dashboard_stats(username: str, start_date=None, end_date=None) ->
 
     try:
         # 1. STATUS SOUMISSIONS
-        signees_path = os.path.join(base_cloud, "soumissions_signees", username, "soumissions.json")
-        if os.path.exists(signees_path):
-            with open(signees_path, 'r', encoding='utf-8') as f:
-                signees = json.load(f)
-                # Filtrer par période si nécessaire
-                if start_date:
-                    filtered = []
-                    for s in signees:
-                        date_obj = parse_date_flexible(s.get("date", ""))
-                        if date_obj and start_date <= date_obj <= end_date:
-                            filtered.append(s)
-                    signees = filtered
-                stats["status_soumissions"]["signees"] = len(signees)
-
-        attente_path = os.path.join(base_cloud, "ventes_attente", username, "ventes.json")
-        if os.path.exists(attente_path):
-            with open(attente_path, 'r', encoding='utf-8') as f:
-                attente = json.load(f)
-                # Filtrer par période si nécessaire
-                if start_date:
-                    filtered = []
-                    for a in attente:
-                        date_obj = parse_date_flexible(a.get("date", ""))
-                        if date_obj and start_date <= date_obj <= end_date:
-                            filtered.append(a)
-                    attente = filtered
-                stats["status_soumissions"]["en_attente"] = len(attente)
+        # Les listes passent par le DocumentStore (shim: JSON ou SQLite selon la collection)
+        # puis en colonnes (date_ts triée, prix parsés une fois): voir period_aggregation
+        # Sans période tout est compté; avec période, les dates illisibles sont exclues
+        columns = {
+            collection: user_record_columns(collection, username)
+            for collection in ("soumissions_signees", "ventes_attente", "clients_perdus",
+                               "ventes_acceptees", "ventes_produit")
+        }
+        periode = dict(start=start_date, end=end_date if start_date else None, include_undated=not start_date)
 
-        perdus_path = os.path.join(base_cloud, "clients_perdus", username, "clients.json")
-        if os.path.exists(perdus_path):
-            with open(perdus_path, 'r', encoding='utf-8') as f:
-                perdus = json.load(f)
-                # Filtrer par période si nécessaire
-                if start_date:
-                    filtered = []
-                    for p in perdus:
-                        date_obj = parse_date_flexible(p.get("date", ""))
-                        if date_obj and start_date <= date_obj <= end_date:
-                            filtered.append(p)
-                    perdus = filtered
-                stats["status_soumissions"]["perdus"] = len(perdus)
+        stats["status_soumissions"]["signees"] = columns["soumissions_signees"].count(**periode)
+        stats["status_soumissions"]["en_attente"] = columns["ventes_attente"].count(**periode)
+        stats["status_soumissions"]["perdus"] = columns["clients_perdus"].count(**periode)
 
         # 2. CHIFFRE D'AFFAIRES (calculé depuis ventes_acceptees + ventes_produit, comme la page Ventes)
-        ca_actuel = 0.0
-
-        # Additionner les ventes acceptées
-        acceptees_path = os.path.join(base_cloud, "ventes_acceptees", username, "ventes.json")
-        if os.path.exists(acceptees_path):
-            with open(acceptees_path, 'r', encoding='utf-8') as f:
-                acceptees = json.load(f)
-                for v in acceptees:
-                    # Filtrer par période si nécessaire
-                    if start_date:
-                        date_obj = parse_date_flexible(v.get("date", ""))
-                        if not date_obj or not (start_date <= date_obj <= end_date):
-                            continue
-
-                    # Nettoyer le prix (gérer espaces insécables \xa0, espaces normaux, virgules françaises)
-                    prix_str = str(v.get("prix", "0"))
-                    prix_str = prix_str.replace("\xa0", "").replace(" ", "").replace(",", ".").replace("$", "").strip()
-                    try:
-                        ca_actuel += float(prix_str)
-                    except:
-                        continue
-
-        # Additionner les ventes produit (travaux terminés)
-        produit_path = os.path.join(base_cloud, "ventes_produit", username, "ventes.json")
-        if os.path.exists(produit_path):
-            with open(produit_path, 'r', encoding='utf-8') as f:
-                produit = json.load(f)
-                for v in produit:
-                    # Filtrer par période si nécessaire
-                    if start_date:
-                        date_obj = parse_date_flexible(v.get("date", ""))
-                        if not date_obj or not (start_date <= date_obj <= end_date):
-                            continue
-
-                    # Nettoyer le prix (gérer espaces insécables \xa0, espaces normaux, virgules françaises)
-                    prix_str = str(v.get("prix", "0"))
-                    prix_str = prix_str.replace("\xa0", "").replace(" ", "").replace(",", ".").replace("$", "").strip()
-                    try:
-                        ca_actuel += float(prix_str)
-                    except:
-                        continue
+        ca_actuel = columns["ventes_acceptees"].total(**periode) + columns["ventes_produit"].total(**periode)
 
         stats["chiffre_affaires"]["ca_actuel"] = round(ca_actuel, 2)
 
@@ -2011,56 +1637,12 @@ def calculate_dashboard_stats(username: str, start_date=None, end_date=None) ->
             annual = rpo_data.get("annual", {})
 
             # Calculer heures PAP, contract_reel et estimation_reel depuis RPO weekly
-            total_heures_pap = 0
-            nombre_semaines_avec_data = 0
-            contract_reel = 0
-            dollar_reel = 0
-            estimation_reel = 0
-            weekly_data = rpo_data.get("weekly", {})
-
-            # Filtrer par période si définie
-            if start_date:
-                weekly_data = filter_rpo_weekly_by_period(weekly_data, start_date, end_date)
-
-            for month_key, weeks in weekly_data.items():
-                try:
-                    month_num = int(month_key)
-                    if month_num < 0:  # Exclure décembre 2025 et avant
-                        continue
-                except:
-                    continue
-
-                for week_key, week_data in weeks.items():
-                    # Heures marketing
-                    h_marketing = week_data.get("h_marketing", 0)
-                    try:
-                        h_marketing_num = float(h_marketing) if h_marketing != '-' else 0
-                        if h_marketing_num > 0:
-                            total_heures_pap += h_marketing_num
-                            nombre_semaines_avec_data += 1
-                    except:
-                        pass
-                    # Contract (signés avec paiement)
-                    c = week_data.get("contract", 0)
-                    if c and c != "-":
-                        try:
-                            contract_reel += int(float(c))
-                        except:
-                            pass
-                    # Dollar
-                    d = week_data.get("dollar", 0)
-                    if d and d != "-":
-                        try:
-                            dollar_reel += float(d)
-                        except:
-                            pass
-                    # Estimation
-                    e = week_data.get("estimation", 0)
-                    if e and e != "-":
-                        try:
-                            estimation_reel += int(float(e))
-                        except:
-                            pass
+            # (semaines en colonnes, filtrées par période si définie, décembre 2025 et avant exclus)
+            totaux = RpoWeekColumns(rpo_data.get("weekly", {})).totals(start_date, end_date, min_month=0)
+            total_heures_pap = totaux["h_marketing"]
+            contract_reel = totaux["contract"]
+            dollar_reel = totaux["dollar"]
+            estimation_reel = totaux["estimation"]
 
             # nb_estimations depuis RPO (source unique de vérité)
             # Fallback sur signees + perdues si pas dans RPO
@@ -2252,6 +1834,7 @@ def mark_guide_complete(data: GuideCompleteData):
         if success:
             # Marquer l'onboarding comme complété
             mark_onboarding_completed(data.username)
+            identity_cache.invalidate(data.username)
             print(f"[OK] Onboarding complété pour {data.username}")
             return {"success": True}
         else:
@@ -2286,6 +1869,7 @@ def send_message(data: SupportMessageData):
     try:
         success = send_support_message(data.username, data.message, data.is_admin)
         if success:
+            support_hub.publish(data.username)
             return {"success": True}
         else:
             raise HTTPException(status_code=500, detail="Erreur lors de l'envoi du message")
@@ -2333,6 +1917,7 @@ def mark_read(username: str):
     try:
         success = mark_messages_as_read(username)
         if success:
+            support_hub.publish(username)
             return {"success": True}
         else:
             raise HTTPException(status_code=500, detail="Erreur marquage messages lus")
@@ -2347,6 +1932,7 @@ def delete_conv(username: str):
     try:
         success = delete_conversation(username)
         if success:
+            support_hub.publish(username)
             return {"success": True}
         else:
             raise HTTPException(status_code=500, detail="Erreur suppression conversation")
@@ -2361,6 +1947,7 @@ def resolve_conv(username: str):
     try:
         success = mark_conversation_resolved(username)
         if success:
+            support_hub.publish(username)
             return {"success": True}
         else:
             raise HTTPException(status_code=500, detail="Erreur marquage conversation résolue")
@@ -2412,6 +1999,7 @@ async def upload_attachment(
         success = send_support_message(username, message, is_admin, relative_path, attachment_type)
 
         if success:
+            support_hub.publish(username)
             return {"success": True, "file_path": relative_path}
         else:
             raise HTTPException(status_code=500, detail="Erreur lors de l'envoi du message")
@@ -2420,6 +2008,43 @@ async def upload_attachment(
         raise HTTPException(status_code=500, detail=str(e))
 
 
+def support_event_stream(request: Request, topic: str, load_state):
+    """SSE du chat de support (voir QE/Backend/support_hub.py)"""
+    return StreamingResponse(
+        support_hub.event_stream(topic, load_state, request.is_disconnected),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "Connection": "keep-alive",
+            "X-Accel-Buffering": "no"
+        }
+    )
+
+
+@app.get("/api/support/stream/{username}")
+async def stream_support_messages(username: str, request: Request):
+    """SSE: messages et nombre de non lus de la conversation (remplace le polling de /api/support/messages)"""
+    def load_state():
+        return {
+            "messages": get_user_messages(username),
+            "unread_count": get_unread_messages_count(username)
+        }
+
+    return support_event_stream(request, user_topic(username), load_state)
+
+
+@app.get("/api/support/admin/stream")
+async def stream_support_conversations(request: Request):
+    """SSE: conversations et résolutions du jour pour la page admin (remplace le polling de all-conversations)"""
+    def load_state():
+        return {
+            "conversations": get_all_support_conversations(),
+            "resolved_today": get_resolved_today_count()
+        }
+
+    return support_event_stream(request, ADMIN_TOPIC, load_state)
+
+
 # [FILE] Créer un PDF
 
 @app.post("/creer-pdf")
@@ -2454,14 +2079,18 @@ async def creer_pdf(data: SoumissionData, request: Request):
     # [DEBUG] DEBUG: Tracer le prix avant envoi au generate_pdf
     print(f"[DEBUG] DEBUG API - Prix dans data_with_username: '{data_with_username.get('prix')}' (type: {type(data_with_username.get('prix'))})")
 
-    pdf_buffer: BytesIO = generate_pdf(data_with_username, language=user_language)
-    with open(chemin_pdf, "wb") as f:
-        f.write(pdf_buffer.getvalue())
-
-    public_dir = os.path.join("cloud", "soumissions_completes", utilisateur)
-    os.makedirs(public_dir, exist_ok=True)
-    with open(os.path.join(public_dir, nom_fichier), "wb") as f_out:
-        f_out.write(pdf_buffer.getvalue())
+    # Rendu du PDF dans le pool de processus: lien_pdf est utilisé tout de suite par le
+    # frontend (affichage, signature), le fichier doit donc exister avant la réponse
+    # /cloud/soumissions_completes est servi directement depuis base_cloud (plus de copie locale "cloud/")
+    ventes_dir = os.path.join(f"{base_cloud}/ventes_attente", utilisateur)
+    await run_in_process(render_soumission_pdf, {
+        "data": data_with_username,
+        "language": user_language,
+        "paths": [
+            chemin_pdf,
+            os.path.join(ventes_dir, nom_fichier),  # Copie dans ventes_attente
+        ]
+    })
 
     lien_pdf = f"{BASE_URL}/cloud/soumissions_completes/{utilisateur}/{nom_fichier}"
 
@@ -2476,16 +2105,9 @@ async def creer_pdf(data: SoumissionData, request: Request):
         soumission_id = str(uuid.uuid4())
         num_soumission = soumission_data.get("num", datetime.now().strftime("%Y%m%d%H%M%S"))
 
-        ventes_dir = os.path.join(f"{base_cloud}/ventes_attente", utilisateur)
         os.makedirs(ventes_dir, exist_ok=True)
         print(f"[FILE] Dossier ventes_attente créé: {ventes_dir}")
 
-        # Copier le PDF dans ventes_attente
-        ventes_pdf_path = os.path.join(ventes_dir, nom_fichier)
-        with open(ventes_pdf_path, "wb") as f:
-            f.write(pdf_buffer.getvalue())
-        print(f"[PDF] PDF copie: {ventes_pdf_path}")
-
         # Créer objet vente
         vente = {
             "id": soumission_id,
@@ -2509,6 +2131,7 @@ async def creer_pdf(data: SoumissionData, request: Request):
             "lien_calcul": soumission_data.get("lien_calcul", None),
             "date_soumission": datetime.now().isoformat()
         }
+        normalize_record_date(vente)
         print(f"[VENTE] Objet vente cree: {vente['prenom']} {vente['nom']} - {vente['id']}")
 
         # Sauvegarder dans ventes_attente/ventes.json
@@ -2914,7 +2537,7 @@ async def marquer_prospect_perdu(username: str, prospect_id: str):
                 "statut": "perdu",
                 "source": "potentiel"  # Marquer la source
             }
-            soumissions.append(soumission_entry)
+            soumissions.append(normalize_record_date(soumission_entry))
 
             with open(soumissions_file, "w", encoding="utf-8") as f:
                 json.dump(soumissions, f, ensure_ascii=False, indent=2)
@@ -2935,7 +2558,7 @@ async def marquer_prospect_perdu(username: str, prospect_id: str):
         prospect_trouve["date_perdu"] = datetime.now().isoformat()
         prospect_trouve["statut"] = "perdu"
         prospect_trouve["category_origine"] = "potentiel"
-        clients_perdus.append(prospect_trouve)
+        clients_perdus.append(normalize_record_date(prospect_trouve))
 
         with open(perdus_file, "w", encoding="utf-8") as f:
             json.dump(clients_perdus, f, ensure_ascii=False, indent=2)
@@ -2966,9 +2589,9 @@ async def marquer_prospect_perdu(username: str, prospect_id: str):
 
         # 5. SYNC RPO pour mettre à jour estimation_reel
         try:
-            from QE.Backend.rpo import sync_soumissions_to_rpo
-            sync_soumissions_to_rpo(username)
-            print(f"[PERDU] RPO synchronisé pour {username}")
+            from QE.Backend.rpo_sync import request_rpo_sync
+            request_rpo_sync(username)
+            print(f"[PERDU] Synchronisation RPO programmée pour {username}")
         except Exception as e:
             print(f"[WARNING] Erreur sync RPO: {e}")
 
@@ -3120,6 +2743,7 @@ async def deplacer_accepte_vers_produits(data: dict):
         now_utc_minus_4 = now_utc - timedelta(hours=4)
         client_trouve["date"] = now_utc_minus_4.isoformat()
         client_trouve["date_completion"] = data.get("date_completion", now_utc_minus_4.isoformat())
+        normalize_record_date(client_trouve)
 
         # Ajouter statut_paiement par défaut si non présent
         if "statut_paiement" not in client_trouve:
@@ -3255,12 +2879,13 @@ async def creer_pdf_calculateur(data: CalculateurData):
         except Exception as e:
             print(f"[PDF] Erreur récupération langue utilisateur: {e}")
 
-        # Générer le PDF avec la langue appropriée
-        pdf_buffer = generate_calcul_pdf(data.dict(), language=user_language)
+        # Générer le PDF avec la langue appropriée (pool de processus: le PDF est renvoyé dans la réponse)
+        pdf_bytes = await run_in_process(render_calcul_pdf_bytes, data.dict(), user_language)
+        pdf_buffer = BytesIO(pdf_bytes)
         
         # Sauvegarder le fichier
         with open(chemin_pdf, "wb") as f:
-            f.write(pdf_buffer.getvalue())
+            f.write(pdf_bytes)
         
         # URL du PDF
         lien_pdf = f"/cloud/pdfcalcul/{utilisateur}/{nom_fichier}"
@@ -4726,6 +4351,7 @@ async def block_sensitive_files(request: Request, call_next):
         not path.startswith("/api/") and
         not path.startswith("/cloud/") and
         not path.startswith("/static/") and
+        not path.startswith("/photos/") and
         not path.startswith("/frontend/") and
         path not in ["/", "/login", "/onboarding", "/guide", "/connect-google", "/oauth2callback", "/connect-gmail", "/gmail/callback", "/gmail-oauth2callback", "/liste-agendas", "/sauver-agenda-id", "/get-agenda-id", "/is-agenda-linked", "/google-email", "/email-connecte", "/avisclient", "/plainte"] and
         not path.endswith(".css") and
@@ -4746,31 +4372,18 @@ async def block_sensitive_files(request: Request, call_next):
             # Pas de token = pas vraiment connecte, laisser passer vers login
             return await call_next(request)
 
-        if username and get_user(username):
-            # Verifier si onboarding complete
-            info_file = f"{base_cloud}/signatures/{username}/user_info.json"
-            onboarding_ok = False
-
-            if os.path.exists(info_file):
-                try:
-                    with open(info_file, "r", encoding="utf-8") as f:
-                        user_details = json.load(f)
-                        has_prenom = user_details.get("prenom", "").strip() != ""
-                        has_nom = user_details.get("nom", "").strip() != ""
-                        onboarding_completed = user_details.get("onboarding_completed", False)
-
-                        onboarding_ok = onboarding_completed and has_prenom and has_nom
-                except Exception as e:
-                    print(f"Erreur lecture onboarding pour {username}: {e}")
-
+        # Utilisateur + onboarding + guide: en mémoire sur le chemin chaud (voir identity_cache.py)
+        identity = None
+        if username:
+            identity = identity_cache.cached(username) or await run_blocking(identity_cache.get, username)
+        if identity is not None:
             # Si onboarding incomplet, rediriger
-            if not onboarding_ok:
+            if not identity.onboarding_ok:
                 print(f"[BLOQUE] Acces refuse a {path} pour {username} - onboarding incomplet")
                 return RedirectResponse(url="/onboarding", status_code=303)
 
             # Verifier si le guide est complete
-            guide_progress = get_guide_progress(username)
-            if guide_progress is None or not guide_progress.get("completed", False):
+            if not identity.guide_completed:
                 # Permettre l'acces a /apppc pour afficher le guide (hash #/guide)
                 if path == "/apppc":
                     pass  # Laisser passer pour afficher le guide
@@ -4813,8 +4426,6 @@ async def creer_facture(request: Request):
                     "pressure wash", "sanding", "liability insurance", "turnkey service"]
     language = 'en' if any(mot in texte_combine for mot in mots_anglais) else 'fr'
 
-    pdf_buffer: BytesIO = generate_facture_pdf(nom, prenom, adresse, prix, depot, telephone, courriel, endroit, item, part, produit, payer_par, utilisateur, temps, language)
-
     user_folder = os.path.join(f"{base_cloud}/factures_completes", utilisateur)
     os.makedirs(user_folder, exist_ok=True)
 
@@ -4822,8 +4433,16 @@ async def creer_facture(request: Request):
     nom_fichier_facture = f"facture_{nom}_{prenom}_{random_num}.pdf".replace(" ", "_")
     chemin_pdf = os.path.join(user_folder, nom_fichier_facture)
 
-    with open(chemin_pdf, "wb") as f:
-        f.write(pdf_buffer.getvalue())
+    # Rendu du PDF dans le pool de processus (le lien est renvoyé et envoyé au client tout de suite)
+    await run_in_process(render_facture_pdf, {
+        "args": {
+            "nom": nom, "prenom": prenom, "adresse": adresse, "prix": prix, "depot": depot,
+            "telephone": telephone, "courriel": courriel, "endroit": endroit, "item": item,
+            "part": part, "produit": produit, "payer_par": payer_par, "username": utilisateur,
+            "temps": temps, "language": language
+        },
+        "paths": [chemin_pdf]
+    })
 
     lien_pdf_facture = f"{BASE_URL}/cloud/factures/{utilisateur}/{nom_fichier_facture}"
 
@@ -4847,7 +4466,6 @@ async def creer_facture(request: Request):
         raise HTTPException(status_code=500, detail="Erreur lors de l'enregistrement")
 
     return JSONResponse({
-        "pdf_buffer_facture": base64.b64encode(pdf_buffer.getvalue()).decode(),
         "nom_fichier_facture": nom_fichier_facture,
         "lien_pdf_facture": lien_pdf_facture
     })
@@ -5083,30 +4701,11 @@ def envoyer_soumission_email(
 
     subject = "=?UTF-8?B?" + base64.b64encode(subject_text.encode("utf-8")).decode() + "?="
 
-    raw_message = (
-        f"To: {destinataire}\r\n"
-        f"Subject: {subject}\r\n"
-        f"Content-Type: text/html; charset=UTF-8\r\n\r\n"
-        f"{html}"
-    )
-    raw_encoded = base64.urlsafe_b64encode(raw_message.encode("utf-8")).decode("utf-8")
-
-    access_token = get_valid_gmail_token(username)
-
-    response = requests.post(
-        "https://gmail.googleapis.com/gmail/v1/users/me/messages/send",
-        headers={
-            "Authorization": f"Bearer {access_token}",
-            "Content-Type": "application/json"
-        },
-        json={"raw": raw_encoded}
-    )
-
-    if response.status_code != 200:
-        print("[ERROR] Erreur Gmail API:", response.text)
-        raise HTTPException(status_code=400, detail="Échec de l’envoi de la soumission")
+    # Envoi Gmail dans la file de tâches (nouvelles tentatives si Google échoue);
+    # le frontend suit /api/jobs/{job_id} avant d'annoncer l'envoi
+    job_id = enqueue_gmail(destinataire, subject, html, username)
 
-    return {"message": "Soumission envoyée avec succès [OK]"}
+    return {"message": "Soumission mise en file d'envoi", "job_id": job_id}
 
 
 @app.post("/api/envoyer-soumission-signee")
@@ -5310,16 +4909,8 @@ def envoyer_soumission_signee(
                 json.dump(ventes_acceptees, f, ensure_ascii=False, indent=2)
             print(f"[OK] Soumission {soumission_id} ajoutée dans ventes_acceptees")
 
-            # Synchroniser avec Monday.com EN ARRIÈRE-PLAN (non bloquant)
-            def sync_monday_background():
-                sync_success = sync_vente_to_monday(username, soumission_data)
-                if sync_success:
-                    print(f"[MONDAY] ✓ Synchronisation Monday.com réussie")
-                else:
-                    print(f"[MONDAY] ✗ Synchronisation Monday.com échouée (non bloquant)")
-
-            threading.Thread(target=sync_monday_background, daemon=True).start()
-            print(f"[MONDAY] 🚀 Synchronisation Monday.com lancée en arrière-plan")
+            # Synchroniser avec Monday.com EN ARRIÈRE-PLAN (outbox, nouvelles tentatives)
+            monday_outbox.enqueue_vente_sync(username, soumission_data)
 
         except Exception as e:
             print(f"[WARNING] Erreur lors du déplacement ventes_attente -> ventes_acceptees: {e}")
@@ -5336,9 +4927,9 @@ def envoyer_soumission_signee(
 
         # Sync RPO après la signature (contrat signé)
         try:
-            from QE.Backend.rpo import sync_soumissions_to_rpo
-            sync_soumissions_to_rpo(username)
-            print(f"[OK] RPO synchronisé après signature pour {username}")
+            from QE.Backend.rpo_sync import request_rpo_sync
+            request_rpo_sync(username)
+            print(f"[OK] Synchronisation RPO programmée après signature pour {username}")
         except Exception as sync_error:
             print(f"[WARNING] Erreur sync RPO après signature: {sync_error}")
 
@@ -5429,16 +5020,57 @@ def envoyer_email_soumission_signee_entrepreneur(username, lien_pdf, clientPreno
     envoyer_email(email_entrepreneur, subject, html, username=username)
 
 
-def envoyer_email(destinataire, sujet, html_contenu, username):
-    access_token = get_valid_gmail_token(username)
-
+def build_gmail_raw(destinataire, sujet, html_contenu) -> str:
+    """Message HTML encodé pour l'API Gmail (champ raw)"""
     raw_message = (
         f"To: {destinataire}\r\n"
         f"Subject: {sujet}\r\n"
         f"Content-Type: text/html; charset=UTF-8\r\n\r\n"
         f"{html_contenu}"
     )
-    raw_encoded = base64.urlsafe_b64encode(raw_message.encode("utf-8")).decode("utf-8")
+    return base64.urlsafe_b64encode(raw_message.encode("utf-8")).decode("utf-8")
+
+
+def send_gmail_job(payload: dict) -> dict:
+    """Tâche gmail.send: lève une exception si Google refuse (la file retente avec délai)"""
+    access_token = get_valid_gmail_token(payload["username"])
+
+    response = requests.post(
+        "https://gmail.googleapis.com/gmail/v1/users/me/messages/send",
+        headers={
+            "Authorization": f"Bearer {access_token}",
+            "Content-Type": "application/json"
+        },
+        json={"raw": payload["raw"]},
+        timeout=30
+    )
+    if response.status_code != 200:
+        raise RuntimeError(f"Erreur Gmail API {response.status_code}: {response.text[:500]}")
+    return {"message_id": response.json().get("id")}
+
+
+job_queue.register_handler("gmail.send", send_gmail_job, executor="thread")
+
+
+def enqueue_gmail(destinataire, sujet, html_contenu, username) -> str:
+    """
+    Met un courriel en file d'envoi (nouvelles tentatives si Google échoue) et retourne le job_id
+    Lève 401 tout de suite si Gmail n'est pas connecté. Le frontend attend /api/jobs/{job_id}
+    (attendreTache, common.js) avant d'annoncer l'envoi
+    """
+    if not os.path.exists(os.path.join(base_cloud, "emails", f"{username}.json")):
+        raise HTTPException(status_code=401, detail="Aucun token Gmail trouvé")
+
+    return enqueue_job("gmail.send", {
+        "username": username,
+        "raw": build_gmail_raw(destinataire, sujet, html_contenu)
+    }, username=username)
+
+
+def envoyer_email(destinataire, sujet, html_contenu, username):
+    access_token = get_valid_gmail_token(username)
+
+    raw_encoded = build_gmail_raw(destinataire, sujet, html_contenu)
 
     response = requests.post(
         "https://gmail.googleapis.com/gmail/v1/users/me/messages/send",
@@ -5452,6 +5084,50 @@ def envoyer_email(destinataire, sujet, html_contenu, username):
         print("Erreur envoi mail:", response.text)
 
 
+@app.get("/api/jobs/{job_id}")
+def get_job_status(job_id: str):
+    """Statut d'une tâche de la file (pending, running, done, failed)"""
+    job = get_job(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Tâche introuvable")
+    return job
+
+
+@app.get("/api/jobs/{job_id}/stream")
+async def stream_job_status(job_id: str, request: Request):
+    """SSE: envoie le statut de la tâche à chaque changement, jusqu'à done/failed"""
+    async def event_generator():
+        last_state = None
+        deadline = time.time() + 300
+        while time.time() < deadline:
+            if await request.is_disconnected():
+                break
+
+            job = await run_blocking(get_job, job_id)
+            if not job:
+                yield f"data: {json.dumps({'id': job_id, 'status': 'not_found'})}\n\n"
+                break
+
+            state = (job["status"], job["attempts"])
+            if state != last_state:
+                last_state = state
+                yield f"data: {json.dumps(job)}\n\n"
+            if job["status"] in (job_queue.STATUS_DONE, job_queue.STATUS_FAILED):
+                break
+
+            await asyncio.sleep(0.5)
+
+    return StreamingResponse(
+        event_generator(),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "Connection": "keep-alive",
+            "X-Accel-Buffering": "no"
+        }
+    )
+
+
 @app.get("/api/soumissions/count/{username}")
 def get_soumissions_count(username: str, team: bool = Query(False), all_teams: bool = Query(False)):
     """
@@ -5668,55 +5344,16 @@ def get_total_ventes_produit(username: str, team: bool = Query(False), all_teams
 
 
 # ============== API Numéros de Soumission Uniques ==============
+# Ancienne liste JSON, importée dans la table soumission_numeros au démarrage
 NUMEROS_SOUMISSION_FILE = os.path.join(base_cloud, "soumissions", "numeros_utilises.json")
 
-def get_numeros_utilises():
-    """Récupère la liste des numéros de soumission déjà utilisés"""
-    try:
-        if not os.path.exists(NUMEROS_SOUMISSION_FILE):
-            os.makedirs(os.path.dirname(NUMEROS_SOUMISSION_FILE), exist_ok=True)
-            with open(NUMEROS_SOUMISSION_FILE, "w", encoding="utf-8") as f:
-                json.dump([], f)
-            return []
-
-        with open(NUMEROS_SOUMISSION_FILE, "r", encoding="utf-8") as f:
-            return json.load(f)
-    except Exception as e:
-        print(f"[ERROR] get_numeros_utilises: {e}")
-        return []
-
-def ajouter_numero_utilise(numero: str, username: str):
-    """Ajoute un numéro à la liste des numéros utilisés"""
-    numeros = get_numeros_utilises()
-    numeros.append({
-        "numero": numero,
-        "username": username,
-        "date": datetime.now().isoformat()
-    })
-    with open(NUMEROS_SOUMISSION_FILE, "w", encoding="utf-8") as f:
-        json.dump(numeros, f, indent=2, ensure_ascii=False)
-
 @app.get("/api/soumission/generer-numero")
 def generer_numero_soumission():
-    """Génère un numéro de soumission unique format 26-XXXX"""
-    import random
-    numeros = get_numeros_utilises()
-    numeros_existants = [n["numero"] for n in numeros]
-
-    # Préfixe fixe 26 (pour 2026)
-    prefixe = "26"
-
-    # Générer un numéro unique
-    max_tentatives = 100
-    for _ in range(max_tentatives):
-        # 4 chiffres aléatoires
-        suffix = str(random.randint(0, 9999)).zfill(4)
-        numero = f"{prefixe}-{suffix}"
-
-        if numero not in numeros_existants:
-            return {"numero": numero}
-
-    raise HTTPException(status_code=500, detail="Impossible de générer un numéro unique")
+    """Génère un numéro de soumission unique format AA-XXXX (AA = année de saison)"""
+    numero = soumission_number_allocator.generate()
+    if numero is None:
+        raise HTTPException(status_code=500, detail="Impossible de générer un numéro unique")
+    return {"numero": numero}
 
 @app.post("/api/soumission/reserver-numero")
 def reserver_numero_soumission(data: dict = Body(...)):
@@ -5727,22 +5364,15 @@ def reserver_numero_soumission(data: dict = Body(...)):
     if not numero or not username:
         raise HTTPException(status_code=400, detail="Numéro et username requis")
 
-    numeros = get_numeros_utilises()
-    numeros_existants = [n["numero"] for n in numeros]
-
-    if numero in numeros_existants:
+    if not soumission_number_allocator.reserve(numero, username):
         raise HTTPException(status_code=409, detail="Ce numéro est déjà utilisé")
 
-    ajouter_numero_utilise(numero, username)
     return {"success": True, "message": f"Numéro {numero} réservé"}
 
 @app.get("/api/soumission/verifier-numero/{numero}")
 def verifier_numero_soumission(numero: str):
     """Vérifie si un numéro est disponible"""
-    numeros = get_numeros_utilises()
-    numeros_existants = [n["numero"] for n in numeros]
-
-    return {"disponible": numero not in numeros_existants}
+    return {"disponible": soumission_number_allocator.is_available(numero)}
 
 
 @app.get("/api/soumissions/signees/count/{username}")
@@ -6031,6 +5661,7 @@ async def cloturer_travail(payload: dict = Body(...)):
         now_utc = datetime.utcnow()
         now_utc_minus_4 = now_utc - timedelta(hours=4)
         travail["date"] = now_utc_minus_4.isoformat()
+        normalize_record_date(travail)
 
         dossier_c = f"{base_cloud}/travaux_completes/{username}"
         os.makedirs(dossier_c, exist_ok=True)
@@ -6304,6 +5935,7 @@ def enregistrer_soumission_signee(utilisateur: str, soumission: dict):
                 print(f"[enregistrer_soumission_signee] Champ essentiel manquant '{field}' ajouté comme vide")
 
         print(f"[enregistrer_soumission_signee] TOUS les champs préservés pour soumission {soumission.get('num', soumission.get('id'))}")
+        normalize_record_date(soumission)
 
         if os.path.exists(fichier):
             with open(fichier, "r", encoding="utf-8") as f:
@@ -6564,6 +6196,7 @@ def submit_review(payload: dict = Body(...)):
     with open(reviews_file, "w", encoding="utf-8") as f:
         json.dump(existing_reviews, f, indent=2, ensure_ascii=False)
 
+    leaderboard.mark_dirty(username)
     return {"message": "Avis reçu avec succès"}
 
 @app.get("/api/satisfaction/{username}")
@@ -6602,16 +6235,6 @@ def graph_data(
     type: str = Query(..., description="Type métrique : soumissions, revenus, montant-signe, montant-produit")
 ):
     import datetime as dt
-    from collections import defaultdict
-
-    def parse_date(date_str: str):
-        # Support des formats ISO et français
-        for fmt in ("%Y-%m-%d", "%Y-%m-%dT%H:%M:%S", "%Y-%m-%dT%H:%M:%S.%f", "%d/%m/%Y"):
-            try:
-                return dt.datetime.strptime(date_str, fmt).date()
-            except:
-                continue
-        return None
 
     print(f"[DEBUG] graph-data appelé avec username={username}, start={start}, end={end}, type={type}")
     
@@ -6684,119 +6307,28 @@ def graph_data(
     
     labels_to_show = get_smart_labels(all_dates, all_dates_formatted)
     
-    data_by_date = defaultdict(float)
-
-    if type == "soumissions":
-        # Utiliser le nouveau système simple de comptage
-        stats_file = os.path.join(f"{base_cloud}/stats", username, "soumissions_sent.json")
-        print(f"[Debug Graph Soumissions] Nouveau système - Fichier stats: {stats_file}")
-        print(f"[Debug Graph Soumissions] Fichier existe: {os.path.exists(stats_file)}")
-
-        if not os.path.exists(stats_file):
-            print(f"[Debug Graph Soumissions] Aucune stat trouvée, retour données vides")
-            return {"dates": labels_to_show, "data": [0] * len(all_dates_formatted)}
-
-        with open(stats_file, "r", encoding="utf-8") as f:
-            stats = json.load(f)
-
-        print(f"[Debug Graph Soumissions] Nombre total de soumissions envoyées: {len(stats)}")
-        print(f"[Debug Graph Soumissions] Période: {start_date} à {end_date}")
-
-        compteur_dans_periode = 0
-        for stat in stats:
-            date_str = stat.get("date", "")
-            try:
-                date_obj = dt.datetime.strptime(date_str, "%Y-%m-%d").date()
-                if start_date <= date_obj <= end_date:
-                    compteur_dans_periode += 1
-                    data_by_date[format_date_french(date_obj)] += 1
-                    print(f"[Debug Graph Soumissions] Soumission comptée: {date_str} -> {format_date_french(date_obj)}")
-            except:
-                print(f"[Debug Graph Soumissions] Date invalide ignorée: {date_str}")
-                continue
-
-        print(f"[Debug Graph Soumissions] Total soumissions dans la période: {compteur_dans_periode}")
-
-    elif type == "revenus":
-        fichier = os.path.join(f"{base_cloud}/travaux_completes", username, "soumissions.json")
-        if not os.path.exists(fichier):
-            return {"dates": labels_to_show, "data": [0] * len(all_dates_formatted)}
-        with open(fichier, "r", encoding="utf-8") as f:
-            travaux = json.load(f)
-
-        for t in travaux:
-            date_str = t.get("date", "")
-            prix_str = t.get("prix", "0").replace("\xa0", "").replace(" ", "").replace(",", ".").replace("$", "").strip()
-            date_obj = parse_date(date_str)
-            if not date_obj:
-                continue
-            try:
-                prix = float(prix_str)
-                if start_date <= date_obj <= end_date:
-                    data_by_date[format_date_french(date_obj)] += prix
-            except:
-                continue
-
-    elif type == "montant-signe":
-        fichier = os.path.join(f"{base_cloud}/soumissions_signees", username, "soumissions.json")
-        print(f"[DEBUG montant-signe] Fichier: {fichier}")
-        print(f"[DEBUG montant-signe] Fichier existe: {os.path.exists(fichier)}")
-        if not os.path.exists(fichier):
-            return {"dates": labels_to_show, "data": [0] * len(all_dates_formatted)}
-        with open(fichier, "r", encoding="utf-8") as f:
-            soumissions_signees = json.load(f)
-
-        print(f"[DEBUG montant-signe] Nombre de soumissions signées: {len(soumissions_signees)}")
-        print(f"[DEBUG montant-signe] Période: {start_date} à {end_date}")
-
-        for s in soumissions_signees:
-            date_str = s.get("date", "")
-            prix_str = s.get("prix", "0").replace(" ", "").replace(",", ".").replace("$", "").replace("€", "")
-            print(f"[DEBUG montant-signe] Soumission: date='{date_str}', prix='{prix_str}'")
-            date_obj = parse_date(date_str)
-            print(f"[DEBUG montant-signe] Date parsée: {date_obj}")
-            if not date_obj:
-                print(f"[DEBUG montant-signe] Date non parsée, ignorée")
-                continue
-            try:
-                prix = float(prix_str)
-                print(f"[DEBUG montant-signe] Prix parsé: {prix}")
-                if start_date <= date_obj <= end_date:
-                    data_by_date[format_date_french(date_obj)] += prix
-                    print(f"[DEBUG montant-signe] Dans la période! Ajouté à {format_date_french(date_obj)}")
-                else:
-                    print(f"[DEBUG montant-signe] Hors période: {date_obj} pas entre {start_date} et {end_date}")
-            except Exception as e:
-                print(f"[DEBUG montant-signe] Erreur parsing prix: {e}")
-                continue
+    # Fichier source et agrégation par jour (colonnes NumPy, voir period_aggregation)
+    travaux_file = os.path.join(f"{base_cloud}/travaux_completes", username, "soumissions.json")
+    sources = {
+        "soumissions": (os.path.join(f"{base_cloud}/stats", username, "soumissions_sent.json"), "count"),
+        "revenus": (travaux_file, "sum"),
+        "montant-signe": (os.path.join(f"{base_cloud}/soumissions_signees", username, "soumissions.json"), "sum"),
+        "montant-produit": (travaux_file, "sum"),
+    }
+    if type not in sources:
+        raise HTTPException(status_code=400, detail="Type métrique inconnu")
 
-    elif type == "montant-produit":
-        fichier = os.path.join(f"{base_cloud}/travaux_completes", username, "soumissions.json")
-        if not os.path.exists(fichier):
-            return {"dates": labels_to_show, "data": [0] * len(all_dates_formatted)}
-        with open(fichier, "r", encoding="utf-8") as f:
-            travaux = json.load(f)
+    fichier, how = sources[type]
+    columns = load_record_columns(fichier)
+    if columns is None:
+        print(f"[Debug Graph] Fichier absent: {fichier}, retour données vides")
+        return {"dates": labels_to_show, "data": [0] * len(all_dates_formatted)}
 
-        for t in travaux:
-            date_str = t.get("date", "")
-            prix_str = t.get("prix", "0").replace("\xa0", "").replace(" ", "").replace(",", ".").replace("$", "").strip()
-            date_obj = parse_date(date_str)
-            if not date_obj:
-                continue
-            try:
-                prix = float(prix_str)
-                if start_date <= date_obj <= end_date:
-                    data_by_date[format_date_french(date_obj)] += prix
-            except:
-                continue
+    print(f"[Debug Graph] {type}: {columns.count(start_date, end_date)} enregistrement(s) du {start_date} au {end_date}")
 
-    else:
-        raise HTTPException(status_code=400, detail="Type métrique inconnu")
-
-    # Créer la liste des données pour toutes les dates (pour le survol)
-    data_list = []
-    for date_formatted in all_dates_formatted:
-        data_list.append(round(data_by_date.get(date_formatted, 0), 2))
+    # Une valeur par jour de all_dates (pour le survol)
+    _, values = columns.buckets(start_date, end_date, "day", how)
+    data_list = [round(float(v), 2) for v in values]
 
     return {
         "dates": labels_to_show, 
@@ -6826,7 +6358,7 @@ def envoyer_email_facture(destinataire, nom, prenom, prix, lien_pdf, username):
         f'<p>Merci pour votre confiance.</p>'
         f'<p>L’équipe Qualité Étudiants</p>'
 )
-    envoyer_email(destinataire, subject, html, username=username)
+    return enqueue_gmail(destinataire, subject, html, username=username)
 
 from fastapi import HTTPException
 
@@ -6858,7 +6390,8 @@ async def envoyer_facture_email(data: FactureEmailData):
     if not email_client:
         raise HTTPException(status_code=404, detail="Email client non trouvé dans les soumissions")
 
-    envoyer_email_facture(
+    job_id = await run_blocking(
+        envoyer_email_facture,
         destinataire=email_client,
         nom=data.nom,
         prenom=data.prenom,
@@ -6866,7 +6399,7 @@ async def envoyer_facture_email(data: FactureEmailData):
         lien_pdf=data.lienPdf,
         username=data.username
     )
-    return {"message": "Email de facture envoyé avec succès"}
+    return {"message": "Email de facture mis en file d'envoi", "job_id": job_id}
 
 @app.post("/renvoyer-facture")
 async def renvoyer_facture(request: Request):
@@ -6906,7 +6439,8 @@ async def renvoyer_facture(request: Request):
         raise HTTPException(status_code=404, detail="Email client non trouvé")
 
     try:
-        envoyer_email_facture(
+        job_id = await run_blocking(
+            envoyer_email_facture,
             destinataire=email_client,
             nom=nom,
             prenom=prenom,
@@ -6914,7 +6448,7 @@ async def renvoyer_facture(request: Request):
             lien_pdf=pdf_url,
             username=username
         )
-        return {"message": "Facture renvoyée avec succès"}
+        return {"message": "Facture mise en file d'envoi", "job_id": job_id}
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Erreur lors de l'envoi: {str(e)}")
 
@@ -7366,140 +6900,6 @@ def api_get_coach_equipe(coach_username: str):
         }
     }
 
-def parse_week_label_to_dates(week_label: str, year: int = 2026):
-    """
-    Parse un week_label du RPO (ex: "5 - 11 janv", "26 janv - 1 févr")
-    et retourne (start_date, end_date) en datetime
-    """
-    from datetime import datetime, timezone
-
-    if not week_label or week_label == "N/A":
-        return None, None
-
-    # Mapping des mois français vers numéros
-    mois_map = {
-        'janv': 1, 'janvier': 1,
-        'févr': 2, 'fevr': 2, 'février': 2, 'fevrier': 2,
-        'mars': 3,
-        'avr': 4, 'avril': 4,
-        'mai': 5,
-        'juin': 6,
-        'juil': 7, 'juillet': 7,
-        'août': 8, 'aout': 8,
-        'sept': 9, 'septembre': 9,
-        'oct': 10, 'octobre': 10,
-        'nov': 11, 'novembre': 11,
-        'déc': 12, 'dec': 12, 'décembre': 12, 'decembre': 12
-    }
-
-    try:
-        # Format: "5 - 11 janv" ou "26 janv - 1 févr"
-        parts = week_label.split(' - ')
-        if len(parts) != 2:
-            return None, None
-
-        start_part = parts[0].strip()  # "5" ou "26 janv"
-        end_part = parts[1].strip()    # "11 janv" ou "1 févr"
-
-        # Parser la fin (toujours contient le mois)
-        end_tokens = end_part.split()
-        end_day = int(end_tokens[0])
-        end_month_str = end_tokens[1].lower() if len(end_tokens) > 1 else None
-        end_month = mois_map.get(end_month_str, 1)
-
-        # Parser le début
-        start_tokens = start_part.split()
-        start_day = int(start_tokens[0])
-        if len(start_tokens) > 1:
-            # Le mois est spécifié (ex: "26 janv")
-            start_month_str = start_tokens[1].lower()
-            start_month = mois_map.get(start_month_str, end_month)
-        else:
-            # Pas de mois, utiliser le même que la fin
-            start_month = end_month
-
-        # Gérer le changement d'année (décembre -> janvier)
-        start_year = year
-        end_year = year
-        if start_month == 12 and end_month == 1:
-            start_year = year - 1
-
-        start_date = datetime(start_year, start_month, start_day, 0, 0, 0, tzinfo=timezone.utc)
-        end_date = datetime(end_year, end_month, end_day, 23, 59, 59, tzinfo=timezone.utc)
-
-        return start_date, end_date
-    except Exception as e:
-        print(f"[WARNING] Erreur parsing week_label '{week_label}': {e}", flush=True)
-        return None, None
-
-
-def filter_rpo_weekly_by_period(weekly_data: dict, start_date, end_date, year: int = 2026):
-    """
-    Filtre les données weekly du RPO par période.
-    Retourne un dict avec les mêmes clés mais uniquement les semaines dans la période.
-    """
-    from datetime import datetime, timezone
-
-    if not start_date or not end_date:
-        return weekly_data  # Pas de filtre, retourner tout
-
-    filtered = {}
-
-    for month_key, weeks in weekly_data.items():
-        try:
-            month_num = int(month_key)
-            if month_num < -1:  # Ignorer les mois trop anciens
-                continue
-        except:
-            continue
-
-        for week_key, week_data in weeks.items():
-            week_label = week_data.get("week_label", "")
-            week_start, week_end = parse_week_label_to_dates(week_label, year)
-
-            if week_start and week_end:
-                # Vérifier si la semaine chevauche la période demandée
-                if week_end >= start_date and week_start <= end_date:
-                    if month_key not in filtered:
-                        filtered[month_key] = {}
-                    filtered[month_key][week_key] = week_data
-
-    return filtered
-
-
-def parse_date_flexible(date_str: str):
-    """
-    Parse une date dans différents formats: DD/MM/YYYY, YYYY-MM-DD, ISO
-    Retourne un objet datetime ou None si le parsing échoue
-    """
-    from datetime import datetime, timezone
-
-    if not date_str:
-        return None
-
-    # Essayer format DD/MM/YYYY
-    try:
-        return datetime.strptime(date_str, "%d/%m/%Y").replace(tzinfo=timezone.utc)
-    except ValueError:
-        pass
-
-    # Essayer format YYYY-MM-DD
-    try:
-        return datetime.strptime(date_str, "%Y-%m-%d").replace(tzinfo=timezone.utc)
-    except ValueError:
-        pass
-
-    # Essayer format ISO complet
-    try:
-        date_obj = datetime.fromisoformat(date_str)
-        if date_obj.tzinfo is None:
-            date_obj = date_obj.replace(tzinfo=timezone.utc)
-        return date_obj
-    except ValueError:
-        pass
-
-    return None
-
 @app.get("/api/coach/{coach_username}/equipe/dashboard")
 def api_get_coach_equipe_dashboard(
     coach_username: str,
@@ -7616,14 +7016,16 @@ def api_get_coach_equipe_dashboard(
     # Tableau pour le $ produit par mois (13 mois: Déc 2025 + Jan-Déc 2026)
     produit_mensuel = [0] * 13
 
+    # Fenêtre des listes (colonnes period_aggregation): les dates illisibles restent comptées
+    periode = dict(start=start_date, end=end_date if start_date else None, include_undated=True)
+
     for username in entrepreneur_usernames:
         # 1. Charger user_info
         user_info_path = os.path.join(base_cloud, "signatures", username, "user_info.json")
         user_info = {}
         if os.path.exists(user_info_path):
             try:
-                with open(user_info_path, "r", encoding="utf-8") as f:
-                    user_info = json.load(f)
+                user_info = load_json_cached(user_info_path, default={}, readonly=True)
             except:
                 pass
 
@@ -7640,22 +7042,7 @@ def api_get_coach_equipe_dashboard(
         acceptees_path = os.path.join(base_cloud, "ventes_acceptees", username, "ventes.json")
         if os.path.exists(acceptees_path):
             try:
-                with open(acceptees_path, 'r', encoding='utf-8') as f:
-                    acceptees = json.load(f)
-                    for v in acceptees:
-                        # Vérifier la période si nécessaire
-                        if start_date:
-                            date_str = v.get("date", "")
-                            date_obj = parse_date_flexible(date_str)
-                            if date_obj and (date_obj < start_date or date_obj > end_date):
-                                continue
-
-                        prix_str = str(v.get("prix", "0"))
-                        prix_str = prix_str.replace("\xa0", "").replace(" ", "").replace(",", ".").replace("$", "").strip()
-                        try:
-                            ca_actuel += float(prix_str)
-                        except:
-                            continue
+                ca_actuel += load_record_columns(acceptees_path).total(**periode)
             except:
                 pass
 
@@ -7664,38 +7051,34 @@ def api_get_coach_equipe_dashboard(
         produit_path = os.path.join(base_cloud, "ventes_produit", username, "ventes.json")
         if os.path.exists(produit_path):
             try:
-                with open(produit_path, 'r', encoding='utf-8') as f:
-                    produit = json.load(f)
-                    for v in produit:
-                        if start_date:
-                            date_str = v.get("date", "")
-                            date_obj = parse_date_flexible(date_str)
-                            if date_obj and (date_obj < start_date or date_obj > end_date):
-                                continue
-
-                        prix_str = str(v.get("prix", "0"))
-                        prix_str = prix_str.replace("\xa0", "").replace(" ", "").replace(",", ".").replace("$", "").strip()
-                        try:
-                            prix = float(prix_str)
-                            montant_produit += prix
-                            ca_actuel += prix
+                produit = load_json_cached(produit_path, readonly=True)
+                if start_date:
+                    # Période: index par date (les enregistrements sans date lisible restent comptés)
+                    produit = load_date_index(produit_path).between(start_date, end_date, include_undated=True)
+                for v in produit:
+                    prix_str = str(v.get("prix", "0"))
+                    prix_str = prix_str.replace("\xa0", "").replace(" ", "").replace(",", ".").replace("$", "").strip()
+                    try:
+                        prix = float(prix_str)
+                        montant_produit += prix
+                        ca_actuel += prix
 
-                            # Calculer le mois pour le graphique (basé sur date_completion)
-                            date_completion_str = v.get("date_completion", "")
-                            if date_completion_str:
-                                try:
-                                    from datetime import datetime as dt
-                                    completion_date = dt.fromisoformat(date_completion_str)
-                                    # Index 0 = Déc 2025, Index 1-12 = Jan-Déc 2026
-                                    if completion_date.year == 2025 and completion_date.month == 12:
-                                        produit_mensuel[0] += prix
-                                    elif completion_date.year == 2026:
-                                        mois_index = completion_date.month  # 1=Jan, 2=Fév, etc.
-                                        produit_mensuel[mois_index] += prix
-                                except:
-                                    pass
-                        except:
-                            continue
+                        # Calculer le mois pour le graphique (basé sur date_completion)
+                        date_completion_str = v.get("date_completion", "")
+                        if date_completion_str:
+                            try:
+                                from datetime import datetime as dt
+                                completion_date = dt.fromisoformat(date_completion_str)
+                                # Index 0 = Déc 2025, Index 1-12 = Jan-Déc 2026
+                                if completion_date.year == 2025 and completion_date.month == 12:
+                                    produit_mensuel[0] += prix
+                                elif completion_date.year == 2026:
+                                    mois_index = completion_date.month  # 1=Jan, 2=Fév, etc.
+                                    produit_mensuel[mois_index] += prix
+                            except:
+                                pass
+                    except:
+                        continue
             except:
                 pass
 
@@ -7708,46 +7091,22 @@ def api_get_coach_equipe_dashboard(
 
         signees_path = os.path.join(base_cloud, "soumissions_signees", username, "soumissions.json")
         if os.path.exists(signees_path):
-            try:
-                with open(signees_path, 'r', encoding='utf-8') as f:
-                    signees = json.load(f)
-                    for s in signees:
-                        if start_date:
-                            date_str = s.get("date", "")
-                            date_obj = parse_date_flexible(date_str)
-                            if date_obj and (date_obj < start_date or date_obj > end_date):
-                                continue
-                        signees_count += 1
+            try:
+                signees_count = load_record_columns(signees_path).count(**periode)
             except:
                 pass
 
         attente_path = os.path.join(base_cloud, "ventes_attente", username, "ventes.json")
         if os.path.exists(attente_path):
             try:
-                with open(attente_path, 'r', encoding='utf-8') as f:
-                    attente = json.load(f)
-                    for a in attente:
-                        if start_date:
-                            date_str = a.get("date", "")
-                            date_obj = parse_date_flexible(date_str)
-                            if date_obj and (date_obj < start_date or date_obj > end_date):
-                                continue
-                        attente_count += 1
+                attente_count = load_record_columns(attente_path).count(**periode)
             except:
                 pass
 
         perdus_path = os.path.join(base_cloud, "clients_perdus", username, "clients.json")
         if os.path.exists(perdus_path):
             try:
-                with open(perdus_path, 'r', encoding='utf-8') as f:
-                    perdus = json.load(f)
-                    for p in perdus:
-                        if start_date:
-                            date_str = p.get("date", "")
-                            date_obj = parse_date_flexible(date_str)
-                            if date_obj and (date_obj < start_date or date_obj > end_date):
-                                continue
-                        perdus_count += 1
+                perdus_count = load_record_columns(perdus_path).count(**periode)
             except:
                 pass
 
@@ -7757,23 +7116,16 @@ def api_get_coach_equipe_dashboard(
         reviews_path = os.path.join(base_cloud, "reviews", username, "reviews.json")
         if os.path.exists(reviews_path):
             try:
-                with open(reviews_path, 'r', encoding='utf-8') as f:
-                    reviews = json.load(f)
-                    valid_reviews = []
-                    for r in reviews:
-                        if start_date:
-                            date_str = r.get("date", "")
-                            date_obj = parse_date_flexible(date_str)
-                            if date_obj and (date_obj < start_date or date_obj > end_date):
-                                continue
-                        valid_reviews.append(r)
-
-                    if valid_reviews:
-                        total_etoiles = sum(float(r.get("rating", 0)) for r in valid_reviews)
-                        nombre_avis = len(valid_reviews)
-                        etoiles_moyennes = round(total_etoiles / nombre_avis, 1) if nombre_avis > 0 else 0.0
-                        team_total_etoiles += total_etoiles
-                        team_total_avis += nombre_avis
+                valid_reviews = load_json_cached(reviews_path, readonly=True)
+                if start_date:
+                    valid_reviews = load_date_index(reviews_path).between(start_date, end_date, include_undated=True)
+
+                if valid_reviews:
+                    total_etoiles = sum(float(r.get("rating", 0)) for r in valid_reviews)
+                    nombre_avis = len(valid_reviews)
+                    etoiles_moyennes = round(total_etoiles / nombre_avis, 1) if nombre_avis > 0 else 0.0
+                    team_total_etoiles += total_etoiles
+                    team_total_avis += nombre_avis
             except:
                 pass
 
@@ -7785,27 +7137,24 @@ def api_get_coach_equipe_dashboard(
         actifs_path = os.path.join(base_cloud, "employes", username, "actifs.json")
         if os.path.exists(actifs_path):
             try:
-                with open(actifs_path, 'r', encoding='utf-8') as f:
-                    actifs = json.load(f)
-                    employes_actifs = len(actifs)
+                actifs = load_json_cached(actifs_path, readonly=True)
+                employes_actifs = len(actifs)
             except:
                 pass
 
         candidats_path = os.path.join(base_cloud, "employes", username, "candidats.json")
         if os.path.exists(candidats_path):
             try:
-                with open(candidats_path, 'r', encoding='utf-8') as f:
-                    candidats = json.load(f)
-                    employes_candidats = len(candidats)
+                candidats = load_json_cached(candidats_path, readonly=True)
+                employes_candidats = len(candidats)
             except:
                 pass
 
         inactifs_path = os.path.join(base_cloud, "employes", username, "inactifs.json")
         if os.path.exists(inactifs_path):
             try:
-                with open(inactifs_path, 'r', encoding='utf-8') as f:
-                    inactifs = json.load(f)
-                    employes_inactifs = len(inactifs)
+                inactifs = load_json_cached(inactifs_path, readonly=True)
+                employes_inactifs = len(inactifs)
             except:
                 pass
 
@@ -7817,7 +7166,6 @@ def api_get_coach_equipe_dashboard(
         estimation_reel = 0
         nb_estimations = 0
         hr_pap_reel = 0
-        produit_reel = 0
 
         # 8. OBJECTIF et POURCENTAGE depuis RPO
         objectif = 0
@@ -7833,40 +7181,12 @@ def api_get_coach_equipe_dashboard(
             weekly_data = rpo_data.get("weekly", {})
 
             if start_date:
-                # Filtrer weekly par période
-                filtered_weekly = filter_rpo_weekly_by_period(weekly_data, start_date, end_date)
-
-                # Agréger depuis weekly filtrées
-                for month_key, weeks in filtered_weekly.items():
-                    try:
-                        if int(month_key) < 0:
-                            continue
-                    except:
-                        continue
-
-                    for week_key, week_data_item in weeks.items():
-                        # Dollar et contract
-                        d = week_data_item.get("dollar", 0)
-                        if d and d != "-":
-                            dollar_reel += float(d)
-                        c = week_data_item.get("contract", 0)
-                        if c and c != "-":
-                            contract_reel += int(c)
-                        # Estimation
-                        e = week_data_item.get("estimation", 0)
-                        if e and e != "-":
-                            estimation_reel += int(e)
-                        # Heures PAP
-                        h = week_data_item.get("h_marketing", "-")
-                        if h and h != "-":
-                            try:
-                                hr_pap_reel += float(h)
-                            except:
-                                pass
-                        # Produit
-                        p = week_data_item.get("produit", 0)
-                        if p and p != "-":
-                            produit_reel += float(p)
+                # Agréger les semaines RPO qui chevauchent la période (colonnes, mois >= 0)
+                totaux = RpoWeekColumns(weekly_data).totals(start_date, end_date, min_month=0)
+                dollar_reel = totaux["dollar"]
+                contract_reel = totaux["contract"]
+                estimation_reel = totaux["estimation"]
+                hr_pap_reel = totaux["h_marketing"]
 
                 total_heures_pap = hr_pap_reel
             else:
@@ -7984,43 +7304,42 @@ def api_get_coach_equipe_dashboard(
         facturation_statuts_path = os.path.join(base_cloud, "facturation_qe_statuts", username, "statuts.json")
         if os.path.exists(facturation_statuts_path):
             try:
-                with open(facturation_statuts_path, 'r', encoding='utf-8') as f:
-                    statuts = json.load(f)
-                    for num_soumission, client_statuts in statuts.items():
-                        # Vérifier si traité ou en attente comptable
-                        statut_client = client_statuts.get("statutClient", "")
-
-                        # Dépôt traité
-                        if client_statuts.get("statutDepot") in ["traite", "traite_attente_final", "attente_comptable"]:
-                            depot_details = client_statuts.get("depot", {})
-                            montant_str = str(depot_details.get("montant", "0,00 $"))
-                            montant_str = montant_str.replace("\xa0", "").replace(" ", "").replace(",", ".").replace("$", "").strip()
-                            try:
-                                paiements_recoltes += float(montant_str)
-                            except:
-                                pass
+                statuts = load_json_cached(facturation_statuts_path, readonly=True)
+                for num_soumission, client_statuts in statuts.items():
+                    # Vérifier si traité ou en attente comptable
+                    statut_client = client_statuts.get("statutClient", "")
+
+                    # Dépôt traité
+                    if client_statuts.get("statutDepot") in ["traite", "traite_attente_final", "attente_comptable"]:
+                        depot_details = client_statuts.get("depot", {})
+                        montant_str = str(depot_details.get("montant", "0,00 $"))
+                        montant_str = montant_str.replace("\xa0", "").replace(" ", "").replace(",", ".").replace("$", "").strip()
+                        try:
+                            paiements_recoltes += float(montant_str)
+                        except:
+                            pass
 
-                        # Paiement final traité
-                        if client_statuts.get("statutPaiementFinal") in ["traite", "attente_comptable"]:
-                            pf_details = client_statuts.get("paiementFinal", {})
-                            montant_str = str(pf_details.get("montant", "0,00 $"))
-                            montant_str = montant_str.replace("\xa0", "").replace(" ", "").replace(",", ".").replace("$", "").strip()
-                            try:
-                                paiements_recoltes += float(montant_str)
-                            except:
-                                pass
+                    # Paiement final traité
+                    if client_statuts.get("statutPaiementFinal") in ["traite", "attente_comptable"]:
+                        pf_details = client_statuts.get("paiementFinal", {})
+                        montant_str = str(pf_details.get("montant", "0,00 $"))
+                        montant_str = montant_str.replace("\xa0", "").replace(" ", "").replace(",", ".").replace("$", "").strip()
+                        try:
+                            paiements_recoltes += float(montant_str)
+                        except:
+                            pass
 
-                        # Autres paiements traités
-                        autres_paiements = client_statuts.get("autresPaiements", [])
-                        if isinstance(autres_paiements, list):
-                            for ap in autres_paiements:
-                                if ap.get("statut") in ["traite", "attente_comptable"]:
-                                    montant_str = str(ap.get("montant", "0,00 $"))
-                                    montant_str = montant_str.replace("\xa0", "").replace(" ", "").replace(",", ".").replace("$", "").strip()
-                                    try:
-                                        paiements_recoltes += float(montant_str)
-                                    except:
-                                        pass
+                    # Autres paiements traités
+                    autres_paiements = client_statuts.get("autresPaiements", [])
+                    if isinstance(autres_paiements, list):
+                        for ap in autres_paiements:
+                            if ap.get("statut") in ["traite", "attente_comptable"]:
+                                montant_str = str(ap.get("montant", "0,00 $"))
+                                montant_str = montant_str.replace("\xa0", "").replace(" ", "").replace(",", ".").replace("$", "").strip()
+                                try:
+                                    paiements_recoltes += float(montant_str)
+                                except:
+                                    pass
             except:
                 pass
 
@@ -8115,12 +7434,11 @@ def api_get_coach_equipe_dashboard(
     coach_previsions_path = os.path.join(base_cloud, "coach_previsions", f"{coach_username}_previsions.json")
     if os.path.exists(coach_previsions_path):
         try:
-            with open(coach_previsions_path, 'r', encoding='utf-8') as f:
-                coach_previsions_data = json.load(f)
-                previsions = coach_previsions_data.get("previsions", {})
-                # La somme de toutes les prévisions = objectif total du coach
-                team_total_objectif = sum(previsions.values())
-                print(f"[DEBUG OBJECTIF COACH] {coach_username} -> Objectif depuis previsions: {team_total_objectif} (détail: {previsions})")
+            coach_previsions_data = load_json_cached(coach_previsions_path, readonly=True)
+            previsions = coach_previsions_data.get("previsions", {})
+            # La somme de toutes les prévisions = objectif total du coach
+            team_total_objectif = sum(previsions.values())
+            print(f"[DEBUG OBJECTIF COACH] {coach_username} -> Objectif depuis previsions: {team_total_objectif} (détail: {previsions})")
         except Exception as e:
             print(f"[DEBUG OBJECTIF COACH ERROR] {coach_username} -> Erreur chargement previsions: {e}")
             # Si erreur, garder la somme des objectifs individuels
@@ -8217,19 +7535,11 @@ def api_get_coach_equipe_dashboard(
 def load_submissions_for_entrepreneur(username: str, start_date: datetime, end_date: datetime, signed: bool = False):
     dossier = "soumissions_signees" if signed else "soumissions_completes"
     fichier = f"{base_cloud}/{dossier}/{username}/soumissions.json"
-    if not os.path.exists(fichier):
+    index = load_date_index(fichier)
+    if index is None:
         return None
-    with open(fichier, "r", encoding="utf-8") as f:
-        soumissions = json.load(f)
-    filtered = []
-    for s in soumissions:
-        date_str = s.get("date", "")
-        date_obj = parse_date_flexible(date_str)
-        if not date_obj:
-            continue
-        if start_date <= date_obj <= end_date:
-            filtered.append(s)
-    return filtered
+    # Soumissions sans date lisible exclues, comme avant
+    return index.between(start_date, end_date)
 
 from fastapi import HTTPException, Query
 from typing import Optional
@@ -9952,7 +9262,7 @@ class AssignCoachData(BaseModel):
 async def assign_coach_to_entrepreneur(data: AssignCoachData):
     """Assigne ou désassigne un coach à un entrepreneur"""
     try:
-        with sqlite3.connect(DB_PATH) as conn:
+        with get_connection() as conn:
             cursor = conn.cursor()
 
             # Si on assigne un coach, récupérer son username
@@ -10034,6 +9344,7 @@ async def update_user_route(data: UpdateUserData):
         )
 
         if success:
+            identity_cache.invalidate()
             return {"success": True, "message": "Utilisateur mis à jour avec succès"}
         else:
             raise HTTPException(
@@ -10059,6 +9370,7 @@ async def delete_user_route(data: DeleteUserData):
         success = delete_user_completely(user_id=data.id)
 
         if success:
+            identity_cache.invalidate()
             return {"success": True, "message": "Utilisateur supprimé avec succès"}
         else:
             raise HTTPException(status_code=400, detail="Impossible de supprimer l'utilisateur")
@@ -10082,6 +9394,7 @@ async def toggle_active_route(data: ToggleActiveData):
         success = toggle_user_active(user_id=data.id, is_active=data.is_active)
 
         if success:
+            identity_cache.invalidate()
             status = "activé" if data.is_active else "désactivé"
             return {"success": True, "message": f"Utilisateur {status} avec succès"}
         else:
@@ -10098,7 +9411,7 @@ async def toggle_active_route(data: ToggleActiveData):
 async def get_users_entrepreneurs_api(coach_username: Optional[str] = None):
     """Récupère la liste de tous les entrepreneurs (ou filtrée par coach si spécifié) avec le nombre d'employés en attente"""
     try:
-        with sqlite3.connect(DB_PATH) as conn:
+        with get_connection() as conn:
             cursor = conn.cursor()
 
             if coach_username:
@@ -10122,25 +9435,19 @@ async def get_users_entrepreneurs_api(coach_username: Optional[str] = None):
             employes_dir = os.path.join(base_cloud, "employes")
             statuts_dir = os.path.join(base_cloud, "facturation_qe_statuts")
 
-            # Charger l'historique pour exclure les paiements déjà dans Rapprochement QBO
-            historique_file = os.path.join(base_cloud, "facturation_qe_historique", "historique.json")
+            # Clés de l'historique pour exclure les paiements déjà dans Rapprochement QBO
             paiements_en_rapprochement = set()
             remboursements_en_rapprochement = set()
-            if os.path.exists(historique_file):
-                try:
-                    with open(historique_file, "r", encoding="utf-8") as f:
-                        historique = json.load(f)
-                        for h in historique:
-                            if h.get("statut") == "attente_comptable":
-                                if h.get("type") == "remboursement":
-                                    # Pour les remboursements: (username, num)
-                                    remboursements_en_rapprochement.add((h.get("entrepreneurUsername"), h.get("numeroSoumission")))
-                                else:
-                                    # Pour les autres paiements: (username, num, type, index)
-                                    key = (h.get("entrepreneurUsername"), h.get("numeroSoumission"), h.get("type"), h.get("index"))
-                                    paiements_en_rapprochement.add(key)
-                except:
-                    pass
+            try:
+                for h_username, h_num, h_type, h_index in facturation_historique.live_keys(statut="attente_comptable"):
+                    if h_type == "remboursement":
+                        # Pour les remboursements: (username, num)
+                        remboursements_en_rapprochement.add((h_username, h_num))
+                    else:
+                        # Pour les autres paiements: (username, num, type, index)
+                        paiements_en_rapprochement.add((h_username, h_num, h_type, h_index))
+            except:
+                pass
 
             for row in cursor.fetchall():
                 username = row[0]
@@ -10317,7 +9624,7 @@ async def get_users_entrepreneurs_api(coach_username: Optional[str] = None):
 async def get_all_coaches():
     """Récupère la liste de tous les coachs"""
     try:
-        with sqlite3.connect(DB_PATH) as conn:
+        with get_connection() as conn:
             cursor = conn.cursor()
 
             # Récupérer tous les coachs avec prenom et nom
@@ -10353,7 +9660,7 @@ async def get_all_coaches():
 async def get_all_direction():
     """Récupère la liste de tous les utilisateurs direction"""
     try:
-        with sqlite3.connect(DB_PATH) as conn:
+        with get_connection() as conn:
             cursor = conn.cursor()
 
             # Récupérer tous les direction avec prenom et nom
@@ -10387,7 +9694,7 @@ async def get_all_direction():
 
 @app.post("/api/users/heartbeat")
 async def user_heartbeat(request: Request):
-    """Enregistre un heartbeat pour marquer l'utilisateur comme en ligne (persisté en SQLite)"""
+    """Enregistre un heartbeat pour marquer l'utilisateur comme en ligne (registre en mémoire)"""
     try:
         data = await request.json()
         username = data.get("username")
@@ -10395,21 +9702,10 @@ async def user_heartbeat(request: Request):
         if not username:
             return {"success": False, "error": "Username requis"}
 
-        # Récupérer les infos de l'utilisateur et insérer/mettre à jour dans online_users
-        with sqlite3.connect(DB_PATH) as conn:
-            cursor = conn.cursor()
-            cursor.execute("""
-                SELECT prenom, nom, role FROM users WHERE username = ?
-            """, (username,))
-            row = cursor.fetchone()
-
-            if row:
-                # INSERT OR REPLACE pour gérer les heartbeats répétés
-                cursor.execute("""
-                    INSERT OR REPLACE INTO online_users (username, last_seen, prenom, nom, role)
-                    VALUES (?, ?, ?, ?, ?)
-                """, (username, time.time(), row[0] or "", row[1] or "", row[2] or "entrepreneur"))
-                conn.commit()
+        # Heartbeats suivants: mémoire seulement, écrits dans SQLite par lot
+        if not presence_registry.heartbeat(username):
+            # Premier heartbeat: lecture du profil dans le pool d'I/O
+            await run_blocking(presence_registry.register, username)
 
         return {"success": True}
     except Exception as e:
@@ -10419,16 +9715,13 @@ async def user_heartbeat(request: Request):
 
 @app.post("/api/users/disconnect")
 async def user_disconnect(request: Request):
-    """Marque l'utilisateur comme déconnecté immédiatement (supprime de SQLite)"""
+    """Marque l'utilisateur comme déconnecté immédiatement (supprimé de SQLite au prochain flush)"""
     try:
         data = await request.json()
         username = data.get("username")
 
         if username:
-            with sqlite3.connect(DB_PATH) as conn:
-                cursor = conn.cursor()
-                cursor.execute("DELETE FROM online_users WHERE username = ?", (username,))
-                conn.commit()
+            presence_registry.disconnect(username)
 
         return {"success": True}
     except Exception as e:
@@ -10437,37 +9730,9 @@ async def user_disconnect(request: Request):
 
 @app.get("/api/users/online")
 async def get_online_users():
-    """Récupère la liste des utilisateurs en ligne (heartbeat < 30 secondes) depuis SQLite"""
+    """Récupère la liste des utilisateurs en ligne (heartbeat < 30 secondes) depuis la mémoire"""
     try:
-        current_time = time.time()
-        timeout = 30  # 30 secondes de timeout
-        cutoff_time = current_time - timeout
-
-        with sqlite3.connect(DB_PATH) as conn:
-            cursor = conn.cursor()
-
-            # Nettoyer les utilisateurs inactifs (heartbeat trop vieux)
-            cursor.execute("DELETE FROM online_users WHERE last_seen < ?", (cutoff_time,))
-
-            # Récupérer les utilisateurs actifs
-            cursor.execute("""
-                SELECT username, prenom, nom, role
-                FROM online_users
-                WHERE last_seen >= ?
-            """, (cutoff_time,))
-
-            rows = cursor.fetchall()
-            conn.commit()
-
-            active_users = []
-            for row in rows:
-                active_users.append({
-                    "username": row[0],
-                    "prenom": row[1] or "",
-                    "nom": row[2] or "",
-                    "role": row[3] or "entrepreneur"
-                })
-
+        active_users = presence_registry.get_online_users()
         return {
             "success": True,
             "count": len(active_users),
@@ -10478,6 +9743,43 @@ async def get_online_users():
         return {"success": False, "count": 0, "users": []}
 
 
+@app.get("/api/users/online/stream")
+async def stream_online_users(request: Request):
+    """
+    SSE: envoie la liste des utilisateurs en ligne à la connexion puis à chaque changement
+    (connexion, déconnexion, expiration). Remplace le polling de /api/users/online.
+    """
+    async def event_generator():
+        subscriber = presence_registry.subscribe()
+        _, changed = subscriber
+        try:
+            while True:
+                if await request.is_disconnected():
+                    break
+
+                changed.clear()
+                users = presence_registry.get_online_users()
+                yield f"data: {json.dumps({'success': True, 'count': len(users), 'users': users})}\n\n"
+
+                try:
+                    await asyncio.wait_for(changed.wait(), timeout=15)
+                except asyncio.TimeoutError:
+                    # Commentaire SSE: garde la connexion ouverte derrière les proxies
+                    yield ": keepalive\n\n"
+        finally:
+            presence_registry.unsubscribe(subscriber)
+
+    return StreamingResponse(
+        event_generator(),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "Connection": "keep-alive",
+            "X-Accel-Buffering": "no"
+        }
+    )
+
+
 @app.get("/api/user-info")
 async def get_current_user_info(request: Request):
     """Récupère les informations de l'utilisateur connecté"""
@@ -10488,7 +9790,7 @@ async def get_current_user_info(request: Request):
         if not username:
             raise HTTPException(status_code=401, detail="Non authentifié")
 
-        with sqlite3.connect(DB_PATH) as conn:
+        with get_connection() as conn:
             cursor = conn.cursor()
             cursor.execute("""
                 SELECT username, prenom, nom, role, email
@@ -10519,7 +9821,7 @@ async def get_current_user_info(request: Request):
 async def get_user_profile(username: str):
     """Récupère le profil d'un utilisateur"""
     try:
-        with sqlite3.connect(DB_PATH) as conn:
+        with get_connection() as conn:
             cursor = conn.cursor()
             cursor.execute("""
                 SELECT username, email, prenom, nom, telephone, adresse, photo_url
@@ -10585,7 +9887,7 @@ async def update_user_profile(request: Request):
 
         # Mettre à jour dans la base de données SQLite uniquement si des champs sont fournis
         if update_fields:
-            with sqlite3.connect(DB_PATH) as conn:
+            with get_connection() as conn:
                 cursor = conn.cursor()
                 update_values.append(username)
                 query = f"UPDATE users SET {', '.join(update_fields)} WHERE username = ?"
@@ -10619,6 +9921,7 @@ async def update_user_profile(request: Request):
         # Sauvegarder
         with open(user_info_file, "w", encoding="utf-8") as f:
             json.dump(user_info, f, ensure_ascii=False, indent=2)
+        identity_cache.invalidate(username)
 
         return {"success": True, "message": "Profil mis à jour"}
     except Exception as e:
@@ -10630,33 +9933,16 @@ async def update_user_profile(request: Request):
 async def upload_profile_photo(photo: UploadFile = File(...), username: str = Form(...)):
     """Upload la photo de profil d'un utilisateur"""
     try:
-        # Créer le dossier pour les photos de profil s'il n'existe pas
-        photos_dir = os.path.join(BASE_DIR, "static", "profile_photos")
-        os.makedirs(photos_dir, exist_ok=True)
-
-        # Générer un nom de fichier unique
-        file_extension = os.path.splitext(photo.filename)[1]
-        filename = f"{username}_{int(time.time())}{file_extension}"
-        file_path = os.path.join(photos_dir, filename)
-
-        # Sauvegarder le fichier
-        with open(file_path, "wb") as buffer:
-            content = await photo.read()
-            buffer.write(content)
-
-        # Mettre à jour l'URL dans la base de données
-        photo_url = f"/static/profile_photos/{filename}"
-
-        with sqlite3.connect(DB_PATH) as conn:
-            cursor = conn.cursor()
-            cursor.execute("""
-                UPDATE users
-                SET photo_url = ?
-                WHERE username = ?
-            """, (photo_url, username))
-            conn.commit()
+        # Stockage adressé par contenu + miniatures WebP/JPEG générées une fois ici
+        content = await photo.read()
+        digest = await run_blocking(photo_store.save_user_photo, username, content)
+        photo_url = photo_store.photo_url(digest)
 
-        return {"success": True, "photo_url": photo_url}
+        leaderboard.mark_dirty(username)
+        return {"success": True, "photo_url": photo_url, "photo_hash": digest,
+                "thumbnails": photo_store.photo_urls(digest)}
+    except photo_store.InvalidPhoto as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         print(f"[ERREUR] Upload photo: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -11026,8 +10312,10 @@ async def save_user_info(
 
         with open(user_info_path, "w", encoding="utf-8") as f:
             json.dump(user_info, f, ensure_ascii=False, indent=2)
+        identity_cache.invalidate(username)
 
         print(f"[OK] user_info.json sauvegardé pour {username}: {user_info}")
+        leaderboard.mark_dirty(username)
 
         return {
             "success": True,
@@ -11075,59 +10363,37 @@ async def save_profile_photo(
     try:
         print(f"[DEBUG] [SAVE-PHOTO] Début sauvegarde photo pour {username}", flush=True)
 
-        # Créer le dossier de signature pour l'utilisateur (on utilise le même dossier)
-        user_signature_dir = os.path.join(base_cloud, "signatures", username)
-        os.makedirs(user_signature_dir, exist_ok=True)
-        print(f"[DEBUG] [SAVE-PHOTO] Dossier créé/vérifié: {user_signature_dir}", flush=True)
-
         # Décoder l'image base64
         header, encoded = photoData.split(",", 1)
         photo_bytes = base64.b64decode(encoded)
         print(f"[DEBUG] [SAVE-PHOTO] Image décodée, taille: {len(photo_bytes)} bytes", flush=True)
 
-        # Sauvegarder l'image
-        photo_filename = f"profile_photo_{username}.png"
-        photo_path = os.path.join(user_signature_dir, photo_filename)
-
-        # Supprimer l'ancienne photo si elle existe
-        if os.path.exists(photo_path):
-            os.remove(photo_path)
-            print(f"[DEBUG] [SAVE-PHOTO] Ancienne photo supprimée", flush=True)
-
-        with open(photo_path, "wb") as f:
-            f.write(photo_bytes)
-
-        print(f"[DEBUG] [SAVE-PHOTO] Photo sauvegardée: {photo_path}", flush=True)
+        # Stockage adressé par contenu + miniatures (users.photo_hash / photo_url mis à jour)
+        digest = await run_blocking(photo_store.save_user_photo, username, photo_bytes)
+        photo_url = photo_store.photo_url(digest)
 
-        # Ajouter timestamp pour éviter le cache
-        import time
-        timestamp = int(time.time())
-
-        photo_url = f"/cloud/signatures/{username}/{photo_filename}?v={timestamp}"
+        # Copie historique signatures/<user>/profile_photo_<user>.png, encore lue par /api/get-file et get_user_info
+        user_signature_dir = os.path.join(base_cloud, "signatures", username)
+        await makedirs_async(user_signature_dir)
+        photo_path = os.path.join(user_signature_dir, f"profile_photo_{username}.png")
 
-        # Mettre à jour la base de données avec la nouvelle photo URL
-        try:
-            with sqlite3.connect(DB_PATH) as conn:
-                cursor = conn.cursor()
-                # Stocker l'URL sans le timestamp pour pouvoir ajouter un nouveau timestamp à chaque chargement
-                photo_url_db = f"/cloud/signatures/{username}/{photo_filename}"
-                cursor.execute("""
-                    UPDATE users
-                    SET photo_url = ?
-                    WHERE username = ?
-                """, (photo_url_db, username))
-                conn.commit()
-                print(f"[DEBUG] [SAVE-PHOTO] Base de données mise à jour avec photo_url: {photo_url_db}", flush=True)
-        except Exception as db_error:
-            print(f"[WARN] [SAVE-PHOTO] Erreur mise à jour DB (non bloquant): {db_error}", flush=True)
+        def _write_legacy_copy():
+            with open(photo_path, "wb") as f:
+                f.write(photo_bytes)
+        await run_blocking(_write_legacy_copy)
 
+        leaderboard.mark_dirty(username)
         print(f"[OK] Photo de profil sauvegardée pour {username}: {photo_url}", flush=True)
 
         return {
             "success": True,
             "message": "Photo de profil sauvegardée avec succès",
-            "photoUrl": photo_url
+            "photoUrl": photo_url,
+            "photoHash": digest,
+            "thumbnails": photo_store.photo_urls(digest)
         }
+    except photo_store.InvalidPhoto as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         print(f"[ERREUR] Erreur sauvegarde photo de profil: {e}", flush=True)
         import traceback
@@ -11281,7 +10547,7 @@ async def update_user_profile(request: Request):
         if not username or not first_name or not last_name:
             raise HTTPException(status_code=400, detail="Missing required fields")
 
-        with sqlite3.connect(DB_PATH) as conn:
+        with get_connection() as conn:
             cursor = conn.cursor()
             cursor.execute("""
                 UPDATE users
@@ -11322,7 +10588,7 @@ async def change_user_password(data: ChangePasswordData):
             raise HTTPException(status_code=400, detail="Le nouveau mot de passe doit contenir au moins 6 caractères")
 
         # Mettre à jour le mot de passe
-        with sqlite3.connect(DB_PATH) as conn:
+        with get_connection() as conn:
             cursor = conn.cursor()
 
             # Hasher le nouveau mot de passe
@@ -11354,11 +10620,20 @@ async def get_profile_photo(username: str):
     """Récupère la photo de profil d'un utilisateur"""
     try:
         # D'abord, chercher dans la base de données (pour tous les users: entrepreneurs, coaches, direction)
-        with sqlite3.connect(DB_PATH) as conn:
+        with get_connection() as conn:
             cursor = conn.cursor()
-            cursor.execute("SELECT photo_url FROM users WHERE username = ?", (username,))
+            cursor.execute("SELECT photo_url, photo_hash FROM users WHERE username = ?", (username,))
             result = cursor.fetchone()
 
+            # Photo adressée par contenu: URL immuable, pas de contournement du cache
+            if result and result[1]:
+                return {
+                    "success": True,
+                    "photoUrl": photo_store.photo_url(result[1]),
+                    "photoHash": result[1],
+                    "thumbnails": photo_store.photo_urls(result[1])
+                }
+
             if result and result[0]:
                 import time
                 timestamp = int(time.time())
@@ -11398,6 +10673,12 @@ async def get_profile_photo(username: str):
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.get("/photos/{digest}/{variant}")
+async def get_stored_photo(request: Request, digest: str, variant: str):
+    """Photo adressée par contenu (miniature ou original): immuable, mise en cache 1 an"""
+    return photo_store.photo_response(request, digest, variant)
+
+
 @app.post("/api/delete-profile-photo")
 async def delete_profile_photo(username: str = Body(...)):
     """Supprime la photo de profil d'un utilisateur"""
@@ -11405,9 +10686,15 @@ async def delete_profile_photo(username: str = Body(...)):
         photo_filename = f"profile_photo_{username}.png"
         photo_path = os.path.join(base_cloud, "signatures", username, photo_filename)
 
+        had_photo = await run_blocking(photo_store.get_user_photo_hash, username) is not None
+        if had_photo:
+            await run_blocking(photo_store.clear_user_photo, username)
+            leaderboard.mark_dirty(username)
+
         # Supprimer la photo si elle existe
-        if os.path.exists(photo_path):
-            os.remove(photo_path)
+        if os.path.exists(photo_path) or had_photo:
+            if os.path.exists(photo_path):
+                os.remove(photo_path)
             print(f"[OK] Photo de profil supprimée pour {username}", flush=True)
             return {
                 "success": True,
@@ -11436,26 +10723,17 @@ async def upload_mobile_photo(
     username: str = Form(...),
     photo: UploadFile = File(...)
 ):
-    """Recevoir la photo depuis le mobile"""
+    """Recevoir la photo depuis le mobile (écrite dans le spool partagé, voir QE/Backend/mobile_photos.py)"""
+    if not mobile_photo_rendezvous.is_valid_session(session):
+        raise HTTPException(status_code=400, detail="Session invalide")
     try:
-        # Lire la photo et la convertir en base64
-        photo_data = await photo.read()
-        photo_base64 = f"data:image/jpeg;base64,{base64.b64encode(photo_data).decode()}"
-
-        # Stocker temporairement
-        mobile_photo_sessions[session] = {
-            'photo': photo_base64,
-            'timestamp': datetime.now(),
-            'username': username
-        }
-
-        print(f"[OK] Photo mobile reçue pour session {session}", flush=True)
-
-        # Notifier les clients en attente via SSE
-        if session in mobile_photo_waiters:
-            mobile_photo_waiters[session].set()
-
+        size = await mobile_photo_rendezvous.store(session, photo)
+        print(f"[OK] Photo mobile reçue pour session {session} ({username}, {size // 1024} Ko)", flush=True)
         return {"success": True}
+    except PhotoTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         print(f"[ERREUR] Erreur upload mobile photo: {e}", flush=True)
         raise HTTPException(status_code=500, detail=str(e))
@@ -11463,34 +10741,21 @@ async def upload_mobile_photo(
 
 @app.get('/api/wait-mobile-photo/{session_id}')
 async def wait_mobile_photo(session_id: str):
-    """Attendre qu'une photo soit uploadée via SSE"""
-    async def event_generator():
-        # Créer un événement pour ce session_id
-        event = asyncio.Event()
-        mobile_photo_waiters[session_id] = event
+    """Attendre qu'une photo soit uploadée via SSE (envoie l'URL de la photo, pas son contenu)"""
+    if not mobile_photo_rendezvous.is_valid_session(session_id):
+        raise HTTPException(status_code=400, detail="Session invalide")
 
+    async def event_generator():
         print(f"[SSE] Client en attente pour session {session_id}", flush=True)
 
-        try:
-            # Attendre jusqu'à 5 minutes ou jusqu'à ce qu'une photo soit uploadée
-            await asyncio.wait_for(event.wait(), timeout=300)
-
-            # Photo disponible!
-            if session_id in mobile_photo_sessions:
-                photo_data = mobile_photo_sessions[session_id]['photo']
-                del mobile_photo_sessions[session_id]
-
-                print(f"[OK] Photo envoyée au client pour session {session_id}", flush=True)
-                yield f"data: {json.dumps({'photo': photo_data})}\n\n"
-
-        except asyncio.TimeoutError:
-            # Timeout après 5 minutes
+        # Attendre jusqu'à 5 minutes ou jusqu'à ce qu'une photo soit uploadée (sur n'importe quel worker)
+        path = await mobile_photo_rendezvous.wait(session_id, timeout=300)
+        if path:
+            print(f"[OK] Photo prête pour session {session_id}", flush=True)
+            yield f"data: {json.dumps({'photo': f'/api/mobile-photo/{session_id}'})}\n\n"
+        else:
             print(f"[TIMEOUT] Session {session_id} expirée", flush=True)
             yield f"data: {json.dumps({'photo': None})}\n\n"
-        finally:
-            # Nettoyer
-            if session_id in mobile_photo_waiters:
-                del mobile_photo_waiters[session_id]
 
     return StreamingResponse(
         event_generator(),
@@ -11503,6 +10768,22 @@ async def wait_mobile_photo(session_id: str):
     )
 
 
+@app.get('/api/mobile-photo/{session_id}')
+async def get_mobile_photo(session_id: str):
+    """Photo reçue du mobile, servie depuis le spool puis supprimée (usage unique)"""
+    if not mobile_photo_rendezvous.is_valid_session(session_id):
+        raise HTTPException(status_code=400, detail="Session invalide")
+    path = await run_blocking(mobile_photo_rendezvous.photo_path, session_id)
+    if not path:
+        raise HTTPException(status_code=404, detail="Photo introuvable ou expirée")
+    return FileResponse(
+        path,
+        media_type="image/jpeg",
+        headers={"Cache-Control": "no-store"},
+        background=BackgroundTask(mobile_photo_rendezvous.remove, session_id)
+    )
+
+
 # Endpoints pour le nouveau workflow des soumissions
 @app.get("/soumissions_attente/{username}")
 def get_soumissions_attente(username: str):
@@ -11611,11 +10892,7 @@ async def marquer_comme_perdu(data: dict = Body(...)):
 
         # Dossiers
         attente_dir = f"{base_cloud}/ventes_attente/{username}"
-        perdus_dir = f"{base_cloud}/clients_perdus/{username}"
-        os.makedirs(perdus_dir, exist_ok=True)
-
         attente_file = os.path.join(attente_dir, "ventes.json")
-        perdus_file = os.path.join(perdus_dir, "clients.json")
 
         # Charger les ventes en attente
         if not os.path.exists(attente_file):
@@ -11637,22 +10914,20 @@ async def marquer_comme_perdu(data: dict = Body(...)):
         if not client_trouve:
             raise HTTPException(status_code=404, detail="Client introuvable")
 
-        # Sauvegarder la liste mise à jour (sans le client perdu)
-        with open(attente_file, "w", encoding="utf-8") as f:
-            json.dump(ventes_attente_updated, f, ensure_ascii=False, indent=2)
-
         # Ajouter le client dans clients_perdus avec date de marquage
-        clients_perdus = []
-        if os.path.exists(perdus_file):
-            with open(perdus_file, "r", encoding="utf-8") as f:
-                clients_perdus = json.load(f)
+        # (avant de le retirer des ventes en attente: un échec ne doit pas le perdre des deux listes)
+        clients_perdus = load_user_documents("clients_perdus", username)
 
         client_trouve["date_perdu"] = datetime.now().isoformat()
         client_trouve["statut"] = "perdu"
         clients_perdus.append(client_trouve)
 
-        with open(perdus_file, "w", encoding="utf-8") as f:
-            json.dump(clients_perdus, f, ensure_ascii=False, indent=2)
+        if not save_user_documents("clients_perdus", username, clients_perdus):
+            raise HTTPException(status_code=500, detail="Erreur lors de l'enregistrement du client perdu")
+
+        # Sauvegarder la liste mise à jour (sans le client perdu)
+        with open(attente_file, "w", encoding="utf-8") as f:
+            json.dump(ventes_attente_updated, f, ensure_ascii=False, indent=2)
 
         # Supprimer le PDF de ventes_attente
         pdf_filename = client_trouve.get("pdf_url", "").split("/")[-1]
@@ -11699,10 +10974,11 @@ async def marquer_comme_perdu(data: dict = Body(...)):
 
         # Re-synchroniser le RPO pour mettre à jour les statistiques
         try:
-            from QE.Backend.rpo import sync_ventes_produit_to_rpo, sync_soumissions_to_rpo
+            from QE.Backend.rpo import sync_ventes_produit_to_rpo
+            from QE.Backend.rpo_sync import request_rpo_sync
             sync_result_produit = sync_ventes_produit_to_rpo(username)
-            sync_result_soum = sync_soumissions_to_rpo(username)
-            print(f"[RPO SYNC] RPO synchronisé après client perdu")
+            request_rpo_sync(username)
+            print(f"[RPO SYNC] RPO synchronisé après client perdu (recalcul soumissions programmé)")
         except Exception as e:
             print(f"[RPO SYNC WARNING] Impossible de synchroniser le RPO: {e}")
 
@@ -11813,10 +11089,11 @@ async def annuler_client_accepte(data: dict = Body(...)):
 
         # Re-synchroniser le RPO pour mettre à jour les statistiques
         try:
-            from QE.Backend.rpo import sync_ventes_produit_to_rpo, sync_soumissions_to_rpo
+            from QE.Backend.rpo import sync_ventes_produit_to_rpo
+            from QE.Backend.rpo_sync import request_rpo_sync
             sync_result_produit = sync_ventes_produit_to_rpo(username)
-            sync_result_soum = sync_soumissions_to_rpo(username)
-            print(f"[RPO SYNC] RPO synchronisé après client perdu")
+            request_rpo_sync(username)
+            print(f"[RPO SYNC] RPO synchronisé après client perdu (recalcul soumissions programmé)")
         except Exception as e:
             print(f"[RPO SYNC WARNING] Impossible de synchroniser le RPO: {e}")
 
@@ -11958,10 +11235,11 @@ async def marquer_vente_perdue(data: dict = Body(...)):
 
         # Re-synchroniser le RPO pour mettre à jour les statistiques
         try:
-            from QE.Backend.rpo import sync_ventes_produit_to_rpo, sync_soumissions_to_rpo
+            from QE.Backend.rpo import sync_ventes_produit_to_rpo
+            from QE.Backend.rpo_sync import request_rpo_sync
             sync_result_produit = sync_ventes_produit_to_rpo(username)
-            sync_result_soum = sync_soumissions_to_rpo(username)
-            print(f"[RPO SYNC] RPO synchronisé après client perdu")
+            request_rpo_sync(username)
+            print(f"[RPO SYNC] RPO synchronisé après client perdu (recalcul soumissions programmé)")
         except Exception as e:
             print(f"[RPO SYNC WARNING] Impossible de synchroniser le RPO: {e}")
 
@@ -11984,23 +11262,8 @@ async def get_clients_perdus(username: str):
     try:
         print(f"[BAN] Récupération des clients perdus pour {username}")
 
-        perdus_dir = f"{base_cloud}/clients_perdus/{username}"
-        perdus_file = os.path.join(perdus_dir, "clients.json")
-
-        # Créer le dossier et le fichier s'ils n'existent pas
-        if not os.path.exists(perdus_file):
-            os.makedirs(perdus_dir, exist_ok=True)
-            with open(perdus_file, "w", encoding="utf-8") as f:
-                json.dump([], f)
-            print(f"[BAN] Dossier clients perdus créé pour {username}")
-            return []
-
-        # Charger et retourner les clients perdus
-        with open(perdus_file, "r", encoding="utf-8") as f:
-            content = f.read().strip()
-            if not content:
-                return []
-            clients_perdus = json.loads(content)
+        # Charger et retourner les clients perdus (DocumentStore ou fichier JSON)
+        clients_perdus = load_user_documents("clients_perdus", username)
 
         print(f"[OK] {len(clients_perdus)} clients perdus trouvés pour {username}")
         return clients_perdus
@@ -12146,9 +11409,9 @@ async def supprimer_client_perdu(data: dict = Body(...)):
 
                             # Sync RPO pour mettre à jour estimation_reel
                             try:
-                                from QE.Backend.rpo import sync_soumissions_to_rpo
-                                sync_soumissions_to_rpo(username)
-                                print(f"[OK] RPO synchronisé après suppression")
+                                from QE.Backend.rpo_sync import request_rpo_sync
+                                request_rpo_sync(username)
+                                print(f"[OK] Synchronisation RPO programmée après suppression")
                             except Exception as e:
                                 print(f"[WARNING] Erreur sync RPO: {e}")
                     except Exception as e:
@@ -12360,12 +11623,10 @@ def get_soumissions_signees_facturation_qe(username: str):
     try:
         # Vérifier si c'est un coach
         from QE.Backend.coach_access import get_entrepreneurs_for_coach
-        import sqlite3
 
         is_coach = False
         try:
-            db_path = os.path.join(base_cloud, "qwota.db")
-            conn = sqlite3.connect(db_path)
+            conn = get_connection()
             cursor = conn.cursor()
             cursor.execute("SELECT role FROM users WHERE username = ?", (username,))
             role_row = cursor.fetchone()
@@ -13233,14 +12494,7 @@ def load_employes(username: str, type_employe: str):
     """Charge les employés d'un type donné pour un utilisateur"""
     try:
         fichier_path = os.path.join(f"{base_cloud}/employes", username, f"{type_employe}.json")
-        if not os.path.exists(fichier_path):
-            return []
-        
-        with open(fichier_path, "r", encoding="utf-8") as f:
-            content = f.read().strip()
-            if not content:
-                return []
-            return json.loads(content)
+        return load_json_cached(fichier_path, default=[])
     except Exception as e:
         print(f"Erreur lors du chargement des employés {type_employe}: {e}")
         return []
@@ -13254,6 +12508,9 @@ def save_employes(username: str, type_employe: str, employes: list):
         fichier_path = os.path.join(dossier, f"{type_employe}.json")
         with open(fichier_path, "w", encoding="utf-8") as f:
             json.dump(employes, f, indent=2, ensure_ascii=False)
+        invalidate_json_cache(fichier_path)
+        if f"employes_{type_employe}" in work_queue_index.SOURCES:
+            work_queue_index.refresh_source(username, f"employes_{type_employe}")
         
         return True
     except Exception as e:
@@ -13955,53 +13212,21 @@ async def get_employe_document(username: str, employe_id: str, filename: str):
 async def count_employes_en_attente(coach_username: str):
     """Compte le nombre total d'employés en attente de validation pour les entrepreneurs du coach (activations + réactivations + inactivations + modifications)"""
     try:
-        total_activations = 0
-        total_reactivations = 0
-        total_inactivations = 0
-        total_modifications = 0
-        employes_dir = os.path.join(base_cloud, "employes")
-
-        if not os.path.exists(employes_dir):
-            return {"success": True, "count": 0, "activations": 0, "reactivations": 0, "inactivations": 0, "modifications": 0}
-
         # Récupérer les entrepreneurs assignés à ce coach
         entrepreneurs_list = get_entrepreneurs_for_coach(coach_username)
         coach_entrepreneur_usernames = [e["username"] for e in entrepreneurs_list]
 
-        # Parcourir uniquement les entrepreneurs du coach
-        for username in coach_entrepreneur_usernames:
-            user_path = os.path.join(employes_dir, username)
-            if os.path.isdir(user_path):
-                # Compter les nouveaux employés en attente d'activation
-                employes_nouveaux = load_employes(username, "nouveaux")
-                for employe in employes_nouveaux:
-                    if employe.get("statut") == "En attente de validation":
-                        total_activations += 1
-
-                # Compter les réactivations en attente de validation coach
-                # IMPORTANT: Chercher dans inactifs ET termines, pas dans reactivations.json
-                # car le statut est mis à jour dans ces fichiers, pas dans reactivations.json
-                employes_inactifs = load_employes(username, "inactifs")
-                for emp in employes_inactifs:
-                    if emp.get("statut") == "Réactivation en attente de validation":
-                        total_reactivations += 1
-
-                employes_termines = load_employes(username, "termines")
-                for emp in employes_termines:
-                    if emp.get("statut") == "Réactivation en attente de validation":
-                        total_reactivations += 1
-
-                # Compter les inactivations en attente de validation coach
-                inactivations = load_inactivations(username)
-                for inact in inactivations:
-                    if inact.get("statut") == "Inactivation en attente de validation":
-                        total_inactivations += 1
-
-                # Compter les modifications en attente de validation coach
-                employes_actifs = load_employes(username, "actifs")
-                for employe in employes_actifs:
-                    if employe.get("statut") == "Modification en attente de validation":
-                        total_modifications += 1
+        # Réactivations: statut porté par inactifs.json / termines.json, pas par reactivations.json
+        counts = await run_blocking(work_queue_index.count_by_queue, (
+            work_queue_index.ACTIVATION_COACH,
+            work_queue_index.REACTIVATION_COACH_EMPLOYE,
+            work_queue_index.INACTIVATION_COACH,
+            work_queue_index.MODIFICATION_COACH,
+        ), coach_entrepreneur_usernames)
+        total_activations = counts[work_queue_index.ACTIVATION_COACH]
+        total_reactivations = counts[work_queue_index.REACTIVATION_COACH_EMPLOYE]
+        total_inactivations = counts[work_queue_index.INACTIVATION_COACH]
+        total_modifications = counts[work_queue_index.MODIFICATION_COACH]
 
         total = total_activations + total_reactivations + total_inactivations + total_modifications
         return {"success": True, "count": total, "activations": total_activations, "reactivations": total_reactivations, "inactivations": total_inactivations, "modifications": total_modifications}
@@ -14014,28 +13239,8 @@ async def count_employes_en_attente(coach_username: str):
 async def count_employes_refuses_coach():
     """Compte le nombre total d'employés refusés par le coach en attente de réponse de l'entrepreneur"""
     try:
-        total_refuses = 0
-        employes_dir = os.path.join(base_cloud, "employes")
-
-        if not os.path.exists(employes_dir):
-            return {"success": True, "count": 0}
-
-        # Parcourir tous les dossiers d'entrepreneurs
-        for username in os.listdir(employes_dir):
-            user_path = os.path.join(employes_dir, username)
-            if os.path.isdir(user_path):
-                # Compter les employés avec statut "Refusé par coach" dans nouveaux
-                employes_nouveaux = load_employes(username, "nouveaux")
-                for employe in employes_nouveaux:
-                    if employe.get("statut") == "Refusé par coach":
-                        total_refuses += 1
-
-                # Compter aussi dans actifs (au cas où)
-                employes_actifs = load_employes(username, "actifs")
-                for employe in employes_actifs:
-                    if employe.get("statut") == "Refusé par coach":
-                        total_refuses += 1
-
+        # Statut "Refusé par coach" dans nouveaux.json et actifs.json
+        total_refuses = await run_blocking(work_queue_index.count, (work_queue_index.REFUSE_COACH,))
         return {"success": True, "count": total_refuses}
     except Exception as e:
         print(f"Erreur lors du comptage des employés refusés par coach: {e}")
@@ -14048,41 +13253,27 @@ async def liste_employes_en_attente(coach_username: str):
     try:
         employes_en_attente = []
         inactivations_en_attente = []
-        employes_dir = os.path.join(base_cloud, "employes")
-
-        if not os.path.exists(employes_dir):
-            return {"success": True, "employes": [], "inactivations": []}
 
         # Récupérer les entrepreneurs assignés à ce coach
         entrepreneurs_list = get_entrepreneurs_for_coach(coach_username)
         coach_entrepreneur_usernames = [e["username"] for e in entrepreneurs_list]
 
-        # Parcourir uniquement les entrepreneurs du coach
-        for username in coach_entrepreneur_usernames:
-            user_path = os.path.join(employes_dir, username)
-            if os.path.isdir(user_path):
-                # Charger les nouveaux employés (activations)
-                employes_nouveaux = load_employes(username, "nouveaux")
+        items = await run_blocking(work_queue_index.list_items, (
+            work_queue_index.ACTIVATION_COACH,
+            work_queue_index.INACTIVATION_COACH,
+        ), coach_entrepreneur_usernames)
 
-                # Récupérer ceux en attente de validation
-                for employe in employes_nouveaux:
-                    if employe.get("statut") == "En attente de validation":
-                        # Ajouter le username de l'entrepreneur
-                        employe_avec_info = employe.copy()
-                        employe_avec_info["entrepreneur"] = username
-                        employe_avec_info["entrepreneurUsername"] = username
-                        employe_avec_info["requestType"] = "activation"
-                        employes_en_attente.append(employe_avec_info)
-
-                # Charger les inactivations en attente de validation coach
-                inactivations = load_inactivations(username)
-                for inact in inactivations:
-                    if inact.get("statut") == "Inactivation en attente de validation":
-                        inact_avec_info = inact.copy()
-                        inact_avec_info["entrepreneur"] = username
-                        inact_avec_info["entrepreneurUsername"] = username
-                        inact_avec_info["requestType"] = "inactivation"
-                        inactivations_en_attente.append(inact_avec_info)
+        for item in items:
+            username = item["entrepreneur"]
+            entree_avec_info = item["payload"].copy()
+            entree_avec_info["entrepreneur"] = username
+            entree_avec_info["entrepreneurUsername"] = username
+            if item["queue"] == work_queue_index.ACTIVATION_COACH:
+                entree_avec_info["requestType"] = "activation"
+                employes_en_attente.append(entree_avec_info)
+            else:
+                entree_avec_info["requestType"] = "inactivation"
+                inactivations_en_attente.append(entree_avec_info)
 
         return {"success": True, "employes": employes_en_attente, "inactivations": inactivations_en_attente}
     except Exception as e:
@@ -14143,73 +13334,16 @@ async def liste_modifications_en_attente(coach_username: str):
 async def count_facturation_en_traitement(coach_username: str):
     """Compte le nombre total de facturations en traitement pour les entrepreneurs du coach (depot, paiement_final, autres_paiements, remboursements)"""
     try:
-        total_count = 0
-        details_par_entrepreneur = {}
-        statuts_dir = os.path.join(base_cloud, "facturation_qe_statuts")
-
-        if not os.path.exists(statuts_dir):
-            return {"success": True, "count": 0, "details": {}}
-
         # Récupérer les entrepreneurs assignés à ce coach
         entrepreneurs_list = get_entrepreneurs_for_coach(coach_username)
         coach_entrepreneur_usernames = [e["username"] for e in entrepreneurs_list]
 
-        # Parcourir uniquement les entrepreneurs du coach
-        for username in coach_entrepreneur_usernames:
-            entrepreneur_count = 0
-
-            # Compter les paiements en traitement
-            user_path = os.path.join(statuts_dir, username)
-            if os.path.isdir(user_path):
-                statuts_file = os.path.join(user_path, "statuts_clients.json")
-                if os.path.exists(statuts_file):
-                    with open(statuts_file, "r", encoding="utf-8") as f:
-                        statuts = json.load(f)
-
-                    for num_soumission, client_statuts in statuts.items():
-                        # Vérifier si le client a un paiement refusé (urgent)
-                        # Si oui, ne pas compter ses paiements "traitement" car il est dans la colonne Urgent
-                        statut_depot = client_statuts.get("statutDepot")
-                        statut_paiement_final = client_statuts.get("statutPaiementFinal")
-                        autres_paiements = client_statuts.get("autresPaiements", [])
-
-                        # Vérifier si un paiement est refusé
-                        depot_refuse = statut_depot == "refuse"
-                        paiement_final_refuse = statut_paiement_final == "refuse"
-                        autres_refuses = any(p.get("statut") == "refuse" for p in autres_paiements) if isinstance(autres_paiements, list) else False
-                        a_paiement_refuse = depot_refuse or paiement_final_refuse or autres_refuses
-
-                        # Si le client a un paiement refusé, ne pas compter (il est dans Urgent)
-                        if a_paiement_refuse:
-                            continue
-
-                        # Compter depot en traitement
-                        if statut_depot == "traitement":
-                            entrepreneur_count += 1
-                            total_count += 1
-                        # Compter paiement final en traitement
-                        if statut_paiement_final == "traitement":
-                            entrepreneur_count += 1
-                            total_count += 1
-                        # Compter autres paiements en traitement
-                        if client_statuts.get("statutAutresPaiements") == "traitement":
-                            entrepreneur_count += 1
-                            total_count += 1
-
-            # Compter les remboursements en attente validation coach
-            remb_file = os.path.join(base_cloud, "remboursements", username, "remboursements.json")
-            if os.path.exists(remb_file):
-                with open(remb_file, "r", encoding="utf-8") as f:
-                    content = f.read().strip()
-                    if content:
-                        remboursements = json.loads(content)
-                        remb_en_attente = sum(1 for r in remboursements if r.get("statut") == "en_attente_coach")
-                        entrepreneur_count += remb_en_attente
-                        total_count += remb_en_attente
-                        print(f"[COACH NOTIF] {username}: {remb_en_attente} remboursements en attente coach")
-
-            if entrepreneur_count > 0:
-                details_par_entrepreneur[username] = entrepreneur_count
+        # Paiements "traitement" des clients sans paiement refusé (ceux-là sont dans Urgent)
+        # + remboursements en attente validation coach
+        details_par_entrepreneur = await run_blocking(
+            work_queue_index.count_by_entrepreneur, work_queue_index.FACTURATION_QUEUES, coach_entrepreneur_usernames
+        )
+        total_count = sum(details_par_entrepreneur.values())
 
         return {"success": True, "count": total_count, "details": details_par_entrepreneur}
     except Exception as e:
@@ -14314,6 +13448,7 @@ async def valider_facturation_coach(username: str, numero_soumission: str, reque
         # Sauvegarder
         with open(statuts_file, "w", encoding="utf-8") as f:
             json.dump(statuts, f, ensure_ascii=False, indent=2)
+        await run_blocking(work_queue_index.refresh_source, username, "statuts_clients")
 
         return {"success": True, "message": "Paiement validé par le coach - en attente de validation comptable"}
     except HTTPException:
@@ -14389,6 +13524,7 @@ async def refuser_facturation_coach(username: str, numero_soumission: str, reque
         # Sauvegarder
         with open(statuts_file, "w", encoding="utf-8") as f:
             json.dump(statuts, f, ensure_ascii=False, indent=2)
+        await run_blocking(work_queue_index.refresh_source, username, "statuts_clients")
 
         return {"success": True, "message": "Paiement refusé par le coach"}
     except HTTPException:
@@ -14436,7 +13572,7 @@ async def get_coach_tasks(coach_username: str, include_all: bool = False):
                 tasks = json.load(f)
 
         # Enrichir chaque tâche avec le nom complet du créateur
-        with sqlite3.connect(DB_PATH) as conn:
+        with get_connection() as conn:
             cursor = conn.cursor()
             for task in tasks:
                 creator_username = task.get("created_by")
@@ -15148,7 +14284,7 @@ async def get_coach_entrepreneurs_list(coach_username: str):
 async def get_all_entrepreneurs_list():
     """Récupère la liste de TOUS les entrepreneurs (pour Direction)"""
     try:
-        with sqlite3.connect(DB_PATH) as conn:
+        with get_connection() as conn:
             conn.row_factory = sqlite3.Row
             cursor = conn.cursor()
             cursor.execute("""
@@ -15182,73 +14318,22 @@ def get_available_weeks():
     Format: liste de {week_label, start_date, end_date, month_index, week_number}
     IMPORTANT: Cette route doit être définie AVANT /api/rpo/{username} pour éviter le conflit!
     """
-    from datetime import datetime, timezone, timedelta
-
-    # Liste des semaines de janvier à décembre 2026
-    weeks = []
+    from datetime import datetime, timezone
+    from season_calendar import season_calendar
 
-    # Définir les semaines manuellement basées sur la structure RPO
+    # Semaines de janvier à septembre de la saison (mois 0 à 8), depuis le calendrier précalculé
     all_weeks = [
-        # Mois 0 (Janvier 2026)
-        {"month_index": 0, "week_number": 1, "week_label": "5 - 11 janv", "start": "2026-01-05", "end": "2026-01-11"},
-        {"month_index": 0, "week_number": 2, "week_label": "12 - 18 janv", "start": "2026-01-12", "end": "2026-01-18"},
-        {"month_index": 0, "week_number": 3, "week_label": "19 - 25 janv", "start": "2026-01-19", "end": "2026-01-25"},
-        {"month_index": 0, "week_number": 4, "week_label": "26 janv - 1 févr", "start": "2026-01-26", "end": "2026-02-01"},
-        # Mois 1 (Février 2026)
-        {"month_index": 1, "week_number": 1, "week_label": "2 - 8 févr", "start": "2026-02-02", "end": "2026-02-08"},
-        {"month_index": 1, "week_number": 2, "week_label": "9 - 15 févr", "start": "2026-02-09", "end": "2026-02-15"},
-        {"month_index": 1, "week_number": 3, "week_label": "16 - 22 févr", "start": "2026-02-16", "end": "2026-02-22"},
-        {"month_index": 1, "week_number": 4, "week_label": "23 févr - 1 mars", "start": "2026-02-23", "end": "2026-03-01"},
-        # Mois 2 (Mars 2026)
-        {"month_index": 2, "week_number": 1, "week_label": "2 - 8 mars", "start": "2026-03-02", "end": "2026-03-08"},
-        {"month_index": 2, "week_number": 2, "week_label": "9 - 15 mars", "start": "2026-03-09", "end": "2026-03-15"},
-        {"month_index": 2, "week_number": 3, "week_label": "16 - 22 mars", "start": "2026-03-16", "end": "2026-03-22"},
-        {"month_index": 2, "week_number": 4, "week_label": "23 - 29 mars", "start": "2026-03-23", "end": "2026-03-29"},
-        {"month_index": 2, "week_number": 5, "week_label": "30 mars - 5 avr", "start": "2026-03-30", "end": "2026-04-05"},
-        # Mois 3 (Avril 2026)
-        {"month_index": 3, "week_number": 1, "week_label": "6 - 12 avr", "start": "2026-04-06", "end": "2026-04-12"},
-        {"month_index": 3, "week_number": 2, "week_label": "13 - 19 avr", "start": "2026-04-13", "end": "2026-04-19"},
-        {"month_index": 3, "week_number": 3, "week_label": "20 - 26 avr", "start": "2026-04-20", "end": "2026-04-26"},
-        {"month_index": 3, "week_number": 4, "week_label": "27 avr - 3 mai", "start": "2026-04-27", "end": "2026-05-03"},
-        # Mois 4 (Mai 2026)
-        {"month_index": 4, "week_number": 1, "week_label": "4 - 10 mai", "start": "2026-05-04", "end": "2026-05-10"},
-        {"month_index": 4, "week_number": 2, "week_label": "11 - 17 mai", "start": "2026-05-11", "end": "2026-05-17"},
-        {"month_index": 4, "week_number": 3, "week_label": "18 - 24 mai", "start": "2026-05-18", "end": "2026-05-24"},
-        {"month_index": 4, "week_number": 4, "week_label": "25 - 31 mai", "start": "2026-05-25", "end": "2026-05-31"},
-        # Mois 5 (Juin 2026)
-        {"month_index": 5, "week_number": 1, "week_label": "1 - 7 juin", "start": "2026-06-01", "end": "2026-06-07"},
-        {"month_index": 5, "week_number": 2, "week_label": "8 - 14 juin", "start": "2026-06-08", "end": "2026-06-14"},
-        {"month_index": 5, "week_number": 3, "week_label": "15 - 21 juin", "start": "2026-06-15", "end": "2026-06-21"},
-        {"month_index": 5, "week_number": 4, "week_label": "22 - 28 juin", "start": "2026-06-22", "end": "2026-06-28"},
-        {"month_index": 5, "week_number": 5, "week_label": "29 juin - 5 juil", "start": "2026-06-29", "end": "2026-07-05"},
-        # Mois 6 (Juillet 2026)
-        {"month_index": 6, "week_number": 1, "week_label": "6 - 12 juil", "start": "2026-07-06", "end": "2026-07-12"},
-        {"month_index": 6, "week_number": 2, "week_label": "13 - 19 juil", "start": "2026-07-13", "end": "2026-07-19"},
-        {"month_index": 6, "week_number": 3, "week_label": "20 - 26 juil", "start": "2026-07-20", "end": "2026-07-26"},
-        {"month_index": 6, "week_number": 4, "week_label": "27 juil - 2 août", "start": "2026-07-27", "end": "2026-08-02"},
-        # Mois 7 (Août 2026)
-        {"month_index": 7, "week_number": 1, "week_label": "3 - 9 août", "start": "2026-08-03", "end": "2026-08-09"},
-        {"month_index": 7, "week_number": 2, "week_label": "10 - 16 août", "start": "2026-08-10", "end": "2026-08-16"},
-        {"month_index": 7, "week_number": 3, "week_label": "17 - 23 août", "start": "2026-08-17", "end": "2026-08-23"},
-        {"month_index": 7, "week_number": 4, "week_label": "24 - 30 août", "start": "2026-08-24", "end": "2026-08-30"},
-        {"month_index": 7, "week_number": 5, "week_label": "31 août - 6 sept", "start": "2026-08-31", "end": "2026-09-06"},
-        # Mois 8 (Septembre 2026)
-        {"month_index": 8, "week_number": 1, "week_label": "7 - 13 sept", "start": "2026-09-07", "end": "2026-09-13"},
-        {"month_index": 8, "week_number": 2, "week_label": "14 - 20 sept", "start": "2026-09-14", "end": "2026-09-20"},
-        {"month_index": 8, "week_number": 3, "week_label": "21 - 27 sept", "start": "2026-09-21", "end": "2026-09-27"},
-        {"month_index": 8, "week_number": 4, "week_label": "28 sept - 4 oct", "start": "2026-09-28", "end": "2026-10-04"},
+        {"month_index": w.month_index, "week_number": w.week_number, "week_label": w.label,
+         "start": w.start.isoformat(), "end": w.end.isoformat()}
+        for w in season_calendar().weeks
+        if 0 <= w.month_index <= 8
     ]
 
     # Déterminer la semaine actuelle
-    now = datetime.now(timezone.utc)
-    current_week_index = -1
-
-    for i, w in enumerate(all_weeks):
-        start_date = datetime.strptime(w["start"], "%Y-%m-%d").replace(tzinfo=timezone.utc)
-        end_date = datetime.strptime(w["end"], "%Y-%m-%d").replace(hour=23, minute=59, second=59, tzinfo=timezone.utc)
-        if start_date <= now <= end_date:
-            current_week_index = i
-            break
+    today = datetime.now(timezone.utc).date().isoformat()
+    current_week_index = next(
+        (i for i, w in enumerate(all_weeks) if w["start"] <= today <= w["end"]), -1
+    )
 
     # Marquer la semaine actuelle
     for i, w in enumerate(all_weeks):
@@ -15738,7 +14823,7 @@ async def count_facturation_en_attente_comptable():
     """Compte le nombre de facturations en attente pour la direction/comptable (statut attente_comptable)"""
     try:
         from QE.Backend.facturationqe import get_facturations_a_traiter_count_direction
-        result = get_facturations_a_traiter_count_direction()
+        result = await run_blocking(get_facturations_a_traiter_count_direction)
         return {"success": True, "count": result.get("count", 0)}
     except Exception as e:
         print(f"Erreur lors du comptage des facturations en attente: {e}")
@@ -15754,26 +14839,14 @@ async def liste_facturation_en_traitement_comptable():
         if not os.path.exists(statuts_dir):
             return {"success": True, "paiements": []}
 
-        # Charger l'historique pour exclure les paiements déjà validés (seulement ceux qui ne sont pas refusés)
-        historique_file = os.path.join(base_cloud, "facturation_qe_historique", "historique.json")
+        # Clés de l'historique pour exclure les paiements déjà validés (seulement ceux qui ne sont pas refusés)
+        # Les paiements refusés peuvent revenir en attente_comptable après correction
         historique_set = set()
-        if os.path.exists(historique_file):
-            try:
-                with open(historique_file, "r", encoding="utf-8") as f:
-                    historique = json.load(f)
-                # Créer un set de clés uniques pour les paiements NON REFUSÉS dans l'historique
-                # Les paiements refusés peuvent revenir en attente_comptable après correction
-                for h in historique:
-                    # Ne pas exclure les paiements qui ont été refusés - ils peuvent revenir
-                    if h.get("statut") == "refuse":
-                        continue
-                    if h.get("type") == "autres_paiements":
-                        key = (h.get("entrepreneurUsername"), h.get("numeroSoumission"), h.get("type"), h.get("index"))
-                    else:
-                        key = (h.get("entrepreneurUsername"), h.get("numeroSoumission"), h.get("type"), None)
-                    historique_set.add(key)
-            except:
-                pass
+        try:
+            for h_username, h_num, h_type, h_index in facturation_historique.live_keys(exclude_statut="refuse"):
+                historique_set.add((h_username, h_num, h_type, h_index if h_type == "autres_paiements" else None))
+        except:
+            pass
 
         # Parcourir tous les dossiers d'entrepreneurs
         for username in os.listdir(statuts_dir):
@@ -16015,6 +15088,7 @@ async def valider_facturation_comptable(username: str, numero_soumission: str, r
             # Sauvegarder les remboursements mis à jour
             with open(remb_file, "w", encoding="utf-8") as f:
                 json.dump(remboursements, f, ensure_ascii=False, indent=2)
+            await run_blocking(work_queue_index.refresh_source, username, "remboursements")
 
             # Nettoyer le refus dans statuts_clients.json pour que le message disparaisse
             statuts_file = os.path.join(base_cloud, "facturation_qe_statuts", username, "statuts_clients.json")
@@ -16027,6 +15101,7 @@ async def valider_facturation_comptable(username: str, numero_soumission: str, r
                         statuts[numero_soumission]["dateMiseAJour"] = datetime.now().isoformat()
                         with open(statuts_file, "w", encoding="utf-8") as f:
                             json.dump(statuts, f, ensure_ascii=False, indent=2)
+                        await run_blocking(work_queue_index.refresh_source, username, "statuts_clients")
                 except Exception as e:
                     print(f"[VALIDER REMBOURSEMENT] Erreur nettoyage refus statuts: {e}")
 
@@ -16139,6 +15214,7 @@ async def valider_facturation_comptable(username: str, numero_soumission: str, r
         # Sauvegarder
         with open(statuts_file, "w", encoding="utf-8") as f:
             json.dump(statuts, f, ensure_ascii=False, indent=2)
+        await run_blocking(work_queue_index.refresh_source, username, "statuts_clients")
 
         # Ajouter à l'historique avec statut "attente_comptable" pour affichage dans Rapprochement QBO
         # Pour les paiements partiels, passer l'index
@@ -16163,18 +15239,9 @@ async def retourner_paiements_general(request: Request):
         if not paiements:
             raise HTTPException(status_code=400, detail="Aucun paiement fourni")
 
-        # Charger l'historique
-        historique_file = os.path.join(base_cloud, "facturation_qe_historique", "historique.json")
-        if not os.path.exists(historique_file):
-            return {"success": True, "message": "Aucun historique trouvé", "removed": 0}
-
-        with open(historique_file, "r", encoding="utf-8") as f:
-            historique = json.load(f)
-
-        # Créer un set des paiements à retirer
+        # Paiements à retirer de l'historique, clé unique: (entrepreneurUsername, numeroSoumission, type, index)
         paiements_a_retirer = set()
         for p in paiements:
-            # Clé unique: (entrepreneurUsername, numeroSoumission, type, index)
             key = (
                 p.get("entrepreneurUsername"),
                 p.get("numeroSoumission"),
@@ -16183,24 +15250,11 @@ async def retourner_paiements_general(request: Request):
             )
             paiements_a_retirer.add(key)
 
-        # Filtrer l'historique pour retirer les paiements
-        historique_original_len = len(historique)
-        historique_filtre = []
-        for h in historique:
-            key = (
-                h.get("entrepreneurUsername"),
-                h.get("numeroSoumission"),
-                h.get("type"),
-                h.get("index")
-            )
-            if key not in paiements_a_retirer:
-                historique_filtre.append(h)
-
-        # Sauvegarder l'historique mis à jour
-        with open(historique_file, "w", encoding="utf-8") as f:
-            json.dump(historique_filtre, f, ensure_ascii=False, indent=2)
-
-        removed_count = historique_original_len - len(historique_filtre)
+        # Pierres tombales (l'historique n'est jamais réécrit)
+        removed_count = 0
+        for h_username, h_num, h_type, h_index in paiements_a_retirer:
+            removed_count += facturation_historique.tombstone(h_username, [h_num], h_type, h_index,
+                                                              reason="retour_general")
 
         # Remettre le statut à attente_comptable dans statuts_clients.json pour chaque paiement
         for p in paiements:
@@ -16260,33 +15314,14 @@ async def remettre_paiement_rapprochement(request: Request):
         if not paiement:
             raise HTTPException(status_code=400, detail="Paiement non fourni")
 
-        # Charger l'historique
-        historique_file = os.path.join(base_cloud, "facturation_qe_historique", "historique.json")
-        historique = []
-        if os.path.exists(historique_file):
-            with open(historique_file, "r", encoding="utf-8") as f:
-                historique = json.load(f)
-
         # Vérifier si le paiement n'est pas déjà dans l'historique
-        key = (
+        already_exists = facturation_historique.exists(
             paiement.get("entrepreneurUsername"),
             paiement.get("numeroSoumission"),
             paiement.get("type"),
             paiement.get("index")
         )
 
-        already_exists = False
-        for h in historique:
-            h_key = (
-                h.get("entrepreneurUsername"),
-                h.get("numeroSoumission"),
-                h.get("type"),
-                h.get("index")
-            )
-            if h_key == key:
-                already_exists = True
-                break
-
         if not already_exists:
             # Créer l'entrée pour l'historique
             entry = {
@@ -16306,13 +15341,8 @@ async def remettre_paiement_rapprochement(request: Request):
             if paiement.get("type") == "autres_paiements" and paiement.get("index") is not None:
                 entry["index"] = paiement.get("index")
 
-            # Ajouter au début de l'historique
-            historique.insert(0, entry)
-
-            # Sauvegarder (garder les 500 dernières entrées)
-            historique = historique[:500]
-            with open(historique_file, "w", encoding="utf-8") as f:
-                json.dump(historique, f, ensure_ascii=False, indent=2)
+            # Ajouter comme entrée la plus récente de l'historique
+            facturation_historique.append(entry)
 
             print(f"[REMETTRE RAPPROCHEMENT] Paiement ajouté à l'historique: {paiement.get('numeroSoumission')}")
             return {"success": True, "message": "Paiement remis dans Rapprochement QBO"}
@@ -16449,6 +15479,7 @@ async def refuser_facturation_comptable(username: str, numero_soumission: str, r
                         break
                 with open(remb_file, "w", encoding="utf-8") as f:
                     json.dump(remboursements, f, ensure_ascii=False, indent=2)
+                await run_blocking(work_queue_index.refresh_source, username, "remboursements")
 
         if numero_soumission in statuts:
             statuts[numero_soumission]["dateMiseAJour"] = datetime.now().isoformat()
@@ -16456,6 +15487,7 @@ async def refuser_facturation_comptable(username: str, numero_soumission: str, r
         # Sauvegarder
         with open(statuts_file, "w", encoding="utf-8") as f:
             json.dump(statuts, f, ensure_ascii=False, indent=2)
+        await run_blocking(work_queue_index.refresh_source, username, "statuts_clients")
 
         # Ajouter à l'historique
         # Pour les paiements partiels, passer l'index
@@ -16513,6 +15545,7 @@ async def renvoyer_paiement_en_traitement(username: str, numero_soumission: str,
                 raise HTTPException(status_code=404, detail="Remboursement refusé non trouvé")
             with open(remb_file, "w", encoding="utf-8") as f:
                 json.dump(remboursements, f, ensure_ascii=False, indent=2)
+            await run_blocking(work_queue_index.refresh_source, username, "remboursements")
             return {"success": True, "message": "Remboursement renvoyé en traitement"}
 
         statuts_file = os.path.join(base_cloud, "facturation_qe_statuts", username, "statuts_clients.json")
@@ -16615,6 +15648,7 @@ async def renvoyer_paiement_en_traitement(username: str, numero_soumission: str,
         # Sauvegarder
         with open(statuts_file, "w", encoding="utf-8") as f:
             json.dump(statuts, f, ensure_ascii=False, indent=2)
+        await run_blocking(work_queue_index.refresh_source, username, "statuts_clients")
 
         return {"success": True, "message": "Paiement renvoyé en traitement pour validation coach"}
     except HTTPException:
@@ -16689,22 +15723,6 @@ async def envoyer_message_conversation(username: str, numero_soumission: str, re
 async def ajouter_historique_facturation(username: str, numero_soumission: str, type_paiement: str, statut: str, client_statuts: dict, index: int = None):
     """Ajoute une entrée à l'historique de facturation"""
     try:
-        historique_dir = os.path.join(base_cloud, "facturation_qe_historique")
-        os.makedirs(historique_dir, exist_ok=True)
-        historique_file = os.path.join(historique_dir, "historique.json")
-
-        # Charger l'historique existant
-        historique = []
-        if os.path.exists(historique_file):
-            with open(historique_file, "r", encoding="utf-8") as f:
-                content = json.load(f)
-                # Vérifier que c'est bien une liste
-                if isinstance(content, list):
-                    historique = content
-                else:
-                    print(f"[HISTORIQUE] Fichier corrompu (dict au lieu de list), réinitialisation")
-                    historique = []
-
         # Récupérer le nom et la photo de l'entrepreneur
         entrepreneur_nom = username
         entrepreneur_photo = None
@@ -16827,33 +15845,38 @@ async def ajouter_historique_facturation(username: str, numero_soumission: str,
         if type_paiement == "remboursement" and courriel:
             entry["courriel"] = courriel
 
-        historique.insert(0, entry)
-
-        # Sauvegarder (garder les 500 dernières entrées)
-        historique = historique[:500]
-        with open(historique_file, "w", encoding="utf-8") as f:
-            json.dump(historique, f, ensure_ascii=False, indent=2)
+        facturation_historique.append(entry)
 
     except Exception as e:
         print(f"Erreur lors de l'ajout à l'historique: {e}")
 
 @app.get("/api/comptable/facturation/historique")
-async def get_historique_facturation(limit: int = 100):
-    """Récupère l'historique des facturations validées et traitées (sans les refusés)"""
+async def get_historique_facturation(limit: int = 100, cursor: Optional[int] = None,
+                                     entrepreneur: Optional[str] = None, numero: Optional[str] = None,
+                                     type: Optional[str] = None, statut: Optional[str] = None,
+                                     date_debut: Optional[str] = None, date_fin: Optional[str] = None):
+    """
+    Récupère l'historique des facturations validées et traitées (sans les refusés), plus récentes d'abord
+    Pagination: passer next_cursor de la réponse dans cursor. Filtres optionnels:
+    entrepreneur (username), numero, type, statut, date_debut / date_fin (AAAA-MM-JJ, fin incluse)
+    """
     try:
-        historique_file = os.path.join(base_cloud, "facturation_qe_historique", "historique.json")
-
-        if not os.path.exists(historique_file):
-            return {"success": True, "historique": []}
-
-        with open(historique_file, "r", encoding="utf-8") as f:
-            historique = json.load(f)
+        date_from = datetime.strptime(date_debut, "%Y-%m-%d").timestamp() if date_debut else None
+        date_to = (datetime.strptime(date_fin, "%Y-%m-%d") + timedelta(days=1)).timestamp() if date_fin else None
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Format de date invalide (AAAA-MM-JJ)")
 
-        # Filtrer pour exclure les paiements refusés (statut "refuse")
+    try:
+        # Exclure les paiements refusés (statut "refuse") sauf si un statut est demandé
         # Inclure les paiements "attente_comptable" (validés par direction) et "valide" (traités)
-        historique_valides = [h for h in historique if h.get("statut") != "refuse"]
+        historique, next_cursor = await run_blocking(
+            facturation_historique.query,
+            limit=limit, cursor=cursor, username=entrepreneur, numero_soumission=numero,
+            type_paiement=type, statut=statut, exclude_statut=None if statut else "refuse",
+            date_from=date_from, date_to=date_to,
+        )
 
-        return {"success": True, "historique": historique_valides[:limit]}
+        return {"success": True, "historique": historique, "next_cursor": next_cursor}
     except Exception as e:
         print(f"Erreur lors de la récupération de l'historique: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -16868,35 +15891,19 @@ async def supprimer_paiements_historique(request: Request):
         if not paiements_a_supprimer:
             return {"success": False, "message": "Aucun paiement à supprimer"}
 
-        historique_file = os.path.join(base_cloud, "facturation_qe_historique", "historique.json")
-
-        if not os.path.exists(historique_file):
-            return {"success": False, "message": "Historique non trouvé"}
-
-        with open(historique_file, "r", encoding="utf-8") as f:
-            historique = json.load(f)
-
-        # Créer un set des paiements à supprimer pour une recherche rapide
-        # Format: (entrepreneurUsername, numeroSoumission, type)
+        # Paiements à supprimer, format: (entrepreneurUsername, numeroSoumission, type)
         a_supprimer_set = set()
         for p in paiements_a_supprimer:
             key = (p.get("entrepreneurUsername"), p.get("numeroSoumission"), p.get("type"))
             a_supprimer_set.add(key)
 
-        # Filtrer l'historique
-        historique_filtre = []
+        # Pierres tombales (l'historique n'est jamais réécrit)
         supprimes = 0
-        for h in historique:
-            key = (h.get("entrepreneurUsername"), h.get("numeroSoumission"), h.get("type"))
-            if key in a_supprimer_set:
-                supprimes += 1
+        for key in a_supprimer_set:
+            count = facturation_historique.tombstone(key[0], [key[1]], key[2], reason="rapprochement_qbo")
+            if count:
+                supprimes += count
                 print(f"[SUPPRIMER HISTORIQUE] Supprimé: {key}")
-            else:
-                historique_filtre.append(h)
-
-        # Sauvegarder
-        with open(historique_file, "w", encoding="utf-8") as f:
-            json.dump(historique_filtre, f, ensure_ascii=False, indent=2)
 
         return {"success": True, "message": f"{supprimes} paiement(s) supprimé(s) de l'historique"}
     except Exception as e:
@@ -16987,30 +15994,11 @@ async def supprimer_paiement_complet(request: Request):
                     with open(statuts_file, "w", encoding="utf-8") as f:
                         json.dump(statuts, f, ensure_ascii=False, indent=2)
 
-        # 2. Supprimer de l'historique
-        historique_file = os.path.join(base_cloud, "facturation_qe_historique", "historique.json")
-        if os.path.exists(historique_file):
-            with open(historique_file, "r", encoding="utf-8") as f:
-                historique = json.load(f)
-
-            # Filtrer l'historique
-            historique_filtre = []
-            for h in historique:
-                # Vérifier si c'est le paiement à supprimer
-                match = (h.get("entrepreneurUsername") == username and
-                        h.get("numeroSoumission") == numero_soumission and
-                        h.get("type") == type_paiement)
-                # Pour autres_paiements, vérifier aussi l'index
-                if match and type_paiement == "autres_paiements" and index is not None:
-                    match = h.get("index") == index
-
-                if not match:
-                    historique_filtre.append(h)
-                else:
-                    print(f"[SUPPRIMER COMPLET] Supprimé de l'historique")
-
-            with open(historique_file, "w", encoding="utf-8") as f:
-                json.dump(historique_filtre, f, ensure_ascii=False, indent=2)
+        # 2. Supprimer de l'historique (pour autres_paiements, seulement cet index)
+        index_historique = index if type_paiement == "autres_paiements" and index is not None else facturation_historique.ANY_INDEX
+        if facturation_historique.tombstone(username, [numero_soumission], type_paiement, index_historique,
+                                            reason="suppression_complete"):
+            print(f"[SUPPRIMER COMPLET] Supprimé de l'historique")
 
         return {"success": True, "message": "Paiement supprimé complètement"}
     except HTTPException:
@@ -17443,28 +16431,12 @@ async def get_conversation_refus(username: str, numero_soumission: str):
 async def count_employes_en_attente_comptable():
     """Compte le nombre total d'employés en attente de validation comptable (activations + modifications)"""
     try:
-        total_activations = 0
-        total_modifications = 0
-        employes_dir = os.path.join(base_cloud, "employes")
-
-        if not os.path.exists(employes_dir):
-            return {"success": True, "count": 0, "activations": 0, "modifications": 0}
-
-        # Parcourir tous les dossiers d'entrepreneurs
-        for username in os.listdir(employes_dir):
-            user_path = os.path.join(employes_dir, username)
-            if os.path.isdir(user_path):
-                # Charger les nouveaux employés (activations)
-                employes_nouveaux = load_employes(username, "nouveaux")
-                for employe in employes_nouveaux:
-                    if employe.get("statut") == "En attente comptable":
-                        total_activations += 1
-
-                # Charger les employés actifs (modifications en attente comptable)
-                employes_actifs = load_employes(username, "actifs")
-                for employe in employes_actifs:
-                    if employe.get("statut") == "Modification en attente comptable":
-                        total_modifications += 1
+        counts = await run_blocking(work_queue_index.count_by_queue, (
+            work_queue_index.ACTIVATION_COMPTABLE,
+            work_queue_index.MODIFICATION_COMPTABLE,
+        ))
+        total_activations = counts[work_queue_index.ACTIVATION_COMPTABLE]
+        total_modifications = counts[work_queue_index.MODIFICATION_COMPTABLE]
 
         total = total_activations + total_modifications
         return {"success": True, "count": total, "activations": total_activations, "modifications": total_modifications}
@@ -17478,60 +16450,54 @@ async def liste_employes_en_attente_comptable():
     """Liste tous les employés en attente de validation comptable avec les infos de l'entrepreneur"""
     try:
         employes_en_attente = []
-        employes_dir = os.path.join(base_cloud, "employes")
-
-        if not os.path.exists(employes_dir):
-            return {"success": True, "employes": []}
-
-        # Parcourir tous les dossiers d'entrepreneurs
-        for username in os.listdir(employes_dir):
-            user_path = os.path.join(employes_dir, username)
-            if os.path.isdir(user_path):
-                # Charger les nouveaux employés
-                employes_nouveaux = load_employes(username, "nouveaux")
+        items = await run_blocking(work_queue_index.list_items, (work_queue_index.ACTIVATION_COMPTABLE,))
 
-                # Récupérer ceux en attente comptable
-                for employe in employes_nouveaux:
-                    if employe.get("statut") == "En attente comptable":
-                        # Récupérer les infos de l'entrepreneur (nom complet et photo)
-                        entrepreneur_nom_complet = username
-                        photo_profil = None
+        # Infos de l'entrepreneur lues une fois, seulement pour ceux qui ont des employés en attente
+        entrepreneurs_infos = {}
+        for item in items:
+            username = item["entrepreneur"]
+            if username not in entrepreneurs_infos:
+                # Récupérer les infos de l'entrepreneur (nom complet et photo)
+                entrepreneur_nom_complet = username
+                photo_profil = None
 
-                        entrepreneur_department = None
-                        try:
-                            user_info = get_user_info(username)
-                            if user_info and user_info.get("success"):
-                                # Récupérer le nom complet depuis data
-                                data = user_info.get("data", {})
-                                prenom = data.get("prenom", "")
-                                nom = data.get("nom", "")
-                                if prenom or nom:
-                                    entrepreneur_nom_complet = f"{prenom} {nom}".strip()
-                                # Récupérer la photo depuis files
-                                files = user_info.get("files", {})
-                                photo_profil = files.get("profile_photo")
-                                # Récupérer le département
-                                entrepreneur_department = data.get("department")
-                        except:
-                            pass
+                entrepreneur_department = None
+                try:
+                    user_info = get_user_info(username)
+                    if user_info and user_info.get("success"):
+                        # Récupérer le nom complet depuis data
+                        data = user_info.get("data", {})
+                        prenom = data.get("prenom", "")
+                        nom = data.get("nom", "")
+                        if prenom or nom:
+                            entrepreneur_nom_complet = f"{prenom} {nom}".strip()
+                        # Récupérer la photo depuis files
+                        files = user_info.get("files", {})
+                        photo_profil = files.get("profile_photo")
+                        # Récupérer le département
+                        entrepreneur_department = data.get("department")
+                except:
+                    pass
 
-                        # Si pas de photo via get_user_info, chercher manuellement
-                        if not photo_profil:
-                            import glob as glob_module
-                            user_dir = os.path.join(base_cloud, "signatures", username)
-                            pattern = os.path.join(user_dir, f"profile_photo*.*")
-                            matching_files = glob_module.glob(pattern)
-                            if matching_files:
-                                filename = os.path.basename(matching_files[0])
-                                photo_profil = f"/api/get-file/{username}/{filename}"
+                # Si pas de photo via get_user_info, chercher manuellement
+                if not photo_profil:
+                    import glob as glob_module
+                    user_dir = os.path.join(base_cloud, "signatures", username)
+                    pattern = os.path.join(user_dir, f"profile_photo*.*")
+                    matching_files = glob_module.glob(pattern)
+                    if matching_files:
+                        filename = os.path.basename(matching_files[0])
+                        photo_profil = f"/api/get-file/{username}/{filename}"
+                entrepreneurs_infos[username] = (entrepreneur_nom_complet, photo_profil, entrepreneur_department)
 
-                        # Ajouter les infos de l'entrepreneur
-                        employe_avec_info = employe.copy()
-                        employe_avec_info["entrepreneur"] = entrepreneur_nom_complet
-                        employe_avec_info["entrepreneurUsername"] = username
-                        employe_avec_info["entrepreneurPhoto"] = photo_profil
-                        employe_avec_info["entrepreneurDepartment"] = entrepreneur_department
-                        employes_en_attente.append(employe_avec_info)
+            # Ajouter les infos de l'entrepreneur
+            entrepreneur_nom_complet, photo_profil, entrepreneur_department = entrepreneurs_infos[username]
+            employe_avec_info = item["payload"].copy()
+            employe_avec_info["entrepreneur"] = entrepreneur_nom_complet
+            employe_avec_info["entrepreneurUsername"] = username
+            employe_avec_info["entrepreneurPhoto"] = photo_profil
+            employe_avec_info["entrepreneurDepartment"] = entrepreneur_department
+            employes_en_attente.append(employe_avec_info)
 
         return {"success": True, "employes": employes_en_attente}
     except Exception as e:
@@ -18322,6 +17288,7 @@ def save_inactivations(username, inactivations):
     os.makedirs(os.path.dirname(filepath), exist_ok=True)
     with open(filepath, "w", encoding="utf-8") as f:
         json.dump(inactivations, f, ensure_ascii=False, indent=2)
+    work_queue_index.refresh_source(username, "inactivations")
     return True
 
 # Demander l'inactivation d'un employé (entrepreneur)
@@ -18740,23 +17707,7 @@ async def refuser_reactivation_coach(username: str, employe_id: str):
 async def count_inactivations_en_attente_coach():
     """Compte le nombre total d'inactivations en attente de validation pour tous les entrepreneurs"""
     try:
-        total_en_attente = 0
-        employes_dir = os.path.join(base_cloud, "employes")
-
-        if not os.path.exists(employes_dir):
-            return {"success": True, "count": 0}
-
-        # Parcourir tous les dossiers d'entrepreneurs
-        for username in os.listdir(employes_dir):
-            user_path = os.path.join(employes_dir, username)
-            if os.path.isdir(user_path):
-                inactivations = load_inactivations(username)
-
-                # Compter celles en attente de validation (coach)
-                for inact in inactivations:
-                    if inact.get("statut") == "Inactivation en attente de validation":
-                        total_en_attente += 1
-
+        total_en_attente = await run_blocking(work_queue_index.count, (work_queue_index.INACTIVATION_COACH,))
         return {"success": True, "count": total_en_attente}
     except Exception as e:
         print(f"Erreur compteur inactivations coach: {e}")
@@ -18768,23 +17719,7 @@ async def count_inactivations_en_attente_coach():
 async def count_inactivations_en_attente_comptable():
     """Compte le nombre total d'inactivations en attente comptable pour tous les entrepreneurs"""
     try:
-        total_en_attente = 0
-        employes_dir = os.path.join(base_cloud, "employes")
-
-        if not os.path.exists(employes_dir):
-            return {"success": True, "count": 0}
-
-        # Parcourir tous les dossiers d'entrepreneurs
-        for username in os.listdir(employes_dir):
-            user_path = os.path.join(employes_dir, username)
-            if os.path.isdir(user_path):
-                inactivations = load_inactivations(username)
-
-                # Compter celles en attente comptable
-                for inact in inactivations:
-                    if inact.get("statut") == "Inactivation en attente comptable":
-                        total_en_attente += 1
-
+        total_en_attente = await run_blocking(work_queue_index.count, (work_queue_index.INACTIVATION_COMPTABLE,))
         return {"success": True, "count": total_en_attente}
     except Exception as e:
         print(f"Erreur compteur inactivations comptable: {e}")
@@ -18796,15 +17731,13 @@ async def get_inactivations_en_attente_coach():
     """Retourne la liste des inactivations en attente de validation pour le coach"""
     try:
         inactivations_en_attente = []
-        employes_dir = os.path.join(base_cloud, "employes")
-
-        if not os.path.exists(employes_dir):
-            return {"inactivations": []}
+        items = await run_blocking(work_queue_index.list_items, (work_queue_index.INACTIVATION_COACH,))
 
-        # Parcourir tous les dossiers d'entrepreneurs
-        for username in os.listdir(employes_dir):
-            user_path = os.path.join(employes_dir, username)
-            if os.path.isdir(user_path):
+        # Infos de l'entrepreneur lues une fois, seulement pour ceux qui ont des inactivations en attente
+        entrepreneurs_infos = {}
+        for item in items:
+            username = item["entrepreneur"]
+            if username not in entrepreneurs_infos:
                 # Récupérer la photo de profil et le nom complet de l'entrepreneur
                 photo_profil = None
                 entrepreneur_nom_complet = username
@@ -18823,17 +17756,15 @@ async def get_inactivations_en_attente_coach():
                         entrepreneur_department = data.get("department")
                 except:
                     pass
+                entrepreneurs_infos[username] = (entrepreneur_nom_complet, photo_profil, entrepreneur_department)
 
-                inactivations = load_inactivations(username)
-
-                for inact in inactivations:
-                    if inact.get("statut") == "Inactivation en attente de validation":
-                        inact_info = inact.copy()
-                        inact_info["entrepreneur"] = entrepreneur_nom_complet
-                        inact_info["entrepreneurUsername"] = username
-                        inact_info["entrepreneurPhoto"] = photo_profil
-                        inact_info["entrepreneurDepartment"] = entrepreneur_department
-                        inactivations_en_attente.append(inact_info)
+            entrepreneur_nom_complet, photo_profil, entrepreneur_department = entrepreneurs_infos[username]
+            inact_info = item["payload"].copy()
+            inact_info["entrepreneur"] = entrepreneur_nom_complet
+            inact_info["entrepreneurUsername"] = username
+            inact_info["entrepreneurPhoto"] = photo_profil
+            inact_info["entrepreneurDepartment"] = entrepreneur_department
+            inactivations_en_attente.append(inact_info)
 
         return {"inactivations": inactivations_en_attente}
     except Exception as e:
@@ -18846,15 +17777,13 @@ async def get_inactivations_en_attente_comptable():
     """Retourne la liste des inactivations en attente comptable pour la Direction"""
     try:
         inactivations_en_attente = []
-        employes_dir = os.path.join(base_cloud, "employes")
-
-        if not os.path.exists(employes_dir):
-            return {"inactivations": []}
+        items = await run_blocking(work_queue_index.list_items, (work_queue_index.INACTIVATION_COMPTABLE,))
 
-        # Parcourir tous les dossiers d'entrepreneurs
-        for username in os.listdir(employes_dir):
-            user_path = os.path.join(employes_dir, username)
-            if os.path.isdir(user_path):
+        # Infos de l'entrepreneur lues une fois, seulement pour ceux qui ont des inactivations en attente
+        entrepreneurs_infos = {}
+        for item in items:
+            username = item["entrepreneur"]
+            if username not in entrepreneurs_infos:
                 # Récupérer la photo de profil et le nom complet (comme dans historique)
                 photo_profil = None
                 entrepreneur_nom_complet = username
@@ -18882,17 +17811,15 @@ async def get_inactivations_en_attente_comptable():
                     if matching_files:
                         filename = os.path.basename(matching_files[0])
                         photo_profil = f"/api/get-file/{username}/{filename}"
+                entrepreneurs_infos[username] = (entrepreneur_nom_complet, photo_profil, entrepreneur_department)
 
-                inactivations = load_inactivations(username)
-
-                for inact in inactivations:
-                    if inact.get("statut") == "Inactivation en attente comptable":
-                        inact_info = inact.copy()
-                        inact_info["entrepreneur"] = entrepreneur_nom_complet
-                        inact_info["entrepreneurUsername"] = username
-                        inact_info["entrepreneurPhoto"] = photo_profil
-                        inact_info["entrepreneurDepartment"] = entrepreneur_department
-                        inactivations_en_attente.append(inact_info)
+            entrepreneur_nom_complet, photo_profil, entrepreneur_department = entrepreneurs_infos[username]
+            inact_info = item["payload"].copy()
+            inact_info["entrepreneur"] = entrepreneur_nom_complet
+            inact_info["entrepreneurUsername"] = username
+            inact_info["entrepreneurPhoto"] = photo_profil
+            inact_info["entrepreneurDepartment"] = entrepreneur_department
+            inactivations_en_attente.append(inact_info)
 
         return {"inactivations": inactivations_en_attente}
     except Exception as e:
@@ -18970,6 +17897,7 @@ def save_reactivations(username, reactivations):
     os.makedirs(os.path.dirname(filepath), exist_ok=True)
     with open(filepath, "w", encoding="utf-8") as f:
         json.dump(reactivations, f, ensure_ascii=False, indent=2)
+    work_queue_index.refresh_source(username, "reactivations")
     return True
 
 # Modèle Pydantic pour la demande de réactivation
@@ -19120,27 +18048,13 @@ async def demander_reactivation(
 async def count_reactivations_en_attente_coach(coach_username: str):
     """Compte le nombre total de réactivations en attente de validation pour les entrepreneurs du coach"""
     try:
-        total_en_attente = 0
-        employes_dir = os.path.join(base_cloud, "employes")
-
-        if not os.path.exists(employes_dir):
-            return {"success": True, "count": 0}
-
         # Récupérer les entrepreneurs assignés à ce coach
         entrepreneurs_list = get_entrepreneurs_for_coach(coach_username)
         coach_entrepreneur_usernames = [e["username"] for e in entrepreneurs_list]
 
-        # Parcourir uniquement les entrepreneurs du coach
-        for username in coach_entrepreneur_usernames:
-            user_path = os.path.join(employes_dir, username)
-            if os.path.isdir(user_path):
-                reactivations = load_reactivations(username)
-
-                # Compter celles en attente de validation (coach)
-                for react in reactivations:
-                    if react.get("statut") == "Réactivation en attente de validation":
-                        total_en_attente += 1
-
+        total_en_attente = await run_blocking(
+            work_queue_index.count, (work_queue_index.REACTIVATION_COACH,), coach_entrepreneur_usernames
+        )
         return {"success": True, "count": total_en_attente}
     except Exception as e:
         print(f"Erreur compteur reactivations coach: {e}")
@@ -19162,6 +18076,8 @@ async def get_reactivations_en_attente_coach(coach_username: str):
         coach_entrepreneur_usernames = [e["username"] for e in entrepreneurs_list]
 
         # Parcourir uniquement les entrepreneurs du coach
+        # Miniatures des photos de profil en une requête (photo_store), sinon ancienne photo
+        entrepreneur_photos = photo_store.user_photo_urls(coach_entrepreneur_usernames, size=photo_store.PHOTO_LIST_SIZE)
         for username in coach_entrepreneur_usernames:
             user_path = os.path.join(employes_dir, username)
             if os.path.isdir(user_path):
@@ -19179,7 +18095,7 @@ async def get_reactivations_en_attente_coach(coach_username: str):
                     pass
 
                 # Utiliser l'URL de l'API pour la photo de profil
-                photo_profil = f"/api/get-file/{username}/profile_photo_{username}.png"
+                photo_profil = entrepreneur_photos.get(username) or f"/api/get-file/{username}/profile_photo_{username}.png"
 
                 reactivations = load_reactivations(username)
                 for react in reactivations:
@@ -19297,31 +18213,11 @@ async def refuser_reactivation_coach(username: str, employe_id: str):
 async def count_reactivations_en_attente_comptable():
     """Compte le nombre total de réactivations en attente comptable pour tous les entrepreneurs"""
     try:
-        count = 0
-        employes_dir = os.path.join(base_cloud, "employes")
-        ids_comptes = set()
-
-        if not os.path.exists(employes_dir):
-            return {"success": True, "count": 0}
-
-        for username in os.listdir(employes_dir):
-            user_path = os.path.join(employes_dir, username)
-            if os.path.isdir(user_path):
-                # D'abord compter dans reactivations.json
-                reactivations = load_reactivations(username)
-                for react in reactivations:
-                    if react.get("statut") == "Réactivation en attente comptable":
-                        count += 1
-                        ids_comptes.add(react.get("id"))
-
-                # Fallback: compter aussi dans inactifs.json et termines.json
-                for source in ["inactifs", "termines"]:
-                    employes_source = load_employes(username, source)
-                    for emp in employes_source:
-                        if emp.get("statut") == "Réactivation en attente comptable" and emp.get("id") not in ids_comptes:
-                            count += 1
-                            ids_comptes.add(emp.get("id"))
-
+        # reactivations.json + fallback inactifs.json / termines.json: un employé présent dans les deux compte une fois
+        count = await run_blocking(work_queue_index.count_distinct_refs, (
+            work_queue_index.REACTIVATION_COMPTABLE,
+            work_queue_index.REACTIVATION_COMPTABLE_EMPLOYE,
+        ))
         return {"success": True, "count": count}
     except Exception as e:
         print(f"Erreur compteur reactivations comptable: {e}")
@@ -19339,6 +18235,8 @@ async def get_reactivations_en_attente_comptable():
         if not os.path.exists(employes_dir):
             return {"reactivations": []}
 
+        # Miniatures des photos de profil en une requête (photo_store), sinon ancienne photo
+        entrepreneur_photos = photo_store.user_photo_urls(size=photo_store.PHOTO_LIST_SIZE)
         for username in os.listdir(employes_dir):
             user_path = os.path.join(employes_dir, username)
             if os.path.isdir(user_path):
@@ -19356,7 +18254,7 @@ async def get_reactivations_en_attente_comptable():
                     pass
 
                 # Utiliser l'URL de l'API pour la photo de profil
-                photo_profil = f"/api/get-file/{username}/profile_photo_{username}.png"
+                photo_profil = entrepreneur_photos.get(username) or f"/api/get-file/{username}/profile_photo_{username}.png"
 
                 # D'abord vérifier dans reactivations.json
                 reactivations = load_reactivations(username)
@@ -19410,8 +18308,10 @@ async def get_reactivations_en_attente_comptable():
 
 # Récupérer tous les employés actifs et terminés de tous les entrepreneurs (pour la Direction)
 @app.get("/api/direction/tous-employes")
-async def get_tous_employes_direction():
-    """Retourne tous les employés actifs et terminés de tous les entrepreneurs"""
+def get_tous_employes_direction():
+    """Retourne tous les employés actifs et terminés de tous les entrepreneurs
+    Route synchrone: FastAPI l'exécute dans son pool de threads (parcours de
+    dossiers + nombreuses lectures, qui bloqueraient la boucle en async)"""
     try:
         tous_actifs = []
         tous_termines = []
@@ -19420,6 +18320,8 @@ async def get_tous_employes_direction():
         if not os.path.exists(employes_dir):
             return {"actifs": [], "termines": []}
 
+        # Miniatures des photos de profil en une requête (photo_store), sinon ancienne photo
+        entrepreneur_photos = photo_store.user_photo_urls(size=photo_store.PHOTO_LIST_SIZE)
         for username in os.listdir(employes_dir):
             user_path = os.path.join(employes_dir, username)
             if os.path.isdir(user_path):
@@ -19439,7 +18341,7 @@ async def get_tous_employes_direction():
                 except:
                     pass
 
-                photo_profil = f"/api/get-file/{username}/profile_photo_{username}.png"
+                photo_profil = entrepreneur_photos.get(username) or f"/api/get-file/{username}/profile_photo_{username}.png"
 
                 # Charger les actifs (tous ceux dans actifs.json sont considérés actifs)
                 actifs = load_employes(username, "actifs")
@@ -19825,6 +18727,9 @@ async def save_user_info(
                 for file_path in glob.glob(pattern):
                     os.remove(file_path)
                     print(f"[DELETE] Fichier {file_key} supprimé: {file_path}")
+                if file_key == "profile_photo":
+                    await run_blocking(photo_store.clear_user_photo, username)
+                    leaderboard.mark_dirty(username)
             elif uploaded_file and uploaded_file.size > 0:
                 # Détecter l'extension du fichier original
                 original_filename = uploaded_file.filename or ""
@@ -19858,10 +18763,18 @@ async def save_user_info(
                 with open(file_path, "wb") as f:
                     f.write(file_content)
                 print(f"[FILE] Fichier {file_key}.{file_extension} sauvegardé pour {username}")
+                if file_key == "profile_photo":
+                    # Photo courante + miniatures (photo_store); le fichier ci-dessus reste la copie historique
+                    try:
+                        await run_blocking(photo_store.save_user_photo, username, file_content)
+                        leaderboard.mark_dirty(username)
+                    except photo_store.InvalidPhoto as e:
+                        print(f"[WARN] Photo de profil non indexée pour {username}: {e}")
         
         # Sauvegarder les informations mises à jour
         with open(info_file, "w", encoding="utf-8") as f:
             json.dump(existing_info, f, ensure_ascii=False, indent=2)
+        identity_cache.invalidate(username)
         
         print(f"[OK] Informations sauvegardées pour {username}")
         return {"success": True, "message": "Informations sauvegardées avec succès"}
@@ -20046,9 +18959,11 @@ async def update_user_info(username: str, request: Request):
         # Sauvegarder les informations
         with open(info_file, "w", encoding="utf-8") as f:
             json.dump(user_data, f, indent=2, ensure_ascii=False)
+        identity_cache.invalidate(username)
 
         print(f"[DEBUG] [UPDATE-INFO] Informations sauvegardées dans {info_file}")
         print(f"[DEBUG] [UPDATE-INFO] Contenu sauvegardé: {user_data}")
+        leaderboard.mark_dirty(username)
 
         return {
             "success": True,
@@ -20113,25 +19028,20 @@ async def save_gqp_to_queue(
     """Sauvegarder un GQP dans la file d'attente 'à envoyer'"""
     try:
         dossier_user = f"{base_cloud}/gqp/{username}"
-        os.makedirs(dossier_user, exist_ok=True)
+        await makedirs_async(dossier_user)
         
         # File pour les GQP à envoyer
         queue_file = os.path.join(dossier_user, "gqp_a_envoyer.json")
-        
-        if os.path.exists(queue_file):
-            with open(queue_file, "r", encoding="utf-8") as f:
-                queue = json.load(f)
-        else:
-            queue = []
+        queue = await load_json_async(queue_file, default=[])
         
         # Créer un ID unique pour ce GQP
         gqp_id = str(uuid.uuid4())
         
         # Créer le dossier pour les images de ce GQP
         images_dir = f"{base_cloud}/gqp_images/{username}/{gqp_id}"
-        os.makedirs(images_dir, exist_ok=True)
+        await makedirs_async(images_dir)
         
-        # Sauvegarder les images
+        # Sauvegarder les images (hors de la boucle d'événements)
         image_paths = []
         for i, image in enumerate(images):
             if image.filename:
@@ -20140,15 +19050,13 @@ async def save_gqp_to_queue(
                 image_path = os.path.join(images_dir, safe_filename)
                 
                 # Sauvegarder l'image
-                with open(image_path, "wb") as f:
-                    content = await image.read()
-                    f.write(content)
+                size = await save_upload_file(image, image_path)
                 
                 image_paths.append({
                     "filename": safe_filename,
                     "original_name": image.filename,
                     "path": image_path,
-                    "size": len(content)
+                    "size": size
                 })
         
         # Parser les données GQP
@@ -20169,8 +19077,8 @@ async def save_gqp_to_queue(
         queue.append(gqp_entry)
         
         # Sauvegarder
-        with open(queue_file, "w", encoding="utf-8") as f:
-            json.dump(queue, f, ensure_ascii=False, indent=2)
+        if not await save_json_async(queue_file, queue):
+            raise IOError(f"Écriture impossible: {queue_file}")
         
         return {"success": True, "gqp_id": gqp_entry["id"]}
         
@@ -21299,9 +20207,9 @@ def record_soumission_sent(username: str):
 
         # Sync RPO après l'envoi de la soumission
         try:
-            from QE.Backend.rpo import sync_soumissions_to_rpo
-            sync_soumissions_to_rpo(username)
-            print(f"[DATA] [Stats] RPO synchronisé pour {username}")
+            from QE.Backend.rpo_sync import request_rpo_sync
+            request_rpo_sync(username)
+            print(f"[DATA] [Stats] Synchronisation RPO programmée pour {username}")
         except Exception as sync_error:
             print(f"[WARNING] [Stats] Erreur sync RPO: {sync_error}")
 
@@ -21363,7 +20271,6 @@ from QE.Backend.rpo import (
     update_annual_data, update_monthly_data, update_weekly_data,
     get_annual_data, get_monthly_data, get_all_monthly_data,
     get_weekly_data, get_all_weekly_data_for_month,
-    sync_soumissions_to_rpo,
     update_etats_resultats_budget, get_etats_resultats_budget,
     update_etats_resultats_cible_percent, get_etats_resultats_actuel
 )
@@ -21429,7 +20336,8 @@ async def force_sync_rpo(username: str):
     """Route de debug pour forcer la synchronisation"""
     try:
         print(f"[DEBUG] Force sync pour {username}", flush=True)
-        result = sync_soumissions_to_rpo(username)
+        # Recalcul immédiat (remplace un recalcul programmé en attente), hors de la boucle asyncio
+        result = await run_blocking(rpo_sync_scheduler.force, username)
 
         # Recharger les données après sync
         data = load_user_rpo_data(username)
@@ -21613,10 +20521,12 @@ async def save_weekly_targets(data: dict):
         # Charger les données RPO en utilisant le module qui gère les chemins
         from QE.Backend.rpo import load_user_rpo_data, save_user_rpo_data, get_week_number_from_date, rpo_file_lock
         from datetime import datetime
+        import copy
 
         # Lock couvre le cycle complet load -> modify -> save
         with rpo_file_lock(username):
             rpo_data = load_user_rpo_data(username)
+            old_weekly = copy.deepcopy(rpo_data.get("weekly", {}))
 
             # Déterminer la semaine actuelle pour ne réinitialiser que les semaines futures
             today = datetime.now().strftime('%Y-%m-%d')
@@ -21665,14 +20575,10 @@ async def save_weekly_targets(data: dict):
             # Sauvegarder les données RPO en utilisant le module qui gère les chemins
             save_user_rpo_data(username, rpo_data)
 
-        # Synchroniser le RPO du coach si l'utilisateur est un entrepreneur
+        # Appliquer aux RPO coach et direction seulement les semaines modifiées
         try:
-            from QE.Backend.coach_access import get_coach_for_entrepreneur
-            from QE.Backend.rpo import sync_coach_rpo
-            coach_username = get_coach_for_entrepreneur(username)
-            if coach_username:
-                print(f"[SAVE TARGETS] Synchronisation RPO coach: {coach_username}")
-                sync_coach_rpo(coach_username)
+            from QE.Backend.rpo import apply_weekly_deltas_to_rollups
+            apply_weekly_deltas_to_rollups(username, old_weekly, rpo_data.get("weekly", {}))
         except Exception as sync_error:
             print(f"[SAVE TARGETS] [WARN] Erreur sync coach RPO: {sync_error}")
 
@@ -21722,53 +20628,49 @@ async def force_sync_coach_rpo(coach_username: str):
 
 
 @app.post("/api/rpo/sync-all-coaches")
-async def sync_all_coaches_rpo():
+async def sync_all_coaches_rpo(recompute: bool = Query(False)):
     """
     Synchronise le RPO de TOUS les coaches du système
     Utile pour migration ou mise à jour globale
+    Si recompute=true, recalcule d'abord le RPO de chaque entrepreneur actif
     """
     try:
-        from QE.Backend.rpo import sync_coach_rpo
-        from QE.Backend.user_management import get_all_users
-
-        # Récupérer tous les utilisateurs
-        all_users = get_all_users()
-
-        # Filtrer les coaches
-        coaches = [user['username'] for user in all_users if user.get('role') == 'coach']
+        from QE.Backend.rpo_org_sync import run_org_sync
 
-        print(f"[SYNC ALL COACHES] Found {len(coaches)} coaches to sync")
+        # Entrepreneurs puis coaches en parallèle (pool de processus), puis une seule fois la direction
+        result = await run_blocking(run_org_sync, recompute)
+        if result["status"] == "already_running":
+            raise HTTPException(status_code=409, detail="Synchronisation globale déjà en cours")
 
-        success_count = 0
-        failed_coaches = []
-
-        for coach_username in coaches:
-            try:
-                print(f"[SYNC ALL COACHES] Syncing {coach_username}...")
-                result = sync_coach_rpo(coach_username)
-                if result:
-                    success_count += 1
-                    print(f"[SYNC ALL COACHES] ✅ {coach_username} synchronized")
-                else:
-                    failed_coaches.append(coach_username)
-                    print(f"[SYNC ALL COACHES] ❌ {coach_username} failed")
-            except Exception as e:
-                failed_coaches.append(coach_username)
-                print(f"[SYNC ALL COACHES] ❌ Error syncing {coach_username}: {e}")
+        success_count = result["synchronized"]
+        failed_coaches = result["failed_coaches"]
 
         return {
             "status": "success",
-            "total_coaches": len(coaches),
+            "total_coaches": result["total_coaches"],
             "synchronized": success_count,
             "failed": len(failed_coaches),
             "failed_coaches": failed_coaches,
-            "message": f"{success_count}/{len(coaches)} coaches synchronisés"
+            "failed_entrepreneurs": result.get("failed_entrepreneurs", []),
+            "processes": result["processes"],
+            "phases": result["phases"],
+            "seconds": result["seconds"],
+            "message": f"{success_count}/{result['total_coaches']} coaches synchronisés"
         }
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"[SYNC ALL COACHES ERROR] {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.get("/api/rpo/sync-all-coaches/status")
+async def sync_all_coaches_status():
+    """Progression de la synchronisation globale en cours (phase, done/total) et durées de la dernière"""
+    from QE.Backend.rpo_org_sync import get_org_sync_status
+    return get_org_sync_status()
+
+
 # [STATS] Routes États des Résultats
 
 @app.post("/api/etats-resultats/budget/{username}")
@@ -22240,6 +21142,7 @@ async def creer_soumission_vente(data: dict = Body(...)):
             "language": user_language,  # NOUVEAU: Stocker la langue de la soumission
             "created_at": datetime.now().isoformat()
         }
+        normalize_record_date(soumission)
 
         # 1. Sauvegarder dans ventes_attente/
         fichier_ventes = os.path.join(pdf_dir, "ventes.json")
@@ -22310,6 +21213,7 @@ async def signer_soumission_vente(data: dict = Body(...)):
             if v.get("id") == soumission_id:
                 soumission = v.copy()
                 soumission["date_signature"] = datetime.now().isoformat()
+                normalize_record_date(soumission)
 
                 # Préserver les champs d'étiquettes (s'ils n'existent pas, initialiser à "")
                 if "statut_vente" not in soumission:
@@ -22423,24 +21327,14 @@ async def signer_soumission_vente(data: dict = Body(...)):
                 shutil.copy2(src_pdf, dst_pdf_signees)
                 os.remove(src_pdf)
 
-        # 4. Synchroniser avec Monday.com EN ARRIÈRE-PLAN (automatique si configuré)
-        print(f"[MONDAY] Tentative de synchronisation pour {username}")
-
-        def sync_monday_background():
-            sync_success = sync_vente_to_monday(username, soumission)
-            if sync_success:
-                print(f"[MONDAY] ✓ Synchronisation Monday.com réussie")
-            else:
-                print(f"[MONDAY] ✗ Synchronisation Monday.com échouée (non bloquant)")
-
-        threading.Thread(target=sync_monday_background, daemon=True).start()
-        print(f"[MONDAY] 🚀 Synchronisation Monday.com lancée en arrière-plan")
+        # 4. Synchroniser avec Monday.com EN ARRIÈRE-PLAN (outbox, automatique si configuré)
+        monday_outbox.enqueue_vente_sync(username, soumission)
 
         # --- SYNCHRONISATION RPO (entrepreneur -> coach -> direction) ---
         try:
-            from QE.Backend.rpo import sync_soumissions_to_rpo
-            sync_soumissions_to_rpo(username)
-            print(f"[RPO SYNC] RPO synchronisé après signature pour {username}")
+            from QE.Backend.rpo_sync import request_rpo_sync
+            request_rpo_sync(username)
+            print(f"[RPO SYNC] Synchronisation RPO programmée après signature pour {username}")
         except Exception as e:
             print(f"[RPO SYNC WARNING] Erreur synchronisation RPO: {e}")
 
@@ -22501,20 +21395,17 @@ def get_ventes_acceptees(username: str):
             if vente_id not in synced_ids:
                 nouvelles_ventes.append((vente_id, vente))
 
-        # Synchroniser les nouvelles ventes vers Monday.com EN ARRIÈRE-PLAN
+        # Synchroniser les nouvelles ventes vers Monday.com EN ARRIÈRE-PLAN (outbox persistante:
+        # une vente en file est marquée tout de suite, les échecs restent visibles dans l'outbox)
         if nouvelles_ventes:
-            def sync_ventes_background():
-                for vente_id, vente in nouvelles_ventes:
-                    sync_success = sync_vente_to_monday(username, vente)
-                    if sync_success:
-                        synced_ids.add(vente_id)
-
-                # Sauvegarder la liste mise à jour des ventes synchronisées
-                with open(fichier_synced, "w", encoding="utf-8") as f:
-                    json.dump(list(synced_ids), f, ensure_ascii=False, indent=2)
+            for vente_id, vente in nouvelles_ventes:
+                monday_outbox.enqueue_vente_sync(username, vente)
+                synced_ids.add(vente_id)
 
-            threading.Thread(target=sync_ventes_background, daemon=True).start()
-            print(f"[MONDAY] 🚀 Synchronisation de {len(nouvelles_ventes)} vente(s) lancée en arrière-plan")
+            # Sauvegarder la liste mise à jour des ventes synchronisées
+            with open(fichier_synced, "w", encoding="utf-8") as f:
+                json.dump(list(synced_ids), f, ensure_ascii=False, indent=2)
+            print(f"[MONDAY] 🚀 Synchronisation de {len(nouvelles_ventes)} vente(s) mise en file")
 
         return ventes
     except Exception:
@@ -22549,6 +21440,7 @@ async def production_terminee_vente(data: dict = Body(...)):
             if v.get("id") == soumission_id:
                 soumission = v.copy()
                 soumission["date_completion"] = datetime.now().isoformat()
+                normalize_record_date(soumission)
 
                 # Préserver les champs d'étiquettes
                 if "statut_vente" not in soumission:
@@ -22619,9 +21511,9 @@ async def production_terminee_vente(data: dict = Body(...)):
 
         # --- SYNCHRONISATION RPO (entrepreneur -> coach -> direction) ---
         try:
-            from QE.Backend.rpo import sync_soumissions_to_rpo
-            sync_soumissions_to_rpo(username)
-            print(f"[RPO SYNC] RPO synchronisé après production terminée pour {username}")
+            from QE.Backend.rpo_sync import request_rpo_sync
+            request_rpo_sync(username)
+            print(f"[RPO SYNC] Synchronisation RPO programmée après production terminée pour {username}")
         except Exception as e:
             print(f"[RPO SYNC WARNING] Erreur synchronisation RPO: {e}")
 
@@ -23152,95 +22044,14 @@ async def update_provenance(data: dict = Body(...)):
         print(f"[VENTES] Provenance mise à jour pour {username}/{vente_id}: {nouvelle_provenance}")
 
         # Synchroniser avec Monday.com si la catégorie est acceptees ou produit (client signé)
+        # Livré en arrière-plan (outbox): recherche de l'item, mapping/création de l'étiquette
         if category in ["acceptees", "produit"] and soumission_num:
             try:
-                # Récupérer les credentials Monday
-                api_key, board_id = get_monday_credentials(username)
-
-                if api_key and board_id:
-                    # Trouver l'item Monday correspondant en utilisant le numéro de soumission
-                    monday_item_id = find_monday_item_by_soumission(username, soumission_num)
-
-                    if monday_item_id:
-                        # Mapper l'étiquette au bon index Monday en cherchant par NOM
-                        if nouvelle_provenance and nouvelle_provenance.strip():
-                            # Récupérer le mapping des labels Monday
-                            from QE.Backend.monday_sync import get_monday_column_labels, add_label_to_monday_column
-
-                            label_map = get_monday_column_labels(api_key, board_id, "dup__of_couleurs_mkm0awjt")
-
-                            # Chercher l'index Monday correspondant au nom de l'étiquette
-                            monday_index = None
-
-                            # Essayer avec le nom exact
-                            if nouvelle_provenance in label_map:
-                                monday_index = label_map[nouvelle_provenance]
-                            # Essayer avec le nom normalisé (minuscules)
-                            elif nouvelle_provenance.lower() in label_map:
-                                monday_index = label_map[nouvelle_provenance.lower()]
-
-                            # Si l'étiquette n'existe pas dans Monday, essayer de la créer
-                            if monday_index is None:
-                                print(f"[MONDAY] Étiquette '{nouvelle_provenance}' non trouvée dans Monday")
-
-                                # Essayer de créer l'étiquette automatiquement
-                                # Récupérer la couleur de l'étiquette dans Qwota
-                                etiquette_color = "#3b82f6"  # Couleur par défaut (bleu)
-                                try:
-                                    fichier_etiquettes = os.path.join(f"{base_cloud}/ventes_etiquettes", username, "etiquettes.json")
-                                    if os.path.exists(fichier_etiquettes):
-                                        with open(fichier_etiquettes, "r", encoding="utf-8") as f:
-                                            etiquettes = json.load(f)
-                                        provenances = etiquettes.get("provenances", [])
-                                        for prov in provenances:
-                                            if isinstance(prov, dict) and prov.get("label") == nouvelle_provenance:
-                                                etiquette_color = prov.get("color", etiquette_color)
-                                                break
-                                except Exception as e:
-                                    print(f"[MONDAY] Impossible de récupérer la couleur: {e}")
-
-                                print(f"[MONDAY] Tentative de création de l'étiquette '{nouvelle_provenance}'...")
-                                monday_index = add_label_to_monday_column(
-                                    api_key,
-                                    board_id,
-                                    "dup__of_couleurs_mkm0awjt",
-                                    nouvelle_provenance,
-                                    etiquette_color
-                                )
-
-                                # Si la création échoue, essayer une correspondance partielle
-                                if monday_index is None:
-                                    print(f"[MONDAY] Recherche de correspondance partielle...")
-                                    nouvelle_prov_lower = nouvelle_provenance.lower()
-                                    for label_name, idx in label_map.items():
-                                        if label_name and nouvelle_prov_lower in label_name.lower() or label_name.lower() in nouvelle_prov_lower:
-                                            monday_index = idx
-                                            print(f"[MONDAY] Correspondance partielle trouvée: '{nouvelle_provenance}' -> '{label_name}' (index {monday_index})")
-                                            break
-
-                            if monday_index is not None:
-                                value_json = json.dumps({"index": monday_index})
-                                success = update_monday_column(
-                                    api_key,
-                                    board_id,
-                                    monday_item_id,
-                                    "dup__of_couleurs_mkm0awjt",  # ID colonne Provenance Monday
-                                    value_json
-                                )
-                                if success:
-                                    print(f"[MONDAY] Provenance synchronisée: {nouvelle_provenance} -> index {monday_index}")
-                                else:
-                                    print(f"[MONDAY ERROR] Échec synchronisation provenance")
-                            else:
-                                print(f"[MONDAY WARN] ⚠️ Étiquette '{nouvelle_provenance}' absente dans Monday.com")
-                                print(f"[MONDAY WARN] 💡 Ajoutez manuellement l'étiquette dans la colonne 'Provenance' de votre board Monday")
-                                print(f"[MONDAY WARN] Labels disponibles: {', '.join([k for k in label_map.keys() if k and k[0].isupper()])}")
-                        else:
-                            # Vide - effacer la valeur
-                            value_json = json.dumps({"index": None})
-                            update_monday_column(api_key, board_id, monday_item_id, "dup__of_couleurs_mkm0awjt", value_json)
-                    else:
-                        print(f"[MONDAY] Item non trouvé dans Monday pour {vente_id}")
+                monday_outbox.enqueue_label_sync(
+                    username, soumission_num,
+                    "dup__of_couleurs_mkm0awjt",  # ID colonne Provenance Monday
+                    nouvelle_provenance, "provenances"
+                )
             except Exception as e:
                 print(f"[MONDAY ERROR] Erreur sync provenance: {e}")
 
@@ -23295,95 +22106,14 @@ async def update_type_travaux(data: dict = Body(...)):
         print(f"[VENTES] Type travaux mis à jour pour {username}/{vente_id}: {nouveau_type}")
 
         # Synchroniser avec Monday.com si la catégorie est acceptees ou produit (client signé)
+        # Livré en arrière-plan (outbox): recherche de l'item, mapping/création de l'étiquette
         if category in ["acceptees", "produit"] and soumission_num:
             try:
-                # Récupérer les credentials Monday
-                api_key, board_id = get_monday_credentials(username)
-
-                if api_key and board_id:
-                    # Trouver l'item Monday correspondant en utilisant le numéro de soumission
-                    monday_item_id = find_monday_item_by_soumission(username, soumission_num)
-
-                    if monday_item_id:
-                        # Mapper l'étiquette au bon index Monday en cherchant par NOM
-                        if nouveau_type and nouveau_type.strip():
-                            # Récupérer le mapping des labels Monday
-                            from QE.Backend.monday_sync import get_monday_column_labels, add_label_to_monday_column
-
-                            label_map = get_monday_column_labels(api_key, board_id, "status_1")
-
-                            # Chercher l'index Monday correspondant au nom de l'étiquette
-                            monday_index = None
-
-                            # Essayer avec le nom exact
-                            if nouveau_type in label_map:
-                                monday_index = label_map[nouveau_type]
-                            # Essayer avec le nom normalisé (minuscules)
-                            elif nouveau_type.lower() in label_map:
-                                monday_index = label_map[nouveau_type.lower()]
-
-                            # Si l'étiquette n'existe pas dans Monday, essayer de la créer
-                            if monday_index is None:
-                                print(f"[MONDAY] Étiquette '{nouveau_type}' non trouvée dans Monday")
-
-                                # Essayer de créer l'étiquette automatiquement
-                                # Récupérer la couleur de l'étiquette dans Qwota
-                                etiquette_color = "#3b82f6"  # Couleur par défaut (bleu)
-                                try:
-                                    fichier_etiquettes = os.path.join(f"{base_cloud}/ventes_etiquettes", username, "etiquettes.json")
-                                    if os.path.exists(fichier_etiquettes):
-                                        with open(fichier_etiquettes, "r", encoding="utf-8") as f:
-                                            etiquettes = json.load(f)
-                                        types_travaux = etiquettes.get("types_travaux", [])
-                                        for type_item in types_travaux:
-                                            if isinstance(type_item, dict) and type_item.get("label") == nouveau_type:
-                                                etiquette_color = type_item.get("color", etiquette_color)
-                                                break
-                                except Exception as e:
-                                    print(f"[MONDAY] Impossible de récupérer la couleur: {e}")
-
-                                print(f"[MONDAY] Tentative de création de l'étiquette '{nouveau_type}'...")
-                                monday_index = add_label_to_monday_column(
-                                    api_key,
-                                    board_id,
-                                    "status_1",
-                                    nouveau_type,
-                                    etiquette_color
-                                )
-
-                                # Si la création échoue, essayer une correspondance partielle
-                                if monday_index is None:
-                                    print(f"[MONDAY] Recherche de correspondance partielle...")
-                                    nouveau_type_lower = nouveau_type.lower()
-                                    for label_name, idx in label_map.items():
-                                        if label_name and nouveau_type_lower in label_name.lower() or label_name.lower() in nouveau_type_lower:
-                                            monday_index = idx
-                                            print(f"[MONDAY] Correspondance partielle trouvée: '{nouveau_type}' -> '{label_name}' (index {monday_index})")
-                                            break
-
-                            if monday_index is not None:
-                                value_json = json.dumps({"index": monday_index})
-                                success = update_monday_column(
-                                    api_key,
-                                    board_id,
-                                    monday_item_id,
-                                    "status_1",  # ID colonne Type de travaux Monday
-                                    value_json
-                                )
-                                if success:
-                                    print(f"[MONDAY] Type travaux synchronisé: {nouveau_type} -> index {monday_index}")
-                                else:
-                                    print(f"[MONDAY ERROR] Échec synchronisation type travaux")
-                            else:
-                                print(f"[MONDAY WARN] ⚠️ Étiquette '{nouveau_type}' absente dans Monday.com")
-                                print(f"[MONDAY WARN] 💡 Ajoutez manuellement l'étiquette dans la colonne 'Type de travaux' de votre board Monday")
-                                print(f"[MONDAY WARN] Labels disponibles: {', '.join([k for k in label_map.keys() if k and k[0].isupper()])}")
-                        else:
-                            # Vide - effacer la valeur
-                            value_json = json.dumps({"index": None})
-                            update_monday_column(api_key, board_id, monday_item_id, "status_1", value_json)
-                    else:
-                        print(f"[MONDAY] Item non trouvé dans Monday pour {vente_id}")
+                monday_outbox.enqueue_label_sync(
+                    username, soumission_num,
+                    "status_1",  # ID colonne Type de travaux Monday
+                    nouveau_type, "types_travaux"
+                )
             except Exception as e:
                 print(f"[MONDAY ERROR] Erreur sync type travaux: {e}")
 
@@ -23491,28 +22221,11 @@ async def update_notes(data: dict = Body(...)):
         notes_preview = nouvelles_notes[:50] + "..." if nouvelles_notes and len(nouvelles_notes) > 50 else nouvelles_notes
         print(f"[VENTES] Notes mises à jour pour {username}/{vente_id}: {notes_preview}")
 
-        # Synchroniser avec Monday.com
+        # Synchroniser avec Monday.com (outbox, livré en arrière-plan)
         try:
-            api_key, board_id = get_monday_credentials(username)
-
-            if api_key and board_id and soumission_num:
-                # Trouver l'item Monday
-                monday_item_id = find_monday_item_by_soumission(username, soumission_num)
-
-                if monday_item_id:
-                    # Mettre à jour la colonne "Infos sup" (ID: "text")
-                    update_monday_text_column(
-                        api_key=api_key,
-                        board_id=board_id,
-                        item_id=monday_item_id,
-                        column_id="text",
-                        value=nouvelles_notes or ""
-                    )
-                    print(f"[MONDAY] Notes synchronisées pour l'item {monday_item_id}")
-                else:
-                    print(f"[MONDAY] Item non trouvé dans Monday pour {soumission_num}")
-            else:
-                print(f"[MONDAY] Pas de configuration Monday pour {username}")
+            if soumission_num:
+                # Colonne "Infos sup" (ID: "text")
+                monday_outbox.enqueue_text_sync(username, soumission_num, "text", nouvelles_notes or "")
         except Exception as monday_err:
             print(f"[MONDAY ERROR] Erreur synchronisation notes: {monday_err}")
             # Ne pas faire échouer la requête si Monday sync échoue
@@ -23587,12 +22300,6 @@ async def get_monday_columns(username: str):
             return {"error": "Pas de configuration Monday.com pour cet entrepreneur"}
 
         # Query pour récupérer toutes les colonnes
-        url = "https://api.monday.com/v2"
-        headers = {
-            "Authorization": api_key,
-            "Content-Type": "application/json"
-        }
-
         query = f"""
         query {{
           boards(ids: {board_id}) {{
@@ -23605,21 +22312,20 @@ async def get_monday_columns(username: str):
         }}
         """
 
-        response = requests.post(url, headers=headers, json={"query": query})
+        try:
+            data = await run_blocking(monday_client.client.execute, api_key, query)
+        except monday_client.MondayError as e:
+            return {"error": f"HTTP {e.status_code}", "details": str(e)}
 
-        if response.status_code == 200:
-            data = response.json()
-            if "data" in data and data["data"]["boards"]:
-                columns = data["data"]["boards"][0]["columns"]
-                return {
-                    "username": username,
-                    "board_id": board_id,
-                    "columns": columns
-                }
-            else:
-                return {"error": "Aucune colonne trouvée"}
+        if data.get("boards"):
+            columns = data["boards"][0]["columns"]
+            return {
+                "username": username,
+                "board_id": board_id,
+                "columns": columns
+            }
         else:
-            return {"error": f"HTTP {response.status_code}", "details": response.text}
+            return {"error": "Aucune colonne trouvée"}
 
     except Exception as e:
         print(f"[MONDAY COLUMNS ERROR] {e}")
@@ -23651,13 +22357,27 @@ async def force_sync_monday(username: str, vente_id: str):
         if not vente:
             return {"error": "Vente non trouvée"}
 
-        # Forcer la synchronisation
-        success = sync_vente_to_monday(username, vente)
+        soumission_num = vente.get("num") or vente.get("id", "")
+        failures = await run_blocking(monday_outbox.get_failures, username, soumission_num)
+
+        # Création livrée ici: les intentions de création encore en file sont retirées
+        # d'abord, sinon le répartiteur créerait l'item une deuxième fois
+        await run_blocking(monday_outbox.supersede, username, soumission_num, monday_outbox.KIND_CREATE_ITEM)
+        success = await run_blocking(sync_vente_to_monday, username, vente)
+
+        if success:
+            # Étiquettes / notes en échec: relancées maintenant que l'item existe
+            retried = await run_blocking(monday_outbox.retry_failed, username, soumission_num)
+        else:
+            # Création toujours en échec: rendue à l'outbox (nouvelles tentatives)
+            await run_blocking(monday_outbox.enqueue_vente_sync, username, vente)
+            retried = 0
 
+        result = {"failures": failures, "retried": retried}
         if success:
-            return {"success": True, "message": "Client synchronisé avec Monday.com"}
+            return {"success": True, "message": "Client synchronisé avec Monday.com", **result}
         else:
-            return {"success": False, "message": "Erreur lors de la synchronisation"}
+            return {"success": False, "message": "Erreur lors de la synchronisation", **result}
 
     except Exception as e:
         print(f"[FORCE SYNC ERROR] {e}")
@@ -23687,6 +22407,10 @@ async def monday_webhook(request: Request):
         value = event.get("value")  # Nouvelle valeur
         board_id = event.get("boardId")
 
+        # Index soumission -> item (création, renommage, suppression, colonne $JOB)
+        if await run_blocking(monday_client.apply_webhook_event, event):
+            print(f"[MONDAY WEBHOOK] Index mis à jour ({event.get('type')}, item {pulse_id})")
+
         if not pulse_id or not column_id:
             print("[MONDAY WEBHOOK] Données manquantes")
             return {"status": "ignored"}
@@ -23697,7 +22421,7 @@ async def monday_webhook(request: Request):
             return {"status": "ignored"}
 
         # Trouver l'entrepreneur correspondant au board_id
-        with sqlite3.connect(DB_PATH) as conn:
+        with get_connection() as conn:
             cursor = conn.cursor()
             cursor.execute("""
                 SELECT username FROM users WHERE monday_board_id = ?
@@ -24156,23 +22880,16 @@ async def supprimer_client_perdu(data: dict = Body(...)):
         if supprimer_de_fichier_liste(fichier_ventes_attente):
             supprime_de.append("ventes_attente")
 
-        # 7. facturation_qe_historique (global, pas par user)
-        fichier_historique = os.path.join(f"{base_cloud}/facturation_qe_historique", "historique.json")
-        if os.path.exists(fichier_historique):
-            try:
-                with open(fichier_historique, "r", encoding="utf-8") as f:
-                    historique = json.load(f)
-                original_len = len(historique)
-                # Utiliser tous les identifiants pour matcher
-                historique = [h for h in historique
-                             if not (h.get('numeroSoumission') in identifiants_a_matcher and h.get('entrepreneurUsername') == username)]
-                if len(historique) < original_len:
-                    with open(fichier_historique, "w", encoding="utf-8") as f:
-                        json.dump(historique, f, indent=2, ensure_ascii=False)
-                    supprime_de.append("facturation_qe_historique")
-                    print(f"[DELETE] Supprimé de facturation_qe_historique: {original_len - len(historique)} entrée(s)")
-            except Exception as e:
-                print(f"[WARN] Erreur suppression de historique: {e}")
+        # 7. facturation_qe_historique (global, pas par user): pierres tombales, tous les identifiants
+        try:
+            supprimes_historique = facturation_historique.tombstone(
+                username, [i for i in identifiants_a_matcher if i], reason="suppression_client"
+            )
+            if supprimes_historique:
+                supprime_de.append("facturation_qe_historique")
+                print(f"[DELETE] Supprimé de facturation_qe_historique: {supprimes_historique} entrée(s)")
+        except Exception as e:
+            print(f"[WARN] Erreur suppression de historique: {e}")
 
         # 8. facturation_qe_statuts (supprimer l'entrée pour ce num_soumission)
         fichier_statuts = os.path.join(f"{base_cloud}/facturation_qe_statuts", username, "statuts_clients.json")
@@ -24194,9 +22911,10 @@ async def supprimer_client_perdu(data: dict = Body(...)):
 
         # 9. Sync RPO pour mettre à jour les compteurs
         try:
-            from QE.Backend.rpo import sync_soumissions_to_rpo, sync_ventes_produit_to_rpo
-            sync_soumissions_to_rpo(username)
-            sync_ventes_produit_to_rpo(username)
+            from QE.Backend.rpo import sync_ventes_produit_to_rpo
+            # Recalcul immédiat: sync_ventes_produit_to_rpo doit passer après
+            await run_blocking(rpo_sync_scheduler.force, username)
+            await run_blocking(sync_ventes_produit_to_rpo, username)
             print(f"[OK] RPO synchronisé (soumissions + produits) pour {username}")
         except Exception as e:
             print(f"[WARN] Erreur sync RPO: {e}")
@@ -24353,6 +23071,7 @@ async def add_remboursement(username: str, remboursement: dict = Body(...)):
         # Sauvegarder
         with open(remb_file, "w", encoding="utf-8") as f:
             json.dump(remboursements, f, indent=2, ensure_ascii=False)
+        await run_blocking(work_queue_index.refresh_source, username, "remboursements")
 
         print(f"[OK] Remboursement ajouté pour {username}")
         return {"status": "success", "message": "Remboursement ajouté"}
@@ -24391,6 +23110,7 @@ async def delete_remboursement(username: str, num_soumission: str):
         # Sauvegarder
         with open(remb_file, "w", encoding="utf-8") as f:
             json.dump(remboursements_filtres, f, indent=2, ensure_ascii=False)
+        await run_blocking(work_queue_index.refresh_source, username, "remboursements")
 
         print(f"[OK] Remboursement {num_soumission} supprimé pour {username}")
         return {"status": "success", "message": "Remboursement supprimé"}
@@ -24419,6 +23139,7 @@ async def update_remboursements(username: str, remboursements: list = Body(...))
         # Sauvegarder les remboursements mis à jour
         with open(remb_file, "w", encoding="utf-8") as f:
             json.dump(remboursements, f, indent=2, ensure_ascii=False)
+        await run_blocking(work_queue_index.refresh_source, username, "remboursements")
 
         print(f"[OK] Remboursements mis à jour pour {username}")
         return {"status": "success", "message": "Remboursements mis à jour"}
@@ -24618,7 +23339,7 @@ def recalculate_xp_endpoint():
 def get_coaches_list():
     """Retourne la liste de tous les coaches actifs"""
     try:
-        with sqlite3.connect(DB_PATH) as conn:
+        with get_connection() as conn:
             conn.row_factory = sqlite3.Row
             cursor = conn.cursor()
             cursor.execute("""
@@ -26027,13 +24748,14 @@ async def transferer_clients(request: Request):
 
         # --- 5. Sync RPO pour les deux entrepreneurs ---
         try:
-            from QE.Backend.rpo import sync_soumissions_to_rpo, sync_ventes_produit_to_rpo
+            from QE.Backend.rpo import sync_ventes_produit_to_rpo
+            # Recalcul immédiat: sync_ventes_produit_to_rpo doit passer après
             print(f"[TRANSFERT] Sync RPO pour {from_username}...")
-            sync_soumissions_to_rpo(from_username)
-            sync_ventes_produit_to_rpo(from_username)
+            await run_blocking(rpo_sync_scheduler.force, from_username)
+            await run_blocking(sync_ventes_produit_to_rpo, from_username)
             print(f"[TRANSFERT] Sync RPO pour {to_username}...")
-            sync_soumissions_to_rpo(to_username)
-            sync_ventes_produit_to_rpo(to_username)
+            await run_blocking(rpo_sync_scheduler.force, to_username)
+            await run_blocking(sync_ventes_produit_to_rpo, to_username)
             print(f"[TRANSFERT] Sync RPO terminé pour les deux entrepreneurs")
         except Exception as e:
             print(f"[TRANSFERT] Erreur sync RPO: {e}")
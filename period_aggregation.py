@@ -0,0 +1,301 @@
+"""
+Agrégation par période en colonnes NumPy (dashboard, graph-data, classement)
+
+graph-data remplissait un defaultdict jour par jour en nettoyant le prix de
+chaque enregistrement; calculate_dashboard_stats, le dashboard d'équipe coach
+et le classement re-sommaient dollar/contract/estimation/h_marketing/produit
+des semaines RPO avec des boucles de dicts imbriqués.
+
+Maintenant, une seule API:
+- RecordColumns: une liste (ventes, soumissions, stats) chargée une fois en
+  colonnes (date_ts triée, montant parsé une seule fois), gardée tant que le
+  fichier ne change pas (même identité que date_index)
+  -> count / total / mean sur une fenêtre (searchsorted), buckets() par jour,
+     semaine (lundi) ou mois avec np.bincount
+- RecordColumns.concat(): les colonnes de toute une équipe
+- RpoWeekColumns: les semaines RPO d'un utilisateur en colonnes, totals()
+  sur la période (mêmes règles que filter_rpo_weekly_by_period)
+
+Les montants illisibles valent NaN: ils sont comptés dans count() mais pas
+dans total()/mean(), comme le "continue" des anciennes boucles.
+"""
+
+import json
+from datetime import date, datetime, time, timezone
+from functools import lru_cache
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+import config
+from date_index import DateIndex, IdentityCache, load_date_index, to_timestamp, user_date_index
+from season_calendar import week_label_bounds
+
+SECONDS_PER_DAY = 86400
+FREQUENCIES = ("day", "week", "month")
+AGGREGATIONS = ("sum", "count", "mean")
+
+# Champs numériques d'une semaine RPO
+RPO_WEEK_FIELDS = ("dollar", "contract", "estimation", "h_marketing", "produit")
+
+_AMOUNT_JUNK = str.maketrans({"\xa0": None, "\u202f": None, " ": None, "$": None, "€": None, ",": "."})
+
+
+def parse_amount(value) -> float:
+    """Prix saisi ("1 234,50 $", 1234.5, ...) -> float, NaN si illisible"""
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return float(value)
+    try:
+        return float(str(value).translate(_AMOUNT_JUNK).strip())
+    except ValueError:
+        return float("nan")
+
+
+def _to_float(value) -> float:
+    """Valeur RPO ("-", "", None, "12.5") -> float, 0 si vide ou illisible"""
+    if value in (None, "", "-"):
+        return 0.0
+    try:
+        return float(value)
+    except (ValueError, TypeError):
+        return 0.0
+
+
+def _prod_horaire(value) -> float:
+    """Production horaire RPO -> float, NaN si absente (None, 0, "-") ou illisible: semaine exclue de la moyenne"""
+    if value in (None, 0, "-"):
+        return float("nan")
+    try:
+        return float(value)
+    except (ValueError, TypeError):
+        return float("nan")
+
+
+def _bound(value, end: bool = False) -> Optional[float]:
+    """Borne de fenêtre: datetime, date (journée entière) ou None"""
+    if value is None:
+        return None
+    if isinstance(value, date) and not isinstance(value, datetime):
+        value = datetime.combine(value, time.max if end else time.min, tzinfo=timezone.utc)
+    return to_timestamp(value)
+
+
+class RecordColumns:
+    """Colonnes d'une liste d'enregistrements: epochs triés + montants alignés"""
+
+    __slots__ = ("ts", "amount", "undated_amount")
+
+    def __init__(self, ts: np.ndarray, amount: np.ndarray, undated_amount: np.ndarray):
+        self.ts = ts
+        self.amount = amount
+        self.undated_amount = undated_amount
+
+    @classmethod
+    def from_index(cls, index: DateIndex, amount_field: str = "prix") -> "RecordColumns":
+        count = len(index.timestamps)
+        return cls(
+            np.fromiter(index.timestamps, dtype=np.float64, count=count),
+            np.fromiter((parse_amount(r.get(amount_field, "0")) for r in index.dated), dtype=np.float64, count=count),
+            np.fromiter((parse_amount(r.get(amount_field, "0")) for r in index.undated), dtype=np.float64,
+                        count=len(index.undated)),
+        )
+
+    @classmethod
+    def from_records(cls, records: Optional[List[Any]], amount_field: str = "prix") -> "RecordColumns":
+        return cls.from_index(DateIndex(records), amount_field)
+
+    @classmethod
+    def concat(cls, columns: Iterable["RecordColumns"]) -> "RecordColumns":
+        """Colonnes d'une équipe (fusion triée par date)"""
+        columns = list(columns)
+        if not columns:
+            return cls.from_records([])
+        ts = np.concatenate([c.ts for c in columns])
+        order = np.argsort(ts, kind="stable")
+        return cls(ts[order], np.concatenate([c.amount for c in columns])[order],
+                   np.concatenate([c.undated_amount for c in columns]))
+
+    def __len__(self) -> int:
+        return len(self.ts) + len(self.undated_amount)
+
+    def _window(self, start=None, end=None) -> Tuple[int, int]:
+        start_ts, end_ts = _bound(start), _bound(end, end=True)
+        lo = 0 if start_ts is None else int(np.searchsorted(self.ts, start_ts, side="left"))
+        hi = len(self.ts) if end_ts is None else int(np.searchsorted(self.ts, end_ts, side="right"))
+        return lo, max(lo, hi)
+
+    def _amounts(self, start, end, include_undated: bool) -> np.ndarray:
+        lo, hi = self._window(start, end)
+        amounts = self.amount[lo:hi]
+        return np.concatenate([amounts, self.undated_amount]) if include_undated else amounts
+
+    def count(self, start=None, end=None, include_undated: bool = False) -> int:
+        """Nombre d'enregistrements datés dans [start, end] (+ ceux sans date si include_undated)"""
+        lo, hi = self._window(start, end)
+        return hi - lo + (len(self.undated_amount) if include_undated else 0)
+
+    def total(self, start=None, end=None, include_undated: bool = False) -> float:
+        """Somme des montants lisibles"""
+        return float(np.nansum(self._amounts(start, end, include_undated)))
+
+    def mean(self, start=None, end=None, include_undated: bool = False) -> float:
+        """Moyenne des montants lisibles, 0 si aucun"""
+        amounts = self._amounts(start, end, include_undated)
+        amounts = amounts[~np.isnan(amounts)]
+        return float(amounts.mean()) if len(amounts) else 0.0
+
+    def buckets(self, start, end, freq: str = "day", how: str = "sum") -> Tuple[List[date], np.ndarray]:
+        """
+        Valeurs par jour / semaine (lundi) / mois entre start et end inclus (bornes obligatoires).
+        Retourne (début de chaque bucket, valeurs); les buckets vides valent 0.
+        """
+        if freq not in FREQUENCIES or how not in AGGREGATIONS:
+            raise ValueError(f"Agrégation inconnue: {freq}/{how}")
+        start_ts, end_ts = _bound(start), _bound(end, end=True)
+        lo, hi = self._window(start, end)
+
+        first, last = _bucket_keys(np.array([start_ts, end_ts]) // SECONDS_PER_DAY, freq)
+        size = max(int(last - first) + 1, 0)
+        keys = _bucket_keys(self.ts[lo:hi] // SECONDS_PER_DAY, freq) - first
+        amounts = self.amount[lo:hi]
+
+        if how == "count":
+            values = np.bincount(keys, minlength=size).astype(np.float64)
+        else:
+            valid = ~np.isnan(amounts)
+            values = np.bincount(keys[valid], weights=amounts[valid], minlength=size)
+            if how == "mean":
+                counts = np.bincount(keys[valid], minlength=size)
+                values = np.divide(values, counts, out=np.zeros(size), where=counts > 0)
+        return _bucket_starts(int(first), size, freq), values[:size]
+
+
+def _bucket_keys(days: np.ndarray, freq: str) -> np.ndarray:
+    """Jours depuis l'epoch -> numéro de bucket (le 1er janvier 1970 est un jeudi)"""
+    days = days.astype(np.int64)
+    if freq == "day":
+        return days
+    if freq == "week":
+        return (days + 3) // 7
+    return days.astype("datetime64[D]").astype("datetime64[M]").astype(np.int64)
+
+
+def _bucket_starts(first: int, size: int, freq: str) -> List[date]:
+    keys = np.arange(first, first + size, dtype=np.int64)
+    if freq == "day":
+        starts = keys.astype("datetime64[D]")
+    elif freq == "week":
+        starts = (keys * 7 - 3).astype("datetime64[D]")
+    else:
+        starts = keys.astype("datetime64[M]").astype("datetime64[D]")
+    return starts.tolist()
+
+
+# ===================================
+# CHARGEMENT (mis en cache avec l'index par date)
+# ===================================
+
+_columns_cache = IdentityCache(config.DATE_INDEX_MAX_ENTRIES, RecordColumns.from_index)
+
+
+def load_record_columns(path: str) -> Optional[RecordColumns]:
+    """Colonnes du fichier JSON (liste), ou None s'il n'existe pas. Lève json.JSONDecodeError si invalide"""
+    index = load_date_index(path)
+    if index is None:
+        return None
+    return _columns_cache.get(path, index)
+
+
+def user_record_columns(collection: str, username: str) -> RecordColumns:
+    """Colonnes d'une collection du DocumentStore pour un utilisateur"""
+    # Import local, comme date_index.user_date_index
+    from document_store import MODE_JSON, get_collection_mode, get_legacy_path
+
+    if get_collection_mode(collection) == MODE_JSON:
+        try:
+            return load_record_columns(get_legacy_path(collection, username)) or RecordColumns.from_records([])
+        except json.JSONDecodeError as e:
+            print(f"[AGGREGATION] JSON invalide {collection}/{username}: {e}", flush=True)
+            return RecordColumns.from_records([])
+    return RecordColumns.from_index(user_date_index(collection, username))
+
+
+def team_record_columns(collection: str, usernames: Iterable[str]) -> RecordColumns:
+    """Colonnes d'une collection pour toute une équipe"""
+    return RecordColumns.concat(user_record_columns(collection, username) for username in usernames)
+
+
+# ===================================
+# SEMAINES RPO
+# ===================================
+
+@lru_cache(maxsize=4096)
+def _week_bounds(week_label: str, year: Optional[int]) -> Tuple[float, float]:
+    week_start, week_end = week_label_bounds(week_label, year)
+    if not week_start or not week_end:
+        return float("nan"), float("nan")
+    return week_start.timestamp(), week_end.timestamp()
+
+
+class RpoWeekColumns:
+    """Semaines RPO (weekly[mois][semaine]) d'un utilisateur en colonnes"""
+
+    def __init__(self, weekly: Optional[Dict[str, Any]], year: Optional[int] = None):
+        rows = []
+        for month_key, weeks in (weekly or {}).items():
+            try:
+                month_index = int(month_key)
+            except (ValueError, TypeError):
+                continue
+            for week_key, week_data in (weeks or {}).items():
+                if not isinstance(week_data, dict):
+                    continue
+                try:
+                    week_number = int(week_key)
+                except (ValueError, TypeError):
+                    week_number = -1
+                rows.append((
+                    month_index, week_number,
+                    *_week_bounds(str(week_data.get("week_label", "") or ""), year),
+                    _to_float(week_data.get("dollar")),
+                    float(int(_to_float(week_data.get("contract")))),
+                    float(int(_to_float(week_data.get("estimation")))),
+                    _to_float(week_data.get("h_marketing")),
+                    _to_float(week_data.get("produit")),
+                    _prod_horaire(week_data.get("prod_horaire")),
+                ))
+
+        table = np.array(rows, dtype=np.float64).reshape(len(rows), 10)
+        self.month_index = table[:, 0].astype(np.int64)
+        self.week_number = table[:, 1].astype(np.int64)
+        self.week_start = table[:, 2]
+        self.week_end = table[:, 3]
+        self.dollar, self.contract, self.estimation, self.h_marketing, self.produit = (table[:, i] for i in range(4, 9))
+        self.prod_horaire = table[:, 9]
+
+    def __len__(self) -> int:
+        return len(self.month_index)
+
+    def select(self, start=None, end=None, min_month: int = 0) -> np.ndarray:
+        """
+        Masque des semaines du mois min_month et suivants; avec une période, seulement
+        les semaines (à week_label lisible) qui la chevauchent
+        """
+        mask = self.month_index >= min_month
+        if start is not None:
+            start_ts, end_ts = _bound(start), _bound(end, end=True)
+            # NaN (week_label illisible) -> comparaison fausse -> semaine exclue
+            mask &= (self.week_end >= start_ts) & (self.week_start <= end_ts)
+        return mask
+
+    def totals(self, start=None, end=None, min_month: int = 0) -> Dict[str, float]:
+        """Sommes des champs RPO sur la période + heures PAP et nombre de semaines avec marketing"""
+        mask = self.select(start, end, min_month)
+        marketing = self.h_marketing[mask]
+        totals = {field: float(getattr(self, field)[mask].sum()) for field in RPO_WEEK_FIELDS}
+        totals["contract"] = int(totals["contract"])
+        totals["estimation"] = int(totals["estimation"])
+        totals["h_marketing"] = float(marketing[marketing > 0].sum())
+        totals["weeks_with_marketing"] = int((marketing > 0).sum())
+        return totals
+
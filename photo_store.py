@@ -0,0 +1,203 @@
+"""
+Photos de profil: stockage adressé par contenu et miniatures générées à l'upload
+
+Avant: /api/profile/upload-photo gardait l'original tel quel dans
+static/profile_photos/<user>_<timestamp>.<ext>; /api/user/{username}/profile-photo
+et le classement cherchaient la plus récente par glob (3 extensions) + tri par
+mtime à chaque appel, et les listes (classement, /api/direction/tous-employes,
+équipes) envoyaient l'image pleine taille pour un avatar de 40 px. Les URL
+portaient ?v=<timestamp> pour contourner le cache: aucune mise en cache possible.
+
+Maintenant:
+- L'image est décodée une seule fois à l'upload (Pillow, orientation EXIF
+  appliquée) puis rangée sous {STORAGE_PATH}/photo_store/<aa>/<sha256>/:
+  l'original et une miniature carrée par taille (PHOTO_THUMB_SIZES) en WebP et en JPEG
+- Même contenu = même sha256: un ré-upload identique ne réécrit rien
+- La photo courante est enregistrée dans users.photo_hash (photo_url pointe
+  vers la miniature par défaut): plus de glob ni de tri par mtime
+- /photos/<sha256>/<taille>.<webp|jpg> est servi avec Cache-Control immutable
+  (1 an) et ETag: l'URL change quand la photo change
+"""
+
+import hashlib
+import io
+import os
+import re
+import sys
+from typing import Dict, Iterable, Optional
+
+from PIL import Image, ImageOps, UnidentifiedImageError
+from starlette.responses import FileResponse, Response
+
+from db_pool import get_connection
+from static_assets import IMMUTABLE_CACHE_CONTROL
+
+# Détection OS pour chemins de fichiers (même logique que main.py)
+if sys.platform == 'win32':
+    base_cloud = os.path.join(os.path.dirname(__file__), 'data')
+else:
+    base_cloud = os.getenv("STORAGE_PATH", "/mnt/cloud")
+
+PHOTO_STORE_DIR = os.path.join(base_cloud, "photo_store")
+PHOTO_THUMB_SIZES = tuple(int(size) for size in os.getenv("PHOTO_THUMB_SIZES", "64,128,256").split(",") if size.strip())
+PHOTO_DEFAULT_SIZE = int(os.getenv("PHOTO_DEFAULT_SIZE", "256"))
+# Taille des avatars dans les listes (classement, équipes, employés)
+PHOTO_LIST_SIZE = int(os.getenv("PHOTO_LIST_SIZE", "64"))
+PHOTO_MAX_BYTES = int(float(os.getenv("PHOTO_MAX_MB", "20")) * 1024 * 1024)
+
+# Format de miniature -> (format Pillow, type MIME, options d'encodage)
+THUMB_FORMATS = {
+    "webp": ("WEBP", "image/webp", {"quality": 80, "method": 4}),
+    "jpg": ("JPEG", "image/jpeg", {"quality": 85, "optimize": True, "progressive": True}),
+}
+ORIGINAL_FORMATS = {"JPEG": ("jpg", "image/jpeg"), "PNG": ("png", "image/png"),
+                    "WEBP": ("webp", "image/webp"), "GIF": ("gif", "image/gif")}
+
+_DIGEST_RE = re.compile(r"^[0-9a-f]{64}$")
+_VARIANT_RE = re.compile(r"^(?:(\d+)\.(webp|jpg)|orig\.(jpg|png|webp|gif))$")
+
+
+class InvalidPhoto(Exception):
+    """Fichier vide, trop gros ou qui n'est pas une image lisible"""
+
+
+def _photo_dir(digest: str) -> str:
+    return os.path.join(PHOTO_STORE_DIR, digest[:2], digest)
+
+
+def _write_atomic(path: str, content: bytes):
+    tmp_path = f"{path}.tmp.{os.getpid()}"
+    with open(tmp_path, "wb") as f:
+        f.write(content)
+    os.replace(tmp_path, path)
+
+
+def _thumbnail(image: Image.Image, size: int, fmt: str) -> bytes:
+    pil_format, _, options = THUMB_FORMATS[fmt]
+    # Carré centré (avatars ronds), jamais agrandi au-delà de l'original
+    side = min(size, image.width, image.height)
+    thumb = ImageOps.fit(image, (side, side), Image.LANCZOS)
+    if pil_format == "JPEG" and thumb.mode != "RGB":
+        background = Image.new("RGB", thumb.size, (255, 255, 255))
+        background.paste(thumb, mask=thumb.getchannel("A") if "A" in thumb.getbands() else None)
+        thumb = background
+    buffer = io.BytesIO()
+    thumb.save(buffer, pil_format, **options)
+    return buffer.getvalue()
+
+
+def store_photo(content: bytes) -> str:
+    """Range l'image (original + miniatures) et retourne son sha256. Lève InvalidPhoto"""
+    if not content:
+        raise InvalidPhoto("Fichier vide")
+    if len(content) > PHOTO_MAX_BYTES:
+        raise InvalidPhoto(f"Photo trop volumineuse (max {PHOTO_MAX_BYTES // (1024 * 1024)} Mo)")
+
+    digest = hashlib.sha256(content).hexdigest()
+    photo_dir = _photo_dir(digest)
+    # L'original est écrit en dernier: s'il existe, les miniatures aussi
+    if any(name.startswith("orig.") for name in (os.listdir(photo_dir) if os.path.isdir(photo_dir) else [])):
+        return digest
+
+    try:
+        image = Image.open(io.BytesIO(content))
+        original_format = image.format
+        image = ImageOps.exif_transpose(image)
+        image.load()
+    except (UnidentifiedImageError, OSError, Image.DecompressionBombError) as e:
+        raise InvalidPhoto(f"Image illisible: {e}")
+    if original_format not in ORIGINAL_FORMATS:
+        raise InvalidPhoto(f"Format non supporté: {original_format}")
+    if image.mode not in ("RGB", "RGBA"):
+        image = image.convert("RGBA" if "A" in image.getbands() or "transparency" in image.info else "RGB")
+
+    os.makedirs(photo_dir, exist_ok=True)
+    for size in PHOTO_THUMB_SIZES:
+        for fmt in THUMB_FORMATS:
+            _write_atomic(os.path.join(photo_dir, f"{size}.{fmt}"), _thumbnail(image, size, fmt))
+    _write_atomic(os.path.join(photo_dir, f"orig.{ORIGINAL_FORMATS[original_format][0]}"), content)
+    return digest
+
+
+def photo_url(digest: Optional[str], size: int = PHOTO_DEFAULT_SIZE, fmt: str = "webp") -> Optional[str]:
+    """URL immuable d'une miniature (taille la plus proche disponible), None sans photo"""
+    if not digest:
+        return None
+    if size not in PHOTO_THUMB_SIZES:
+        size = min(PHOTO_THUMB_SIZES, key=lambda available: (available < size, abs(available - size)))
+    return f"/photos/{digest}/{size}.{fmt}"
+
+
+def photo_urls(digest: Optional[str]) -> Dict[str, Dict[str, str]]:
+    """Toutes les miniatures: {"64": {"webp": url, "jpg": url}, ...}"""
+    if not digest:
+        return {}
+    return {str(size): {fmt: f"/photos/{digest}/{size}.{fmt}" for fmt in THUMB_FORMATS} for size in PHOTO_THUMB_SIZES}
+
+
+def set_user_photo(username: str, digest: str) -> bool:
+    """Enregistre la photo courante de l'utilisateur (photo_hash + photo_url par défaut)"""
+    with get_connection() as conn:
+        updated = conn.execute(
+            "UPDATE users SET photo_hash = ?, photo_url = ? WHERE username = ?",
+            (digest, photo_url(digest), username)
+        ).rowcount
+        conn.commit()
+    return bool(updated)
+
+
+def save_user_photo(username: str, content: bytes) -> str:
+    """Range la photo et en fait la photo courante de l'utilisateur. Retourne le sha256"""
+    digest = store_photo(content)
+    set_user_photo(username, digest)
+    return digest
+
+
+def clear_user_photo(username: str):
+    """Retire la photo courante (les fichiers restent: d'autres comptes peuvent partager le même contenu)"""
+    with get_connection() as conn:
+        conn.execute("UPDATE users SET photo_hash = NULL, photo_url = NULL WHERE username = ? AND photo_hash IS NOT NULL",
+                     (username,))
+        conn.commit()
+
+
+def get_user_photo_hash(username: str) -> Optional[str]:
+    with get_connection() as conn:
+        row = conn.execute("SELECT photo_hash FROM users WHERE username = ?", (username,)).fetchone()
+    return row[0] if row else None
+
+
+def user_photo_urls(usernames: Optional[Iterable[str]] = None, size: int = PHOTO_DEFAULT_SIZE,
+                    fmt: str = "webp") -> Dict[str, str]:
+    """username -> URL de miniature en une requête (utilisateurs sans photo absents)"""
+    query = "SELECT username, photo_hash FROM users WHERE photo_hash IS NOT NULL"
+    params: list = []
+    if usernames is not None:
+        usernames = list(usernames)
+        if not usernames:
+            return {}
+        query += f" AND username IN ({','.join('?' for _ in usernames)})"
+        params = usernames
+    with get_connection() as conn:
+        rows = conn.execute(query, params).fetchall()
+    return {username: photo_url(digest, size, fmt) for username, digest in rows}
+
+
+def photo_response(request, digest: str, variant: str) -> Response:
+    """GET /photos/<sha256>/<variante>: fichier immuable, 304 si le navigateur l'a déjà"""
+    match = _VARIANT_RE.match(variant)
+    if not _DIGEST_RE.match(digest) or match is None:
+        return Response(status_code=404)
+    path = os.path.join(_photo_dir(digest), variant)
+    if not os.path.isfile(path):
+        return Response(status_code=404)
+
+    etag = f'"{digest[:16]}-{variant}"'
+    headers = {"ETag": etag, "Cache-Control": IMMUTABLE_CACHE_CONTROL}
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and (if_none_match.strip() == "*" or etag in if_none_match):
+        return Response(status_code=304, headers=headers)
+
+    fmt = match.group(2) or match.group(3)
+    media_type = THUMB_FORMATS[fmt][1] if fmt in THUMB_FORMATS else f"image/{fmt}"
+    return FileResponse(path, media_type=media_type, headers=headers)
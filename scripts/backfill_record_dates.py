@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Script de migration: ajoute le champ canonique date_ts (epoch UTC) aux listes existantes
+Usage:
+    python scripts/backfill_record_dates.py                      # toutes les collections
+    python scripts/backfill_record_dates.py ventes_acceptees     # une seule collection
+    python scripts/backfill_record_dates.py --dry-run            # compte sans écrire
+
+Les nouvelles écritures sont normalisées par date_index.normalize_record_date();
+ce script traite les données déjà présentes (JSON ou DocumentStore selon le mode
+de chaque collection). Il peut être relancé sans risque: un fichier déjà
+normalisé n'est pas réécrit. Les dates illisibles sont listées à la fin.
+"""
+
+import json
+import os
+import sys
+
+# Ajouter le répertoire racine au path pour les imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from date_index import DATE_FIELD, DATE_TS_FIELD, normalize_records
+from document_store import COLLECTIONS, get_base_cloud, load_user_documents, save_user_documents
+from utils import save_json_file
+
+# Listes filtrées par période qui ne passent pas par le DocumentStore: collection -> fichier
+EXTRA_FILES = {
+    "reviews": "reviews.json",
+}
+
+
+def list_users(collection: str, filename: str):
+    """Liste les dossiers utilisateurs d'une collection"""
+    collection_dir = os.path.join(get_base_cloud(), collection)
+    if not os.path.isdir(collection_dir):
+        return []
+    return sorted(
+        name for name in os.listdir(collection_dir)
+        if os.path.isfile(os.path.join(collection_dir, name, filename))
+    )
+
+
+def unreadable_dates(records) -> list:
+    return [r.get(DATE_FIELD) for r in records
+            if isinstance(r, dict) and r.get(DATE_FIELD) and r.get(DATE_TS_FIELD) is None]
+
+
+def backfill_collection(collection: str, dry_run: bool) -> tuple:
+    """Retourne (nb_users, nb_documents_modifiés, dates_illisibles, nb_erreurs)"""
+    filename = COLLECTIONS.get(collection) or EXTRA_FILES[collection]
+    users = list_users(collection, filename)
+    changed_total = 0
+    unreadable = []
+    errors = 0
+
+    for username in users:
+        try:
+            if collection in COLLECTIONS:
+                records = load_user_documents(collection, username)
+            else:
+                path = os.path.join(get_base_cloud(), collection, username, filename)
+                with open(path, "r", encoding="utf-8") as f:
+                    content = f.read().strip()
+                records = json.loads(content) if content else []
+            if not isinstance(records, list):
+                continue
+
+            changed = normalize_records(records)
+            unreadable += [(username, value) for value in unreadable_dates(records)]
+            if not changed:
+                continue
+            changed_total += changed
+            if dry_run:
+                continue
+
+            if collection in COLLECTIONS:
+                ok = save_user_documents(collection, username, records)
+            else:
+                ok = save_json_file(path, records)
+            if not ok:
+                errors += 1
+                print(f"  [ERREUR] {collection}/{username}: sauvegarde échouée")
+        except json.JSONDecodeError as e:
+            errors += 1
+            print(f"  [ERREUR] {collection}/{username}: JSON invalide ({e})")
+        except Exception as e:
+            errors += 1
+            print(f"  [ERREUR] {collection}/{username}: {e}")
+
+    return len(users), changed_total, unreadable, errors
+
+
+def main():
+    args = [a for a in sys.argv[1:] if not a.startswith('--')]
+    dry_run = '--dry-run' in sys.argv
+    available = list(COLLECTIONS) + list(EXTRA_FILES)
+    collections = args or available
+
+    unknown = [c for c in collections if c not in available]
+    if unknown:
+        print(f"[ERREUR] Collections inconnues: {unknown}")
+        print(f"Collections disponibles: {available}")
+        sys.exit(1)
+
+    print("=" * 60)
+    print(f"NORMALISATION DES DATES ({DATE_TS_FIELD}){' - SIMULATION' if dry_run else ''}")
+    print(f"Source: {get_base_cloud()}")
+    print("=" * 60)
+
+    total_errors = 0
+    for collection in collections:
+        users, changed, unreadable, errors = backfill_collection(collection, dry_run)
+        total_errors += errors
+        print(f"[{collection}] {users} utilisateurs, {changed} document(s) normalisé(s), "
+              f"{len(unreadable)} date(s) illisible(s), {errors} erreur(s)")
+        for username, value in unreadable[:10]:
+            print(f"  [DATE ILLISIBLE] {username}: {value!r}")
+
+    print()
+    print("[OK] Terminé" if total_errors == 0 else f"[ATTENTION] {total_errors} problème(s)")
+    sys.exit(0 if total_errors == 0 else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+Benchmark de sérialisation JSON: json standard vs orjson (module serialization)
+Usage:
+    python scripts/benchmark_json.py                          # fixtures générées (taille réelle)
+    python scripts/benchmark_json.py data/rpo/mathis_rpo.json # fichiers réels
+    python scripts/benchmark_json.py --iterations 500
+
+Mesure le temps moyen de parse et d'écriture (indent=2, comme sur disque)
+pour un fichier *_rpo.json et un ventes.json.
+"""
+
+import json
+import os
+import sys
+import time
+
+# Ajouter le répertoire racine au path pour les imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import serialization
+
+
+def build_rpo_fixture() -> dict:
+    """RPO entrepreneur complet: annual + 13 mois + 13x5 semaines remplies"""
+    annual = {f"champ_{i}": i * 1.5 for i in range(40)}
+    monthly = {
+        month: {field: 1250.0 for field in ["obj_pap", "obj_rep", "hrpap_vise", "estimation_vise", "contract_vise",
+                                            "dollar_vise", "hrpap_reel", "estimation_reel", "contract_reel", "dollar_reel"]}
+        for month in ['dec2025', 'jan', 'feb', 'mar', 'apr', 'may', 'jun', 'jul', 'aug', 'sep', 'oct', 'nov', 'dec']
+    }
+    weekly = {
+        str(month_idx): {
+            str(week_num): {
+                "week_label": f"{week_num * 7 - 6} - {week_num * 7} janv",
+                "h_marketing": "12.5",
+                "estimation": 8,
+                "contract": 3,
+                "dollar": 14250.75,
+                "produit": 820.0,
+                "rating": 4,
+                "probleme": "Météo difficile, deux clients reportés",
+                "focus": "Relances téléphoniques et porte-à-porte",
+                "h_marketing_vise": 15,
+                "estimation_vise": 10,
+                "contract_vise": 3,
+                "dollar_vise": 12000,
+                "commentaire": "Bonne semaine malgré la pluie",
+                "prod_horaire": 62.4
+            }
+            for week_num in range(1, 6)
+        }
+        for month_idx in [-2] + list(range(12))
+    }
+    return {"annual": annual, "monthly": monthly, "weekly": weekly, "last_updated": "2026-01-15T10:00:00-05:00"}
+
+
+def build_ventes_fixture(count: int = 400) -> list:
+    """Liste de ventes acceptées typique d'un entrepreneur en fin de saison"""
+    return [
+        {
+            "id": f"vente_{i}",
+            "num": f"{1000 + i}",
+            "nom": "Tremblay",
+            "prenom": "Éloïse",
+            "adresse": f"{i} rue Saint-Denis, Montréal, QC",
+            "telephone": "514-555-0199",
+            "courriel": f"client{i}@exemple.ca",
+            "prix": f"{4500 + i},00 $",
+            "date": "2026-06-12",
+            "date_completion": "2026-07-02T14:30:00",
+            "statut": "acceptee",
+            "pdf_url": f"/cloud/soumissions_signees/user/soumission_{i}.pdf",
+            "notes": "Peinture extérieure, deux couches, galerie incluse",
+            "items": [{"description": "Mur façade", "quantite": 1, "prix": 1800.0},
+                      {"description": "Galerie", "quantite": 1, "prix": 950.0}]
+        }
+        for i in range(count)
+    ]
+
+
+def bench(label: str, func, iterations: int) -> float:
+    start = time.perf_counter()
+    for _ in range(iterations):
+        func()
+    elapsed = (time.perf_counter() - start) / iterations * 1e6
+    print(f"  {label:<28} {elapsed:10.1f} µs")
+    return elapsed
+
+
+def run(name: str, data, iterations: int):
+    text = json.dumps(data, indent=2, ensure_ascii=False)
+    raw = text.encode("utf-8")
+    print(f"\n{name} ({len(raw) / 1024:.1f} Ko)")
+
+    parse_std = bench("parse json", lambda: json.loads(text), iterations)
+    parse_fast = bench("parse serialization", lambda: serialization.loads(raw), iterations)
+    dump_std = bench("dump json (indent=2)", lambda: json.dumps(data, indent=2, ensure_ascii=False), iterations)
+    dump_fast = bench("dump serialization", lambda: serialization.dumps_bytes(data, indent=True), iterations)
+
+    print(f"  -> parse x{parse_std / parse_fast:.1f}, dump x{dump_std / dump_fast:.1f}")
+
+    # Le format écrit doit rester identique à l'ancien json.dump
+    if serialization.dumps(data, indent=True) != text:
+        print("  [ATTENTION] Sortie différente de json.dump(indent=2, ensure_ascii=False)")
+
+
+def main():
+    iterations = 200
+    args = sys.argv[1:]
+    if "--iterations" in args:
+        idx = args.index("--iterations")
+        iterations = int(args[idx + 1])
+        del args[idx:idx + 2]
+
+    print("=" * 60)
+    print(f"BENCHMARK JSON - orjson {'actif' if serialization.HAS_ORJSON else 'ABSENT (fallback json)'}")
+    print(f"{iterations} itérations par mesure")
+    print("=" * 60)
+
+    if args:
+        for path in args:
+            run(path, serialization.read_json_file(path), iterations)
+    else:
+        run("fixture *_rpo.json", build_rpo_fixture(), iterations)
+        run("fixture ventes.json", build_ventes_fixture(), iterations)
+
+
+if __name__ == "__main__":
+    main()
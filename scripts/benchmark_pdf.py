@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+Benchmark de génération PDF: fusion PyPDF2 classique vs templates en cache (QE/PDF/template_cache)
+Usage:
+    python scripts/benchmark_pdf.py                   # 30 PDF par type et par mode
+    python scripts/benchmark_pdf.py --iterations 100
+
+Types mesurés: soumission (fr/en), facture, calculateur (fr).
+Pour chaque type, vérifie aussi que les deux modes donnent le même nombre de
+pages et le même texte extrait (espaces ignorés: le calque étant un XObject
+séparé, l'extraction n'insère pas les mêmes espaces; numéro de facture
+aléatoire masqué).
+"""
+
+import contextlib
+import io
+import os
+import re
+import sys
+import tempfile
+import time
+
+# Ajouter le répertoire racine au path pour les imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Pas de signature/user_info réels pendant le benchmark
+os.environ["STORAGE_PATH"] = tempfile.mkdtemp(prefix="qwota_bench_pdf_")
+
+from PyPDF2 import PdfReader
+
+import QE.PDF.generate_pdf as soumission_module
+import QE.PDF.generate_pdf_calcul as calcul_module
+import QE.PDF.generate_pdf_facture as facture_module
+from QE.PDF.template_cache import TemplateError
+
+# Numéros de facture tirés pendant le benchmark: fichier jetable, pas factures/used_nums.json du dépôt
+facture_module.FACTURE_NUM_FILE = os.path.join(os.environ["STORAGE_PATH"], "used_nums.json")
+
+SOUMISSION = {
+    "nom": "Tremblay", "prenom": "Jean", "prix": "12 500,00 $", "depot": "500",
+    "adresse": "123 rue Principale, Montréal, QC H2X 1Y4", "telephone": "514-555-0101", "courriel": "jean@example.com",
+    "date": "2025-05-01", "date2": "2025-05-08", "item": "Peinture extérieure\nLavage à pression",
+    "temps": "3 jours", "endroit": "Façade avant", "produit": "Sico Evolution", "part": "Toit et galerie",
+    "payer_par": "Virement Interac", "num": "25-0001", "username": "benchmark",
+}
+
+FACTURE = {
+    "nom": "Tremblay", "prenom": "Jean", "adresse": "123 rue Principale", "prix": "12500",
+    "depot": "500", "telephone": "514-555-0101", "courriel": "jean@example.com", "endroit": "Façade",
+    "item": "Peinture extérieure", "part": "Toit", "produit": "Sico", "payer_par": "Virement Interac",
+    "username": "benchmark", "temps": "3 jours", "language": "fr",
+}
+
+CALCUL = {
+    "username": "benchmark",
+    "client": {"name": "Jean Tremblay", "address": "123 rue Principale", "phone": "514-555-0101", "date": "2025-05-01"},
+    "surfaces": {}, "product": {}, "hours": {}, "parameters": {},
+    "costs": {"totalExterieur": 8000, "totalInterieur": 4500},
+}
+
+CASES = [
+    ("soumission fr", lambda: soumission_module.generate_pdf(dict(SOUMISSION), language="fr")),
+    ("soumission en", lambda: soumission_module.generate_pdf(dict(SOUMISSION), language="en")),
+    ("facture", lambda: facture_module.generate_facture_pdf(**FACTURE)),
+    ("calculateur", lambda: calcul_module.generate_calcul_pdf(dict(CALCUL), language="fr")),
+]
+
+MODULES = (soumission_module, facture_module, calcul_module)
+
+
+@contextlib.contextmanager
+def legacy_mode():
+    """Force la fusion PyPDF2 classique (comme si le cache de templates était indisponible)"""
+    def unavailable(*args, **kwargs):
+        raise TemplateError("benchmark: mode classique")
+
+    originals = [module.render_with_template for module in MODULES]
+    for module in MODULES:
+        module.render_with_template = unavailable
+    try:
+        yield
+    finally:
+        for module, original in zip(MODULES, originals):
+            module.render_with_template = original
+
+
+def run(generate, iterations: int):
+    """Temps moyen (ms) et dernier PDF, sans les print de débogage des générateurs"""
+    with contextlib.redirect_stdout(io.StringIO()):
+        output = generate()  # préparation du template (premier appel) exclue de la mesure
+        start = time.perf_counter()
+        for _ in range(iterations):
+            output = generate()
+        elapsed = time.perf_counter() - start
+    return elapsed / iterations * 1000, output.getvalue()
+
+
+def describe(pdf_bytes: bytes):
+    reader = PdfReader(io.BytesIO(pdf_bytes))
+    texts = []
+    for page in reader.pages:
+        text = re.sub(r"\d{6}-\d{2}", "<num>", page.extract_text())
+        texts.append("".join(text.split()))
+    return len(reader.pages), texts
+
+
+def main():
+    args = sys.argv[1:]
+    iterations = int(args[args.index("--iterations") + 1]) if "--iterations" in args else 30
+
+    print("=" * 60)
+    print(f"BENCHMARK PDF - {iterations} PDF par type et par mode")
+    print("=" * 60)
+
+    for name, generate in CASES:
+        with legacy_mode():
+            legacy_ms, legacy_pdf = run(generate, iterations)
+        cached_ms, cached_pdf = run(generate, iterations)
+
+        same = describe(legacy_pdf) == describe(cached_pdf)
+        print(f"\n[{name}]")
+        print(f"  Fusion PyPDF2:     {legacy_ms:7.1f} ms/PDF ({1000 / legacy_ms:6.0f} PDF/s)")
+        print(f"  Template en cache: {cached_ms:7.1f} ms/PDF ({1000 / cached_ms:6.0f} PDF/s)")
+        print(f"  Accélération:      x{legacy_ms / cached_ms:.1f}")
+        print(f"  Taille:            {len(legacy_pdf) // 1024} Ko -> {len(cached_pdf) // 1024} Ko")
+        print(f"  Pages et texte identiques: {'oui' if same else 'NON'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+Benchmark de concurrence SQLite: 200 utilisateurs envoient des heartbeats et gagnent de l'XP
+Usage:
+    python scripts/benchmark_sqlite_concurrency.py                 # 200 utilisateurs, 40 threads
+    python scripts/benchmark_sqlite_concurrency.py --users 500 --threads 64 --rounds 5
+
+Compare deux modes sur des bases temporaires (la vraie qwota.db n'est jamais touchée):
+- legacy: sqlite3.connect() à chaque appel, journal rollback, pas de busy_timeout
+- pool:   db_pool.get_connection() (WAL, synchronous=NORMAL, busy_timeout, connexions réutilisées)
+
+40 threads = taille du pool de threads de FastAPI pour les routes synchrones.
+"""
+
+import os
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# Ajouter le répertoire racine au path pour les imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Les bases du benchmark vivent dans un dossier temporaire
+BENCH_DIR = tempfile.mkdtemp(prefix="qwota_bench_")
+os.environ["STORAGE_PATH"] = BENCH_DIR
+
+import db_pool
+import gamification
+
+
+def create_schema(db_path: str, nb_users: int):
+    conn = sqlite3.connect(db_path)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS users (
+            username TEXT PRIMARY KEY, prenom TEXT, nom TEXT, role TEXT
+        )
+    """)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS online_users (
+            username TEXT PRIMARY KEY, last_seen REAL, prenom TEXT, nom TEXT, role TEXT
+        )
+    """)
+    conn.executemany(
+        "INSERT OR REPLACE INTO users VALUES (?, ?, ?, 'entrepreneur')",
+        [(f"user{i}", f"Prenom{i}", f"Nom{i}") for i in range(nb_users)]
+    )
+    conn.commit()
+    conn.close()
+
+
+def heartbeat(connect, username: str):
+    """Même requêtes que la route /api/users/heartbeat"""
+    with connect() as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT prenom, nom, role FROM users WHERE username = ?", (username,))
+        row = cursor.fetchone()
+        if row:
+            cursor.execute("""
+                INSERT OR REPLACE INTO online_users (username, last_seen, prenom, nom, role)
+                VALUES (?, ?, ?, ?, ?)
+            """, (username, time.time(), row[0] or "", row[1] or "", row[2] or "entrepreneur"))
+            conn.commit()
+
+
+def run_mode(mode: str, nb_users: int, nb_threads: int, rounds: int) -> dict:
+    db_path = os.path.join(BENCH_DIR, f"{mode}.db")
+
+    if mode == "pool":
+        def connect():
+            return db_pool.get_connection(db_path)
+    else:
+        def connect():
+            return sqlite3.connect(db_path)
+
+    # award_xp() réel, branché sur la connexion du mode testé
+    gamification.DB_PATH = db_path
+    gamification.get_connection = connect
+    gamification.init_gamification_tables()
+    create_schema(db_path, nb_users)
+
+    latencies = []
+    errors = []
+
+    def user_session(i: int):
+        username = f"user{i}"
+        for _ in range(rounds):
+            for action in ("heartbeat", "xp", "heartbeat"):
+                start = time.perf_counter()
+                try:
+                    if action == "heartbeat":
+                        heartbeat(connect, username)
+                    else:
+                        gamification.award_xp(username, 10, "benchmark", "Benchmark concurrence")
+                    latencies.append(time.perf_counter() - start)
+                except sqlite3.OperationalError as e:
+                    errors.append(str(e))
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=nb_threads) as executor:
+        list(executor.map(user_session, range(nb_users)))
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        "ops": len(latencies),
+        "errors": len(errors),
+        "elapsed": elapsed,
+        "ops_per_sec": len(latencies) / elapsed if elapsed else 0,
+        "p50_ms": statistics.median(latencies) * 1000 if latencies else 0,
+        "p95_ms": latencies[int(len(latencies) * 0.95) - 1] * 1000 if latencies else 0,
+        "max_ms": latencies[-1] * 1000 if latencies else 0,
+    }
+
+
+def main():
+    args = sys.argv[1:]
+
+    def option(name: str, default: int) -> int:
+        if name in args:
+            return int(args[args.index(name) + 1])
+        return default
+
+    nb_users = option("--users", 200)
+    nb_threads = option("--threads", 40)
+    rounds = option("--rounds", 3)
+
+    print("=" * 60)
+    print(f"BENCHMARK SQLITE - {nb_users} utilisateurs, {nb_threads} threads, {rounds} tours")
+    print(f"Bases temporaires: {BENCH_DIR}")
+    print("=" * 60)
+
+    for mode in ("legacy", "pool"):
+        result = run_mode(mode, nb_users, nb_threads, rounds)
+        print(f"\n[{mode}]")
+        print(f"  Opérations:   {result['ops']} en {result['elapsed']:.2f}s ({result['ops_per_sec']:.0f} ops/s)")
+        print(f"  Latence:      p50={result['p50_ms']:.1f}ms p95={result['p95_ms']:.1f}ms max={result['max_ms']:.1f}ms")
+        print(f"  Erreurs:      {result['errors']} (database is locked)")
+
+    print(f"\nConnexions pool: {db_pool.get_pool_stats()}")
+
+
+if __name__ == "__main__":
+    main()
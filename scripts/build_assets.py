@@ -0,0 +1,40 @@
+#!/usr/bin/env python3
+"""
+Build des assets du frontend: CSS/JS avec empreinte + versions .gz/.br + manifest.json
+Usage:
+    python scripts/build_assets.py
+
+Écrit dans build/assets (voir static_assets.py). Lancé par la commande de build
+de Render; sinon l'application le fait au démarrage si les sources ont changé.
+"""
+
+import os
+import sys
+import time
+
+# Ajouter le répertoire racine au path pour les imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from static_assets import HAS_BROTLI, asset_store
+
+
+def main():
+    start = time.perf_counter()
+    manifest = asset_store.build()
+    elapsed = time.perf_counter() - start
+
+    total = {"identity": 0, "gzip": 0, "br": 0}
+    for entry in manifest["assets"].values():
+        total["identity"] += entry["size"]
+        for encoding, suffix in (("gzip", ".gz"), ("br", ".br")):
+            path = asset_store.assets_dir / f"{entry['file']}{suffix}"
+            total[encoding] += path.stat().st_size if path.exists() else entry["size"]
+
+    print(f"[ASSETS] {len(manifest['assets'])} assets dans {asset_store.assets_dir} ({elapsed:.1f}s)")
+    print(f"[ASSETS] Taille: {total['identity'] // 1024} Ko, gzip {total['gzip'] // 1024} Ko"
+          + (f", brotli {total['br'] // 1024} Ko" if HAS_BROTLI else " (module brotli absent)"))
+    print(f"[ASSETS] Version du manifest: {manifest['version']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+Détecte les appels bloquants (fichiers, SQLite, sleep, HTTP) dans les routes `async def`
+Usage:
+    python scripts/check_blocking_async.py                   # main.py + QE/Backend
+    python scripts/check_blocking_async.py main.py           # fichiers choisis
+    python scripts/check_blocking_async.py --summary         # nombre d'appels par route
+    python scripts/check_blocking_async.py --max 120         # échoue si plus de 120 appels
+
+Dans une route async, ces appels doivent passer par async_io (run_blocking,
+load_json_async, save_json_async, save_upload_file) ou la route doit être
+déclarée en `def` (FastAPI l'exécute alors dans son pool de threads).
+Les fonctions imbriquées et les lambdas ne sont pas analysées: c'est justement
+la façon de passer du travail à run_blocking().
+"""
+
+import ast
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Appels simples (nom) et attributs (module.fonction) considérés comme bloquants
+BLOCKING_NAMES = {"open"}
+BLOCKING_ATTRS = {
+    ("json", "load"), ("json", "dump"),
+    ("sqlite3", "connect"),
+    ("time", "sleep"),
+    ("os", "listdir"), ("os", "walk"), ("os", "makedirs"), ("os", "remove"),
+    ("os", "rename"), ("os", "replace"), ("os", "scandir"),
+    ("shutil", "copy"), ("shutil", "copy2"), ("shutil", "copyfile"), ("shutil", "copyfileobj"),
+    ("shutil", "move"), ("shutil", "rmtree"),
+    ("glob", "glob"),
+    ("subprocess", "run"), ("subprocess", "call"), ("subprocess", "check_output"),
+    ("requests", "get"), ("requests", "post"), ("requests", "put"), ("requests", "delete"),
+    ("requests", "patch"), ("requests", "request"),
+}
+# Méthodes de pathlib.Path bloquantes quel que soit l'objet
+BLOCKING_METHODS = {"read_text", "write_text", "read_bytes", "write_bytes", "iterdir", "mkdir", "unlink"}
+
+ROUTE_DECORATORS = {"get", "post", "put", "delete", "patch", "websocket", "api_route"}
+
+
+def is_route(func: ast.AsyncFunctionDef) -> bool:
+    """@app.get(...), @router.post(...), etc."""
+    for decorator in func.decorator_list:
+        if isinstance(decorator, ast.Call) and isinstance(decorator.func, ast.Attribute):
+            if decorator.func.attr in ROUTE_DECORATORS:
+                return True
+    return False
+
+
+def blocking_call_name(call: ast.Call):
+    func = call.func
+    if isinstance(func, ast.Name) and func.id in BLOCKING_NAMES:
+        return func.id
+    if isinstance(func, ast.Attribute):
+        if isinstance(func.value, ast.Name) and (func.value.id, func.attr) in BLOCKING_ATTRS:
+            return f"{func.value.id}.{func.attr}"
+        if func.attr in BLOCKING_METHODS:
+            return f".{func.attr}()"
+    return None
+
+
+class RouteVisitor(ast.NodeVisitor):
+    """Parcourt le corps d'une route sans descendre dans les fonctions imbriquées"""
+
+    def __init__(self):
+        self.calls = []
+
+    def visit_FunctionDef(self, node):
+        pass
+
+    def visit_AsyncFunctionDef(self, node):
+        pass
+
+    def visit_Lambda(self, node):
+        pass
+
+    def visit_Call(self, node):
+        name = blocking_call_name(node)
+        if name:
+            self.calls.append((node.lineno, name))
+        self.generic_visit(node)
+
+
+def check_file(path: str):
+    """Retourne [(route, ligne, appel)] pour un fichier"""
+    with open(path, "r", encoding="utf-8") as f:
+        tree = ast.parse(f.read(), filename=path)
+
+    findings = []
+    for node in ast.walk(tree):
+        if isinstance(node, ast.AsyncFunctionDef) and is_route(node):
+            visitor = RouteVisitor()
+            for statement in node.body:
+                visitor.visit(statement)
+            findings.extend((node.name, lineno, name) for lineno, name in visitor.calls)
+    return findings
+
+
+def default_files():
+    files = [os.path.join(ROOT, "main.py")]
+    backend_dir = os.path.join(ROOT, "QE", "Backend")
+    if os.path.isdir(backend_dir):
+        files += sorted(
+            os.path.join(backend_dir, name) for name in os.listdir(backend_dir) if name.endswith(".py")
+        )
+    return files
+
+
+def main():
+    args = sys.argv[1:]
+    summary = "--summary" in args
+    max_allowed = 0
+    if "--max" in args:
+        idx = args.index("--max")
+        max_allowed = int(args[idx + 1])
+        del args[idx:idx + 2]
+    files = [a for a in args if not a.startswith("--")] or default_files()
+
+    total = 0
+    for path in files:
+        findings = check_file(path)
+        total += len(findings)
+        rel = os.path.relpath(path, ROOT)
+
+        if summary:
+            per_route = {}
+            for route, _, _ in findings:
+                per_route[route] = per_route.get(route, 0) + 1
+            for route, count in sorted(per_route.items(), key=lambda item: -item[1]):
+                print(f"{rel}: {route}: {count} appel(s) bloquant(s)")
+        else:
+            for route, lineno, name in findings:
+                print(f"{rel}:{lineno}: {name} dans la route async {route}()")
+
+    print()
+    print(f"[TOTAL] {total} appel(s) bloquant(s) dans des routes async (max autorisé: {max_allowed})")
+    sys.exit(0 if total <= max_allowed else 1)
+
+
+if __name__ == "__main__":
+    main()
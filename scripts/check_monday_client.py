@@ -0,0 +1,262 @@
+#!/usr/bin/env python3
+"""
+Vérification du client Monday.com (QE/Backend/monday_client.py) contre un faux serveur GraphQL local
+Usage:
+    python scripts/check_monday_client.py
+
+Un http.server local joue l'API Monday (aucun appel réseau externe, base SQLite
+temporaire). Le script vérifie:
+- mutate_batch(): découpage en lots de MONDAY_BATCH_SIZE alias, erreur par alias
+- nouvelles tentatives: budget de complexité (retry_in_seconds), limite de débit
+  ("reset in N seconds"), 429 + Retry-After, 5xx avec délai exponentiel,
+  aucune nouvelle tentative d'une mutation non idempotente, abandon après max_retries
+- index soumission -> item_id: rempli par le rafraîchissement paginé du board et
+  par create_monday_item, puis utilisé sans requête; webhook de suppression
+Code de sortie 1 si une vérification échoue.
+"""
+
+import json
+import os
+import re
+import sys
+import tempfile
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Ajouter le répertoire racine au path pour les imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+BOARD_ID = "4242"
+_ALIAS_RE = re.compile(r"\b(m\d+): ")
+
+
+class FakeMonday:
+    """État du faux serveur: réponses scriptées puis comportement par défaut"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.scripted = []      # (status, headers, body) renvoyés avant le comportement par défaut
+        self.queries = []       # requêtes GraphQL reçues
+        self.next_item_id = 9000
+        self.board_items = [
+            [{"id": "1001", "name": "S-100 Jean Tremblay", "column_values": [{"id": "numbers4", "text": "2500"}]},
+             {"id": "1002", "name": "Marie Roy", "column_values": [{"id": "numbers4", "text": "S-101"}]}],
+            [{"id": "1003", "name": "Luc Gagnon", "column_values": [{"id": "numbers4", "text": "900"}]}],
+        ]
+
+    def script(self, *responses):
+        with self.lock:
+            self.scripted.extend(responses)
+
+    def reset(self):
+        with self.lock:
+            self.scripted.clear()
+            self.queries.clear()
+
+    def respond(self, query: str):
+        with self.lock:
+            self.queries.append(query)
+            if self.scripted:
+                return self.scripted.pop(0)
+
+        if "create_item" in query:
+            with self.lock:
+                self.next_item_id += 1
+                item_id = str(self.next_item_id)
+            name = re.search(r'item_name: "((?:[^"\\]|\\.)*)"', query)
+            return 200, {}, {"data": {"create_item": {"id": item_id, "name": json.loads(f'"{name.group(1)}"') if name else ""}}}
+        if "next_items_page" in query:
+            return 200, {}, {"data": {"next_items_page": {"cursor": None, "items": self.board_items[1]}}}
+        if "items_page" in query:
+            return 200, {}, {"data": {"boards": [{"items_page": {"cursor": "page2", "items": self.board_items[0]}}]}}
+        if query.lstrip().startswith("mutation"):
+            data, errors = {}, []
+            for alias, body in re.findall(r"\b(m\d+): (.*?)(?= m\d+: | \}$)", query):
+                if "FAIL" in body:
+                    data[alias] = None
+                    errors.append({"message": f"Colonne invalide ({alias})", "path": [alias]})
+                else:
+                    data[alias] = {"id": "1"}
+            payload = {"data": data}
+            if errors:
+                payload["errors"] = errors
+            return 200, {}, payload
+        return 200, {}, {"data": {}}
+
+
+fake = FakeMonday()
+
+
+class _Handler(BaseHTTPRequestHandler):
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        raw = self.rfile.read(length)
+        try:
+            query = json.loads(raw).get("query", "")
+        except ValueError:
+            query = raw.decode("utf-8", "replace")
+        status, headers, body = fake.respond(query)
+        content = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(content)))
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(content)
+
+    def log_message(self, *args):
+        pass
+
+
+server = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+threading.Thread(target=server.serve_forever, daemon=True).start()
+FAKE_URL = f"http://127.0.0.1:{server.server_address[1]}/v2"
+
+# Le client unique (et monday_sync) doit viser le faux serveur, l'index une base jetable
+os.environ["MONDAY_API_URL"] = FAKE_URL
+os.environ["STORAGE_PATH"] = tempfile.mkdtemp(prefix="qwota_monday_check_")
+
+from QE.Backend import monday_client  # noqa: E402
+from QE.Backend.monday_client import MondayClient, MondayError  # noqa: E402
+
+# Délais demandés au lieu de dormir réellement (les valeurs sont vérifiées)
+sleeps = []
+monday_client.time.sleep = sleeps.append
+
+failures = []
+
+
+def check(label: str, condition: bool, detail: str = ""):
+    print(f"  [{'OK' if condition else 'ÉCHEC'}] {label}{f' ({detail})' if detail and not condition else ''}")
+    if not condition:
+        failures.append(label)
+
+
+def limit_error(code, retry_in=None, message="Complexity budget exhausted"):
+    extensions = {"code": code}
+    if retry_in is not None:
+        extensions["retry_in_seconds"] = retry_in
+    return {"errors": [{"message": message, "extensions": extensions}]}
+
+
+def check_batching():
+    print("\n[LOTS] mutate_batch")
+    fake.reset()
+    client = MondayClient(url=FAKE_URL, retry_base=0.5, max_retries=3)
+    mutations = [f'change_simple_column_value(board_id: {BOARD_ID}, item_id: 1, column_id: "c{i}", value: "{"FAIL" if i == 23 else i}") {{ id }}'
+                 for i in range(45)]
+    results = client.mutate_batch("cle", mutations)
+    sizes = [len(_ALIAS_RE.findall(q)) for q in fake.queries]
+    batch = monday_client.MONDAY_BATCH_SIZE
+    check(f"45 mutations -> lots de {batch}", sizes == [batch, batch, 45 - 2 * batch], f"lots={sizes}")
+    check("un résultat par mutation, dans l'ordre", len(results) == 45)
+    check("erreur rattachée à la bonne mutation (alias m3 du 2e lot)",
+          results[23] is not None and all(r is None for i, r in enumerate(results) if i != 23), f"{results[20:25]}")
+
+
+def check_retries():
+    print("\n[NOUVELLES TENTATIVES]")
+    client = MondayClient(url=FAKE_URL, retry_base=0.5, max_retries=3)
+
+    fake.reset(); sleeps.clear()
+    fake.script((200, {}, limit_error("COMPLEXITY_BUDGET_EXHAUSTED", retry_in=7)))
+    client.execute("cle", "query { me { id } }")
+    check("budget de complexité: délai retry_in_seconds", sleeps == [7.0] and len(fake.queries) == 2, f"délais={sleeps}")
+
+    fake.reset(); sleeps.clear()
+    fake.script((200, {}, {"error_code": "RATE_LIMIT_EXCEEDED", "error_message": "Rate limit, reset in 12 seconds"}))
+    client.execute("cle", "query { me { id } }")
+    check("limite de débit (ancien format): 'reset in N seconds'", sleeps == [12.0], f"délais={sleeps}")
+
+    fake.reset(); sleeps.clear()
+    fake.script((429, {"Retry-After": "3"}, {"error_message": "Too many requests"}))
+    client.execute("cle", "query { me { id } }")
+    check("429: délai Retry-After", sleeps == [3.0], f"délais={sleeps}")
+
+    fake.reset(); sleeps.clear()
+    fake.script(*[(503, {}, {"error_message": "indisponible"})] * 3)
+    client.execute("cle", "query { me { id } }")
+    check("5xx: délai exponentiel", sleeps == [0.5, 1.0, 2.0] and len(fake.queries) == 4, f"délais={sleeps}")
+
+    fake.reset(); sleeps.clear()
+    fake.script((503, {}, {"error_message": "indisponible"}))
+    try:
+        client.execute("cle", f'mutation {{ create_item(board_id: {BOARD_ID}, item_name: "X") {{ id }} }}', idempotent=False)
+        raised = False
+    except MondayError:
+        raised = True
+    check("5xx sur mutation non idempotente: aucune nouvelle tentative", raised and len(fake.queries) == 1 and not sleeps,
+          f"requêtes={len(fake.queries)}")
+
+    fake.reset(); sleeps.clear()
+    fake.script((200, {}, limit_error("COMPLEXITY_BUDGET_EXHAUSTED", retry_in=1)))
+    client.execute("cle", f'mutation {{ create_item(board_id: {BOARD_ID}, item_name: "X") {{ id }} }}', idempotent=False)
+    check("limite sur mutation non idempotente: relancée (non exécutée par Monday)", len(fake.queries) == 2)
+
+    fake.reset(); sleeps.clear()
+    fake.script(*[(503, {}, {"error_message": "indisponible"})] * 10)
+    try:
+        client.execute("cle", "query { me { id } }")
+        raised = False
+    except MondayError:
+        raised = True
+    check("abandon après max_retries", raised and len(fake.queries) == client.max_retries + 1, f"requêtes={len(fake.queries)}")
+
+
+def check_index():
+    print("\n[INDEX SOUMISSION -> ITEM]")
+    from QE.Backend import monday_sync
+
+    monday_client.init_monday_tables()
+    fake.reset()
+    item_id = monday_client.find_item_id("cle", BOARD_ID, "S-100")
+    pages = [q for q in fake.queries if "items_page" in q]
+    check("index vide: board relu page par page", len(pages) == 2, f"requêtes={len(fake.queries)}")
+    check("numéro dans le nom de l'item trouvé", item_id == "1001", f"item={item_id}")
+    check("numéro dans la colonne $JOB trouvé", monday_client.index_lookup(BOARD_ID, "S-101") == "1002")
+
+    fake.reset()
+    check("recherche suivante: lue dans l'index sans requête",
+          monday_client.find_item_id("cle", BOARD_ID, "S-100") == "1001" and not fake.queries)
+    check("absent + index récent: pas de relecture du board",
+          monday_client.find_item_id("cle", BOARD_ID, "S-999") is None and not fake.queries)
+
+    fake.reset()
+    created = monday_sync.create_monday_item("cle", BOARD_ID, {
+        "num": "S-200", "prenom": "Anne", "nom": "Lavoie", "prix": "3 200,50",
+        "telephone": "514-555-1234", "adresse": "1 rue Principale", "courriel": "anne@example.com",
+    }, "verification")
+    new_id = str(fake.next_item_id)
+    batches = [q for q in fake.queries if "create_item" not in q and q.lstrip().startswith("mutation")]
+    check("create_monday_item: item créé", created and any("create_item" in q for q in fake.queries))
+    check("colonnes envoyées en une seule requête", len(batches) == 1 and len(_ALIAS_RE.findall(batches[0])) == 4,
+          f"lots={[len(_ALIAS_RE.findall(q)) for q in batches]}")
+
+    fake.reset()
+    check("item créé retrouvé par numéro de soumission sans requête",
+          monday_client.find_item_id("cle", BOARD_ID, "S-200") == new_id and not fake.queries)
+
+    monday_client.apply_webhook_event({"boardId": BOARD_ID, "pulseId": new_id, "type": "delete_pulse"})
+    check("webhook de suppression: item retiré de l'index", monday_client.index_lookup(BOARD_ID, "S-200") is None)
+
+
+def main():
+    print("=" * 60)
+    print("CLIENT MONDAY.COM - VÉRIFICATION CONTRE UN FAUX SERVEUR GRAPHQL")
+    print(f"Serveur: {FAKE_URL}")
+    print(f"Base: {os.environ['STORAGE_PATH']}")
+    print("=" * 60)
+
+    check_batching()
+    check_retries()
+    check_index()
+    server.shutdown()
+
+    print()
+    print("[OK] Toutes les vérifications passent" if not failures else f"[ATTENTION] {len(failures)} échec(s): {failures}")
+    sys.exit(0 if not failures else 1)
+
+
+if __name__ == "__main__":
+    main()
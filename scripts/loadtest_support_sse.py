@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+"""
+Test de charge du chat de support: polling (avant) vs flux SSE du hub (QE/Backend/support_hub)
+Usage:
+    python scripts/loadtest_support_sse.py                       # 100 onglets, 30 s
+    python scripts/loadtest_support_sse.py --tabs 200 --seconds 60 --message-interval 0.5
+
+Simule dans un seul processus, sur une base temporaire (la vraie qwota.db n'est jamais touchée):
+- --tabs onglets entrepreneur avec le chat ouvert + --admins pages support-admin
+- un message envoyé toutes les --message-interval secondes dans une conversation au hasard
+- polling: GET /api/support/messages toutes les 3 s par onglet, all-conversations toutes les 2 s par admin
+- SSE: une connexion par onglet, relecture SQLite seulement après une publication du hub
+
+Compte les requêtes HTTP, les lectures SQLite et mesure le délai entre l'envoi
+d'un message et son affichage dans l'onglet concerné.
+"""
+
+import asyncio
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+# Ajouter le répertoire racine au path pour les imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# La base du test de charge vit dans un dossier temporaire
+os.environ["STORAGE_PATH"] = tempfile.mkdtemp(prefix="qwota_loadtest_support_")
+
+import database
+from async_io import run_blocking
+from QE.Backend.support_hub import ADMIN_TOPIC, SupportHub, user_topic
+
+USER_POLL_SECONDS = 3
+ADMIN_POLL_SECONDS = 2
+
+
+class Stats:
+    def __init__(self):
+        self.requests = 0
+        self.sqlite_reads = 0
+        self.events = 0
+        self.latencies = []
+        self.sent = {}  # texte du message -> heure d'envoi
+        self.seen = set()
+
+    def record_messages(self, messages):
+        """Délai d'affichage du dernier message (une seule fois par message)"""
+        if not messages:
+            return
+        text = messages[-1]["message"]
+        if text in self.sent and text not in self.seen:
+            self.seen.add(text)
+            self.latencies.append(time.perf_counter() - self.sent[text])
+
+
+def create_users(nb_tabs: int):
+    with database.get_connection() as conn:
+        conn.executemany(
+            "INSERT OR IGNORE INTO users (username, password_hash, role, created_at) VALUES (?, 'x', 'entrepreneur', ?)",
+            [(f"user{i}", time.strftime("%Y-%m-%dT%H:%M:%S")) for i in range(nb_tabs)]
+        )
+
+
+async def sender(stats: Stats, hub, nb_tabs: int, interval: float, deadline: float):
+    """Entrepreneurs et support qui écrivent: POST /api/support/send-message"""
+    count = 0
+    while time.perf_counter() < deadline:
+        await asyncio.sleep(interval)
+        username = f"user{random.randrange(nb_tabs)}"
+        text = f"message {count}"
+        count += 1
+        stats.sent[text] = time.perf_counter()
+        stats.requests += 1
+        await run_blocking(database.send_support_message, username, text, count % 2)
+        if hub is not None:
+            hub.publish(username)
+
+
+def load_user_state(stats: Stats, username: str):
+    stats.sqlite_reads += 2
+    return {"messages": database.get_user_messages(username),
+            "unread_count": database.get_unread_messages_count(username)}
+
+
+def load_admin_state(stats: Stats):
+    stats.sqlite_reads += 2
+    return {"conversations": database.get_all_support_conversations(),
+            "resolved_today": database.get_resolved_today_count()}
+
+
+async def polling_tab(stats: Stats, username: str, deadline: float):
+    await asyncio.sleep(random.uniform(0, USER_POLL_SECONDS))
+    while time.perf_counter() < deadline:
+        stats.requests += 1
+        stats.sqlite_reads += 1
+        messages = await run_blocking(database.get_user_messages, username)
+        stats.record_messages(messages)
+        await asyncio.sleep(USER_POLL_SECONDS)
+
+
+async def polling_admin(stats: Stats, deadline: float):
+    await asyncio.sleep(random.uniform(0, ADMIN_POLL_SECONDS))
+    while time.perf_counter() < deadline:
+        stats.requests += 1
+        stats.sqlite_reads += 1
+        await run_blocking(database.get_all_support_conversations)
+        await asyncio.sleep(ADMIN_POLL_SECONDS)
+
+
+async def sse_client(stats: Stats, hub: SupportHub, topic: str, load_state, deadline: float, username=None):
+    """Une connexion EventSource: une seule requête HTTP pour toute la durée"""
+    stats.requests += 1
+
+    async def is_disconnected():
+        return time.perf_counter() >= deadline
+
+    stream = hub.event_stream(topic, load_state, is_disconnected)
+    try:
+        while True:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                event = await asyncio.wait_for(stream.__anext__(), timeout=remaining)
+            except (asyncio.TimeoutError, StopAsyncIteration):
+                break
+            if event.startswith("data: "):
+                stats.events += 1
+                if username is not None:
+                    stats.record_messages(json.loads(event[6:])["messages"])
+    finally:
+        await stream.aclose()
+
+
+async def run_mode(mode: str, nb_tabs: int, nb_admins: int, seconds: float, interval: float) -> Stats:
+    stats = Stats()
+    deadline = time.perf_counter() + seconds
+    hub = SupportHub() if mode == "sse" else None
+
+    tasks = [sender(stats, hub, nb_tabs, interval, deadline)]
+    for i in range(nb_tabs):
+        username = f"user{i}"
+        if hub is None:
+            tasks.append(polling_tab(stats, username, deadline))
+        else:
+            tasks.append(sse_client(stats, hub, user_topic(username),
+                                    lambda u=username: load_user_state(stats, u), deadline, username))
+    for _ in range(nb_admins):
+        if hub is None:
+            tasks.append(polling_admin(stats, deadline))
+        else:
+            tasks.append(sse_client(stats, hub, ADMIN_TOPIC, lambda: load_admin_state(stats), deadline))
+
+    await asyncio.gather(*tasks)
+    return stats
+
+
+def report(name: str, stats: Stats, seconds: float):
+    latency = (f"moyenne {statistics.mean(stats.latencies) * 1000:6.0f} ms, "
+               f"max {max(stats.latencies) * 1000:6.0f} ms ({len(stats.latencies)} messages)"
+               if stats.latencies else "aucun message vu")
+    print(f"\n[{name}]")
+    print(f"  Requêtes HTTP:    {stats.requests:6d} ({stats.requests / seconds:7.1f}/s)")
+    print(f"  Lectures SQLite:  {stats.sqlite_reads:6d} ({stats.sqlite_reads / seconds:7.1f}/s)")
+    if stats.events:
+        print(f"  Événements SSE:   {stats.events:6d}")
+    print(f"  Délai d'affichage: {latency}")
+
+
+def main():
+    args = sys.argv[1:]
+
+    def option(name, default, cast):
+        return cast(args[args.index(name) + 1]) if name in args else default
+
+    nb_tabs = option("--tabs", 100, int)
+    nb_admins = option("--admins", 3, int)
+    seconds = option("--seconds", 30.0, float)
+    interval = option("--message-interval", 1.0, float)
+
+    database.init_database()
+    create_users(nb_tabs)
+
+    print("=" * 60)
+    print(f"TEST DE CHARGE CHAT SUPPORT - {nb_tabs} onglets, {nb_admins} admins, {seconds:.0f} s, "
+          f"1 message / {interval:g} s")
+    print("=" * 60)
+
+    polling = asyncio.run(run_mode("polling", nb_tabs, nb_admins, seconds, interval))
+    sse = asyncio.run(run_mode("sse", nb_tabs, nb_admins, seconds, interval))
+
+    report("Polling (avant)", polling, seconds)
+    report("SSE + hub", sse, seconds)
+    print(f"\nRequêtes HTTP: -{(1 - sse.requests / polling.requests) * 100:.0f}%  "
+          f"Lectures SQLite: -{(1 - sse.sqlite_reads / polling.sqlite_reads) * 100:.0f}%")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Script de migration des photos de profil vers le stockage adressé par contenu (photo_store.py)
+Usage:
+    python scripts/migrate_profile_photos.py            # liste ce qui serait importé
+    python scripts/migrate_profile_photos.py --apply    # importe et met à jour users.photo_hash
+
+Pour chaque utilisateur sans photo_hash, la photo la plus récente est cherchée
+dans l'ancien emplacement (users.photo_url, static/profile_photos/<user>_*,
+signatures/<user>/profile_photo*), puis rangée avec ses miniatures.
+"""
+
+import glob
+import os
+import sys
+
+# Ajouter le répertoire racine au path pour les imports
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+
+import photo_store
+from database import init_database
+from db_pool import get_connection
+
+
+def _legacy_photo_path(username, photo_url):
+    """Fichier de l'ancienne photo de l'utilisateur (la plus récente), None si aucune"""
+    candidates = []
+    if photo_url:
+        path = photo_url.split("?", 1)[0]
+        if path.startswith("/static/"):
+            candidates.append(os.path.join(ROOT_DIR, path.lstrip("/")))
+        elif path.startswith("/cloud/"):
+            candidates.append(os.path.join(photo_store.base_cloud, path[len("/cloud/"):]))
+    candidates.extend(glob.glob(os.path.join(ROOT_DIR, "static", "profile_photos", f"{username}_*.*")))
+    candidates.extend(glob.glob(os.path.join(photo_store.base_cloud, "signatures", username, "profile_photo*")))
+    existing = [path for path in candidates if os.path.isfile(path)]
+    return max(existing, key=os.path.getmtime) if existing else None
+
+
+def main():
+    apply = '--apply' in sys.argv
+
+    print("=" * 60)
+    print(f"MIGRATION DES PHOTOS DE PROFIL{' - IMPORT' if apply else ' - SIMULATION'}")
+    print(f"Destination: {photo_store.PHOTO_STORE_DIR}")
+    print("=" * 60)
+
+    init_database()
+    with get_connection() as conn:
+        users = conn.execute("SELECT username, photo_url FROM users WHERE photo_hash IS NULL").fetchall()
+
+    imported = skipped = 0
+    for username, photo_url in users:
+        path = _legacy_photo_path(username, photo_url)
+        if path is None:
+            continue
+        if not apply:
+            print(f"  [À IMPORTER] {username}: {path}")
+            imported += 1
+            continue
+        try:
+            with open(path, "rb") as f:
+                digest = photo_store.save_user_photo(username, f.read())
+            print(f"  [OK] {username}: {path} -> {digest[:12]}")
+            imported += 1
+        except photo_store.InvalidPhoto as e:
+            print(f"  [IGNORÉ] {username}: {path} ({e})")
+            skipped += 1
+
+    print()
+    print(f"[TERMINÉ] {imported} photo(s) {'importée(s)' if apply else 'à importer'}, {skipped} ignorée(s)")
+    if apply and imported:
+        print("Le classement reprendra les miniatures au prochain recalcul des utilisateurs concernés")
+
+
+if __name__ == "__main__":
+    main()
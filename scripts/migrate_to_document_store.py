@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Script de migration des listes JSON de base_cloud vers le DocumentStore SQLite
+Usage:
+    python scripts/migrate_to_document_store.py                    # toutes les collections
+    python scripts/migrate_to_document_store.py clients_perdus     # une seule collection
+    python scripts/migrate_to_document_store.py --verify           # compare JSON et SQLite
+
+La migration peut être relancée sans risque: chaque liste est remplacée en entier.
+"""
+
+import json
+import os
+import sys
+
+# Ajouter le répertoire racine au path pour les imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from document_store import COLLECTIONS, get_base_cloud, get_document_store, get_legacy_path, _read_legacy_file
+
+
+def list_users(collection: str):
+    """Liste les dossiers utilisateurs d'une collection"""
+    collection_dir = os.path.join(get_base_cloud(), collection)
+    if not os.path.isdir(collection_dir):
+        return []
+    return sorted(
+        name for name in os.listdir(collection_dir)
+        if os.path.isfile(os.path.join(collection_dir, name, COLLECTIONS[collection]))
+    )
+
+
+def migrate_collection(collection: str) -> tuple:
+    """Importe tous les fichiers d'une collection. Retourne (nb_users, nb_documents, nb_erreurs)"""
+    store = get_document_store()
+    users = list_users(collection)
+    total_docs = 0
+    errors = 0
+
+    for username in users:
+        try:
+            total_docs += store.import_legacy_file(collection, username)
+        except json.JSONDecodeError as e:
+            errors += 1
+            print(f"  [ERREUR] {collection}/{username}: JSON invalide ({e})")
+        except Exception as e:
+            errors += 1
+            print(f"  [ERREUR] {collection}/{username}: {e}")
+
+    return len(users), total_docs, errors
+
+
+def verify_collection(collection: str) -> int:
+    """Compare chaque fichier JSON avec SQLite. Retourne le nombre de différences"""
+    store = get_document_store()
+    differences = 0
+    for username in list_users(collection):
+        try:
+            legacy = _read_legacy_file(get_legacy_path(collection, username))
+        except json.JSONDecodeError:
+            continue
+        if legacy != store.get_all(collection, username):
+            differences += 1
+            print(f"  [DIFF] {collection}/{username}")
+    return differences
+
+
+def main():
+    args = [a for a in sys.argv[1:] if not a.startswith('--')]
+    verify = '--verify' in sys.argv
+    collections = args or list(COLLECTIONS)
+
+    unknown = [c for c in collections if c not in COLLECTIONS]
+    if unknown:
+        print(f"[ERREUR] Collections inconnues: {unknown}")
+        print(f"Collections disponibles: {list(COLLECTIONS)}")
+        sys.exit(1)
+
+    print("=" * 60)
+    print("VERIFICATION DU DOCUMENT STORE" if verify else "MIGRATION VERS LE DOCUMENT STORE")
+    print(f"Source: {get_base_cloud()}")
+    print(f"Base: {get_document_store().db_path}")
+    print("=" * 60)
+
+    total_errors = 0
+    for collection in collections:
+        if verify:
+            diffs = verify_collection(collection)
+            total_errors += diffs
+            print(f"[{collection}] {diffs} différence(s)")
+        else:
+            users, docs, errors = migrate_collection(collection)
+            total_errors += errors
+            print(f"[{collection}] {users} utilisateurs, {docs} documents, {errors} erreur(s)")
+
+    print()
+    print("[OK] Terminé" if total_errors == 0 else f"[ATTENTION] {total_errors} problème(s)")
+    sys.exit(0 if total_errors == 0 else 1)
+
+
+if __name__ == "__main__":
+    main()
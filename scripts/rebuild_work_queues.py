@@ -0,0 +1,46 @@
+#!/usr/bin/env python3
+"""
+Script de vérification / reconstruction de l'index des files de travail coach / comptable
+Usage:
+    python scripts/rebuild_work_queues.py            # compare l'index au parcours complet des fichiers
+    python scripts/rebuild_work_queues.py --rebuild  # vide l'index, le reconstruit puis vérifie
+
+Les compteurs et listes (facturation en traitement, employés, inactivations,
+réactivations en attente) lisent QE/Backend/work_queue_index.py. Ce script
+relit tous les fichiers des entrepreneurs (ancienne méthode des compteurs) et
+liste les écarts par entrepreneur et par file. Code de sortie 1 s'il en reste.
+"""
+
+import os
+import sys
+
+# Ajouter le répertoire racine au path pour les imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from QE.Backend import work_queue_index
+
+
+def main():
+    rebuild = '--rebuild' in sys.argv
+
+    print("=" * 60)
+    print(f"INDEX DES FILES DE TRAVAIL{' - RECONSTRUCTION' if rebuild else ' - VÉRIFICATION'}")
+    print(f"Source: {work_queue_index.base_cloud}")
+    print("=" * 60)
+
+    work_queue_index.init_work_queue_tables()
+    if rebuild:
+        indexed = work_queue_index.rebuild()
+        print(f"[REBUILD] {indexed} fichier(s) indexé(s)")
+
+    differences = work_queue_index.verify()
+    for diff in differences:
+        print(f"  [ÉCART] {diff['entrepreneur']} / {diff['queue']}: index={diff['index']} fichiers={diff['scan']}")
+
+    print()
+    print("[OK] Index cohérent avec les fichiers" if not differences else f"[ATTENTION] {len(differences)} écart(s)")
+    sys.exit(0 if not differences else 1)
+
+
+if __name__ == "__main__":
+    main()
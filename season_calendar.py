@@ -0,0 +1,169 @@
+"""
+Calendrier précalculé des semaines de la saison RPO
+
+get_week_number_from_date() recalculait le premier lundi du mois (avec
+plusieurs cas spéciaux codés pour 2025/2026) à chaque date, et chaque filtre
+par période reparsait le week_label ("26 janv - 1 févr") de chaque semaine RPO
+de chaque utilisateur. /api/rpo/available-weeks gardait en plus sa propre
+liste de semaines écrite à la main.
+
+Maintenant, une table par année de saison (calculée une fois, lru_cache):
+- mois -2 = décembre de l'année précédente (semaines comptées depuis son
+  premier lundi; les jours de janvier avant le premier lundi de janvier y
+  appartiennent encore), puis mois 0-11 = janvier-décembre, une semaine
+  appartenant au mois de son lundi
+- week_of(jour) en O(1) (dict jour -> semaine)
+- between(début, fin) en O(log n + k) (bisect sur les débuts/fins triés)
+- get(mois, semaine) et by_label(week_label) en O(1)
+
+L'année par défaut est config.RPO_SEASON_YEAR; toutes les fonctions acceptent
+une autre année pour les saisons suivantes.
+"""
+
+from bisect import bisect_left, bisect_right
+from datetime import date, datetime, time, timedelta, timezone
+from functools import lru_cache
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+import config
+from utils import parse_week_label_to_dates
+
+# Mois de décembre de l'année précédente dans weekly[mois]
+DECEMBER_MONTH_INDEX = -2
+
+# Abréviations utilisées dans les week_label du RPO (mêmes que le frontend)
+MONTH_ABBREVIATIONS = {
+    1: "janv", 2: "févr", 3: "mars", 4: "avr", 5: "mai", 6: "juin",
+    7: "juil", 8: "août", 9: "sept", 10: "oct", 11: "nov", 12: "déc",
+}
+
+
+class Week(NamedTuple):
+    month_index: int
+    week_number: int
+    start: date
+    end: date
+    label: str
+
+    @property
+    def key(self) -> Tuple[str, str]:
+        """Clés (mois, semaine) de weekly dans le JSON RPO"""
+        return str(self.month_index), str(self.week_number)
+
+    @property
+    def start_datetime(self) -> datetime:
+        return datetime.combine(self.start, time.min, tzinfo=timezone.utc)
+
+    @property
+    def end_datetime(self) -> datetime:
+        return datetime.combine(self.end, time(23, 59, 59), tzinfo=timezone.utc)
+
+
+def _first_monday(year: int, month: int) -> date:
+    first_day = date(year, month, 1)
+    return first_day + timedelta(days=(7 - first_day.weekday()) % 7)
+
+
+def format_week_label(start: date, end: date) -> str:
+    """"5 - 11 janv" ou "26 janv - 1 févr" """
+    if start.month == end.month:
+        return f"{start.day} - {end.day} {MONTH_ABBREVIATIONS[end.month]}"
+    return f"{start.day} {MONTH_ABBREVIATIONS[start.month]} - {end.day} {MONTH_ABBREVIATIONS[end.month]}"
+
+
+class SeasonCalendar:
+    """Semaines (mois, semaine) -> [début, fin] d'une saison RPO"""
+
+    def __init__(self, year: int):
+        self.year = year
+        self.first_day = date(year - 1, 12, 1)
+        self.last_day = date(year, 12, 31)
+
+        december_monday = _first_monday(year - 1, 12)
+        january_monday = _first_monday(year, 1)
+
+        keys_by_day: Dict[date, Tuple[int, int]] = {}
+        day = self.first_day
+        while day <= self.last_day:
+            if day < january_monday:
+                week_number = 1 if day < december_monday else (day - december_monday).days // 7 + 1
+                keys_by_day[day] = (DECEMBER_MONTH_INDEX, week_number)
+            else:
+                monday = day - timedelta(days=day.weekday())
+                week_number = (monday - _first_monday(monday.year, monday.month)).days // 7 + 1
+                keys_by_day[day] = (monday.month - 1, week_number)
+            day += timedelta(days=1)
+
+        # Bornes de chaque semaine; la dernière semaine de décembre peut déborder sur l'année suivante
+        bounds: Dict[Tuple[int, int], List[date]] = {}
+        for day, key in keys_by_day.items():
+            if key not in bounds:
+                bounds[key] = [day, day]
+            bounds[key][1] = day
+        for (month_index, _), span in bounds.items():
+            if month_index != DECEMBER_MONTH_INDEX:
+                span[1] = span[0] + timedelta(days=6)
+
+        self.weeks: Tuple[Week, ...] = tuple(
+            Week(month_index, week_number, start, end, format_week_label(start, end))
+            for (month_index, week_number), (start, end) in sorted(bounds.items(), key=lambda item: item[1][0])
+        )
+        self._by_key = {(w.month_index, w.week_number): w for w in self.weeks}
+        self._by_label = {w.label: w for w in self.weeks}
+        self._by_day = {day: self._by_key[key] for day, key in keys_by_day.items()}
+        self._starts = [w.start for w in self.weeks]
+        self._ends = [w.end for w in self.weeks]
+
+    def week_of(self, day) -> Optional[Week]:
+        """Semaine contenant ce jour (date ou datetime, jour local), None hors saison"""
+        if isinstance(day, datetime):
+            day = day.date()
+        return self._by_day.get(day)
+
+    def get(self, month_index: int, week_number: int) -> Optional[Week]:
+        return self._by_key.get((month_index, week_number))
+
+    def by_label(self, week_label: str) -> Optional[Week]:
+        return self._by_label.get(week_label)
+
+    def between(self, start=None, end=None) -> List[Week]:
+        """Semaines qui chevauchent [start, end] (date ou datetime, None = ouverte), dans l'ordre"""
+        if isinstance(start, datetime):
+            start = start.date()
+        if isinstance(end, datetime):
+            end = end.date()
+        lo = 0 if start is None else bisect_left(self._ends, start)
+        hi = len(self.weeks) if end is None else bisect_right(self._starts, end)
+        return list(self.weeks[lo:hi])
+
+    def month_weeks(self, month_index: int) -> List[Week]:
+        return [w for w in self.weeks if w.month_index == month_index]
+
+
+@lru_cache(maxsize=8)
+def _season_calendar(year: int) -> SeasonCalendar:
+    return SeasonCalendar(year)
+
+
+def season_calendar(year: Optional[int] = None) -> SeasonCalendar:
+    """Calendrier de la saison (config.RPO_SEASON_YEAR par défaut), construit une fois par année"""
+    return _season_calendar(year or config.RPO_SEASON_YEAR)
+
+
+@lru_cache(maxsize=4096)
+def _week_label_bounds(week_label: str, year: int) -> Tuple[Optional[datetime], Optional[datetime]]:
+    week = _season_calendar(year).by_label(week_label)
+    if week is not None:
+        return week.start_datetime, week.end_datetime
+    # Label hors calendrier (ancien mois -1, format saisi à la main): parsing
+    return parse_week_label_to_dates(week_label, year)
+
+
+def week_label_bounds(week_label: str, year: Optional[int] = None) -> Tuple[Optional[datetime], Optional[datetime]]:
+    """
+    (début, fin) en datetime UTC d'un week_label, comme parse_week_label_to_dates()
+    mais sans parsing pour les labels du calendrier
+    """
+    if not week_label or week_label == "N/A":
+        return None, None
+    return _week_label_bounds(week_label, year or config.RPO_SEASON_YEAR)
@@ -0,0 +1,65 @@
+"""
+Sérialisation JSON centralisée (orjson si disponible, sinon json standard)
+
+Toutes les lectures/écritures des fichiers JSON (utils, cache JSON, RPO) et
+les réponses FastAPI passent par ce module. Le format sur disque reste le même
+qu'avec json.dump(indent=2, ensure_ascii=False): les fichiers restent lisibles
+et comparables avec les anciens.
+
+Cas où orjson refuse une valeur (entier > 64 bits, Decimal, NaN à la lecture...):
+on retombe automatiquement sur le module json standard.
+"""
+
+import json
+from typing import Any
+
+try:
+    import orjson
+    HAS_ORJSON = True
+except ImportError:  # orjson est dans requirements.txt
+    orjson = None
+    HAS_ORJSON = False
+
+
+def loads(content: Any) -> Any:
+    """Parse du JSON (str ou bytes). Lève json.JSONDecodeError si invalide"""
+    if HAS_ORJSON:
+        try:
+            return orjson.loads(content)
+        except orjson.JSONDecodeError:
+            # NaN/Infinity écrits par l'ancien json.dump: orjson les refuse
+            pass
+    if isinstance(content, (bytes, bytearray)):
+        content = content.decode("utf-8")
+    return json.loads(content)
+
+
+def dumps_bytes(data: Any, indent: bool = False) -> bytes:
+    """Sérialise en UTF-8 (non ASCII conservés, comme ensure_ascii=False)"""
+    if HAS_ORJSON:
+        option = orjson.OPT_NON_STR_KEYS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        try:
+            return orjson.dumps(data, option=option)
+        except TypeError:
+            # orjson.JSONEncodeError hérite de TypeError: Decimal, entier > 64 bits...
+            pass
+    return json.dumps(data, indent=2 if indent else None, ensure_ascii=False).encode("utf-8")
+
+
+def dumps(data: Any, indent: bool = False) -> str:
+    return dumps_bytes(data, indent).decode("utf-8")
+
+
+def read_json_file(file_path) -> Any:
+    """Lit et parse un fichier JSON"""
+    with open(file_path, "rb") as f:
+        return loads(f.read())
+
+
+def write_json_file(file_path, data: Any, indent: bool = True):
+    """Écrit un fichier JSON (indent=2 par défaut, comme les fichiers existants)"""
+    with open(file_path, "wb") as f:
+        f.write(dumps_bytes(data, indent))
+
@@ -0,0 +1,349 @@
+"""
+Assets statiques du frontend (CSS/JS de QE/Frontend): empreinte, précompression et cache HTTP
+
+Avant: chaque fichier CSS/JS avait sa propre route FileResponse (sans
+compression), les pages principales étaient envoyées avec no-store et le
+service worker est auto-destructeur: chaque navigation retéléchargeait
+apppc.html (225 Ko), base.css, common.js, etc.
+
+Maintenant:
+- Build (scripts/build_assets.py, ou automatiquement au démarrage si les
+  sources ont changé): chaque .css/.js est copié dans build/assets sous un
+  nom avec empreinte (base.<sha256>.css) + versions .gz et .br, et un
+  manifest.json fait le lien nom logique -> fichier
+- /assets/<fichier> sert ces fichiers avec Cache-Control immutable (1 an),
+  ETag / If-None-Match (304) et la meilleure compression acceptée (br, gzip)
+- Les pages HTML sont servies par html_response(): les liens /base.css,
+  /common.js... y sont réécrits vers /assets/..., le résultat est compressé
+  une fois puis gardé en mémoire, et la page est revalidée à chaque
+  navigation (no-cache + ETag: 304 sans corps si rien n'a changé)
+- Les anciennes URL (/base.css...) restent servies (legacy_response), compressées
+  et revalidées, pour les pages ou onglets qui les référencent encore
+
+Brotli est optionnel: sans le module brotli, seuls gzip et identité sont servis.
+"""
+
+import gzip
+import hashlib
+import mimetypes
+import os
+import re
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+from starlette.responses import FileResponse, Response
+
+import serialization
+
+try:
+    import brotli
+    HAS_BROTLI = True
+except ImportError:  # Brotli est dans requirements.txt
+    brotli = None
+    HAS_BROTLI = False
+
+BASE_DIR = Path(__file__).resolve().parent
+FRONTEND_DIR = BASE_DIR / "QE" / "Frontend"
+ASSETS_DIR = BASE_DIR / "build" / "assets"
+MANIFEST_PATH = ASSETS_DIR / "manifest.json"
+
+ASSET_EXTENSIONS = (".css", ".js")
+ASSETS_URL_PREFIX = "/assets/"
+
+# Fichiers avec empreinte: le contenu d'une URL ne change jamais
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+# Pages HTML et anciennes URL: toujours revalider (304 si inchangé)
+REVALIDATE_CACHE_CONTROL = os.getenv("HTML_CACHE_CONTROL", "no-cache")
+# Intervalle minimal entre deux vérifications des sources (modification en cours d'exécution)
+ASSETS_CHECK_SECONDS = float(os.getenv("ASSETS_CHECK_SECONDS", "5"))
+
+_ENCODINGS = (("br", ".br"), ("gzip", ".gz"))
+
+# href="/base.css" ou src="/common.js?v=20260114" (chemin racine uniquement)
+_ASSET_LINK_RE = re.compile(r"""(?P<attr>href|src)=(?P<quote>["'])/(?P<name>[\w.\-]+\.(?:css|js))(?:\?[^"']*)?(?P=quote)""")
+
+
+# ----------------------------------------------------------------------
+# Compression et en-têtes
+# ----------------------------------------------------------------------
+
+def _compress(content: bytes) -> Dict[str, bytes]:
+    """Versions compressées plus petites que l'original (gzip déterministe: mtime=0)"""
+    variants = {"gzip": gzip.compress(content, compresslevel=9, mtime=0)}
+    if HAS_BROTLI:
+        variants["br"] = brotli.compress(content, quality=11)
+    return {name: data for name, data in variants.items() if len(data) < len(content)}
+
+
+def negotiate_encoding(accept_encoding: str, available) -> Optional[str]:
+    """Meilleur encodage disponible accepté par le client (br > gzip), None pour identité"""
+    accepted = set()
+    for part in (accept_encoding or "").lower().split(","):
+        name, _, params = part.strip().partition(";")
+        if not name:
+            continue
+        q = params.strip()
+        if q.startswith("q=") and q[2:].strip() in ("0", "0.0", "0.00", "0.000"):
+            continue
+        accepted.add(name.strip())
+    for name, _ in _ENCODINGS:
+        if name in available and (name in accepted or "*" in accepted):
+            return name
+    return None
+
+
+def _etag(digest: str, encoding: Optional[str]) -> str:
+    # Un ETag par représentation (les octets diffèrent selon la compression)
+    return f'"{digest}-{encoding}"' if encoding else f'"{digest}"'
+
+
+def _not_modified(if_none_match: Optional[str], digest: str) -> bool:
+    """If-None-Match correspond au contenu, quelle que soit la compression de la version en cache"""
+    if not if_none_match:
+        return False
+    for tag in if_none_match.split(","):
+        tag = tag.strip()
+        if tag == "*":
+            return True
+        if tag.startswith("W/"):
+            tag = tag[2:]
+        tag = tag.strip('"')
+        if tag == digest or tag.startswith(f"{digest}-"):
+            return True
+    return False
+
+
+def _headers(digest: str, encoding: Optional[str], cache_control: str) -> Dict[str, str]:
+    headers = {"Cache-Control": cache_control, "ETag": _etag(digest, encoding), "Vary": "Accept-Encoding"}
+    if encoding:
+        headers["Content-Encoding"] = encoding
+    return headers
+
+
+def _media_type(name: str) -> str:
+    if name.endswith(".js"):
+        return "application/javascript"
+    if name.endswith(".css"):
+        return "text/css"
+    return mimetypes.guess_type(name)[0] or "application/octet-stream"
+
+
+def _write_atomic(path: Path, content: bytes):
+    tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    with open(tmp_path, "wb") as f:
+        f.write(content)
+    os.replace(tmp_path, path)
+
+
+# ----------------------------------------------------------------------
+# Assets avec empreinte
+# ----------------------------------------------------------------------
+
+class AssetStore:
+    """Manifest des assets avec empreinte + cache des pages HTML réécrites (par worker)"""
+
+    def __init__(self, frontend_dir: Path = FRONTEND_DIR, assets_dir: Path = ASSETS_DIR):
+        self.frontend_dir = Path(frontend_dir)
+        self.assets_dir = Path(assets_dir)
+        self.manifest_path = self.assets_dir / "manifest.json"
+        self._lock = threading.RLock()
+        self._assets: Dict[str, dict] = {}       # nom logique ("Common/base.css") -> entrée
+        self._by_file: Dict[str, dict] = {}      # "base.<empreinte>.css" -> entrée
+        self._by_url: Dict[str, str] = {}        # "base.css" (URL racine historique) -> nom logique
+        self._html: Dict[str, Tuple[tuple, str, Dict[Optional[str], bytes]]] = {}
+        self._version = ""
+        self._last_check = 0.0
+
+    # -- Build --------------------------------------------------------
+
+    def _sources(self) -> Dict[str, Path]:
+        sources = {}
+        for root, dirs, files in os.walk(self.frontend_dir):
+            dirs[:] = sorted(d for d in dirs if d != "node_modules" and not d.startswith("."))
+            for name in sorted(files):
+                if name.endswith(ASSET_EXTENSIONS):
+                    path = Path(root) / name
+                    sources[path.relative_to(self.frontend_dir).as_posix()] = path
+        return sources
+
+    def _signatures(self, sources: Dict[str, Path]) -> Dict[str, list]:
+        signatures = {}
+        for logical, path in sources.items():
+            stat = path.stat()
+            signatures[logical] = [stat.st_mtime_ns, stat.st_size]
+        return signatures
+
+    def build(self) -> dict:
+        """Écrit les fichiers avec empreinte (+ .gz/.br) et le manifest. Retourne le manifest"""
+        sources = self._sources()
+        self.assets_dir.mkdir(parents=True, exist_ok=True)
+
+        assets = {}
+        for logical, path in sources.items():
+            stat = path.stat()
+            content = path.read_bytes()
+            digest = hashlib.sha256(content).hexdigest()[:16]
+            stem, ext = os.path.splitext(path.name)
+            filename = f"{stem}.{digest}{ext}"
+            target = self.assets_dir / filename
+
+            # Même empreinte déjà construite (source inchangée): pas de recompression
+            encodings = [name for name, suffix in _ENCODINGS
+                         if (self.assets_dir / f"{filename}{suffix}").exists()]
+            if not target.exists() or not encodings or (HAS_BROTLI and "br" not in encodings):
+                _write_atomic(target, content)
+                encodings = []
+                for name, data in _compress(content).items():
+                    _write_atomic(self.assets_dir / f"{filename}{dict(_ENCODINGS)[name]}", data)
+                    encodings.append(name)
+
+            assets[logical] = {
+                "file": filename,
+                "digest": digest,
+                "size": len(content),
+                "encodings": sorted(encodings),
+                "source": [stat.st_mtime_ns, stat.st_size],
+            }
+
+        manifest = {"version": hashlib.sha256(serialization.dumps_bytes(
+            {k: v["digest"] for k, v in assets.items()})).hexdigest()[:16], "assets": assets}
+        _write_atomic(self.manifest_path, serialization.dumps_bytes(manifest, indent=True))
+
+        # Anciennes versions qui ne sont plus référencées
+        keep = {entry["file"] for entry in assets.values()}
+        for path in self.assets_dir.iterdir():
+            base = path.name
+            for _, suffix in _ENCODINGS:
+                if base.endswith(suffix):
+                    base = base[:-len(suffix)]
+            if path != self.manifest_path and base not in keep and not path.name.endswith(".tmp"):
+                try:
+                    path.unlink()
+                except FileNotFoundError:
+                    pass
+        return manifest
+
+    def _read_manifest(self) -> Optional[dict]:
+        try:
+            return serialization.loads(self.manifest_path.read_bytes())
+        except (OSError, ValueError):
+            return None
+
+    def _is_fresh(self, manifest: Optional[dict], sources: Dict[str, Path]) -> bool:
+        if not manifest or set(manifest.get("assets", {})) != set(sources):
+            return False
+        signatures = self._signatures(sources)
+        return all(entry.get("source") == signatures[logical] for logical, entry in manifest["assets"].items())
+
+    def load(self) -> dict:
+        """Charge le manifest (reconstruit si absent ou si une source a changé)"""
+        with self._lock:
+            sources = self._sources()
+            manifest = self._read_manifest()
+            if not self._is_fresh(manifest, sources):
+                start = time.perf_counter()
+                manifest = self.build()
+                print(f"[ASSETS] {len(manifest['assets'])} assets construits en "
+                      f"{time.perf_counter() - start:.1f}s (brotli: {'oui' if HAS_BROTLI else 'non'})", flush=True)
+
+            basenames: Dict[str, list] = {}
+            for logical in manifest["assets"]:
+                basenames.setdefault(logical.rsplit("/", 1)[-1], []).append(logical)
+
+            self._assets = manifest["assets"]
+            self._by_file = {entry["file"]: entry for entry in self._assets.values()}
+            # Seuls les noms uniques sont réécrits (les routes historiques servent /<nom>)
+            self._by_url = {name: logicals[0] for name, logicals in basenames.items() if len(logicals) == 1}
+            self._version = manifest["version"]
+            self._html.clear()
+            self._last_check = time.monotonic()
+            return manifest
+
+    def refresh_if_stale(self):
+        """Reconstruit si une source a changé (au plus toutes les ASSETS_CHECK_SECONDS)"""
+        now = time.monotonic()
+        if now - self._last_check < ASSETS_CHECK_SECONDS:
+            return
+        self._last_check = now
+        sources = self._sources()
+        if not self._is_fresh({"assets": self._assets}, sources):
+            self.load()
+
+    # -- URL ----------------------------------------------------------
+
+    def asset_url(self, logical: str) -> str:
+        """URL avec empreinte d'un asset ("Common/base.css" -> "/assets/base.<empreinte>.css")"""
+        return f"{ASSETS_URL_PREFIX}{self._assets[logical]['file']}"
+
+    def rewrite_html(self, html: str) -> str:
+        """Remplace les liens racine (/base.css, /common.js?v=...) par les URL avec empreinte"""
+        def replace(match):
+            logical = self._by_url.get(match.group("name"))
+            if logical is None:
+                return match.group(0)
+            quote = match.group("quote")
+            return f"{match.group('attr')}={quote}{self.asset_url(logical)}{quote}"
+        return _ASSET_LINK_RE.sub(replace, html)
+
+    # -- Réponses -----------------------------------------------------
+
+    def asset_response(self, request, filename: str) -> Response:
+        """GET /assets/<fichier avec empreinte>: cache immutable, 304, br/gzip"""
+        entry = self._by_file.get(filename)
+        if entry is None:
+            return Response(status_code=404)
+        return self._file_response(request, entry, IMMUTABLE_CACHE_CONTROL)
+
+    def legacy_response(self, request, logical: str) -> Response:
+        """Ancienne URL (/base.css...): même fichier compressé, mais revalidé à chaque chargement"""
+        self.refresh_if_stale()
+        entry = self._assets.get(logical)
+        if entry is None:
+            return Response(status_code=404)
+        return self._file_response(request, entry, REVALIDATE_CACHE_CONTROL)
+
+    def _file_response(self, request, entry: dict, cache_control: str) -> Response:
+        digest = entry["digest"]
+        if _not_modified(request.headers.get("if-none-match"), digest):
+            return Response(status_code=304, headers=_headers(digest, None, cache_control))
+
+        encoding = negotiate_encoding(request.headers.get("accept-encoding", ""), entry["encodings"])
+        path = self.assets_dir / entry["file"]
+        if encoding:
+            path = path.with_name(f"{path.name}{dict(_ENCODINGS)[encoding]}")
+        # FileResponse garde les en-têtes fournis (ETag inclus) et ajoute Content-Length
+        return FileResponse(path, media_type=_media_type(entry["file"]),
+                            headers=_headers(digest, encoding, cache_control))
+
+    def html_response(self, request, path) -> Response:
+        """Page HTML: liens vers les assets avec empreinte, compressée une fois, revalidée (304)"""
+        self.refresh_if_stale()
+        path = str(path)
+        stat = os.stat(path)
+        signature = (stat.st_mtime_ns, stat.st_size, self._version)
+
+        with self._lock:
+            cached = self._html.get(path)
+        if cached is None or cached[0] != signature:
+            with open(path, "r", encoding="utf-8") as f:
+                content = self.rewrite_html(f.read()).encode("utf-8")
+            digest = hashlib.sha256(content).hexdigest()[:16]
+            variants: Dict[Optional[str], bytes] = {None: content, **_compress(content)}
+            cached = (signature, digest, variants)
+            with self._lock:
+                self._html[path] = cached
+
+        _, digest, variants = cached
+        if _not_modified(request.headers.get("if-none-match"), digest):
+            return Response(status_code=304, headers=_headers(digest, None, REVALIDATE_CACHE_CONTROL))
+
+        encoding = negotiate_encoding(request.headers.get("accept-encoding", ""),
+                                      [name for name in variants if name])
+        return Response(content=variants[encoding], media_type="text/html; charset=utf-8",
+                        headers=_headers(digest, encoding, REVALIDATE_CACHE_CONTROL))
+
+
+# Store unique du processus
+asset_store = AssetStore()
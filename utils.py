@@ -8,11 +8,15 @@ from pathlib import Path
 from typing import Any, Optional, TypeVar, Union
 
 import config
+import json_cache
+import serialization
 
 logger = logging.getLogger(__name__)
 
 T = TypeVar('T')
 
+_MISSING = object()
+
 # ===================================
 # GESTION SÉCURISÉE DES FICHIERS JSON
 # ===================================
@@ -30,15 +34,11 @@ def load_json_file(file_path: Union[str, Path], default: Optional[T] = None) ->
     """
     file_path = Path(file_path)
 
-    if not file_path.exists():
-        return default if default is not None else []
-
     try:
-        with open(file_path, 'r', encoding='utf-8') as f:
-            content = f.read().strip()
-            if not content:
-                return default if default is not None else []
-            return json.loads(content)
+        data = json_cache.load_json_cached(file_path, default=_MISSING)
+        if data is _MISSING:
+            return default if default is not None else []
+        return data
     except json.JSONDecodeError as e:
         logger.error(f"JSON decode error in {file_path}: {e}")
         return default if default is not None else []
@@ -68,8 +68,8 @@ def save_json_file(
         file_path.parent.mkdir(parents=True, exist_ok=True)
 
     try:
-        with open(file_path, 'w', encoding='utf-8') as f:
-            json.dump(data, f, indent=2, ensure_ascii=False)
+        serialization.write_json_file(file_path, data)
+        json_cache.invalidate(file_path)
         return True
     except Exception as e:
         logger.error(f"Error saving JSON to {file_path}: {e}")
@@ -206,6 +206,149 @@ def validate_password_strength(password: str) -> tuple[bool, str]:
 
     return True, ""
 
+# ===================================
+# DATES ET SEMAINES RPO
+# ===================================
+
+def parse_week_label_to_dates(week_label: str, year: Optional[int] = None):
+    """
+    Parse un week_label du RPO (ex: "5 - 11 janv", "26 janv - 1 févr")
+    et retourne (start_date, end_date) en datetime.
+    Pour les semaines de la saison, season_calendar.week_label_bounds() évite le parsing.
+    """
+    from datetime import datetime, timezone
+
+    if not week_label or week_label == "N/A":
+        return None, None
+
+    year = year or config.RPO_SEASON_YEAR
+
+    # Mapping des mois français vers numéros
+    mois_map = {
+        'janv': 1, 'janvier': 1,
+        'févr': 2, 'fevr': 2, 'février': 2, 'fevrier': 2,
+        'mars': 3,
+        'avr': 4, 'avril': 4,
+        'mai': 5,
+        'juin': 6,
+        'juil': 7, 'juillet': 7,
+        'août': 8, 'aout': 8,
+        'sept': 9, 'septembre': 9,
+        'oct': 10, 'octobre': 10,
+        'nov': 11, 'novembre': 11,
+        'déc': 12, 'dec': 12, 'décembre': 12, 'decembre': 12
+    }
+
+    try:
+        # Format: "5 - 11 janv" ou "26 janv - 1 févr"
+        parts = week_label.split(' - ')
+        if len(parts) != 2:
+            return None, None
+
+        start_part = parts[0].strip()  # "5" ou "26 janv"
+        end_part = parts[1].strip()    # "11 janv" ou "1 févr"
+
+        # Parser la fin (toujours contient le mois)
+        end_tokens = end_part.split()
+        end_day = int(end_tokens[0])
+        end_month_str = end_tokens[1].lower() if len(end_tokens) > 1 else None
+        end_month = mois_map.get(end_month_str, 1)
+
+        # Parser le début
+        start_tokens = start_part.split()
+        start_day = int(start_tokens[0])
+        if len(start_tokens) > 1:
+            # Le mois est spécifié (ex: "26 janv")
+            start_month_str = start_tokens[1].lower()
+            start_month = mois_map.get(start_month_str, end_month)
+        else:
+            # Pas de mois, utiliser le même que la fin
+            start_month = end_month
+
+        # Gérer le changement d'année (décembre -> janvier)
+        start_year = year
+        end_year = year
+        if start_month == 12 and end_month == 1:
+            start_year = year - 1
+
+        start_date = datetime(start_year, start_month, start_day, 0, 0, 0, tzinfo=timezone.utc)
+        end_date = datetime(end_year, end_month, end_day, 23, 59, 59, tzinfo=timezone.utc)
+
+        return start_date, end_date
+    except Exception as e:
+        print(f"[WARNING] Erreur parsing week_label '{week_label}': {e}", flush=True)
+        return None, None
+
+
+def filter_rpo_weekly_by_period(weekly_data: dict, start_date, end_date, year: Optional[int] = None):
+    """
+    Filtre les données weekly du RPO par période.
+    Retourne un dict avec les mêmes clés mais uniquement les semaines dans la période.
+    """
+    # Import local: season_calendar importe utils
+    from season_calendar import week_label_bounds
+
+    if not start_date or not end_date:
+        return weekly_data  # Pas de filtre, retourner tout
+
+    filtered = {}
+
+    for month_key, weeks in weekly_data.items():
+        try:
+            month_num = int(month_key)
+            if month_num < -1:  # Ignorer les mois trop anciens
+                continue
+        except:
+            continue
+
+        for week_key, week_data in weeks.items():
+            week_label = week_data.get("week_label", "")
+            week_start, week_end = week_label_bounds(week_label, year)
+
+            if week_start and week_end:
+                # Vérifier si la semaine chevauche la période demandée
+                if week_end >= start_date and week_start <= end_date:
+                    if month_key not in filtered:
+                        filtered[month_key] = {}
+                    filtered[month_key][week_key] = week_data
+
+    return filtered
+
+
+def parse_date_flexible(date_str: str):
+    """
+    Parse une date dans différents formats: DD/MM/YYYY, YYYY-MM-DD, ISO
+    Retourne un objet datetime ou None si le parsing échoue
+    """
+    from datetime import datetime, timezone
+
+    if not date_str:
+        return None
+
+    # Essayer format DD/MM/YYYY
+    try:
+        return datetime.strptime(date_str, "%d/%m/%Y").replace(tzinfo=timezone.utc)
+    except ValueError:
+        pass
+
+    # Essayer format YYYY-MM-DD
+    try:
+        return datetime.strptime(date_str, "%Y-%m-%d").replace(tzinfo=timezone.utc)
+    except ValueError:
+        pass
+
+    # Essayer format ISO complet
+    try:
+        date_obj = datetime.fromisoformat(date_str)
+        if date_obj.tzinfo is None:
+            date_obj = date_obj.replace(tzinfo=timezone.utc)
+        return date_obj
+    except ValueError:
+        pass
+
+    return None
+
+
 # ===================================
 # HELPERS
 # ===================================